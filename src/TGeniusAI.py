@@ -29,10 +29,9 @@ from pyqtgraph.dockarea.DockArea import DockArea
 from src.ui.CustomDock import CustomDock
 
 from moviepy.editor import (
-    ImageClip, CompositeVideoClip, concatenate_audioclips,
-    concatenate_videoclips, VideoFileClip, AudioFileClip, vfx, TextClip, ImageSequenceClip
+    ImageClip, CompositeVideoClip,
+    concatenate_videoclips, VideoFileClip, AudioFileClip, TextClip, ImageSequenceClip
 )
-from moviepy.audio.AudioClip import CompositeAudioClip, AudioArrayClip
 from pydub import AudioSegment
 from PIL import Image, ImageDraw, ImageFont
 import cv2
@@ -53,6 +52,11 @@ from src.services.WhisperTranscript import WhisperTranscriptionThread
 from src.services.AudioGenerationREST import AudioGenerationThread, FetchVoicesThread
 from src.services.VideoCutting import VideoCuttingThread
 from src.recorder.ScreenRecorder import ScreenRecorder
+from src.recorder.CaptureOptions import (
+    CAPTURE_MODE_MP4, DEFAULT_SEGMENT_SECONDS, SEGMENT_LIST_NAME, DEFAULT_CAPTURE_PROFILE, CAPTURE_PROFILES,
+    parse_capture_region, unique_recording_path
+)
+from src.recorder.RecordingTelemetry import HEALTH_LAGGING
 from src.managers.SettingsManager import DockSettingsManager
 from src.ui.CustVideoWidget import CropVideoWidget
 from src.ui.CustomSlider import CustomSlider
@@ -65,6 +69,7 @@ from src.services.threads import PptxGenerationThread
 from src.ui.PptxDialog import PptxDialog
 from src.ui.ExportDialog import ExportDialog
 from src.services.ProcessTextAI import ProcessTextAI
+from src.services.ResponseCache import CACHE_DISABLE_ENV
 from src.ui.SplashScreen import SplashScreen
 from src.services.ShareVideo import VideoSharingManager
 from src.ui.MonitorPreview import MonitorPreview
@@ -72,14 +77,16 @@ from src.managers.StreamToLogger import setup_logging
 from src.services.FrameExtractor import FrameExtractor
 from src.services.OperationalGuideThread import OperationalGuideThread
 from src.ui.OperationalGuideDialog import OperationalGuideDialog
-from src.services.VideoCropping import CropThread
+from src.services.VideoCropping import CropThread, BatchCropThread
+from src.services.BackgroundAudio import BackgroundAudioThread
+from src.services.SegmentMerger import SegmentMergeThread
 from PyQt6.QtCore import QThread, pyqtSignal, Qt
 from src.ui.CropDialog import CropDialog
 from src.ui.FrameEditorDialog import FrameEditorDialog
 from src.ui.CursorOverlay import CursorOverlay
 from src.ui.MultiLineInputDialog import MultiLineInputDialog
 from src.ui.AddMediaDialog import AddMediaDialog
-from src.config import (get_api_key, FFMPEG_PATH, FFMPEG_PATH_DOWNLOAD, VERSION_FILE,
+from src.config import (get_api_key, FFMPEG_PATH, FFPROBE_PATH, FFMPEG_PATH_DOWNLOAD, VERSION_FILE,
                     MUSIC_DIR, DEFAULT_FRAME_COUNT, DEFAULT_AUDIO_CHANNELS,
                     DEFAULT_STABILITY, DEFAULT_SIMILARITY, DEFAULT_STYLE,
                     DEFAULT_FRAME_RATE, get_default_voices, SPLASH_IMAGES_DIR,
@@ -98,9 +105,16 @@ from src.managers.BookmarkManager import BookmarkManager
 from src.ui.ProjectDock import ProjectDock
 from src.ui.ChatDock import ChatDock
 from src.services.BatchTranscription import BatchTranscriptionThread
+from src.services.BatchSummarization import BatchSummarizationThread, SUMMARY_DETAILED, SUMMARY_MEETING, CLIP_JSON_LOCK
 from src.services.VideoCompositing import VideoCompositingThread
 from src.managers.HtmlManager import HtmlManager
 from src.services.utils import generate_unique_filename
+from src.services.ParallelEncoder import ParallelSegmentEncoder, write_clip
+from src.services.VideoReverser import ChunkedReverseEngine
+from src.services.SpeedAlign import SpeedAlignEngine
+from src.services.MediaInfo import get_media_info, parse_frame_rate
+from src.services.ProxyGenerator import ProxyGenerationThread
+from src.services.PauseInsertion import FreezeFramePauseThread, AudioPauseThread
 from src.services.Translator import TranslationService
 from src.services.TranslationThread import TranslationThread
 import docx
@@ -116,13 +130,20 @@ class ProjectClipsMergeThread(QThread):
     completed = pyqtSignal(str)
     error = pyqtSignal(str)
 
-    def __init__(self, clips_paths, output_path, parent=None):
+    def __init__(self, clips_paths, output_path, parent=None, use_parallel_encoding=False):
         super().__init__(parent)
         self.clips_paths = clips_paths
         self.output_path = generate_unique_filename(output_path)
+        self.use_parallel_encoding = use_parallel_encoding
+        self.parallel_encoder = None
         self.running = True
 
     def run(self):
+        if self.use_parallel_encoding:
+            self._run_parallel()
+            return
+
+        video_clips = []
         try:
             self.progress.emit(10, "Caricamento clip...")
             video_clips = [VideoFileClip(path) for path in self.clips_paths]
@@ -160,8 +181,37 @@ class ProjectClipsMergeThread(QThread):
             for clip in video_clips:
                 clip.close()
 
+    def _run_parallel(self):
+        """Normalizza ogni clip in un processo ffmpeg dedicato e le unisce con il concat demuxer."""
+        try:
+            self.progress.emit(10, "Analisi clip...")
+            video_stream = get_media_info().stream(self.clips_paths[0], 'video')
+            if video_stream is None:
+                raise ValueError(f"Nessuna traccia video leggibile in {os.path.basename(self.clips_paths[0])}.")
+            target_size = (int(video_stream['width']), int(video_stream['height']))
+            fps = parse_frame_rate(video_stream.get('avg_frame_rate'), default=DEFAULT_FRAME_RATE)
+
+            def on_progress(fraction):
+                if self.running:
+                    self.progress.emit(10 + int(fraction * 89), "Rendering parallelo delle clip...")
+
+            self.parallel_encoder = ParallelSegmentEncoder()
+            self.parallel_encoder.encode_clips(self.clips_paths, self.output_path, target_size, round(fps, 3),
+                                               progress_callback=on_progress)
+
+            if self.running:
+                self.progress.emit(100, "Completato")
+                self.completed.emit(self.output_path)
+        except InterruptedError:
+            pass
+        except Exception as e:
+            if self.running:
+                self.error.emit(f"Errore durante l'unione: {e}")
+
     def stop(self):
         self.running = False
+        if self.parallel_encoder:
+            self.parallel_encoder.cancel()
 
 
 class MediaOverlayThread(QThread):
@@ -169,12 +219,13 @@ class MediaOverlayThread(QThread):
     completed = pyqtSignal(str)
     error = pyqtSignal(str)
 
-    def __init__(self, base_video_path, media_data, output_path, start_time, parent=None):
+    def __init__(self, base_video_path, media_data, output_path, start_time, parent=None, use_parallel_encoding=False):
         super().__init__(parent)
         self.base_video_path = base_video_path
         self.media_data = media_data
         self.output_path = generate_unique_filename(output_path)
         self.start_time = start_time
+        self.parallel_encoder = ParallelSegmentEncoder() if use_parallel_encoding else None
         self.running = True
 
     def run(self):
@@ -285,7 +336,8 @@ class MediaOverlayThread(QThread):
             self.progress.emit(80, "Writing final video...")
             if not self.running: return
 
-            final_clip.write_videofile(self.output_path, codec='libx264', audio_codec='aac', temp_audiofile=f'temp-audio.m4a', remove_temp=True)
+            write_clip(final_clip, self.output_path, parallel=self.parallel_encoder is not None, encoder=self.parallel_encoder,
+                       codec='libx264', audio_codec='aac', temp_audiofile=f'temp-audio.m4a', remove_temp=True)
 
             if self.running:
                 self.progress.emit(100, "Completed.")
@@ -303,6 +355,8 @@ class MediaOverlayThread(QThread):
 
     def stop(self):
         self.running = False
+        if self.parallel_encoder:
+            self.parallel_encoder.cancel()
 
 
 class MergeProgressLogger(proglog.ProgressBarLogger):
@@ -326,12 +380,13 @@ class VideoMergeThread(QThread):
     completed = pyqtSignal(str)
     error = pyqtSignal(str)
 
-    def __init__(self, base_path, merge_path, timecode_str, adapt_resolution, parent=None):
+    def __init__(self, base_path, merge_path, timecode_str, adapt_resolution, parent=None, use_parallel_encoding=False):
         super().__init__(parent)
         self.base_path = base_path
         self.merge_path = merge_path
         self.timecode_str = timecode_str
         self.adapt_resolution = adapt_resolution
+        self.parallel_encoder = ParallelSegmentEncoder() if use_parallel_encoding else None
         self.running = True
 
     def run(self):
@@ -378,7 +433,9 @@ class VideoMergeThread(QThread):
             if not self.running: return
 
             logger = MergeProgressLogger(self.progress)
-            final_clip.write_videofile(output_path, codec='libx264', audio_codec='aac', logger=logger)
+            write_clip(final_clip, output_path, parallel=self.parallel_encoder is not None, encoder=self.parallel_encoder,
+                       progress_callback=lambda fraction: self.progress.emit(95 + int(fraction * 4), "Rendering parallelo..."),
+                       codec='libx264', audio_codec='aac', logger=logger)
 
             if self.running:
                 self.progress.emit(100, "Completato")
@@ -392,84 +449,8 @@ class VideoMergeThread(QThread):
 
     def stop(self):
         self.running = False
-        self.progress.emit(0, "Annullamento in corso...")
-
-
-class BackgroundAudioProgressLogger(proglog.ProgressBarLogger):
-    def __init__(self, progress_signal_emitter):
-        super().__init__()
-        self.progress_signal_emitter = progress_signal_emitter
-        self.duration = 0
-
-    def bars_callback(self, bar, attr, value, old_value=None):
-        super().bars_callback(bar, attr, value, old_value)
-        if attr == 'duration':
-            self.duration = value
-        elif attr == 't' and self.duration > 0:
-            percent = int((value / self.duration) * 100)
-            progress_value = 50 + int(percent * 0.45)
-            self.progress_signal_emitter.emit(progress_value, f"Rendering video: {percent}%")
-
-class BackgroundAudioThread(QThread):
-    progress = pyqtSignal(int, str)
-    completed = pyqtSignal(str)
-    error = pyqtSignal(str)
-
-    def __init__(self, video_path, audio_path, volume, loop_audio=True, parent=None):
-        super().__init__(parent)
-        self.video_path = video_path
-        self.audio_path = audio_path
-        self.volume = volume
-        self.loop_audio = loop_audio
-        self.running = True
-
-    def run(self):
-        video_clip = None
-        background_audio_clip = None
-        try:
-            self.progress.emit(5, "Caricamento file...")
-            video_clip = VideoFileClip(self.video_path)
-            background_audio_clip = AudioFileClip(self.audio_path).volumex(self.volume)
-            if not self.running: return
-
-            if self.loop_audio and background_audio_clip.duration < video_clip.duration:
-                self.progress.emit(20, "Looping audio di sottofondo...")
-                background_audio_clip = background_audio_clip.loop(duration=video_clip.duration)
-            if not self.running: return
-
-            self.progress.emit(35, "Composizione audio...")
-            if video_clip.audio:
-                combined_audio = CompositeAudioClip(
-                    [video_clip.audio, background_audio_clip.set_duration(video_clip.duration)])
-            else:
-                combined_audio = background_audio_clip.set_duration(video_clip.duration)
-            if not self.running: return
-
-            self.progress.emit(50, "Applicazione audio al video...")
-            final_clip = video_clip.set_audio(combined_audio)
-
-            timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-            base_name = os.path.splitext(os.path.basename(self.video_path))[0]
-            output_dir = os.path.dirname(self.video_path)
-            output_path = os.path.join(output_dir, f"{base_name}_background_audio_{timestamp}.mp4")
-
-            if not self.running: return
-
-            logger = BackgroundAudioProgressLogger(self.progress)
-            final_clip.write_videofile(output_path, codec='libx264', audio_codec='aac', logger=logger)
-
-            if self.running:
-                self.progress.emit(100, "Completato")
-                self.completed.emit(output_path)
-
-        except Exception as e:
-            if self.running: self.error.emit(str(e))
-        finally:
-            if video_clip: video_clip.close()
-            if background_audio_clip: background_audio_clip.close()
-
-    def stop(self):
-        self.running = False
+        if self.parallel_encoder:
+            self.parallel_encoder.cancel()
         self.progress.emit(0, "Annullamento in corso...")
 
 
@@ -485,6 +466,7 @@ class AudioProcessingThread(QThread):
         self.use_sync = use_sync
         self.start_time = start_time
         self.running = True
+        self.engine = SpeedAlignEngine()
 
     def run(self):
         try:
@@ -498,97 +480,48 @@ class AudioProcessingThread(QThread):
 
     def stop(self):
         self.running = False
-        self.terminate()
-        self.wait()
+        self.engine.cancel()
 
     def sync_and_apply(self):
         self.progress.emit(10, "Avvio sincronizzazione...")
         if not self.running: return
 
-        try:
-            video_clip = VideoFileClip(self.video_path)
-            new_audio_clip = AudioFileClip(self.new_audio_path)
-
-            if not self.running: return
-
-            speed_factor = video_clip.duration / new_audio_clip.duration
-            self.progress.emit(30, f"Fattore di velocità calcolato: {speed_factor:.2f}x")
-
-            if not self.running: return
-
-            video_modificato = video_clip.fx(vfx.speedx, speed_factor)
-            final_video = video_modificato.set_audio(new_audio_clip)
-
-            base_name = os.path.splitext(os.path.basename(self.video_path))[0]
-            timestamp = time.strftime('%Y%m%d%H%M%S', time.localtime())
-            output_path = os.path.join(os.path.dirname(self.video_path), f"{base_name}_GeniusAI_{timestamp}.mp4")
-
-            self.progress.emit(70, "Salvataggio video finale...")
-            if not self.running: return
+        base_name = os.path.splitext(os.path.basename(self.video_path))[0]
+        timestamp = time.strftime('%Y%m%d%H%M%S', time.localtime())
+        output_path = os.path.join(os.path.dirname(self.video_path), f"{base_name}_GeniusAI_{timestamp}.mp4")
 
-            final_video.write_videofile(output_path, codec="libx264", audio_codec="aac", fps=video_clip.fps, logger=None)
-
-            if self.running:
-                self.progress.emit(100, "Completato")
-                self.completed.emit(output_path)
-        finally:
-            if 'video_clip' in locals(): video_clip.close()
-            if 'new_audio_clip' in locals(): new_audio_clip.close()
+        try:
+            speed_factor = self.engine.align(
+                self.video_path, self.new_audio_path, output_path,
+                lambda fraction: self.progress.emit(10 + int(89 * fraction), "Sincronizzazione e salvataggio...")
+            )
+        except InterruptedError:
+            return
+        logging.debug(f"Fattore di velocità applicato: {speed_factor:.4f}x")
 
+        if self.running:
+            self.progress.emit(100, "Completato")
+            self.completed.emit(output_path)
 
     def apply_at_time(self):
         self.progress.emit(10, "Avvio applicazione audio...")
         if not self.running: return
 
-        try:
-            video_clip = VideoFileClip(self.video_path)
-            original_audio = video_clip.audio
-            new_audio_clip = AudioFileClip(self.new_audio_path)
+        base_name = os.path.splitext(os.path.basename(self.video_path))[0]
+        timestamp = time.strftime('%Y%m%d%H%M%S', time.localtime())
+        output_path = os.path.join(os.path.dirname(self.video_path), f"{base_name}_manual_audio_{timestamp}.mp4")
 
-            if not self.running: return
-
-            if self.start_time > video_clip.duration:
-                raise ValueError("Il tempo di inizio supera la durata del video.")
-
-            self.progress.emit(30, "Composizione tracce audio...")
-
-            # Parte 1: Audio originale fino a start_time
-            part1 = original_audio.subclip(0, self.start_time)
-
-            # Parte 3: Audio originale dopo il nuovo audio
-            end_of_new_audio = self.start_time + new_audio_clip.duration
-            part3 = None
-            if end_of_new_audio < video_clip.duration:
-                part3 = original_audio.subclip(end_of_new_audio)
-
-            # Combina le parti
-            final_audio_clips = [part1, new_audio_clip]
-            if part3:
-                final_audio_clips.append(part3)
-
-            final_audio = concatenate_audioclips(final_audio_clips)
-
-            if not self.running: return
-
-            self.progress.emit(60, "Applicazione audio al video...")
-            final_video = video_clip.set_audio(final_audio)
-
-            base_name = os.path.splitext(os.path.basename(self.video_path))[0]
-            timestamp = time.strftime('%Y%m%d%H%M%S', time.localtime())
-            output_path = os.path.join(os.path.dirname(self.video_path), f"{base_name}_manual_audio_{timestamp}.mp4")
-
-            self.progress.emit(80, "Salvataggio video...")
-            if not self.running: return
-
-            final_video.write_videofile(output_path, codec="libx264", audio_codec="aac", fps=video_clip.fps, logger=None)
+        try:
+            self.engine.splice_audio(
+                self.video_path, self.new_audio_path, output_path, self.start_time,
+                lambda fraction: self.progress.emit(10 + int(89 * fraction), "Applicazione audio al video...")
+            )
+        except InterruptedError:
+            return
 
-            if self.running:
-                self.progress.emit(100, "Completato")
-                self.completed.emit(output_path)
-        finally:
-            if 'video_clip' in locals(): video_clip.close()
-            if 'original_audio' in locals(): original_audio.close()
-            if 'new_audio_clip' in locals(): new_audio_clip.close()
+        if self.running:
+            self.progress.emit(100, "Completato")
+            self.completed.emit(output_path)
 
 
 class ReverseVideoThread(QThread):
@@ -603,70 +536,41 @@ class ReverseVideoThread(QThread):
         self.end_time = end_time
         self.is_audio_only = is_audio_only
         self.main_window = parent
+        self.engine = ChunkedReverseEngine()
         self._is_running = True
 
     def run(self):
-        clip = None
-        reversed_media = None
         try:
             if not self.video_path or not os.path.exists(self.video_path):
                 self.error.emit("Media file not found.")
                 return
 
-            self.progress.emit(10, "Loading and clipping media...")
-            if self.is_audio_only:
-                clip = AudioFileClip(self.video_path)
-                if self.start_time is not None and self.end_time is not None:
-                    clip = clip.subclip(self.start_time, self.end_time)
-
-                if not self._is_running: return
-
-                self.progress.emit(50, "Reversing audio...")
-                audio_frames = [frame for frame in clip.iter_frames()]
-                reversed_audio_frames = audio_frames[::-1]
-                reversed_media = AudioArrayClip(np.array(reversed_audio_frames), fps=clip.fps)
+            def on_progress(fraction):
+                if self._is_running:
+                    self.progress.emit(int(fraction * 100), f"Reversing media: {int(fraction * 100)}%")
 
+            self.progress.emit(5, "Preparing reverse...")
+            if self.is_audio_only:
                 temp_path = self.main_window.get_temp_filepath(suffix=".mp3", prefix="reversed_")
-                self.progress.emit(70, "Saving reversed audio...")
-                reversed_media.write_audiofile(temp_path)
+                self.engine.reverse_audio(self.video_path, temp_path, self.start_time, self.end_time,
+                                          progress_callback=on_progress)
             else:
-                clip = VideoFileClip(self.video_path)
-                if self.start_time is not None and self.end_time is not None:
-                    clip = clip.subclip(self.start_time, self.end_time)
-
-                if not self._is_running: return
-
-                self.progress.emit(30, "Reversing video frames...")
-                frames = [frame for frame in clip.iter_frames()]
-                reversed_frames = frames[::-1]
-                reversed_media = ImageSequenceClip(reversed_frames, fps=clip.fps)
-
-                if clip.audio:
-                    self.progress.emit(50, "Reversing audio...")
-                    audio_frames = [frame for frame in clip.audio.iter_frames()]
-                    reversed_audio_frames = audio_frames[::-1]
-                    reversed_audio = AudioArrayClip(np.array(reversed_audio_frames), fps=clip.audio.fps)
-                    reversed_media = reversed_media.set_audio(reversed_audio)
-
-                if not self._is_running: return
-
                 temp_path = self.main_window.get_temp_filepath(suffix=".mp4", prefix="reversed_")
-                self.progress.emit(70, "Saving reversed video...")
-                logger = MergeProgressLogger(self.progress)
-                reversed_media.write_videofile(temp_path, codec='libx264', audio_codec='aac', logger=logger)
+                self.engine.reverse_video(self.video_path, temp_path, self.start_time, self.end_time,
+                                          progress_callback=on_progress)
 
             if self._is_running:
                 self.completed.emit(temp_path)
 
+        except InterruptedError:
+            pass
         except Exception as e:
             if self._is_running:
                 self.error.emit(str(e))
-        finally:
-            if clip: clip.close()
-            if reversed_media: reversed_media.close()
 
     def stop(self):
         self._is_running = False
+        self.engine.cancel()
         self.progress.emit(0, "Cancelling...")
 
 
@@ -681,6 +585,7 @@ class VideoAudioManager(QMainWindow):
         self.translation_service = TranslationService()
         self.html_manager = HtmlManager()
         self.current_project_path = None
+        self.proxy_thread = None
 
         setup_logging()
 
@@ -710,6 +615,7 @@ class VideoAudioManager(QMainWindow):
         self.recentProjects = []
         self.loadRecentProjects()
         self.recording_segments = []
+        self.segment_merge_threads = []
 
         # Blinking recording indicator
         self.recording_indicator = QLabel(self)
@@ -795,6 +701,7 @@ class VideoAudioManager(QMainWindow):
             "meeting_combined_integrated": ""
         }
         self.active_summary_type = None # e.g., 'detailed', 'meeting_combined'
+        self._summary_stream_backup = None  # (area di testo, HTML) prima dello streaming in corso
         self.original_audio_ai_html = ""
         self.reversed_video_path = None
 
@@ -825,13 +732,19 @@ class VideoAudioManager(QMainWindow):
                     self.statusBar.setStyleSheet(self.original_status_bar_stylesheet)
             QTimer.singleShot(timeout, reset_status)
 
-    def start_task(self, thread, on_complete, on_error, on_progress):
-        """Avvia un thread e gestisce la barra di stato."""
+    def start_task(self, thread, on_complete, on_error, on_progress, on_partial=None):
+        """
+        Avvia un thread e gestisce la barra di stato.
+        `on_partial` riceve il testo generato man mano, se il thread emette partial_text.
+        Restituisce False, senza avviarlo, se un'altra operazione è già in corso.
+        """
         if self.current_thread and self.current_thread.isRunning():
             self.show_status_message("Un'altra operazione è già in corso.", error=True)
-            return
+            return False
 
         self.current_thread = thread
+        # Il backup viene creato al primo frammento ricevuto: uno rimasto da un'attività precedente non vale più
+        self._summary_stream_backup = None
 
         self.progressBar.setValue(0)
         self.progressBar.setVisible(True)
@@ -847,10 +760,13 @@ class VideoAudioManager(QMainWindow):
         # Connette i segnali del thread
         if hasattr(thread, 'progress'):
             thread.progress.connect(on_progress)
+        if on_partial is not None and hasattr(thread, 'partial_text'):
+            thread.partial_text.connect(on_partial)
         thread.completed.connect(lambda result: self.finish_task(True, result, on_complete))
         thread.error.connect(lambda error: self.finish_task(False, error, on_error))
 
         thread.start()
+        return True
 
     def update_status_progress(self, value, label):
         """Aggiorna la barra di avanzamento e il messaggio di stato."""
@@ -883,6 +799,15 @@ class VideoAudioManager(QMainWindow):
             else:
                 self.current_thread.terminate() # Fallback
 
+            # Il testo parziale già mostrato non corrisponde a nessun risultato: torna al contenuto precedente
+            if hasattr(self.current_thread, 'partial_text'):
+                try:
+                    self.current_thread.partial_text.disconnect()
+                except TypeError:
+                    pass
+            self._restore_summary_stream_backup()
+            self.chatDock.discard_stream_message()
+
             self.show_status_message("Operazione annullata.", timeout=5000)
             self.finish_task(False, "Annullato dall'utente", None)
 
@@ -899,6 +824,10 @@ class VideoAudioManager(QMainWindow):
         self.watermarkSize = settings.value("recording/watermarkSize", 10, type=int)
         self.watermarkPosition = settings.value("recording/watermarkPosition", "Bottom Right")
         self.use_vb_cable = settings.value("recording/useVBCable", False, type=bool)
+        self.capture_mode = settings.value("recording/captureMode", CAPTURE_MODE_MP4)
+        self.segment_seconds = settings.value("recording/segmentSeconds", DEFAULT_SEGMENT_SECONDS, type=int)
+        self.capture_profile = settings.value("recording/captureProfile", DEFAULT_CAPTURE_PROFILE)
+        self.capture_region = parse_capture_region(settings.value("recording/captureRegion", ""))
 
         # Carica il colore di evidenziazione personalizzato
         self.current_highlight_color_name = settings.value("editor/highlightColor", "Giallo")
@@ -980,7 +909,9 @@ class VideoAudioManager(QMainWindow):
         self.projectDock.relink_clip_requested.connect(self.relink_project_clip)
         self.projectDock.batch_transcribe_requested.connect(self.start_batch_transcription)
         self.projectDock.batch_summarize_requested.connect(self.start_batch_summarization)
+        self.projectDock.clip_summaries_requested.connect(self.start_clip_summaries)
         self.projectDock.separate_audio_requested.connect(self.separate_audio_from_video)
+        self.projectDock.crop_clips_requested.connect(self.crop_project_clips)
 
         self.videoNotesDock = CustomDock("Note Video", closable=True)
         self.videoNotesDock.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
@@ -1915,6 +1846,45 @@ class VideoAudioManager(QMainWindow):
         else:
             self.show_status_message("Nessun campo di testo attivo per la ricerca. Clicca su un'area di testo prima di cercare.", error=True)
 
+    def _summary_stream_handler(self):
+        """
+        Callback per partial_text che mostra il testo in arrivo nell'area di destinazione
+        dell'azione corrente; onProcessComplete lo sostituisce poi con il risultato finale.
+        Il contenuto precedente dell'area viene salvato e ripristinato da onProcessError.
+        """
+        if self.active_summary_type == 'transcription_fix':
+            text_area = self.singleTranscriptionTextArea
+        else:
+            text_area = self.get_current_summary_text_area()
+        self._summary_stream_backup = None
+        if text_area is None:
+            return lambda chunk: None
+
+        original_html = text_area.toHtml()
+        chunks = []
+
+        def on_partial(chunk):
+            if not chunks:
+                self._summary_stream_backup = (text_area, original_html)
+            chunks.append(chunk)
+            text_area.blockSignals(True)
+            text_area.setMarkdown("".join(chunks))
+            text_area.blockSignals(False)
+            scrollbar = text_area.verticalScrollBar()
+            scrollbar.setValue(scrollbar.maximum())
+
+        return on_partial
+
+    def _restore_summary_stream_backup(self):
+        """Rimette nell'area di testo il contenuto precedente a uno streaming non completato."""
+        if self._summary_stream_backup is None:
+            return
+        text_area, original_html = self._summary_stream_backup
+        self._summary_stream_backup = None
+        text_area.blockSignals(True)
+        text_area.setHtml(original_html)
+        text_area.blockSignals(False)
+
     def get_current_summary_text_area(self):
         """Restituisce il widget CustomTextEdit del tab di riassunto attualmente attivo."""
         # Mappatura diretta dall'indice del widget al widget stesso.
@@ -2397,7 +2367,7 @@ class VideoAudioManager(QMainWindow):
         if not self.videoPathLineOutputEdit:
             return 30
         try:
-            return VideoFileClip(self.videoPathLineOutputEdit).fps
+            return get_media_info().fps(self.videoPathLineOutputEdit, default=30)
         except Exception as e:
             print(f"Error getting FPS for output: {e}")
             return 30  # default fps
@@ -2461,7 +2431,8 @@ class VideoAudioManager(QMainWindow):
             current_text,
             self.languageComboBox.currentText()
         )
-        self.start_task(thread, self.onProcessComplete, self.onProcessError, self.update_status_progress)
+        self.start_task(thread, self.onProcessComplete, self.onProcessError, self.update_status_progress,
+                        on_partial=self._summary_stream_handler())
 
     def processTextWithAI(self):
         current_text = self.singleTranscriptionTextArea.toPlainText()
@@ -2478,7 +2449,8 @@ class VideoAudioManager(QMainWindow):
             language=self.languageComboBox.currentText(),
             prompt_vars={'text': current_text}
         )
-        self.start_task(thread, self.onProcessComplete, self.onProcessError, self.update_status_progress)
+        self.start_task(thread, self.onProcessComplete, self.onProcessError, self.update_status_progress,
+                        on_partial=self._summary_stream_handler())
 
     def paste_to_audio_ai(self, source_text_edit):
         """
@@ -2509,7 +2481,8 @@ class VideoAudioManager(QMainWindow):
             language=self.languageComboBox.currentText(),
             prompt_vars={'text': current_text}
         )
-        self.start_task(thread, self.onProcessComplete, self.onProcessError, self.update_status_progress)
+        self.start_task(thread, self.onProcessComplete, self.onProcessError, self.update_status_progress,
+                        on_partial=self._summary_stream_handler())
 
     def fixTextWithAI(self):
         current_text = self.singleTranscriptionTextArea.toPlainText()
@@ -2525,7 +2498,8 @@ class VideoAudioManager(QMainWindow):
             language=self.languageComboBox.currentText(),
             prompt_vars={'text': current_text}
         )
-        self.start_task(thread, self.onProcessComplete, self.onProcessError, self.update_status_progress)
+        self.start_task(thread, self.onProcessComplete, self.onProcessError, self.update_status_progress,
+                        on_partial=self._summary_stream_handler())
 
     def summarizeYouTube(self):
         url, ok = QInputDialog.getText(self, 'Riassunto YouTube', 'Inserisci l\'URL del video di YouTube:')
@@ -2548,7 +2522,8 @@ class VideoAudioManager(QMainWindow):
             prompt_vars={'text': transcript}
         )
         # Il callback onProcessComplete gestirà già il risultato
-        self.start_task(thread, self.onProcessComplete, self.onProcessError, self.update_status_progress)
+        self.start_task(thread, self.onProcessComplete, self.onProcessError, self.update_status_progress,
+                        on_partial=self._summary_stream_handler())
 
     def _sync_transcription_state_from_ui(self):
         """Sincronizza le variabili di stato della trascrizione con il contenuto della UI."""
@@ -2625,30 +2600,32 @@ class VideoAudioManager(QMainWindow):
 
         json_path = os.path.splitext(video_path)[0] + ".json"
 
-        try:
-            # Leggi i dati esistenti
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            logging.error(f"Impossibile leggere il file JSON {json_path} per l'aggiornamento: {e}. L'operazione verrà annullata.")
-            return
+        # Il riassunto multiplo scrive gli stessi file dai suoi thread: lettura e scrittura sotto lo stesso lock
+        with CLIP_JSON_LOCK:
+            try:
+                # Leggi i dati esistenti
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError) as e:
+                logging.error(f"Impossibile leggere il file JSON {json_path} per l'aggiornamento: {e}. L'operazione verrà annullata.")
+                return
 
-        # Aggiorna i campi
-        data.update(update_dict)
+            # Aggiorna i campi
+            data.update(update_dict)
 
-        # Rimuovi le chiavi obsolete per la pulizia del formato
-        if 'combined_summary' in data:
-            del data['combined_summary']
-        if 'transcription_raw' in data:
-            del data['transcription_raw']
+            # Rimuovi le chiavi obsolete per la pulizia del formato
+            if 'combined_summary' in data:
+                del data['combined_summary']
+            if 'transcription_raw' in data:
+                del data['transcription_raw']
 
-        # Salva i dati aggiornati
-        try:
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=4)
-            logging.info(f"File JSON {json_path} aggiornato con successo.")
-        except Exception as e:
-            logging.error(f"Errore durante il salvataggio del file JSON aggiornato: {e}")
+            # Salva i dati aggiornati
+            try:
+                with open(json_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=4)
+                logging.info(f"File JSON {json_path} aggiornato con successo.")
+            except Exception as e:
+                logging.error(f"Errore durante il salvataggio del file JSON aggiornato: {e}")
 
     def handleTimecodeToggle(self, checked):
         """
@@ -2792,6 +2769,7 @@ class VideoAudioManager(QMainWindow):
         logging.debug(f"Synced UI to model for key: {summary_key} after processing images.")
 
     def onProcessComplete(self, result):
+        self._summary_stream_backup = None
         if isinstance(result, dict):
             # Questo gestisce i risultati della trascrizione che arrivano come dizionario
             self.transcription_original = result.get('transcription_raw', '')
@@ -2971,6 +2949,7 @@ class VideoAudioManager(QMainWindow):
     def onProcessError(self, error_message):
         # This is now a generic error handler for AI text processes.
         # The main error display is handled by finish_task.
+        self._restore_summary_stream_backup()
         self.show_status_message(f"Errore processo AI: {error_message}", error=True)
 
     def highlight_selected_text(self):
@@ -3268,6 +3247,7 @@ class VideoAudioManager(QMainWindow):
 
         dialog = CropDialog(
             video_path=self.videoPathLineEdit,
+            preview_path=self._playback_path(self.videoPathLineEdit),
             current_time=self.player.position(),
             start_time=start_time,
             end_time=end_time,
@@ -3315,7 +3295,7 @@ class VideoAudioManager(QMainWindow):
 
     def get_current_fps(self):
         try:
-            return VideoFileClip(self.videoPathLineEdit).fps
+            return get_media_info().fps(self.videoPathLineEdit)
         except Exception as e:
             print(f"Error getting FPS: {e}")
             return 0
@@ -3365,6 +3345,36 @@ class VideoAudioManager(QMainWindow):
 
         thread.start()
 
+    def crop_project_clips(self, video_paths):
+        """Ritaglia una o più clip del progetto con la stessa area, scelta sulla prima clip."""
+        if not video_paths:
+            return
+        if self.current_thread and self.current_thread.isRunning():
+            self.show_status_message("Un'altra operazione è già in corso.", error=True)
+            return
+
+        self.player.pause()
+        first_clip = video_paths[0]
+        dialog = CropDialog(
+            video_path=first_clip,
+            preview_path=self._playback_path(first_clip),
+            parent=self
+        )
+        if not dialog.exec():
+            return
+
+        thread = BatchCropThread(video_paths, dialog.get_crop_rect(), self.current_project_path, parent=self)
+        self.start_task(
+            thread,
+            on_complete=self.on_batch_crop_completed,
+            on_error=lambda error: QMessageBox.critical(self, "Errore durante il ritaglio", error),
+            on_progress=self.update_status_progress
+        )
+
+    def on_batch_crop_completed(self, message):
+        self.show_status_message(message, timeout=10000)
+        self.sync_project_clips_folder()
+
     def on_crop_completed(self, output_path):
         self.progressBar.setVisible(False)
         self.cancelButton.setVisible(False)
@@ -3630,35 +3640,21 @@ class VideoAudioManager(QMainWindow):
 
         try:
             pause_duration = int(self.pauseVideoDurationLineEdit.text())
-            start_time = player.position() / 1000.0
-
-            video_clip = VideoFileClip(video_path)
-            freeze_frame = video_clip.get_frame(start_time)
-            freeze_clip = ImageClip(freeze_frame).set_duration(pause_duration).set_fps(video_clip.fps)
-
-            original_video_part1 = video_clip.subclip(0, start_time)
-            original_video_part2 = video_clip.subclip(start_time)
-
-            final_video = concatenate_videoclips([original_video_part1, freeze_clip, original_video_part2])
+        except ValueError:
+            self.show_status_message("La durata della pausa deve essere un numero intero.", error=True)
+            return
 
-            if video_clip.audio:
-                final_video.audio = video_clip.audio
+        start_time = player.position() / 1000.0
+        output_path = self.get_temp_filepath(suffix='.mp4')
+        thread = FreezeFramePauseThread(video_path, start_time, pause_duration, output_path, self)
+        self.start_task(thread, self.onPauseCompleted, self.onPauseError, self.update_status_progress)
 
-            output_path = self.get_temp_filepath(suffix='.mp4')
-            final_video.write_videofile(output_path, codec='libx264', audio_codec='aac')
+    def onPauseCompleted(self, output_path):
+        self.show_status_message("Pausa applicata con successo.")
+        self.loadVideoOutput(output_path)
 
-            self.show_status_message("Pausa video applicata con successo.")
-            self.loadVideoOutput(output_path)
-        except ValueError:
-            self.show_status_message("La durata della pausa deve essere un numero intero.", error=True)
-        except Exception as e:
-            QMessageBox.critical(self, "Errore", f"Errore durante l'applicazione della pausa: {e}")
-        finally:
-            if 'video_clip' in locals():
-                video_clip.close()
-            if 'final_video' in locals():
-                if hasattr(final_video, 'audio') and final_video.audio:
-                    final_video.audio.close()
+    def onPauseError(self, error_message):
+        self.show_status_message(f"Errore durante l'applicazione della pausa: {error_message}", error=True)
 
     def createAudioDock(self):
         dock = CustomDock("Gestione Audio e Video", closable=True)
@@ -3954,6 +3950,10 @@ class VideoAudioManager(QMainWindow):
         self.loopBackgroundAudioCheckBox.setChecked(True)
         layout.addWidget(self.loopBackgroundAudioCheckBox)
 
+        self.duckBackgroundAudioCheckBox = QCheckBox("Abbassa il sottofondo quando si parla (ducking)")
+        self.duckBackgroundAudioCheckBox.setToolTip("Comprime il sottofondo mentre è presente la voce del video.")
+        layout.addWidget(self.duckBackgroundAudioCheckBox)
+
         applyBackgroundButton = QPushButton('Applica Sottofondo al Video')
         applyBackgroundButton.clicked.connect(self.applyBackgroundAudioToVideo)
         layout.addWidget(applyBackgroundButton)
@@ -4015,7 +4015,8 @@ class VideoAudioManager(QMainWindow):
             merge_path=merge_video_path,
             timecode_str=timecode,
             adapt_resolution=self.adaptResolutionRadio.isChecked(),
-            parent=self
+            parent=self,
+            use_parallel_encoding=QSettings("Genius", "GeniusAI").value("render/parallelEncoding", False, type=bool)
         )
         self.start_task(thread, self.onMergeCompleted, self.onMergeError, self.update_status_progress)
 
@@ -4063,8 +4064,14 @@ class VideoAudioManager(QMainWindow):
                 logging.error(f"Could not remove temporary reversed video file on exit: {e}")
 
         self.dockSettingsManager.save_settings()
+        if self.proxy_thread and self.proxy_thread.isRunning():
+            self.proxy_thread.stop()
+            self.proxy_thread.wait(3000)
         if hasattr(self, 'monitor_preview') and self.monitor_preview:
             self.monitor_preview.close()
+        # L'unione dei segmenti è in stream copy: si attende che finisca per non perdere la registrazione
+        for thread in list(self.segment_merge_threads):
+            thread.wait()
 
         # Pulizia dei file temporanei
         logging.info("Pulizia dei file temporanei...")
@@ -4145,6 +4152,7 @@ class VideoAudioManager(QMainWindow):
             audio_path=background_audio_path,
             volume=background_volume,
             loop_audio=self.loopBackgroundAudioCheckBox.isChecked(),
+            duck=self.duckBackgroundAudioCheckBox.isChecked(),
             parent=self
         )
         self.start_task(thread, self.onBackgroundAudioCompleted, self.onBackgroundAudioError, self.update_status_progress)
@@ -4170,45 +4178,14 @@ class VideoAudioManager(QMainWindow):
 
         try:
             pause_duration = float(pause_duration_str)
-            start_time = player.position() / 1000.0
-
-            video_clip = VideoFileClip(video_path)
-
-            # Create a silent audio clip for the pause
-            pause_audio = AudioSegment.silent(duration=pause_duration * 1000)
-            temp_pause_path = self.get_temp_filepath(suffix=".mp3")
-            pause_audio.export(temp_pause_path, format="mp3")
-            pause_clip = AudioFileClip(temp_pause_path)
-
-            # Concatenate audio clips
-            original_audio = video_clip.audio
-            part1 = original_audio.subclip(0, start_time)
-            part2 = original_audio.subclip(start_time)
-            final_audio = concatenate_audioclips([part1, pause_clip, part2])
-
-            # Set the new audio to the video
-            video_clip.audio = final_audio
-
-            # Save the result
-            output_path = self.get_temp_filepath(suffix=".mp4")
-            video_clip.write_videofile(output_path, codec='libx264', audio_codec='aac')
-
-            self.loadVideoOutput(output_path)
-            self.show_status_message("Pausa audio applicata con successo.")
-
         except ValueError:
             self.show_status_message("La durata della pausa non è un numero valido.", error=True)
-        except Exception as e:
-            QMessageBox.critical(self, "Errore", f"Errore durante l'applicazione della pausa audio: {e}")
-        finally:
-            if 'video_clip' in locals():
-                video_clip.close()
-            if 'pause_clip' in locals():
-                pause_clip.close()
-            if 'final_audio' in locals():
-                final_audio.close()
-            if 'temp_pause_path' in locals() and os.path.exists(temp_pause_path):
-                os.remove(temp_pause_path)
+            return
+
+        start_time = player.position() / 1000.0
+        output_path = self.get_temp_filepath(suffix=".mp4")
+        thread = AudioPauseThread(video_path, start_time, pause_duration, output_path, self)
+        self.start_task(thread, self.onPauseCompleted, self.onPauseError, self.update_status_progress)
 
     def updateTimecodeRec(self):
         if self.recordingTime is not None:
@@ -4358,6 +4335,9 @@ class VideoAudioManager(QMainWindow):
         self.audioTestResultLabel = QLabel("Test Audio: N/A")
         infoLayout.addWidget(self.audioTestResultLabel, 5, 1)
 
+        self.encoderHealthLabel = QLabel("Encoder: N/A")
+        infoLayout.addWidget(self.encoderHealthLabel, 6, 0, 1, 2)
+
         # Apply a consistent style to info labels
         label_style = "font-size: 9pt; color: #cccccc;"
         self.recordingStatusLabel.setStyleSheet(label_style)
@@ -4367,6 +4347,7 @@ class VideoAudioManager(QMainWindow):
         self.fileSizeLabel.setStyleSheet(label_style)
         self.bitrateLabel.setStyleSheet(label_style)
         self.audioTestResultLabel.setStyleSheet(label_style)
+        self.encoderHealthLabel.setStyleSheet(label_style)
 
         # Main Layout for Recording Management
         recordingLayout = QVBoxLayout()
@@ -4547,13 +4528,8 @@ class VideoAudioManager(QMainWindow):
         # --- FINE MODIFICA ---
 
         file_extension = ".mp3" if save_audio_only else ".mp4"
-        segment_file_path = os.path.join(output_folder, f"{recording_name}{file_extension}")
-
-        # BUG: The original code used an undefined 'default_folder' variable.
-        # This has been corrected to use 'output_folder'.
-        while os.path.exists(segment_file_path):
-            timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-            segment_file_path = os.path.join(output_folder, f"{recording_name}_{timestamp}{file_extension}")
+        # Ogni sessione (anche una ripresa dopo la pausa) ha un file e una cartella dei segmenti propri
+        segment_file_path = unique_recording_path(output_folder, recording_name, file_extension)
 
         ffmpeg_path = 'ffmpeg/bin/ffmpeg.exe'
         if not os.path.exists(ffmpeg_path):
@@ -4583,14 +4559,21 @@ class VideoAudioManager(QMainWindow):
             watermark_size=self.watermarkSize,
             watermark_position=self.watermarkPosition,
             bluetooth_mode=bluetooth_mode,
-            audio_volume=4.0
+            audio_volume=4.0,
+            capture_mode=self.capture_mode,
+            segment_seconds=self.segment_seconds,
+            capture_profile=self.capture_profile,
+            capture_region=self.capture_region
         )
 
         self.recorder_thread.error_signal.connect(self.showError)
         self.recorder_thread.stats_updated.connect(self.updateRecordingStats)
+        self.recorder_thread.segment_completed.connect(self._on_recording_segment_completed)
+        self.recorder_thread.encoder_health_changed.connect(self._on_encoder_health_changed)
+        self.recorder_thread.telemetry_saved.connect(self._on_recording_telemetry_saved)
         self.recorder_thread.start()
 
-        self.recording_segments.append(segment_file_path)
+        self.recording_output_folder = output_folder
         self.current_video_path = segment_file_path
         self.outputFileLabel.setText(f"File: {segment_file_path}")
         self.recordingStatusLabel.setText(f'Stato: Registrazione iniziata di Schermo {monitor_index + 1}')
@@ -4605,6 +4588,7 @@ class VideoAudioManager(QMainWindow):
         if hasattr(self, 'recorder_thread') and self.recorder_thread is not None:
             self.recorder_thread.stop()
             self.recorder_thread.wait()  # Ensure the thread has finished
+            self.recording_segments.extend(self.recorder_thread.output_files())
             self.rec_timer.stop()
             self.recordingStatusLabel.setText('Stato: Registrazione in pausa')
             self.is_paused = True
@@ -4641,8 +4625,10 @@ class VideoAudioManager(QMainWindow):
                     padding: 5px;
                 }
             """)
-            self.recorder_thread.stop()
-            self.recorder_thread.wait()  # Ensure the thread has finished
+            if self.recorder_thread.isRunning():
+                self.recorder_thread.stop()
+                self.recorder_thread.wait()  # Ensure the thread has finished
+                self.recording_segments.extend(self.recorder_thread.output_files())
 
         if hasattr(self, 'current_video_path'):
             self._mergeSegments()
@@ -4651,94 +4637,107 @@ class VideoAudioManager(QMainWindow):
             self.monitor_preview.close()
             self.monitor_preview = None
 
-        self.recordingStatusLabel.setText("Stato: Registrazione Terminata e video salvato.")
+        self.recordingStatusLabel.setText("Stato: Registrazione terminata.")
         self.timecodeLabel.setText('00:00:00')
         self.outputFileLabel.setText("File: N/A")
         self.fpsLabel.setText("FPS: N/A")
         self.fileSizeLabel.setText("Dimensione: N/A")
         self.bitrateLabel.setText("Bitrate: N/A")
-
-    import datetime
+        self.encoderHealthLabel.setText("Encoder: N/A")
+        self.encoderHealthLabel.setStyleSheet("font-size: 9pt; color: #cccccc;")
 
     def _mergeSegments(self):
+        """Avvia in background l'unione dei segmenti registrati (pausa/ripresa)."""
         if not self.recording_segments:
             return
 
-        first_segment = self.recording_segments[0]
-        output_path = ""
+        # I segmenti passano al thread di unione: da qui in poi non sono più file temporanei
+        segments = list(self.recording_segments)
+        self.recording_segments.clear()
 
-        if len(self.recording_segments) > 1:
+        first_segment = segments[0]
+        output_dir = getattr(self, 'recording_output_folder', None) or os.path.dirname(first_segment)
+        # Con la registrazione a segmenti i file stanno in una sottocartella: il risultato va nella cartella di uscita
+        in_output_dir = os.path.normcase(os.path.dirname(os.path.abspath(first_segment))) == os.path.normcase(os.path.abspath(output_dir))
+        if len(segments) > 1 or not in_output_dir:
             timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
             base_name = os.path.splitext(os.path.basename(first_segment))[0]
             if '_' in base_name:
                 base_name = base_name.rsplit('_', 1)[0]
 
-            output_dir = os.path.dirname(first_segment)
             file_extension = os.path.splitext(first_segment)[1]
             output_path = os.path.join(output_dir, f"{base_name}_final_{timestamp}{file_extension}")
+        else:
+            output_path = first_segment
+
+        work_dir = os.path.join(self.current_project_path, "temp") if self.current_project_path else None
+        thread = SegmentMergeThread(segments, output_path, work_dir=work_dir,
+                                    leftover_files=(SEGMENT_LIST_NAME,), parent=self)
+        thread.progress.connect(self._on_segment_merge_progress)
+        thread.completed.connect(self._on_segments_merged)
+        thread.error.connect(lambda message: self.show_status_message(
+            f"Errore nel salvataggio della registrazione: {message}", error=True, timeout=10000))
+        self.segment_merge_threads.append(thread)
+        thread.finished.connect(lambda: self.segment_merge_threads.remove(thread))
+        thread.start()
 
-            ffmpeg_path = 'ffmpeg/bin/ffmpeg.exe'
-
-            if self.current_project_path:
-                temp_dir = os.path.join(self.current_project_path, "temp")
-                os.makedirs(temp_dir, exist_ok=True)
-                segments_file = os.path.join(temp_dir, "segments.txt")
-            else:
-                segments_file = "segments.txt"
+    def _on_recording_segment_completed(self, segment_path):
+        """Un segmento della registrazione è stato chiuso ed è già leggibile."""
+        logging.info(f"Segmento di registrazione completato: {segment_path}")
+        self.outputFileLabel.setText(f"File: {os.path.basename(segment_path)}")
 
-            try:
-                with open(segments_file, "w") as file:
-                    for segment in self.recording_segments:
-                        file.write(f"file '{os.path.abspath(segment)}'\n")
-
-                merge_command = [ffmpeg_path, '-f', 'concat', '-safe', '0', '-i', segments_file, '-c', 'copy', output_path]
-                subprocess.run(merge_command, check=True)
-
-                # Pulizia dei segmenti temporanei
-                for segment in self.recording_segments:
-                    if os.path.exists(segment):
-                        os.remove(segment)
-            finally:
-                if os.path.exists(segments_file):
-                    os.remove(segments_file)
+    def _on_segment_merge_progress(self, value, message):
+        # La barra di avanzamento è condivisa: la usa solo se non è in corso un'altra attività
+        if self.current_thread is None:
+            self.update_status_progress(value, message)
         else:
-            output_path = self.recording_segments[0]
-
-        if not output_path or not os.path.exists(output_path):
-            self.show_status_message("Errore nel salvataggio della registrazione.", error=True)
-            return
+            self.statusLabel.setText(message)
 
+    def _on_segments_merged(self, output_path):
+        if self.current_thread is None:
+            self.progressBar.setVisible(False)
         self.show_status_message(f"Registrazione salvata: {os.path.basename(output_path)}")
         self.loadVideoOutput(output_path)
 
         # --- INTEGRAZIONE PROGETTO ---
-        if self.current_project_path and self.projectDock.gnai_path:
-            clip_filename = os.path.basename(output_path)
-            metadata_filename = os.path.splitext(clip_filename)[0] + ".json"
-
-            # Raccogli i metadati aggiuntivi
-            try:
-                clip_info = VideoFileClip(output_path)
-                duration = clip_info.duration
-                clip_info.close()
-                size = os.path.getsize(output_path)
-                creation_date = datetime.datetime.fromtimestamp(os.path.getctime(output_path)).isoformat()
-            except Exception as e:
-                logging.error(f"Impossibile estrarre i metadati per {output_path}: {e}")
-                duration, size, creation_date = 0, 0, datetime.datetime.now().isoformat()
+        if not (self.current_project_path and self.projectDock.gnai_path):
+            return
+        clips_dir = os.path.join(self.current_project_path, "clips")
+        if os.path.normcase(os.path.dirname(os.path.abspath(output_path))) != os.path.normcase(os.path.abspath(clips_dir)):
+            return
 
-            self.project_manager.add_clip_to_project(
-                self.projectDock.gnai_path,
-                clip_filename,
-                metadata_filename,
-                duration,
-                size,
-                creation_date
-            )
+        media_info = get_media_info()
+        try:
+            if media_info.stream(output_path, 'video') is None:
+                # Le registrazioni solo audio non sono clip video del progetto
+                return
+            duration = media_info.duration(output_path)
+            size = os.path.getsize(output_path)
+            creation_date = datetime.datetime.fromtimestamp(os.path.getctime(output_path)).isoformat()
+        except Exception as e:
+            logging.error(f"Impossibile estrarre i metadati per {output_path}: {e}")
+            duration, size, creation_date = 0, 0, datetime.datetime.now().isoformat()
+
+        clip_filename = os.path.basename(output_path)
+        metadata_filename = os.path.splitext(clip_filename)[0] + ".json"
+        gnai_path = self.projectDock.gnai_path
+        self.project_manager.add_clip_to_project(
+            gnai_path,
+            clip_filename,
+            metadata_filename,
+            duration,
+            size,
+            creation_date,
+            'video'
+        )
 
-            # Ricarica i dati del progetto per aggiornare la UI
-            self.load_project(self.projectDock.gnai_path)
-            self.show_status_message(f"Clip '{clip_filename}' aggiunta al progetto.")
+        # Aggiorna solo la riga della nuova clip invece di ricaricare l'intero progetto
+        project_data, _ = self.project_manager.load_project(gnai_path)
+        clip_info = next((c for c in (project_data or {}).get("clips", []) if c.get("clip_filename") == clip_filename), None)
+        if clip_info:
+            self.projectDock.add_clip(clip_info, 'video')
+            self._start_proxy_generation(gnai_path)
+        self.show_status_message(f"Clip '{clip_filename}' aggiunta al progetto.")
 
     def _is_bluetooth_mode_active(self):
         """Checks if any of the selected audio devices is a Bluetooth headset."""
@@ -4773,6 +4772,48 @@ class VideoAudioManager(QMainWindow):
 
         self.bitrateLabel.setText(f"Bitrate: {stats.get('bitrate', 'N/A')} kbit/s")
 
+        effective_fps = stats.get('effective_fps')
+        if effective_fps is not None and stats.get('target_fps'):
+            self.fpsLabel.setText(f"FPS: {effective_fps:.1f} / {stats['target_fps']:.0f}")
+
+        speed = stats.get('interval_speed')
+        if speed is None:
+            speed = stats.get('speed')
+        speed_text = f"{speed:.2f}x" if speed is not None else "N/A"
+        write_rate = stats.get('write_rate')
+        write_text = f"{write_rate * 8 / 1000:.0f} kbit/s" if write_rate is not None else "N/A"
+        lagging = stats.get('health') == HEALTH_LAGGING
+        self.encoderHealthLabel.setText(
+            f"Encoder: {speed_text} | persi {stats.get('drop_frames') or 0} | "
+            f"duplicati {stats.get('dup_frames') or 0} | disco {write_text}"
+            + (" | IN RITARDO" if lagging else "")
+        )
+        self.encoderHealthLabel.setStyleSheet(
+            f"font-size: 9pt; color: {'#ff6b6b' if lagging else '#cccccc'};"
+        )
+
+    def _on_encoder_health_changed(self, sample):
+        """Segnala quando l'encoder non tiene il passo del tempo reale e quando recupera."""
+        if sample.get('lag_started'):
+            speed = sample.get('interval_speed')
+            logging.warning(f"Registrazione: encoder in ritardo (velocità {speed}, frame persi "
+                            f"{sample.get('drop_frames')}) a {sample.get('elapsed')}s")
+            self.recordingStatusLabel.setText(
+                "Stato: Attenzione, l'encoder non tiene il passo: la registrazione può perdere frame")
+        elif sample.get('lag_ended'):
+            logging.info(f"Registrazione: encoder di nuovo in tempo reale a {sample.get('elapsed')}s")
+            self.recordingStatusLabel.setText("Stato: Registrazione in corso")
+
+    def _on_recording_telemetry_saved(self, path, summary):
+        """Riepilogo della telemetria salvata; suggerisce un profilo più leggero se ci sono stati ritardi."""
+        logging.info(f"Telemetria di registrazione salvata in {path}: {summary}")
+        suggested = summary.get('suggested_profile')
+        if suggested:
+            self.recordingStatusLabel.setText(
+                f"Stato: L'encoder è andato in ritardo {summary['lag_episodes']} volte "
+                f"(frame persi: {summary['drop_frames']}). Prova il profilo di cattura "
+                f"'{CAPTURE_PROFILES[suggested]['label']}' nelle impostazioni.")
+
     def saveText(self):
         path, selected_filter = QFileDialog.getSaveFileName(self, "Salva file", "", "JSON files (*.json);;Text files (*.txt)")
         if not path:
@@ -5129,9 +5170,7 @@ class VideoAudioManager(QMainWindow):
                 # Estrai i metadati e aggiungi al progetto
                 metadata_filename = os.path.splitext(clip_filename)[0] + ".json"
 
-                clip_info = VideoFileClip(dest_path)
-                duration = clip_info.duration
-                clip_info.close()
+                duration = get_media_info().duration(dest_path)
 
                 size = os.path.getsize(dest_path)
                 creation_date = datetime.datetime.fromtimestamp(os.path.getctime(dest_path)).isoformat()
@@ -5278,15 +5317,56 @@ class VideoAudioManager(QMainWindow):
         return ext in audio_extensions
 
     def sourceSetter(self, url):
-        self.player.setSource(QUrl.fromLocalFile(url))
+        self.player.setSource(QUrl.fromLocalFile(self._playback_path(url)))
         self.player.play()
         self.player.pause()
 
     def sourceSetterOutput(self, url):
-        self.playerOutput.setSource(QUrl.fromLocalFile(url))
+        self.playerOutput.setSource(QUrl.fromLocalFile(self._playback_path(url)))
         self.playerOutput.play()
         self.playerOutput.pause()
 
+    def _proxies_enabled(self):
+        return QSettings("Genius", "GeniusAI").value("render/useProxies", True, type=bool)
+
+    def _playback_path(self, path):
+        """
+        File da mostrare nei player e nelle anteprime. I percorsi salvati
+        (videoPathLineEdit, videoPathLineOutputEdit) restano quelli originali,
+        quindi tutti i render continuano a usare le clip a piena qualità.
+        """
+        if not path or not self._proxies_enabled():
+            return path
+        return self.project_manager.get_playback_path(path)
+
+    def _start_proxy_generation(self, gnai_path):
+        """Accoda in background la generazione dei proxy mancanti per le clip del progetto."""
+        if not self._proxies_enabled():
+            return
+        missing = self.project_manager.get_clips_needing_proxy(gnai_path)
+        if not missing:
+            return
+
+        # Un thread che sta terminando rifiuta le nuove clip: in quel caso ne serve uno nuovo
+        if self.proxy_thread is None or not self.proxy_thread.enqueue(missing):
+            self.proxy_thread = ProxyGenerationThread(self)
+            self.proxy_thread.proxy_ready.connect(self._on_proxy_ready)
+            self.proxy_thread.error.connect(lambda message: logging.warning(message))
+            self.proxy_thread.enqueue(missing)
+            self.proxy_thread.start()
+        logging.info(f"Generazione proxy in background per {len(missing)} clip.")
+
+    def _on_proxy_ready(self, source_path, proxy_path):
+        """Passa al proxy appena generato se la clip è caricata in un player fermo."""
+        for player, current_path in ((self.player, self.videoPathLineEdit),
+                                     (self.playerOutput, self.videoPathLineOutputEdit)):
+            if current_path != source_path or player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
+                continue
+            position = player.position()
+            player.setSource(QUrl.fromLocalFile(proxy_path))
+            player.setPosition(position)
+        self.show_status_message(f"Proxy pronto per '{os.path.basename(source_path)}'.", timeout=3000)
+
     def _manage_video_json(self, video_path):
         """
         Crea o carica il file JSON associato a un video.
@@ -6599,6 +6679,7 @@ class VideoAudioManager(QMainWindow):
                 self.parent_window = parent_window
                 self.running = True
                 self.chunk_size = chunk_size  # In secondi, per elaborazione a pezzi
+                self.engine = SpeedAlignEngine()
 
                 # Per statistiche
                 self.start_time = None
@@ -6615,7 +6696,7 @@ class VideoAudioManager(QMainWindow):
                     import json
                     # Usa ffprobe per ottenere informazioni sul file
                     ffprobe_cmd = [
-                        'ffmpeg/bin/ffprobe',
+                        FFPROBE_PATH,
                         '-v', 'error',
                         '-show_format',
                         '-show_streams',
@@ -6669,353 +6750,40 @@ class VideoAudioManager(QMainWindow):
                         self.log(error_msg)
                         self.error.emit(error_msg)
 
-            def alignSpeedAndApplyAudio(self):
-                video_clip = None
-                audio_clip = None
+            def _report_progress(self, start, span, label):
+                return lambda fraction: self.progress.emit(start + int(span * fraction), label)
 
+            def alignSpeedAndApplyAudio(self):
+                """Adatta la velocità del video all'audio con un unico passaggio di ffmpeg"""
                 try:
-                    # Primo step: analisi dei file
                     self.progress.emit(5, "Analisi dei file...")
-                    self.log("Inizio caricamento video...")
-
-                    # Utilizziamo librerie di basso livello per le informazioni
-                    video_probe = self.get_media_info(self.video_path)
-                    audio_probe = self.get_media_info(self.audio_path)
-
-                    video_duration = float(video_probe.get('format', {}).get('duration', 0))
-                    audio_duration = float(audio_probe.get('format', {}).get('duration', 0))
-
-                    self.log(f"Durata video: {video_duration:.2f}s, durata audio: {audio_duration:.2f}s")
-
-                    if video_duration <= 0 or audio_duration <= 0:
-                        raise ValueError("Durata del video o dell'audio non valida")
-
-                    # Calcola il fattore di velocità
-                    speed_factor = round(video_duration / audio_duration, 2)
-                    self.log(f"Fattore di velocità calcolato: {speed_factor}")
-
-                    # Per file molto grandi, utilizziamo direttamente ffmpeg invece di moviepy
-                    if os.path.getsize(self.video_path) > 500 * 1024 * 1024:  # > 500 MB
-                        self.log("File di grandi dimensioni rilevato. Utilizzo elaborazione ottimizzata.")
-                        self.progress.emit(20, "Elaborazione file di grandi dimensioni...")
-                        return self.process_large_files(speed_factor)
-
-                    # Per file più piccoli continua con moviepy
-                    self.progress.emit(15, "Caricamento video...")
-                    video_clip = VideoFileClip(self.video_path)
-                    self.progress.emit(30, "Caricamento audio...")
-                    audio_clip = AudioFileClip(self.audio_path)
-
-                    self.log(f"File caricati con successo. Elaborazione in corso...")
-
-                    # Checkpoint: usiamo la gestione della memoria
-                    import gc
-                    gc.collect()  # Forza la garbage collection
-
-                    # Applica il cambio di velocità
-                    self.progress.emit(40, f"Applicazione fattore velocità: {speed_factor}x...")
-                    video_modified = video_clip.fx(vfx.speedx, speed_factor)
-
-                    # Checkpoint
-                    self.log("Fattore di velocità applicato, fase di unione audio...")
-                    self.progress.emit(60, "Unione audio e video...")
-
-                    # Applica l'audio
-                    final_video = video_modified.set_audio(audio_clip)
-
-                    # Checkpoint
-                    self.log("Audio unito, preparazione al salvataggio...")
-                    self.progress.emit(70, "Preparazione salvataggio...")
-
-                    # Determina il codec audio e video
-                    codec_video = "libx264"
-                    codec_audio = "aac"
-
-                    # Ottieni il framerate originale
-                    fps = video_clip.fps
-
-                    # Configurazioni per ridurre l'uso di memoria
-                    write_options = {
-                        'codec': codec_video,
-                        'audio_codec': codec_audio,
-                        'fps': fps,
-                        'preset': 'ultrafast',
-                        'threads': 4,
-                        'logger': None,  # Disabilita il logging verboso
-                        'ffmpeg_params': ['-crf', '23']  # Comprimi leggermente senza perdere qualità
-                    }
-
-                    # Fase critica: salvataggio
-                    self.log("Inizio salvataggio video finale...")
-                    self.progress.emit(80, "Salvataggio video finale...")
-
-                    try:
-                        # Monitoriamo lo stato durante il salvataggio
-                        start_save = time.time()
-                        final_video.write_videofile(self.output_path, **write_options,
-                                                    progress_bar=False, verbose=False)
-                        save_duration = time.time() - start_save
-                        self.log(f"Salvataggio completato in {save_duration:.1f} secondi")
-                        self.progress.emit(100, "Salvataggio completato")
-                    except Exception as save_error:
-                        self.log(f"Errore durante il salvataggio: {save_error}")
-                        # Tenta un metodo alternativo
-                        self.log("Tentativo alternativo con ffmpeg...")
-                        self.progress.emit(85, "Tentativo alternativo di salvataggio...")
-                        self.save_with_ffmpeg(video_modified, audio_clip)
-
-                except Exception as e:
-                    raise Exception(f"Errore nell'allineamento audio-video: {str(e)}")
-
-                finally:
-                    # Pulizia risorse
-                    self.log("Pulizia risorse...")
-                    if video_clip:
-                        video_clip.close()
-                    if audio_clip:
-                        audio_clip.close()
-                    import gc
-                    gc.collect()  # Forza garbage collection
-
-            def process_large_files(self, speed_factor):
-                """Processa file di grandi dimensioni usando direttamente ffmpeg"""
-                try:
-                    self.progress.emit(30, "Elaborazione file grandi con ffmpeg...")
-                    self.log("Utilizzo ffmpeg per file di grandi dimensioni")
-
-                    # Crea un file temporaneo per il video con velocità modificata
-                    temp_video = self.parent_window.get_temp_filepath(suffix='.mp4')
-
-                    # Modifica la velocità del video con ffmpeg
-                    ffmpeg_speed_cmd = [
-                        'ffmpeg/bin/ffmpeg',
-                        '-i', self.video_path,
-                        '-filter_complex', f'[0:v]setpts={1 / speed_factor}*PTS[v]',
-                        '-map', '[v]',
-                        '-c:v', 'libx264',
-                        '-preset', 'ultrafast',
-                        '-crf', '23',
-                        '-y',
-                        temp_video
-                    ]
-
-                    self.log("Esecuzione comando ffmpeg per la velocità...")
-                    self.progress.emit(40, "Modifica velocità video...")
-                    subprocess.run(ffmpeg_speed_cmd, capture_output=True)
-                    self.log("Velocità video modificata")
-
-                    # Aggiungi l'audio al video modificato
-                    ffmpeg_audio_cmd = [
-                        'ffmpeg/bin/ffmpeg',
-                        '-i', temp_video,
-                        '-i', self.audio_path,
-                        '-map', '0:v',
-                        '-map', '1:a',
-                        '-c:v', 'copy',  # Non ricodificare il video
-                        '-c:a', 'aac',
-                        '-shortest',
-                        '-y',
-                        self.output_path
-                    ]
-
-                    self.log("Esecuzione comando ffmpeg per aggiungere audio...")
-                    self.progress.emit(70, "Aggiunta audio...")
-                    subprocess.run(ffmpeg_audio_cmd, capture_output=True)
-
-                    # Rimuovi il file temporaneo
-                    if os.path.exists(temp_video):
-                        os.remove(temp_video)
-
+                    self.log("Allineamento velocità e applicazione audio in un unico passaggio ffmpeg")
+                    speed_factor = self.engine.align(self.video_path, self.audio_path, self.output_path,
+                                                     self._report_progress(5, 95, "Allineamento audio-video..."))
+                    self.log(f"Fattore di velocità applicato: {speed_factor:.4f}")
                     self.progress.emit(100, "Elaborazione completata")
-                    return True
-
-                except Exception as e:
-                    self.log(f"Errore nell'elaborazione con ffmpeg: {e}")
-                    raise Exception(f"Errore nell'elaborazione di file grandi: {str(e)}")
-
-            def save_with_ffmpeg(self, video_clip, audio_clip):
-                """Salva il video usando ffmpeg direttamente"""
-                try:
-                    # Salva video e audio temporanei
-                    temp_video = self.parent_window.get_temp_filepath(suffix='.mp4')
-                    temp_audio = self.parent_window.get_temp_filepath(suffix='.aac')
-
-                    # Salva solo il video senza audio
-                    video_clip.without_audio().write_videofile(temp_video, codec='libx264',
-                                                               audio=False, fps=video_clip.fps,
-                                                               preset='ultrafast', verbose=False,
-                                                               progress_bar=False)
-
-                    # Salva l'audio separatamente
-                    audio_clip.write_audiofile(temp_audio, codec='aac', verbose=False,
-                                               progress_bar=False)
-
-                    # Unisci video e audio con ffmpeg
-                    ffmpeg_cmd = [
-                        'ffmpeg/bin/ffmpeg',
-                        '-i', temp_video,
-                        '-i', temp_audio,
-                        '-c:v', 'copy',
-                        '-c:a', 'aac',
-                        '-map', '0:v',
-                        '-map', '1:a',
-                        '-shortest',
-                        '-y',
-                        self.output_path
-                    ]
-
-                    self.log("Unione finale con ffmpeg...")
-                    self.progress.emit(90, "Unione finale...")
-                    subprocess.run(ffmpeg_cmd, capture_output=True)
-
-                    # Pulizia file temporanei
-                    if os.path.exists(temp_video):
-                        os.remove(temp_video)
-                    if os.path.exists(temp_audio):
-                        os.remove(temp_audio)
-
-                    self.progress.emit(100, "Completato con metodo alternativo")
-                    return True
-
+                except InterruptedError:
+                    raise
                 except Exception as e:
-                    self.log(f"Errore nel salvataggio alternativo: {e}")
-                    raise Exception(f"Fallimento anche con metodo alternativo: {str(e)}")
+                    raise Exception(f"Errore nell'allineamento audio-video: {str(e)}")
 
             def applyAudioOnly(self):
-                """Applica solo l'audio al video esistente"""
-                # Implementazione simile all'allineamento ma senza modificare la velocità
+                """Applica solo l'audio al video esistente, copiando il video senza ricodifica"""
                 try:
-                    self.progress.emit(10, "Caricamento video...")
-
-                    # Per file molto grandi, utilizziamo direttamente ffmpeg
-                    if os.path.getsize(self.video_path) > 500 * 1024 * 1024:  # > 500 MB
-                        self.log("File video grande rilevato, utilizzo ffmpeg diretto")
-                        return self.apply_audio_with_ffmpeg()
-
-                    video_clip = VideoFileClip(self.video_path)
-
-                    self.progress.emit(30, "Caricamento audio...")
-                    audio_clip = AudioFileClip(self.audio_path)
-
-                    # Verifica e gestisci casi in cui la durata dell'audio è diversa dal video
-                    video_duration = video_clip.duration
-                    audio_duration = audio_clip.duration
-
-                    self.log(f"Durata video: {video_duration:.2f}s, durata audio: {audio_duration:.2f}s")
-
-                    if audio_duration > video_duration:
-                        self.progress.emit(40, "Taglio audio per adattarlo al video...")
-                        self.log(f"L'audio è più lungo del video. Taglio l'audio a {video_duration}s")
-                        audio_clip = audio_clip.subclip(0, video_duration)
-                    elif audio_duration < video_duration:
-                        # Avvisiamo che l'audio è più corto
-                        self.log(f"ATTENZIONE: L'audio è più corto del video di {video_duration - audio_duration:.2f}s")
-
-                    # Applica l'audio
-                    self.progress.emit(50, "Applicazione audio...")
-                    final_video = video_clip.set_audio(audio_clip)
-
-                    # Impostazioni di output ottimizzate
-                    self.progress.emit(70, "Salvataggio video finale...")
-
-                    try:
-                        final_video.write_videofile(
-                            self.output_path,
-                            codec="libx264",
-                            audio_codec="aac",
-                            fps=video_clip.fps,
-                            preset="ultrafast",
-                            threads=4,
-                            ffmpeg_params=['-crf', '23'],
-                            logger=None,
-                            verbose=False,
-                            progress_bar=False
-                        )
-                        self.progress.emit(100, "Completato")
-                    except Exception as save_error:
-                        self.log(f"Errore durante il salvataggio: {save_error}")
-                        self.progress.emit(85, "Tentativo alternativo...")
-                        return self.save_with_ffmpeg(video_clip, audio_clip)
-
+                    self.progress.emit(10, "Sostituzione audio con ffmpeg...")
+                    self.log("Sostituzione audio con copia dello stream video")
+                    self.engine.replace_audio(self.video_path, self.audio_path, self.output_path,
+                                              self._report_progress(10, 90, "Sostituzione audio..."))
+                    self.progress.emit(100, "Elaborazione completata")
+                except InterruptedError:
+                    raise
                 except Exception as e:
                     self.log(f"Errore nell'applicazione dell'audio: {e}")
                     raise Exception(f"Errore nella sostituzione dell'audio: {str(e)}")
-                finally:
-                    # Pulizia risorse
-                    import gc
-                    gc.collect()
-
-            def apply_audio_with_ffmpeg(self):
-                """Applica l'audio al video usando direttamente ffmpeg"""
-                try:
-                    self.progress.emit(40, "Sostituzione audio con ffmpeg...")
-                    self.log("Utilizzo ffmpeg per sostituire l'audio")
-
-                    ffmpeg_cmd = [
-                        'ffmpeg/bin/ffmpeg',
-                        '-i', self.video_path,
-                        '-i', self.audio_path,
-                        '-map', '0:v',
-                        '-map', '1:a',
-                        '-c:v', 'copy',  # Copia il video senza ricodifica
-                        '-c:a', 'aac',  # Codifica l'audio in AAC
-                        '-shortest',  # Termina quando finisce lo stream più corto
-                        '-y',  # Sovrascrivi se esiste
-                        self.output_path
-                    ]
-
-                    self.log("Esecuzione comando ffmpeg...")
-                    self.progress.emit(60, "Elaborazione in corso...")
-
-                    # Esegui il comando ffmpeg
-                    process = subprocess.Popen(
-                        ffmpeg_cmd,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        universal_newlines=True
-                    )
-
-                    # Leggi l'output per tenere traccia dell'avanzamento
-                    while True:
-                        line = process.stderr.readline()
-                        if not line and process.poll() is not None:
-                            break
-                        if 'time=' in line:
-                            try:
-                                # Estrai il timestamp corrente
-                                import re
-                                time_match = re.search(r'time=(\d+:\d+:\d+\.\d+)', line)
-                                if time_match:
-                                    current_time = time_match.group(1)
-                                    h, m, s = current_time.split(':')
-                                    seconds = float(h) * 3600 + float(m) * 60 + float(s)
-
-                                    # Calcola percentuale di completamento (approssimata)
-                                    video_info = self.get_media_info(self.video_path)
-                                    total_duration = float(video_info.get('format', {}).get('duration', 0))
-
-                                    if total_duration > 0:
-                                        progress = min(95, int((seconds / total_duration) * 90) + 60)
-                                        self.progress.emit(progress, f"Elaborazione: {current_time}")
-                            except Exception as ex:
-                                self.log(f"Errore nel parsing dell'output ffmpeg: {ex}")
-
-                    # Verifica il risultato
-                    if process.returncode == 0:
-                        self.log("Processo ffmpeg completato con successo")
-                        self.progress.emit(100, "Elaborazione completata")
-                        return True
-                    else:
-                        stderr = process.stderr.read()
-                        self.log(f"Errore ffmpeg: {stderr}")
-                        raise Exception(f"Errore nell'elaborazione ffmpeg: {stderr}")
-
-                except Exception as e:
-                    self.log(f"Errore nell'applicazione dell'audio con ffmpeg: {e}")
-                    raise Exception(f"Errore nell'applicazione dell'audio: {str(e)}")
 
             def stop(self):
                 self.running = False
+                self.engine.cancel()
                 self.log("Richiesta interruzione processo...")
 
         # Crea il dialog personalizzato invece di QProgressDialog
@@ -7387,7 +7155,7 @@ class VideoAudioManager(QMainWindow):
 
     def openRecentFile(self, filePath):
         self.videoPathLineEdit = filePath
-        self.player.setSource(QUrl.fromLocalFile(filePath))
+        self.player.setSource(QUrl.fromLocalFile(self._playback_path(filePath)))
         self.fileNameLabel.setText(os.path.basename(filePath))
 
     def playVideo(self):
@@ -7398,37 +7166,17 @@ class VideoAudioManager(QMainWindow):
 
     def adattaVelocitaVideoAAudio(self, video_path, new_audio_path, output_path):
         try:
-            # Log dei percorsi dei file
             logging.debug(f"Percorso video: {video_path}")
             logging.debug(f"Percorso nuovo audio: {new_audio_path}")
             logging.debug(f"Percorso output: {output_path}")
 
-            # Carica il nuovo file audio e calcola la sua durata
-            new_audio = AudioFileClip(new_audio_path)
-            durata_audio = new_audio.duration
-            logging.debug(f"Durata audio: {durata_audio} secondi")
-
-            # Carica il video (senza audio) e calcola la sua durata
-            video_clip = VideoFileClip(video_path)
-            durata_video = video_clip.duration
-            logging.debug(f"Durata video: {durata_video} secondi")
-
-            # Calcola il fattore di velocità
-            fattore_velocita = round(durata_video / durata_audio, 1)
-            logging.debug(f"Fattore di velocità: {fattore_velocita}")
-
-            # Modifica la velocità del video
-            video_modificato = video_clip.fx(vfx.speedx, fattore_velocita)
-
-            # Imposta il nuovo audio sul video modificato
-            final_video = video_modificato.set_audio(new_audio)
-
-            # Scrivi il video finale mantenendo lo stesso frame rate del video originale
-            final_video.write_videofile(output_path, codec="libx264", audio_codec="aac", fps=video_clip.fps)
+            fattore_velocita = SpeedAlignEngine().align(video_path, new_audio_path, output_path)
+            logging.debug(f"Fattore di velocità: {fattore_velocita:.4f}")
             logging.debug('Video elaborato con successo.')
 
         except Exception as e:
             logging.error(f"Errore durante l'adattamento della velocità del video: {e}")
+
     def stopVideo(self):
         self.player.stop()
 
@@ -7598,6 +7346,8 @@ class VideoAudioManager(QMainWindow):
         self.transcriptionViewToggle.setEnabled(False)
 
         # 4. Resetta i percorsi e lo stato del progetto
+        if self.proxy_thread and self.proxy_thread.isRunning():
+            self.proxy_thread.stop()
         self.current_project_path = None
         self.current_video_path = None
         self.current_audio_path = None
@@ -7672,6 +7422,7 @@ class VideoAudioManager(QMainWindow):
 
         # Asynchronously load the most recent clip to avoid blocking the UI
         QTimer.singleShot(100, self._load_most_recent_clip)
+        self._start_proxy_generation(gnai_path)
 
         # Prepara i dati per l'aggiornamento dell'interfaccia utente, inclusi i riassunti
         ui_data = {
@@ -7720,7 +7471,8 @@ class VideoAudioManager(QMainWindow):
         if not output_path:
             return
 
-        thread = ProjectClipsMergeThread(clips_paths, output_path, self)
+        use_parallel = QSettings("Genius", "GeniusAI").value("render/parallelEncoding", False, type=bool)
+        thread = ProjectClipsMergeThread(clips_paths, output_path, self, use_parallel_encoding=use_parallel)
         self.start_task(thread, self.on_merge_clips_completed, self.on_merge_clips_error, self.update_status_progress)
 
     def on_merge_clips_completed(self, output_path):
@@ -8239,7 +7991,8 @@ class VideoAudioManager(QMainWindow):
                 media_data=media_data,
                 output_path=output_path,
                 start_time=start_time,
-                parent=self
+                parent=self,
+                use_parallel_encoding=QSettings("Genius", "GeniusAI").value("render/parallelEncoding", False, type=bool)
             )
             self.start_task(
                 thread,
@@ -8365,6 +8118,50 @@ class VideoAudioManager(QMainWindow):
         )
         self.start_task(thread, self.on_batch_summary_completed, self.onProcessError, self.update_status_progress)
 
+    def start_clip_summaries(self):
+        """Riassume ogni clip trascritta del progetto e salva il risultato nel suo JSON."""
+        if not self.current_project_path or not self.projectDock.project_data:
+            self.show_status_message("Nessun progetto attivo.", error=True)
+            return
+
+        clips_dir = os.path.join(self.current_project_path, "clips")
+        clip_paths = [os.path.join(clips_dir, c["clip_filename"]) for c in self.projectDock.project_data.get("clips", [])
+                      if os.path.exists(os.path.splitext(os.path.join(clips_dir, c["clip_filename"]))[0] + ".json")]
+        if not clip_paths:
+            self.show_status_message("Nessuna clip con trascrizione trovata nel progetto.", error=True)
+            return
+
+        summary_type, ok = QInputDialog.getItem(self, "Riassumi Ogni Clip", "Scegli il tipo di riassunto:",
+                                                ["Dettagliato", "Note Riunione"], 0, False)
+        if not ok:
+            return
+        scope, ok = QInputDialog.getItem(self, "Riassumi Ogni Clip", "Quali clip riassumere?",
+                                         ["Solo quelle senza riassunto aggiornato", "Tutte (rigenera)"], 0, False)
+        if not ok:
+            return
+
+        thread = BatchSummarizationThread(
+            clip_paths,
+            SUMMARY_DETAILED if summary_type == "Dettagliato" else SUMMARY_MEETING,
+            self.languageComboBox.currentText(),
+            force=scope.startswith("Tutte"),
+        )
+        thread.clip_summarized.connect(self._on_clip_summary_ready)
+        self.start_task(thread, lambda message: self.show_status_message(message, timeout=8000),
+                        self.onProcessError, self.update_status_progress)
+
+    def _on_clip_summary_ready(self, clip_path, summary_html):
+        """Aggiorna la vista se il riassunto appena salvato è della clip aperta nel player."""
+        if self.videoPathLineEdit and os.path.normcase(os.path.abspath(self.videoPathLineEdit)) == \
+                os.path.normcase(os.path.abspath(clip_path)):
+            json_path = os.path.splitext(clip_path)[0] + ".json"
+            try:
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    self.summaries = json.load(f).get('summaries', self.summaries)
+                self._update_summary_view()
+            except (OSError, ValueError) as e:
+                logging.warning(f"Impossibile ricaricare i riassunti di {clip_path}: {e}")
+
     def on_batch_summary_completed(self, summary_text):
         """
         Saves the generated batch summary directly to the correct field
@@ -8786,7 +8583,8 @@ class VideoAudioManager(QMainWindow):
                 'document_text': document_text
             }
         )
-        self.start_task(thread, self.onProcessComplete, self.onProcessError, self.update_status_progress)
+        self.start_task(thread, self.onProcessComplete, self.onProcessError, self.update_status_progress,
+                        on_partial=self._summary_stream_handler())
 
     def _extract_text_from_pdf(self, file_path):
         """Extracts text from a PDF file."""
@@ -8863,20 +8661,31 @@ class VideoAudioManager(QMainWindow):
     def handle_chat_message(self, query):
         """Handles the sendMessage signal from the ChatDock."""
         context_text = self.chatDock.current_context_content
-        if not context_text or not context_text.strip():
+        gnai_path = self.projectDock.gnai_path if self.current_project_path else None
+        if (not context_text or not context_text.strip()) and not gnai_path:
             self.chatDock.add_message("AI", "Per favore, seleziona una trascrizione o un riassunto con del contenuto prima di fare una domanda.")
             return
 
+        # Con un progetto aperto il thread cerca i passaggi pertinenti anche nelle sue clip
         thread = ProcessTextAI(
             mode="chat_summary",
             language=self.languageComboBox.currentText(),
-            prompt_vars={'summary_text': context_text, 'user_query': query}
+            prompt_vars={'summary_text': context_text, 'user_query': query, 'gnai_path': gnai_path}
         )
-        self.start_task(thread, self.on_chat_response_received, self.onProcessError, self.update_status_progress)
+        # Il nuovo messaggio parte solo se il thread è stato accettato: una risposta ancora in
+        # streaming continua così a scrivere nel proprio messaggio
+        if self.start_task(thread, self.on_chat_response_received, self.on_chat_error, self.update_status_progress,
+                           on_partial=self.chatDock.append_stream_text):
+            self.chatDock.begin_stream_message()
 
     def on_chat_response_received(self, response):
         """Handles the completed signal from the ProcessTextAI thread for chat responses."""
-        self.chatDock.add_message("AI", response)
+        self.chatDock.finish_stream_message(response)
+
+    def on_chat_error(self, error_message):
+        """Removes the partially streamed answer, so the next response starts a new message."""
+        self.chatDock.discard_stream_message()
+        self.onProcessError(error_message)
 
     def on_translation_complete(self, translated_html):
         """Gestisce il completamento della traduzione."""
@@ -8904,6 +8713,11 @@ def get_application_path():
         return os.path.dirname(os.path.abspath(__file__))
 
 if __name__ == "__main__":
+    # --no-ai-cache: le azioni AI ignorano le risposte memorizzate per questa sessione
+    if "--no-ai-cache" in sys.argv:
+        sys.argv.remove("--no-ai-cache")
+        os.environ[CACHE_DISABLE_ENV] = "1"
+
     app = QApplication(sys.argv)
 
     # Specifica la cartella delle immagini
@@ -162,6 +162,10 @@ OLLAMA_LLAMA3_8B = "ollama:llama3:8b"
 OLLAMA_MISTRAL_7B = "ollama:mistral:7b" # Esempio Mistral
 OLLAMA_LLAVA = "ollama:llava:latest"  # Modello Vision
 
+# Modelli nel processo (senza server): 'local:echo' è un sostituto deterministico per build e
+# benchmark offline; 'local:<file>.gguf' carica un modello da LOCAL_MODELS_DIR con llama.cpp
+LOCAL_ECHO = "local:echo"
+
 # ElevenLabs (TTS) - Modelli a Novembre 2025
 ELEVENLABS_V2_MULTILINGUAL = "eleven_multilingual_v2" # Raccomandato, alta qualità
 ELEVENLABS_V2_TURBO = "eleven_turbo_v2"           # Bassa latenza
@@ -221,7 +225,8 @@ CATEGORIZED_FAST_TEXT_MODELS = {
     "Ollama": [
         OLLAMA_GEMMA_LATEST, OLLAMA_GEMMA3_4B, OLLAMA_GEMMA2_9B, OLLAMA_GEMMA_7B, OLLAMA_GEMMA_2B,
         OLLAMA_LLAMA3_8B, OLLAMA_MISTRAL_7B
-    ]
+    ],
+    "Locale": [LOCAL_ECHO]
 }
 
 CATEGORIZED_POWERFUL_TEXT_MODELS = {
@@ -322,11 +327,20 @@ ACTION_MODELS_CONFIG = {
 
 # --- Percorsi File e Prompt ---
 FFMPEG_PATH = os.path.join(BASE_DIR, "ffmpeg", "bin", "ffmpeg.exe")
+FFPROBE_PATH = os.path.join(BASE_DIR, "ffmpeg", "bin", "ffprobe.exe")
 FFMPEG_PATH_DOWNLOAD = os.path.join(BASE_DIR, "ffmpeg", "bin") # Usato da yt-dlp
 VERSION_FILE = os.path.join(BASE_DIR, "version_info.txt")
 CONTACTS_FILE = os.path.join(BASE_DIR, "contatti_teams.txt")
 DOCK_SETTINGS_FILE = os.path.join(BASE_DIR, "dock_settings.json")
 LOG_FILE = os.path.join(BASE_DIR, "console_log.txt")
+FFMPEG_TIMINGS_FILE = os.path.join(BASE_DIR, "ffmpeg_timings.jsonl")
+LLM_METRICS_FILE = os.path.join(BASE_DIR, "llm_metrics.jsonl")
+LLM_PROMPT_LOG_FILE = os.path.join(BASE_DIR, "llm_prompts.jsonl")
+LOCAL_MODELS_DIR = os.path.join(BASE_DIR, "models", "llm")
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+MEDIA_INFO_CACHE_FILE = os.path.join(CACHE_DIR, "media_info.json")
+AI_RESPONSE_CACHE_DIR = os.path.join(CACHE_DIR, "ai_responses")
+CHAT_INDEX_DIR = os.path.join(CACHE_DIR, "chat_index")
 
 # --- Livello di Log ---
 LOG_LEVEL = logging.INFO
@@ -358,6 +372,7 @@ PROMPT_GENERATE_FILENAME = get_prompt_path("generate_filename_prompt.txt")
 PROMPT_SPECIFIC_OBJECT_RECOGNITION = get_prompt_path("specific_object_recognition_prompt.txt")
 PROMPT_DOCUMENT_INTEGRATION = get_prompt_path("document_integration_prompt.txt")
 PROMPT_CHAT_SUMMARY = get_prompt_path("chat_summary_prompt.txt")
+PROMPT_CHUNK_SUMMARY = get_prompt_path("chunk_summary_prompt.txt")
 
 # --- Percorsi Risorse ---
 RESOURCES_DIR = os.path.join(BASE_DIR, "res")
@@ -422,6 +437,8 @@ def get_default_voices():
     return DEFAULT_VOICES
 
 # --- Funzione per recuperare il modello per un'azione specifica ---
+MODEL_OVERRIDE_ENV = "GENIUSAI_MODEL_OVERRIDE"
+
 def get_model_for_action(action_name: str) -> str:
     """
     Recupera il modello configurato per una specifica azione, con fallback al default.
@@ -441,6 +458,12 @@ def get_model_for_action(action_name: str) -> str:
     settings_key = config['setting_key']
     default_model = config['default']
 
+    # Forza lo stesso modello per tutte le azioni AI (es. 'local:echo' su una macchina senza rete)
+    override = os.getenv(MODEL_OVERRIDE_ENV)
+    if override and override.strip() and config['categorized_source'] is not CATEGORIZED_TTS_MODELS:
+        logging.debug(f"Modello per l'azione '{action_name}' forzato da {MODEL_OVERRIDE_ENV}: {override}")
+        return override.strip()
+
     settings = QSettings("Genius", "GeniusAI")
 
     # Legge il valore dalle impostazioni; se non c'è, usa il default
@@ -457,6 +480,7 @@ def debug_config():
     paths = {
         "BASE_DIR": BASE_DIR,
         "FFMPEG_PATH": FFMPEG_PATH,
+        "FFPROBE_PATH": FFPROBE_PATH,
         "PROMPTS_DIR": PROMPTS_DIR,
         "RESOURCES_DIR": RESOURCES_DIR,
         "SPLASH_IMAGES_DIR": SPLASH_IMAGES_DIR,
@@ -464,6 +488,7 @@ def debug_config():
         "WATERMARK_IMAGE": WATERMARK_IMAGE,
         "VERSION_FILE": VERSION_FILE,
         "LOG_FILE": LOG_FILE,
+        "CACHE_DIR": CACHE_DIR,
         "OLLAMA_ENDPOINT": get_ollama_endpoint(),
         # API Keys Status
         "ELEVENLABS_API_KEY": "Impostata" if ELEVENLABS_API_KEY else "NON Impostata",
@@ -2,6 +2,11 @@ import os
 import json
 from datetime import datetime
 
+from src.services.MediaInfo import get_media_info
+
+PROXY_DIR_NAME = "proxies"
+PROXY_SUFFIX = "_proxy.mp4"
+
 class ProjectManager:
     def __init__(self, base_dir):
         self.base_dir = base_dir
@@ -113,16 +118,10 @@ class ProjectManager:
             return False, "Clip file not found"
 
         try:
-            # Usa il loader corretto in base al tipo
-            if clip_type == 'video':
-                from moviepy.editor import VideoFileClip
-                media_clip = VideoFileClip(clip_path)
-            else: # 'audio'
-                from moviepy.editor import AudioFileClip
-                media_clip = AudioFileClip(clip_path)
-
-            with media_clip:
-                duration = media_clip.duration
+            media_info = get_media_info()
+            if not media_info.stream(clip_path, clip_type):
+                return False, f"Failed to process clip metadata: no {clip_type} stream found"
+            duration = media_info.duration(clip_path)
 
             size = os.path.getsize(clip_path)
             creation_date = datetime.fromtimestamp(os.path.getctime(clip_path)).isoformat()
@@ -187,6 +186,10 @@ class ProjectManager:
             json.dump(project_data, f, indent=4)
             f.truncate()
 
+        proxy_path = self._proxy_path_for(os.path.dirname(gnai_path), clip_filename)
+        if os.path.exists(proxy_path):
+            os.remove(proxy_path)
+
         return True, "Clip removed successfully"
 
     def rename_clip_in_project(self, gnai_path, old_filename, new_filename):
@@ -223,6 +226,11 @@ class ProjectManager:
             json.dump(project_data, f, indent=4)
             f.truncate()
 
+        project_dir = os.path.dirname(gnai_path)
+        old_proxy = self._proxy_path_for(project_dir, old_filename)
+        if os.path.exists(old_proxy):
+            os.replace(old_proxy, self._proxy_path_for(project_dir, new_filename))
+
         return True, "Clip renamed successfully"
 
     def relink_clip(self, gnai_path, old_filename, new_filepath):
@@ -274,4 +282,48 @@ class ProjectManager:
 
         if os.path.exists(clip_path):
             return clip_path
-        return None
\ No newline at end of file
+        return None
+
+    # --- Proxy di riproduzione ---
+
+    @staticmethod
+    def _proxy_path_for(project_dir, clip_filename):
+        return os.path.join(project_dir, PROXY_DIR_NAME, os.path.splitext(clip_filename)[0] + PROXY_SUFFIX)
+
+    def get_proxy_path(self, clip_path):
+        """
+        Percorso del proxy di una clip di progetto (<progetto>/proxies/<nome>_proxy.mp4).
+        Restituisce None per i file che non si trovano nella cartella 'clips' di un progetto.
+        """
+        if not clip_path:
+            return None
+        clips_dir = os.path.dirname(os.path.abspath(clip_path))
+        if os.path.basename(clips_dir) != "clips":
+            return None
+        return self._proxy_path_for(os.path.dirname(clips_dir), os.path.basename(clip_path))
+
+    def has_valid_proxy(self, clip_path):
+        """True se il proxy esiste ed è più recente dell'originale."""
+        proxy_path = self.get_proxy_path(clip_path)
+        if not proxy_path or not os.path.exists(proxy_path) or not os.path.exists(clip_path):
+            return False
+        return os.path.getmtime(proxy_path) >= os.path.getmtime(clip_path)
+
+    def get_playback_path(self, clip_path):
+        """File da usare per riproduzione e anteprima: il proxy se disponibile, altrimenti l'originale."""
+        if self.has_valid_proxy(clip_path):
+            return self.get_proxy_path(clip_path)
+        return clip_path
+
+    def get_clips_needing_proxy(self, gnai_path):
+        """Coppie (clip originale, percorso proxy) delle clip video di progetto senza un proxy aggiornato."""
+        project_data, error = self.load_project(gnai_path)
+        if error:
+            return []
+        clips_dir = os.path.join(os.path.dirname(gnai_path), "clips")
+        missing = []
+        for clip in project_data.get("clips", []):
+            clip_path = os.path.join(clips_dir, clip.get("clip_filename", ""))
+            if os.path.isfile(clip_path) and not self.has_valid_proxy(clip_path):
+                missing.append((clip_path, self.get_proxy_path(clip_path)))
+        return missing
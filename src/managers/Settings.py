@@ -12,6 +12,10 @@ import torch
 from PyQt6.QtCore import QSettings, Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QFont, QColor
 from src.config import ACTION_MODELS_CONFIG, get_ollama_endpoint, WATERMARK_IMAGE, HIGHLIGHT_COLORS
+from src.recorder.CaptureOptions import (
+    CAPTURE_MODES, CAPTURE_MODE_MP4, DEFAULT_SEGMENT_SECONDS, CAPTURE_PROFILES, DEFAULT_CAPTURE_PROFILE
+)
+from src.services.ResponseCache import get_response_cache, CACHE_SETTING_KEY
 from PyQt6.QtWidgets import QListWidget, QListWidgetItem, QProgressBar, QMessageBox, QGroupBox
 
 class ModelDownloaderThread(QThread):
@@ -52,6 +56,7 @@ class SettingsDialog(QDialog):
         tabs.addTab(self.createRecordingSettingsTab(), "Registrazione")
         tabs.addTab(self.createEditorSettingsTab(), "Editor")
         tabs.addTab(self.createWhisperSettingsTab(), "Whisper")
+        tabs.addTab(self.createPerformanceSettingsTab(), "Prestazioni")
         layout.addWidget(tabs)
 
         buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
@@ -165,6 +170,18 @@ class SettingsDialog(QDialog):
         layout.addRow("Posizione Watermark:", self.watermarkPositionComboBox)
         self.useVBCableCheckBox = QCheckBox(toolTip="Abilita VB-CABLE per la registrazione audio (utile per cuffie bluetooth).")
         layout.addRow("Abilita VB-CABLE:", self.useVBCableCheckBox)
+        self.captureModeComboBox = QComboBox(toolTip="Formato di scrittura della registrazione video. Le modalità frammentata e a segmenti non perdono la registrazione in caso di crash e terminano subito allo stop.")
+        for mode, label in CAPTURE_MODES.items():
+            self.captureModeComboBox.addItem(label, mode)
+        layout.addRow("Modalità di scrittura:", self.captureModeComboBox)
+        self.segmentSecondsSpinBox = QSpinBox(minimum=2, maximum=600, suffix=" s", toolTip="Durata di ogni segmento nella modalità a segmenti.")
+        layout.addRow("Durata segmenti:", self.segmentSecondsSpinBox)
+        self.captureProfileComboBox = QComboBox(toolTip="Compromesso tra carico della CPU e qualità durante la registrazione. CRF e bitrate massimo sono scelti in base alla risoluzione catturata.")
+        for profile, options in CAPTURE_PROFILES.items():
+            self.captureProfileComboBox.addItem(options['label'], profile)
+        layout.addRow("Profilo di cattura:", self.captureProfileComboBox)
+        self.captureRegionEdit = QLineEdit(placeholderText="x,y,larghezza,altezza (vuoto = schermo intero)", toolTip="Area del monitor da registrare, in pixel relativi al monitor selezionato.")
+        layout.addRow("Area di cattura:", self.captureRegionEdit)
         return widget
 
     def browseWatermark(self):
@@ -191,6 +208,28 @@ class SettingsDialog(QDialog):
         layout.addRow("Colore Evidenziatore:", self.highlightColorComboBox)
         return widget
 
+    def createPerformanceSettingsTab(self):
+        widget = QWidget()
+        layout = QFormLayout(widget)
+        self.parallelEncodingCheckBox = QCheckBox(toolTip="Divide i render lunghi in segmenti codificati in parallelo su tutti i core CPU.")
+        layout.addRow("Rendering parallelo a segmenti:", self.parallelEncodingCheckBox)
+        self.parallelSegmentsSpinBox = QSpinBox(minimum=0, maximum=64, toolTip="Numero di segmenti per il rendering parallelo (0 = uno per core CPU).")
+        self.parallelSegmentsSpinBox.setSpecialValueText("Automatico")
+        layout.addRow("Numero segmenti:", self.parallelSegmentsSpinBox)
+        self.proxyMediaCheckBox = QCheckBox(toolTip="Genera in background copie a bassa risoluzione delle clip di progetto e le usa per la riproduzione; i render usano sempre gli originali.")
+        layout.addRow("File proxy per la riproduzione:", self.proxyMediaCheckBox)
+        self.responseCacheCheckBox = QCheckBox(toolTip="Riusa le risposte AI già ottenute per correzione, riassunti e nomi file quando testo, modello e prompt non cambiano.")
+        layout.addRow("Cache delle risposte AI:", self.responseCacheCheckBox)
+        entries, size = get_response_cache().size()
+        self.clearResponseCacheButton = QPushButton(f"Svuota cache ({entries} risposte, {size / (1024 * 1024):.1f} MB)")
+        self.clearResponseCacheButton.clicked.connect(self.clearResponseCache)
+        layout.addRow("", self.clearResponseCacheButton)
+        return widget
+
+    def clearResponseCache(self):
+        get_response_cache().clear()
+        self.clearResponseCacheButton.setText("Svuota cache (0 risposte, 0.0 MB)")
+
     def loadSettings(self):
         for key, edit in self.api_key_edits.items():
             edit.setText(self.settings.value(f"api_keys_dialog/{key}", ""))
@@ -204,6 +243,12 @@ class SettingsDialog(QDialog):
         self.watermarkSizeSpinBox.setValue(self.settings.value("recording/watermarkSize", 10, type=int))
         self.watermarkPositionComboBox.setCurrentText(self.settings.value("recording/watermarkPosition", "Bottom Right"))
         self.useVBCableCheckBox.setChecked(self.settings.value("recording/useVBCable", False, type=bool))
+        capture_mode_index = self.captureModeComboBox.findData(self.settings.value("recording/captureMode", CAPTURE_MODE_MP4))
+        self.captureModeComboBox.setCurrentIndex(max(0, capture_mode_index))
+        self.segmentSecondsSpinBox.setValue(self.settings.value("recording/segmentSeconds", DEFAULT_SEGMENT_SECONDS, type=int))
+        capture_profile_index = self.captureProfileComboBox.findData(self.settings.value("recording/captureProfile", DEFAULT_CAPTURE_PROFILE))
+        self.captureProfileComboBox.setCurrentIndex(max(0, capture_profile_index))
+        self.captureRegionEdit.setText(self.settings.value("recording/captureRegion", ""))
         self.fontFamilyComboBox.setCurrentFont(QFont(self.settings.value("editor/fontFamily", "Arial")))
         self.fontSizeSpinBox.setValue(self.settings.value("editor/fontSize", 14, type=int))
         self.titleFontSizeSpinBox.setValue(self.settings.value("editor/titleFontSize", 22, type=int))
@@ -212,6 +257,11 @@ class SettingsDialog(QDialog):
         # Carica impostazioni Whisper
         self.whisperModelComboBox.setCurrentText(self.settings.value("whisper/model", "base"))
         self.gpuCheckbox.setChecked(self.settings.value("whisper/use_gpu", torch.cuda.is_available(), type=bool))
+        # Carica impostazioni Prestazioni
+        self.parallelEncodingCheckBox.setChecked(self.settings.value("render/parallelEncoding", False, type=bool))
+        self.parallelSegmentsSpinBox.setValue(self.settings.value("render/parallelSegments", 0, type=int))
+        self.proxyMediaCheckBox.setChecked(self.settings.value("render/useProxies", True, type=bool))
+        self.responseCacheCheckBox.setChecked(self.settings.value(CACHE_SETTING_KEY, True, type=bool))
 
 
     def _setComboBoxValue(self, combo, value):
@@ -232,6 +282,10 @@ class SettingsDialog(QDialog):
         self.settings.setValue("recording/watermarkSize", self.watermarkSizeSpinBox.value())
         self.settings.setValue("recording/watermarkPosition", self.watermarkPositionComboBox.currentText())
         self.settings.setValue("recording/useVBCable", self.useVBCableCheckBox.isChecked())
+        self.settings.setValue("recording/captureMode", self.captureModeComboBox.currentData())
+        self.settings.setValue("recording/segmentSeconds", self.segmentSecondsSpinBox.value())
+        self.settings.setValue("recording/captureProfile", self.captureProfileComboBox.currentData())
+        self.settings.setValue("recording/captureRegion", self.captureRegionEdit.text().strip())
         self.settings.setValue("editor/fontFamily", self.fontFamilyComboBox.currentFont().family())
         self.settings.setValue("editor/fontSize", self.fontSizeSpinBox.value())
         self.settings.setValue("editor/titleFontSize", self.titleFontSizeSpinBox.value())
@@ -240,6 +294,11 @@ class SettingsDialog(QDialog):
         # Salva impostazioni Whisper
         self.settings.setValue("whisper/model", self.whisperModelComboBox.currentText())
         self.settings.setValue("whisper/use_gpu", self.gpuCheckbox.isChecked())
+        # Salva impostazioni Prestazioni
+        self.settings.setValue("render/parallelEncoding", self.parallelEncodingCheckBox.isChecked())
+        self.settings.setValue("render/parallelSegments", self.parallelSegmentsSpinBox.value())
+        self.settings.setValue("render/useProxies", self.proxyMediaCheckBox.isChecked())
+        self.settings.setValue(CACHE_SETTING_KEY, self.responseCacheCheckBox.isChecked())
         self.accept()
 
     def createWhisperSettingsTab(self):
@@ -0,0 +1,201 @@
+# File: src/recorder/CaptureOptions.py
+import os
+import hashlib
+import datetime
+import logging
+
+# Modalità di scrittura della registrazione:
+# - mp4: file unico con +faststart (alla chiusura ffmpeg riscrive il file per spostare l'indice)
+# - fragmented: MP4 frammentato, leggibile anche se la registrazione si interrompe
+# - segmented: segmenti MP4 di durata fissa, utilizzabili appena chiusi
+CAPTURE_MODE_MP4 = 'mp4'
+CAPTURE_MODE_FRAGMENTED = 'fragmented'
+CAPTURE_MODE_SEGMENTED = 'segmented'
+CAPTURE_MODES = {
+    CAPTURE_MODE_MP4: "MP4 standard",
+    CAPTURE_MODE_FRAGMENTED: "MP4 frammentato (resistente ai crash)",
+    CAPTURE_MODE_SEGMENTED: "Segmenti di durata fissa",
+}
+KEYFRAME_INTERVAL = 2
+DEFAULT_SEGMENT_SECONDS = 10
+SEGMENT_LIST_NAME = "segments.txt"
+
+
+def segment_dir_for(output_path):
+    """Cartella in cui la modalità a segmenti scrive i file della registrazione `output_path`."""
+    stem = os.path.splitext(os.path.basename(output_path))[0]
+    return os.path.join(os.path.dirname(output_path), f"{stem}_segments")
+
+
+def unique_recording_path(output_folder, recording_name, extension):
+    """
+    Percorso libero per una nuova sessione di registrazione. Oltre al file controlla la
+    cartella dei segmenti: in modalità a segmenti il file finale non viene mai scritto e
+    una sessione ripresa con lo stesso nome sovrascriverebbe segmenti e lista della precedente.
+    """
+    def taken(path):
+        return os.path.exists(path) or os.path.exists(segment_dir_for(path))
+
+    path = os.path.join(output_folder, f"{recording_name}{extension}")
+    if not taken(path):
+        return path
+    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+    path = os.path.join(output_folder, f"{recording_name}_{timestamp}{extension}")
+    counter = 1
+    while taken(path):
+        path = os.path.join(output_folder, f"{recording_name}_{timestamp}_{counter}{extension}")
+        counter += 1
+    return path
+
+
+def read_segment_list(list_path):
+    """Segmenti già chiusi da ffmpeg, nell'ordine di registrazione."""
+    if not os.path.exists(list_path):
+        return []
+    base_dir = os.path.dirname(list_path)
+    with open(list_path, 'r', encoding='utf-8', errors='replace') as f:
+        return [os.path.join(base_dir, line.strip()) for line in f if line.strip()]
+
+
+def container_args(capture_mode, output_path, frame_rate, segment_seconds=DEFAULT_SEGMENT_SECONDS):
+    """Argomenti di uscita di ffmpeg per la modalità di scrittura scelta (solo registrazioni video)."""
+    gop = str(max(1, int(round(frame_rate * KEYFRAME_INTERVAL))))
+    if capture_mode == CAPTURE_MODE_FRAGMENTED:
+        # flush_packets: ogni frammento chiuso arriva subito su disco invece di restare nel buffer di scrittura
+        return ['-g', gop, '-movflags', '+frag_keyframe+empty_moov+default_base_moof', '-flush_packets', '1',
+                '-y', output_path]
+    if capture_mode == CAPTURE_MODE_SEGMENTED:
+        segment_dir = segment_dir_for(output_path)
+        stem, ext = os.path.splitext(os.path.basename(output_path))
+        return [
+            '-force_key_frames', f"expr:gte(t,n_forced*{KEYFRAME_INTERVAL})",
+            '-f', 'segment', '-segment_time', str(segment_seconds),
+            '-segment_format', (ext.lstrip('.') or 'mp4'), '-reset_timestamps', '1',
+            '-segment_list', os.path.join(segment_dir, SEGMENT_LIST_NAME), '-segment_list_type', 'flat',
+            '-y', os.path.join(segment_dir, f"{stem}_%05d{ext or '.mp4'}"),
+        ]
+    return ['-movflags', '+faststart', '-y', output_path]
+
+
+# Profili di codifica della cattura. "balanced" mantiene il preset storico (libx264 ultrafast)
+# ma, come gli altri profili, usa CRF e bitrate massimo scelti in base alla risoluzione
+# (prima: CRF 23 predefinito di x264, senza limite di bitrate); "performance" riduce
+# ulteriormente il carico sulla CPU.
+CAPTURE_PROFILE_PERFORMANCE = 'performance'
+CAPTURE_PROFILE_BALANCED = 'balanced'
+CAPTURE_PROFILE_QUALITY = 'quality'
+DEFAULT_CAPTURE_PROFILE = CAPTURE_PROFILE_BALANCED
+CAPTURE_PROFILES = {
+    CAPTURE_PROFILE_PERFORMANCE: {
+        'label': "Prestazioni (CPU minima)",
+        'preset': 'ultrafast', 'tune': 'zerolatency', 'crf_offset': 3, 'stats_interval': 2.0,
+    },
+    CAPTURE_PROFILE_BALANCED: {
+        'label': "Bilanciato",
+        'preset': 'ultrafast', 'tune': None, 'crf_offset': 0, 'stats_interval': 1.0,
+    },
+    CAPTURE_PROFILE_QUALITY: {
+        'label': "Qualità",
+        'preset': 'veryfast', 'tune': None, 'crf_offset': -3, 'stats_interval': 1.0,
+    },
+}
+
+# CRF e bitrate massimo (kbit/s, riferito a 30 fps) in base all'altezza dell'area catturata:
+# su schermi grandi il testo resta leggibile anche con un CRF più alto
+RESOLUTION_TARGETS = (
+    (720, 23, 4000),
+    (1080, 25, 8000),
+    (1440, 26, 12000),
+    (None, 27, 20000),
+)
+
+
+def capture_profile(name):
+    return CAPTURE_PROFILES.get(name, CAPTURE_PROFILES[DEFAULT_CAPTURE_PROFILE])
+
+
+def resolution_target(height):
+    """(crf, bitrate massimo in kbit/s) per un'area di cattura alta `height` pixel."""
+    for max_height, crf, maxrate in RESOLUTION_TARGETS:
+        if max_height is None or height <= max_height:
+            return crf, maxrate
+    return RESOLUTION_TARGETS[-1][1:]
+
+
+def video_encoder_args(profile_name, height, frame_rate):
+    """Argomenti libx264 per la cattura, con CRF e bitrate massimo scelti in base alla risoluzione."""
+    profile = capture_profile(profile_name)
+    crf, maxrate = resolution_target(height)
+    crf = min(51, max(0, crf + profile['crf_offset']))
+    maxrate = int(maxrate * max(1.0, frame_rate / 30.0))
+    args = ['-c:v', 'libx264', '-preset', profile['preset']]
+    if profile.get('tune'):
+        args.extend(['-tune', profile['tune']])
+    args.extend(['-crf', str(crf), '-maxrate', f"{maxrate}k", '-bufsize', f"{maxrate * 2}k", '-pix_fmt', 'yuv420p'])
+    return args
+
+
+def capture_area(monitor_geometry, region=None):
+    """
+    Area da catturare (x, y, larghezza, altezza) in coordinate del desktop.
+    `region` è relativa al monitor e viene limitata ai suoi bordi; i lati sono resi pari.
+    """
+    monitor_x, monitor_y, monitor_width, monitor_height = monitor_geometry
+    if region:
+        x, y, width, height = (int(v) for v in region)
+        x, y = max(0, x), max(0, y)
+        width = min(width, monitor_width - x)
+        height = min(height, monitor_height - y)
+        if width >= 2 and height >= 2:
+            return monitor_x + x, monitor_y + y, width - width % 2, height - height % 2
+    return monitor_x, monitor_y, monitor_width - monitor_width % 2, monitor_height - monitor_height % 2
+
+
+def parse_capture_region(text):
+    """Converte 'x,y,larghezza,altezza' in una tupla; None se vuoto o non valido (schermo intero)."""
+    try:
+        values = [int(v.strip()) for v in str(text or '').split(',')]
+    except ValueError:
+        return None
+    if len(values) != 4 or values[2] <= 0 or values[3] <= 0:
+        return None
+    return tuple(values)
+
+
+def watermark_overlay(position, margin=10):
+    """Espressione di overlay per la posizione del watermark."""
+    positions = {
+        "Top Left": f"{margin}:{margin}",
+        "Top Right": f"W-w-{margin}:{margin}",
+        "Bottom Left": f"{margin}:H-h-{margin}",
+    }
+    return f"overlay={positions.get(position, f'W-w-{margin}:H-h-{margin}')}"
+
+
+def prescaled_watermark(image_path, size_percent, cache_dir):
+    """
+    Copia del watermark già ridimensionata al `size_percent` della sua altezza, salvata
+    in cache: ffmpeg non deve più applicare lo scale nel grafo dei filtri a ogni frame.
+    Restituisce None se l'immagine non può essere elaborata.
+    """
+    try:
+        from PIL import Image
+        stat = os.stat(image_path)
+        key = hashlib.sha1(f"{os.path.abspath(image_path)}|{stat.st_size}|{stat.st_mtime_ns}".encode('utf-8')).hexdigest()[:16]
+        target_path = os.path.join(cache_dir, f"watermark_{key}_{size_percent}.png")
+        if os.path.exists(target_path):
+            return target_path
+
+        os.makedirs(cache_dir, exist_ok=True)
+        with Image.open(image_path) as image:
+            scale = size_percent / 100.0
+            width = max(1, int(round(image.width * scale)))
+            height = max(1, int(round(image.height * scale)))
+            resized = image.convert('RGBA').resize((width, height), Image.LANCZOS)
+            temp_path = target_path + ".tmp.png"
+            resized.save(temp_path, format='PNG')
+        os.replace(temp_path, target_path)
+        return target_path
+    except Exception as e:
+        logging.warning(f"Impossibile preparare il watermark ridimensionato: {e}")
+        return None
@@ -0,0 +1,183 @@
+# File: src/recorder/RecordingTelemetry.py
+import os
+import csv
+import time
+import logging
+
+from src.recorder.CaptureOptions import (
+    CAPTURE_PROFILES, CAPTURE_PROFILE_PERFORMANCE, CAPTURE_PROFILE_BALANCED, CAPTURE_PROFILE_QUALITY
+)
+
+# Stato dell'encoder rispetto al tempo reale
+HEALTH_OK = 'ok'
+HEALTH_LAGGING = 'lagging'
+
+# Soglie del rilevamento del ritardo. La velocità considerata è quella dell'intervallo
+# (secondi codificati / secondi reali tra due campioni): lo `speed` di ffmpeg è una media
+# dall'avvio e resta sotto 1 per diversi secondi a causa della latenza iniziale.
+# L'encoder è in ritardo se la velocità resta sotto
+# LAG_SPEED per LAG_SAMPLES campioni consecutivi (dopo il riscaldamento iniziale) o se
+# in un intervallo perde più di DROP_RATIO dei frame attesi; torna in salute dopo
+# LAG_SAMPLES campioni con velocità almeno RECOVER_SPEED
+WARMUP_SECONDS = 5.0
+LAG_SPEED = 0.95
+RECOVER_SPEED = 0.98
+LAG_SAMPLES = 3
+DROP_RATIO = 0.05
+
+# Profilo più leggero da suggerire quando l'encoder non tiene il passo
+LIGHTER_PROFILE = {
+    CAPTURE_PROFILE_QUALITY: CAPTURE_PROFILE_BALANCED,
+    CAPTURE_PROFILE_BALANCED: CAPTURE_PROFILE_PERFORMANCE,
+}
+
+TELEMETRY_FIELDS = (
+    'elapsed', 'frame', 'effective_fps', 'fps_ratio', 'dup_frames', 'drop_frames',
+    'new_drops', 'speed', 'interval_speed', 'total_size', 'write_rate', 'bitrate', 'health',
+)
+
+
+def telemetry_path_for(output_path):
+    """File CSV con la serie temporale della registrazione `output_path`, nella stessa cartella."""
+    stem = os.path.splitext(os.path.basename(output_path))[0]
+    return os.path.join(os.path.dirname(output_path), f"{stem}_telemetry.csv")
+
+
+def lighter_profile(profile_name):
+    """Profilo di cattura meno costoso di `profile_name`, o None se è già il più leggero."""
+    return LIGHTER_PROFILE.get(profile_name if profile_name in CAPTURE_PROFILES else CAPTURE_PROFILE_BALANCED)
+
+
+class RecordingTelemetry:
+    """
+    Serie temporale dello stato dell'encoder durante una registrazione.
+
+    Ogni campione di -progress viene confrontato con il precedente: fps effettivi
+    (frame scritti sul tempo reale trascorso), frame duplicati/persi nell'intervallo,
+    velocità dell'encoder e velocità di scrittura su disco.
+    """
+
+    def __init__(self, target_fps, profile_name=None):
+        self.target_fps = float(target_fps) if target_fps else 0.0
+        self.profile_name = profile_name
+        self.samples = []
+        self.health = HEALTH_OK
+        self.lag_episodes = 0
+        self._start = None
+        self._previous = None
+        self._slow_samples = 0
+        self._fast_samples = 0
+
+    def update(self, stats, now=None):
+        """
+        Aggiunge un campione a partire dalle statistiche di FFmpegJob e lo restituisce.
+        Il campione contiene 'lag_started' / 'lag_ended' quando lo stato di salute cambia.
+        """
+        now = time.monotonic() if now is None else now
+        if self._start is None:
+            self._start = now
+        elapsed = now - self._start
+
+        frame = stats.get('frame') or 0
+        dup_frames = stats.get('dup_frames') or 0
+        drop_frames = stats.get('drop_frames') or 0
+        total_size = stats.get('total_size') or 0
+        out_time = stats.get('out_time')
+
+        previous = self._previous
+        interval = now - previous['_time'] if previous is not None else 0
+        effective_fps = write_rate = interval_speed = None
+        new_drops = 0
+        if previous is not None:
+            if interval > 0:
+                effective_fps = max(0, frame - previous['frame']) / interval
+                write_rate = max(0, total_size - previous['total_size']) / interval
+                if out_time is not None and previous['_out_time'] is not None:
+                    interval_speed = max(0.0, out_time - previous['_out_time']) / interval
+            new_drops = max(0, drop_frames - previous['drop_frames'])
+        else:
+            # Primo campione: il valore medio calcolato da ffmpeg è la stima migliore
+            effective_fps = stats.get('fps')
+
+        fps_ratio = effective_fps / self.target_fps if effective_fps is not None and self.target_fps else None
+
+        sample = {
+            'elapsed': round(elapsed, 3),
+            'frame': frame,
+            'effective_fps': round(effective_fps, 2) if effective_fps is not None else None,
+            'fps_ratio': round(fps_ratio, 3) if fps_ratio is not None else None,
+            'dup_frames': dup_frames,
+            'drop_frames': drop_frames,
+            'new_drops': new_drops,
+            'speed': stats.get('speed'),
+            'interval_speed': round(interval_speed, 3) if interval_speed is not None else None,
+            'total_size': total_size,
+            'write_rate': round(write_rate) if write_rate is not None else None,
+            'bitrate': stats.get('bitrate'),
+        }
+        speed = interval_speed if interval_speed is not None else stats.get('speed')
+        sample.update(self._update_health(elapsed, speed, new_drops, interval))
+        sample['health'] = self.health
+
+        self.samples.append(sample)
+        self._previous = dict(sample, _time=now, _out_time=out_time)
+        return sample
+
+    def _update_health(self, elapsed, speed, new_drops, interval):
+        if elapsed < WARMUP_SECONDS:
+            return {}
+
+        expected_frames = self.target_fps * interval
+        dropping = expected_frames > 0 and new_drops > expected_frames * DROP_RATIO
+        slow = dropping or (speed is not None and speed < LAG_SPEED)
+        recovered = not dropping and speed is not None and speed >= RECOVER_SPEED
+
+        self._slow_samples = self._slow_samples + 1 if slow else 0
+        self._fast_samples = self._fast_samples + 1 if recovered else 0
+
+        if self.health == HEALTH_OK and (dropping or self._slow_samples >= LAG_SAMPLES):
+            self.health = HEALTH_LAGGING
+            self.lag_episodes += 1
+            self._fast_samples = 0
+            return {'lag_started': True}
+        if self.health == HEALTH_LAGGING and self._fast_samples >= LAG_SAMPLES:
+            self.health = HEALTH_OK
+            self._slow_samples = 0
+            return {'lag_ended': True}
+        return {}
+
+    def summary(self):
+        """Valori riassuntivi della registrazione, per il log e la UI."""
+        if not self.samples:
+            return {}
+        last = self.samples[-1]
+        speeds = [s['interval_speed'] for s in self.samples if s['interval_speed'] is not None]
+        elapsed = last['elapsed']
+        return {
+            'duration': elapsed,
+            'frames': last['frame'],
+            'average_fps': last['frame'] / elapsed if elapsed > 0 else None,
+            'target_fps': self.target_fps,
+            'dup_frames': last['dup_frames'],
+            'drop_frames': last['drop_frames'],
+            'min_speed': min(speeds) if speeds else None,
+            'average_write_rate': last['total_size'] / elapsed if elapsed > 0 else None,
+            'lag_episodes': self.lag_episodes,
+            'suggested_profile': lighter_profile(self.profile_name) if self.lag_episodes else None,
+        }
+
+    def save(self, path):
+        """Scrive la serie temporale in CSV; restituisce il percorso o None se non ci sono campioni."""
+        if not self.samples:
+            return None
+        try:
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=TELEMETRY_FIELDS, extrasaction='ignore')
+                writer.writeheader()
+                for sample in self.samples:
+                    writer.writerow({key: '' if sample.get(key) is None else sample[key]
+                                     for key in TELEMETRY_FIELDS})
+        except OSError as e:
+            logging.warning(f"Impossibile salvare la telemetria della registrazione in {path}: {e}")
+            return None
+        return path
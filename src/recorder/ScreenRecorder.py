@@ -1,21 +1,33 @@
-import subprocess
-import re
 from screeninfo import get_monitors
 from PyQt6.QtCore import QThread, pyqtSignal
 import os
-from src.config import WATERMARK_IMAGE
+from src.config import WATERMARK_IMAGE, CACHE_DIR
 from src.config import DEFAULT_AUDIO_CHANNELS, DEFAULT_FRAME_RATE
+from src.services.FFmpegRunner import FFmpegJob, FFmpegError
+from src.recorder.CaptureOptions import (
+    CAPTURE_MODES, CAPTURE_MODE_MP4, CAPTURE_MODE_SEGMENTED, DEFAULT_SEGMENT_SECONDS, SEGMENT_LIST_NAME,
+    DEFAULT_CAPTURE_PROFILE, container_args, segment_dir_for, read_segment_list, capture_profile,
+    video_encoder_args, capture_area, watermark_overlay, prescaled_watermark
+)
+from src.recorder.RecordingTelemetry import RecordingTelemetry, telemetry_path_for
+
+WATERMARK_CACHE_DIR = os.path.join(CACHE_DIR, "watermarks")
 
 class ScreenRecorder(QThread):
     error_signal = pyqtSignal(str)
     recording_started_signal = pyqtSignal()
     recording_stopped_signal = pyqtSignal()
     stats_updated = pyqtSignal(dict)
+    segment_completed = pyqtSignal(str)
+    encoder_health_changed = pyqtSignal(dict)
+    telemetry_saved = pyqtSignal(str, dict)
 
     def __init__(self, output_path, ffmpeg_path='ffmpeg.exe', monitor_index=0, audio_inputs=None,
                  audio_channels=DEFAULT_AUDIO_CHANNELS, frames=DEFAULT_FRAME_RATE, record_audio=True,
                  record_video=True, use_watermark=True, watermark_path=None, watermark_size=10,
-                 watermark_position="Bottom Right", bluetooth_mode=False, audio_volume=1.0):
+                 watermark_position="Bottom Right", bluetooth_mode=False, audio_volume=1.0,
+                 capture_mode=CAPTURE_MODE_MP4, segment_seconds=DEFAULT_SEGMENT_SECONDS,
+                 capture_profile=DEFAULT_CAPTURE_PROFILE, capture_region=None):
         super().__init__()
         self.output_path = output_path
         self.ffmpeg_path = os.path.abspath(ffmpeg_path)
@@ -33,7 +45,14 @@ class ScreenRecorder(QThread):
         self.watermark_image = raw_path.replace('\\', '/')
         self.watermark_size = watermark_size
         self.watermark_position = watermark_position
-        self.ffmpeg_process = None
+        self.ffmpeg_job = None
+        # Le registrazioni solo audio restano un file unico
+        self.capture_mode = capture_mode if self.record_video and capture_mode in CAPTURE_MODES else CAPTURE_MODE_MP4
+        self.segment_seconds = segment_seconds
+        self.capture_profile = capture_profile
+        self.capture_region = capture_region
+        self._reported_segments = set()
+        self.telemetry = RecordingTelemetry(self.frame_rate if self.record_video else 0, self.capture_profile)
 
         if not os.path.isfile(self.ffmpeg_path):
             self.error_signal.emit(f"ffmpeg.exe not found at {self.ffmpeg_path}")
@@ -59,8 +78,14 @@ class ScreenRecorder(QThread):
 
         ffmpeg_command = [self.ffmpeg_path]
 
+        capture_height = 0
+        watermark_input = None
         if self.record_video:
-            offset_x, offset_y, screen_width, screen_height = self.get_monitor_offset()
+            offset_x, offset_y, screen_width, screen_height = capture_area(self.get_monitor_offset(), self.capture_region)
+            capture_height = screen_height
+            if self.use_watermark:
+                # Il watermark viene ridimensionato una volta sola invece che nel grafo dei filtri
+                watermark_input = prescaled_watermark(self.watermark_image, self.watermark_size, WATERMARK_CACHE_DIR)
             ffmpeg_command.extend([
                 '-f', 'gdigrab',
                 '-framerate', str(self.frame_rate),
@@ -70,7 +95,7 @@ class ScreenRecorder(QThread):
                 '-i', 'desktop',
             ])
             if self.use_watermark:
-                ffmpeg_command.extend(['-i', self.watermark_image])
+                ffmpeg_command.extend(['-i', watermark_input or self.watermark_image])
 
         # Add audio inputs if any
         if self.record_audio:
@@ -95,20 +120,12 @@ class ScreenRecorder(QThread):
         if self.record_video:
             if self.use_watermark:
                 # Watermark is input 1, so video is [0:v] and watermark is [1:v]
-                scale_filter = f"[1:v]scale=-1:ih*{self.watermark_size/100}[scaled_wm]"
-                filter_complex_parts.append(scale_filter)
-
-                # Position the watermark
-                if self.watermark_position == "Top Left":
-                    overlay_filter = "[0:v][scaled_wm]overlay=10:10[v_out]"
-                elif self.watermark_position == "Top Right":
-                    overlay_filter = "[0:v][scaled_wm]overlay=W-w-10:10[v_out]"
-                elif self.watermark_position == "Bottom Left":
-                    overlay_filter = "[0:v][scaled_wm]overlay=10:H-h-10[v_out]"
-                else:  # Bottom Right
-                    overlay_filter = "[0:v][scaled_wm]overlay=W-w-10:H-h-10[v_out]"
-
-                filter_complex_parts.append(overlay_filter)
+                if watermark_input:
+                    watermark_label = "[1:v]"
+                else:
+                    filter_complex_parts.append(f"[1:v]scale=-1:ih*{self.watermark_size/100}[scaled_wm]")
+                    watermark_label = "[scaled_wm]"
+                filter_complex_parts.append(f"[0:v]{watermark_label}{watermark_overlay(self.watermark_position)}[v_out]")
                 map_args.extend(['-map', '[v_out]'])
                 audio_input_start_index = 2  # Audio inputs start after video and watermark
             else:
@@ -149,69 +166,97 @@ class ScreenRecorder(QThread):
         ffmpeg_command.extend(map_args)
 
         if self.record_video:
-            ffmpeg_command.extend([
-                '-c:v', 'libx264',
-                '-preset', 'ultrafast',
-                '-pix_fmt', 'yuv420p',
-                '-movflags', '+faststart',
-            ])
+            ffmpeg_command.extend(video_encoder_args(self.capture_profile, capture_height, self.frame_rate))
 
         if self.record_audio:
             ffmpeg_command.extend(audio_codec_args)
 
-        ffmpeg_command.extend(['-y', self.output_path])
-
-        # Use CREATE_NO_WINDOW to hide the console window
-        creationflags = subprocess.CREATE_NO_WINDOW
-
-        # Start the ffmpeg process in binary mode (remove text=True)
-        self.ffmpeg_process = subprocess.Popen(ffmpeg_command, stdin=subprocess.PIPE, stderr=subprocess.PIPE, stdout=subprocess.PIPE, creationflags=creationflags)
-
-        # Regex to parse ffmpeg's progress output
-        stats_regex = re.compile(
-            r"frame=\s*(?P<frame>\d+)\s+"
-            r"fps=\s*(?P<fps>[\d.]+)\s+"
-            r"q=(?P<q>[\d.-]+)\s+"
-            r"size=\s*(?P<size>\d+)kB\s+"
-            r"time=(?P<time>[\d:.]+)\s+"
-            r"bitrate=\s*(?P<bitrate>[\d.]+)kbits/s"
-        )
-
-        while self.is_running:
-            if self.ffmpeg_process.poll() is not None:
-                break
-
-            line = self.ffmpeg_process.stderr.readline()
-            if line:
-                line_str = line.decode('utf-8', errors='ignore').strip()
-                match = stats_regex.search(line_str)
-                if match:
-                    stats = match.groupdict()
-                    self.stats_updated.emit(stats)
-                print(line_str) # for debugging
+        if self.record_video:
+            if self.capture_mode == CAPTURE_MODE_SEGMENTED:
+                os.makedirs(segment_dir_for(self.output_path), exist_ok=True)
+            ffmpeg_command.extend(container_args(self.capture_mode, self.output_path, self.frame_rate,
+                                                 self.segment_seconds))
+        else:
+            ffmpeg_command.extend(['-y', self.output_path])
+
+        # stdin resta aperto per poter chiudere la registrazione con 'q'
+        self.ffmpeg_job = FFmpegJob(ffmpeg_command, on_progress=self._emit_stats, name="registrazione schermo",
+                                    progress_interval=capture_profile(self.capture_profile)['stats_interval'],
+                                    stdin=True)
+        try:
+            self.ffmpeg_job.run()
+        except FFmpegError as e:
+            if self.is_running:
+                self.error_signal.emit(f"ffmpeg terminated unexpectedly: {e.stderr}")
+        except Exception as e:
+            self.error_signal.emit(f"Recording error: {e}")
+        self._poll_segments()
+        self._save_telemetry()
 
         # Ensure recording is stopped cleanly
-        if self.ffmpeg_process.poll() is None:
-            self.stop_recording()
+        if self.is_running:
+            self.is_running = False
+            self.recording_stopped_signal.emit()
 
-    def stop_recording(self):
-        if self.ffmpeg_process and self.ffmpeg_process.poll() is None:
-            try:
-                # Write binary 'q' to stdin
-                self.ffmpeg_process.stdin.write(b'q')
-                self.ffmpeg_process.stdin.flush()
-                self.ffmpeg_process.wait(timeout=5)
-            except (OSError, ValueError, BrokenPipeError, subprocess.TimeoutExpired) as e:
-                self.error_signal.emit(f"ffmpeg did not terminate gracefully, killing process. Error: {str(e)}")
-                self.ffmpeg_process.kill()
-                self.ffmpeg_process.wait()
+    def output_files(self):
+        """File prodotti dalla registrazione: il file di uscita, oppure i segmenti chiusi."""
+        if self.capture_mode == CAPTURE_MODE_SEGMENTED:
+            segment_list = os.path.join(segment_dir_for(self.output_path), SEGMENT_LIST_NAME)
+            return [path for path in read_segment_list(segment_list) if os.path.exists(path)]
+        return [self.output_path] if os.path.exists(self.output_path) else []
+
+    def _poll_segments(self):
+        """Segnala i segmenti chiusi da ffmpeg, che possono già essere elaborati durante la registrazione."""
+        if self.capture_mode != CAPTURE_MODE_SEGMENTED:
+            return
+        for path in self.output_files():
+            if path not in self._reported_segments:
+                self._reported_segments.add(path)
+                self.segment_completed.emit(path)
+
+    def _emit_stats(self, stats):
+        """Inoltra le statistiche di -progress nel formato atteso dalla UI (size in kB, bitrate in kbit/s)."""
+        self._poll_segments()
+        sample = self.telemetry.update(stats)
+        if sample.get('lag_started') or sample.get('lag_ended'):
+            self.encoder_health_changed.emit(sample)
+        total_size = stats.get('total_size') or 0
+        self.stats_updated.emit({
+            'frame': stats.get('frame'),
+            'fps': f"{stats['fps']:.1f}" if stats.get('fps') is not None else 'N/A',
+            'size': total_size // 1024,
+            'bitrate': f"{stats['bitrate']:.1f}" if stats.get('bitrate') is not None else 'N/A',
+            'time': stats.get('out_time'),
+            'speed': stats.get('speed'),
+            'dup_frames': stats.get('dup_frames'),
+            'drop_frames': stats.get('drop_frames'),
+            'effective_fps': sample['effective_fps'],
+            'target_fps': self.telemetry.target_fps,
+            'interval_speed': sample['interval_speed'],
+            'new_drops': sample['new_drops'],
+            'write_rate': sample['write_rate'],
+            'health': sample['health'],
+        })
+
+    def _save_telemetry(self):
+        """Salva la serie temporale accanto alla registrazione, per l'analisi a posteriori."""
+        summary = self.telemetry.summary()
+        if not self.record_video or not summary:
+            return
+        path = self.telemetry.save(telemetry_path_for(self.output_path))
+        if path:
+            self.telemetry_saved.emit(path, summary)
 
+    def stop_recording(self):
+        job = self.ffmpeg_job
         self.is_running = False
+        if job and not job.finish(timeout=5):
+            self.error_signal.emit("ffmpeg did not terminate gracefully, process killed.")
         self.recording_stopped_signal.emit()
 
     def stop(self):
-        self.is_running = False
-        if self.ffmpeg_process and self.ffmpeg_process.poll() is None:
-             self.stop_recording()
+        if self.ffmpeg_job and self.ffmpeg_job.process and self.ffmpeg_job.process.poll() is None:
+            self.stop_recording()
         else:
+            self.is_running = False
             self.recording_stopped_signal.emit()
@@ -0,0 +1,134 @@
+# File: src/services/BackgroundAudio.py
+import os
+import datetime
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from src.config import FFMPEG_PATH
+from src.services.MediaInfo import get_media_info
+from src.services.FFmpegRunner import FFmpegJob
+
+MIX_SAMPLE_FORMAT = "aresample=48000,aformat=sample_fmts=fltp:channel_layouts=stereo"
+MIX_AUDIO_ARGS = ['-c:a', 'aac', '-b:a', '192k']
+
+# Ducking: il sottofondo viene compresso quando la traccia originale supera la soglia
+DUCKING_FILTER = "sidechaincompress=threshold=0.05:ratio=8:attack=20:release=400"
+
+
+def build_background_audio_command(video_path, music_path, output_path, volume, duration,
+                                   loop_audio=True, has_voice=True, duck=False, ffmpeg_path=FFMPEG_PATH):
+    """
+    Comando ffmpeg che mescola `music_path` all'audio di `video_path`.
+
+    Il video è copiato senza ricodifica: il costo dipende solo dalla durata dell'audio.
+    Il loop del sottofondo è fatto in lettura (-stream_loop), senza caricare la traccia in memoria.
+    """
+    command = [ffmpeg_path, '-y', '-v', 'error', '-i', video_path]
+    if loop_audio:
+        command.extend(['-stream_loop', '-1'])
+    command.extend(['-i', music_path])
+
+    music_chain = f"[1:a]{MIX_SAMPLE_FORMAT},volume={volume:.6f},apad"
+    if not has_voice:
+        filter_graph = f"{music_chain}[aout]"
+    elif duck:
+        filter_graph = (
+            f"[0:a]{MIX_SAMPLE_FORMAT},asplit=2[voice][key];"
+            f"{music_chain}[music];"
+            f"[music][key]{DUCKING_FILTER}[ducked];"
+            f"[voice][ducked]amix=inputs=2:duration=first:dropout_transition=0:normalize=0[aout]"
+        )
+    else:
+        filter_graph = (
+            f"[0:a]{MIX_SAMPLE_FORMAT}[voice];"
+            f"{music_chain}[music];"
+            f"[voice][music]amix=inputs=2:duration=first:dropout_transition=0:normalize=0[aout]"
+        )
+
+    command.extend(['-filter_complex', filter_graph,
+                    '-map', '0:v:0', '-map', '[aout]',
+                    '-c:v', 'copy'])
+    command.extend(MIX_AUDIO_ARGS)
+    command.extend(['-t', f"{duration:.6f}", '-movflags', '+faststart', output_path])
+    return command
+
+
+class BackgroundAudioThread(QThread):
+    """
+    Aggiunge un audio di sottofondo al video con ffmpeg (amix), con loop opzionale
+    e ducking opzionale del sottofondo sotto la voce (sidechaincompress).
+    """
+    progress = pyqtSignal(int, str)
+    completed = pyqtSignal(str)
+    error = pyqtSignal(str)
+
+    def __init__(self, video_path, audio_path, volume, loop_audio=True, duck=False, parent=None):
+        super().__init__(parent)
+        self.video_path = video_path
+        self.audio_path = audio_path
+        self.volume = volume
+        self.loop_audio = loop_audio
+        self.duck = duck
+        self.ffmpeg_job = None
+        self.running = True
+
+    def run(self):
+        output_path = None
+        try:
+            self.progress.emit(5, "Analisi dei file...")
+            media_info = get_media_info()
+            if media_info.stream(self.video_path, 'video') is None:
+                raise ValueError("Il file non contiene una traccia video.")
+            if media_info.stream(self.audio_path, 'audio') is None:
+                raise ValueError("Il file di sottofondo non contiene audio.")
+            duration = media_info.duration(self.video_path)
+            if duration <= 0:
+                raise ValueError("Impossibile determinare la durata del video.")
+            has_voice = media_info.stream(self.video_path, 'audio') is not None
+            if not self.running:
+                return
+
+            timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+            base_name = os.path.splitext(os.path.basename(self.video_path))[0]
+            output_dir = os.path.dirname(self.video_path)
+            output_path = os.path.join(output_dir, f"{base_name}_background_audio_{timestamp}.mp4")
+
+            command = build_background_audio_command(
+                self.video_path, self.audio_path, output_path, self.volume, duration,
+                loop_audio=self.loop_audio, has_voice=has_voice, duck=self.duck and has_voice
+            )
+
+            def on_progress(stats):
+                if self.running and stats.get('fraction') is not None:
+                    percent = int(stats['fraction'] * 100)
+                    self.progress.emit(10 + int(percent * 0.85), f"Mixaggio audio: {percent}%")
+
+            self.progress.emit(10, "Mixaggio audio di sottofondo...")
+            self.ffmpeg_job = FFmpegJob(command, duration=duration, on_progress=on_progress,
+                                        name="audio di sottofondo")
+            self.ffmpeg_job.run()
+
+            if self.running:
+                self.progress.emit(100, "Completato")
+                self.completed.emit(output_path)
+        except InterruptedError:
+            self._remove_partial(output_path)
+        except Exception as e:
+            self._remove_partial(output_path)
+            if self.running:
+                self.error.emit(str(e))
+        finally:
+            self.ffmpeg_job = None
+
+    @staticmethod
+    def _remove_partial(output_path):
+        if output_path and os.path.exists(output_path):
+            try:
+                os.remove(output_path)
+            except OSError:
+                pass
+
+    def stop(self):
+        self.running = False
+        if self.ffmpeg_job:
+            self.ffmpeg_job.cancel()
+        self.progress.emit(0, "Annullamento in corso...")
@@ -0,0 +1,189 @@
+# File: src/services/BatchSummarization.py
+import os
+import json
+import hashlib
+import logging
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from src.config import get_model_for_action
+from src.managers.HtmlManager import HtmlManager
+from src.services.LLMClient import provider_for_model, PROVIDER_CONCURRENCY
+from src.services.ResponseCache import response_cache_enabled
+from src.services.ProcessTextAI import process_text
+from src.services.MeetingSummarizer import summarize_meeting
+
+# Tipi di riassunto (chiave in 'summaries' del JSON della clip) e azione che li genera
+SUMMARY_DETAILED = 'detailed'
+SUMMARY_MEETING = 'meeting'
+SUMMARY_TYPES = (SUMMARY_DETAILED, SUMMARY_MEETING)
+
+# Serializza lettura-modifica-scrittura dei JSON delle clip tra i lavori in background e la UI
+CLIP_JSON_LOCK = threading.Lock()
+
+
+def clip_json_path(clip_path):
+    return os.path.splitext(clip_path)[0] + ".json"
+
+
+def clip_transcript(data):
+    """Testo da riassumere: la trascrizione corretta se presente, altrimenti l'originale."""
+    return (data.get('transcription_corrected') or data.get('transcription_original')
+            or data.get('transcription_raw') or "")
+
+
+def transcript_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def model_for_summary(summary_type):
+    # Stesse azioni usate dai riassunti della singola clip
+    return get_model_for_action('summary' if summary_type == SUMMARY_MEETING else 'text_processing')
+
+
+def summary_is_current(data, summary_type):
+    """
+    True se il riassunto salvato corrisponde alla trascrizione attuale. I riassunti senza
+    hash (generati dalla singola clip) sono considerati aggiornati per non sovrascriverli.
+    """
+    if not (data.get('summaries') or {}).get(summary_type):
+        return False
+    saved_hash = (data.get('summary_hashes') or {}).get(summary_type)
+    return saved_hash is None or saved_hash == transcript_hash(clip_transcript(data))
+
+
+class BatchSummarizationThread(QThread):
+    """
+    Riassume tutte le clip di un progetto, più clip alla volta.
+
+    Le richieste contemporanee sono al più quelle ammesse dal provider del modello
+    (PROVIDER_CONCURRENCY); il client condiviso gestisce i nuovi tentativi sui rate limit.
+    Le clip senza trascrizione e quelle il cui riassunto è stato generato dalla stessa
+    trascrizione (hash salvato in 'summary_hashes') sono saltate. Ogni riassunto è
+    scritto nel JSON della clip appena pronto.
+    """
+    progress = pyqtSignal(int, str)
+    clip_summarized = pyqtSignal(str, str)  # (percorso clip, riassunto HTML)
+    completed = pyqtSignal(str)
+    error = pyqtSignal(str)
+
+    def __init__(self, clip_paths, summary_type, language, force=False, max_workers=None, parent=None):
+        super().__init__(parent)
+        if summary_type not in SUMMARY_TYPES:
+            raise ValueError(f"Tipo di riassunto non valido: {summary_type}")
+        self.clip_paths = list(clip_paths)
+        self.summary_type = summary_type
+        self.language = language
+        self.force = force
+        self.model = model_for_summary(summary_type)
+        self.max_workers = max_workers
+        self.use_cache = response_cache_enabled()
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def _pending_clips(self):
+        """(percorso clip, trascrizione) da riassumere e numero di clip saltate."""
+        pending, skipped = [], 0
+        for clip_path in self.clip_paths:
+            try:
+                with open(clip_json_path(clip_path), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Riassunto multiplo: JSON non leggibile per {clip_path}: {e}")
+                skipped += 1
+                continue
+            transcript = clip_transcript(data)
+            if not transcript.strip() or (not self.force and summary_is_current(data, self.summary_type)):
+                skipped += 1
+                continue
+            pending.append((clip_path, transcript))
+        return pending, skipped
+
+    def run(self):
+        if not self.clip_paths:
+            self.error.emit("Nessuna clip da riassumere.")
+            return
+
+        pending, skipped = self._pending_clips()
+        if not pending:
+            self.completed.emit(f"Tutte le {len(self.clip_paths)} clip hanno già un riassunto aggiornato o non hanno trascrizione.")
+            return
+
+        try:
+            provider, _ = provider_for_model(self.model)
+        except ValueError as e:
+            self.error.emit(str(e))
+            return
+        workers = max(1, min(self.max_workers or PROVIDER_CONCURRENCY.get(provider, 1), len(pending)))
+        logging.info(f"Riassunto multiplo: {len(pending)} clip con {self.model}, {workers} alla volta "
+                     f"({skipped} saltate).")
+        self.progress.emit(0, f"Riassunto di {len(pending)} clip ({skipped} saltate)...")
+
+        done, failures = 0, []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self._summarize_one, clip_path, transcript): clip_path
+                       for clip_path, transcript in pending}
+            for future in as_completed(futures):
+                if not self.running:
+                    # Le richieste già inviate terminano, quelle in coda non partono
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    break
+                clip_path = futures[future]
+                try:
+                    summary_html = future.result()
+                    if summary_html is not None:
+                        self.clip_summarized.emit(clip_path, summary_html)
+                except Exception as e:
+                    logging.error(f"Riassunto non riuscito per {clip_path}: {e}")
+                    failures.append(f"{os.path.basename(clip_path)}: {e}")
+                done += 1
+                self.progress.emit(int(done / len(pending) * 100), f"Riassunto clip: {done}/{len(pending)}")
+
+        if not self.running:
+            return
+        summarized = len(pending) - len(failures)
+        if failures and not summarized:
+            self.error.emit("Riassunto multiplo non riuscito:\n" + "\n".join(failures))
+            return
+        message = f"{summarized} clip riassunte, {skipped} saltate."
+        if failures:
+            message += " Errori:\n" + "\n".join(failures)
+        self.completed.emit(message)
+
+    def _summarize_one(self, clip_path, transcript):
+        if not self.running:
+            return None
+        if self.summary_type == SUMMARY_MEETING:
+            result = summarize_meeting(transcript, self.language, self.model, use_cache=self.use_cache)
+        else:
+            result = process_text("summary", self.language, {'text': transcript}, self.model, use_cache=self.use_cache)
+        if not isinstance(result, tuple):
+            raise RuntimeError(result)
+
+        summary_html = HtmlManager.remove_inline_styles(HtmlManager.markdown_to_html(result[0]))
+        self._save_summary(clip_path, transcript, summary_html)
+        return summary_html
+
+    def _save_summary(self, clip_path, transcript, summary_html):
+        json_path = clip_json_path(clip_path)
+        with CLIP_JSON_LOCK:
+            with open(json_path, 'r+', encoding='utf-8') as f:
+                data = json.load(f)
+                summaries = data.get('summaries')
+                if not isinstance(summaries, dict):
+                    summaries = data['summaries'] = {}
+                summaries[self.summary_type] = summary_html
+                # Il riassunto integrato derivava dal precedente
+                if summaries.get(f"{self.summary_type}_integrated"):
+                    summaries[f"{self.summary_type}_integrated"] = ""
+                data.setdefault('summary_hashes', {})[self.summary_type] = transcript_hash(transcript)
+                data['summary_date'] = datetime.datetime.now().isoformat()
+                f.seek(0)
+                json.dump(data, f, ensure_ascii=False, indent=4)
+                f.truncate()
+        logging.info(f"Riassunto '{self.summary_type}' salvato per {os.path.basename(clip_path)}")
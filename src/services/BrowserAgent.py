@@ -80,6 +80,7 @@ class GoogleLLMWrapper:
 
 # --- Local Imports ---
 from src.services.FrameExtractor import FrameExtractor # Used for guide generation
+from src.services.LLMClient import get_llm_client
 # Import configuration constants and structures
 from src.config import (
     OLLAMA_ENDPOINT, get_api_key, get_model_for_action,
@@ -830,24 +831,12 @@ class BrowserAgent:
             # Select LLM client based on the agent's model
             model_lower = guide_model_name.lower()
 
-            if model_lower.startswith("claude"):
-                 anthropic_api_key = get_api_key('anthropic')
-                 if not anthropic_api_key: raise ValueError("Anthropic API Key mancante per generare la guida.")
-                 client = anthropic.Anthropic(api_key=anthropic_api_key)
-                 response = client.messages.create(
-                     model=guide_model_name, max_tokens=4000, messages=[{"role": "user", "content": prompt}]
-                 )
-                 guide_text = response.content[0].text
-                 input_tokens = response.usage.input_tokens
-                 output_tokens = response.usage.output_tokens
-
-            elif model_lower.startswith("gemini"):
-                 google_api_key = get_api_key('google')
-                 if not google_api_key: raise ValueError("Google API Key mancante per generare la guida.")
-                 genai.configure(api_key=google_api_key)
-                 model = genai.GenerativeModel(guide_model_name)
-                 response = model.generate_content(prompt)
+            if model_lower.startswith("claude") or model_lower.startswith("gemini"):
+                 response = get_llm_client().generate(guide_model_name, prompt, max_tokens=4000,
+                                                      name="guida browser agent")
                  guide_text = response.text
+                 input_tokens = response.input_tokens
+                 output_tokens = response.output_tokens
 
             elif model_lower.startswith("gpt"):
                  openai_api_key = get_api_key('openai')
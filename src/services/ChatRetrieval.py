@@ -0,0 +1,317 @@
+# File: src/services/ChatRetrieval.py
+import os
+import re
+import glob
+import html
+import json
+import math
+import hashlib
+import logging
+import threading
+from collections import Counter
+
+from src.config import CHAT_INDEX_DIR
+
+# Passaggi di circa PASSAGE_WORDS parole, con PASSAGE_OVERLAP righe ripetute tra passaggi
+# consecutivi per non spezzare una risposta a cavallo di due passaggi
+PASSAGE_WORDS = 150
+PASSAGE_OVERLAP = 1
+TOP_K = 8
+
+# Sotto questa lunghezza (in caratteri) il contesto corrente viene inviato intero, come prima
+FULL_CONTEXT_CHARS = 24000
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+INDEX_VERSION = 1
+
+CURRENT_CONTEXT_SOURCE = "__contesto_corrente__"
+
+_STOPWORDS = frozenset("""
+a ad al alla alle allo agli ai anche che chi ci con da dal dalla dalle dei del della delle dello degli di e ed
+è era gli ha hanno ho i il in la le lo lui ma mi ne nei nel nella nelle non o per più poi quale quando quello
+questa questo se si sia sono su sul sulla tra un una uno come cosa dove loro noi voi ti te vi lei
+the of and to is in it that for on with as are was be this
+""".split())
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_TAG = re.compile(r"<[^>]+>")
+
+
+def tokenize(text):
+    return [word for word in _WORD.findall(text.lower()) if len(word) > 1 and word not in _STOPWORDS]
+
+
+def plain_text(text):
+    """Testo semplice da HTML o Markdown salvati nei JSON delle clip."""
+    if '<' in text and '>' in text:
+        text = re.sub(r"(?i)<br\s*/?>|</p>|</div>|</li>|</h\d>", "\n", text)
+        text = html.unescape(_TAG.sub(" ", text))
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def split_passages(text, max_words=PASSAGE_WORDS, overlap=PASSAGE_OVERLAP):
+    """Divide il testo in passaggi di righe intere (le righe con timecode restano integre)."""
+    lines = []
+    for line in plain_text(text).splitlines():
+        words = line.split()
+        # Le righe molto lunghe (trascrizioni senza a capo) sono spezzate a gruppi di parole
+        for start in range(0, len(words), max_words):
+            lines.append(" ".join(words[start:start + max_words]))
+
+    passages, current, count = [], [], 0
+    for line in lines:
+        words = len(line.split())
+        if current and count + words > max_words:
+            passages.append("\n".join(current))
+            current = current[-overlap:] if overlap else []
+            count = sum(len(l.split()) for l in current)
+        current.append(line)
+        count += words
+    if current:
+        passages.append("\n".join(current))
+    return passages
+
+
+class BM25Index:
+    """
+    Indice BM25 dei passaggi, raggruppati per sorgente (una clip, un riassunto di progetto...).
+    Una sorgente si sostituisce o si rimuove per intero; le statistiche del corpus
+    sono ricalcolate alla prima ricerca successiva.
+    """
+
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.sources = {}
+        self._stats = None
+
+    def set_source(self, source_id, passages, signature=None):
+        """`passages` è una lista di (etichetta, testo)."""
+        self.sources[source_id] = {
+            'signature': signature,
+            'passages': [{'label': label, 'text': text, 'terms': dict(Counter(tokenize(text)))}
+                         for label, text in passages if text.strip()],
+        }
+        self._stats = None
+
+    def remove_source(self, source_id):
+        if self.sources.pop(source_id, None) is not None:
+            self._stats = None
+
+    def _corpus_stats(self):
+        if self._stats is None:
+            document_frequency = Counter()
+            lengths = []
+            for source in self.sources.values():
+                for passage in source['passages']:
+                    document_frequency.update(passage['terms'].keys())
+                    lengths.append(sum(passage['terms'].values()))
+            average_length = sum(lengths) / len(lengths) if lengths else 0
+            self._stats = (len(lengths), document_frequency, average_length)
+        return self._stats
+
+    def search(self, query, top_k=TOP_K):
+        """I `top_k` passaggi più pertinenti come dizionari {'source', 'label', 'text', 'score'}."""
+        terms = set(tokenize(query))
+        count, document_frequency, average_length = self._corpus_stats()
+        if not terms or not count:
+            return []
+
+        idf = {term: math.log(1 + (count - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+               for term in terms if document_frequency[term]}
+        results = []
+        for source_id, source in self.sources.items():
+            for passage in source['passages']:
+                length = sum(passage['terms'].values())
+                score = 0.0
+                for term, weight in idf.items():
+                    frequency = passage['terms'].get(term, 0)
+                    if frequency:
+                        norm = self.k1 * (1 - self.b + self.b * length / (average_length or 1))
+                        score += weight * frequency * (self.k1 + 1) / (frequency + norm)
+                if score > 0:
+                    results.append({'source': source_id, 'label': passage['label'],
+                                    'text': passage['text'], 'score': score})
+        results.sort(key=lambda r: r['score'], reverse=True)
+        # Il testo aperto spesso coincide con la trascrizione di una clip: niente passaggi ripetuti
+        unique, seen = [], set()
+        for result in results:
+            if result['text'] not in seen:
+                seen.add(result['text'])
+                unique.append(result)
+                if len(unique) == top_k:
+                    break
+        return unique
+
+
+class ProjectChatIndex:
+    """
+    Indice di ricerca sulle trascrizioni e sui riassunti di un progetto, salvato in
+    CHAT_INDEX_DIR. Ad ogni aggiornamento vengono rilette solo le clip il cui JSON
+    è cambiato (dimensione o data di modifica) e rimosse quelle non più presenti.
+    """
+
+    def __init__(self, gnai_path, index_dir=CHAT_INDEX_DIR):
+        self.gnai_path = gnai_path
+        self.project_dir = os.path.dirname(gnai_path)
+        digest = hashlib.sha1(os.path.normcase(os.path.abspath(gnai_path)).encode('utf-8')).hexdigest()[:16]
+        self.index_file = os.path.join(index_dir, f"{digest}.json") if index_dir else None
+        self.index = BM25Index()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.index_file or not os.path.exists(self.index_file):
+            return
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == INDEX_VERSION:
+                self.index.sources = data.get('sources', {})
+        except (OSError, ValueError) as e:
+            logging.warning(f"Indice della chat non leggibile, verrà ricostruito: {e}")
+
+    def _save(self):
+        if not self.index_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+            temp_path = f"{self.index_file}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                # Il testo aperto può non essere salvato e cambia a ogni domanda: resta solo in memoria
+                sources = {k: v for k, v in self.index.sources.items() if k != CURRENT_CONTEXT_SOURCE}
+                json.dump({'version': INDEX_VERSION, 'sources': sources}, f, ensure_ascii=False)
+            os.replace(temp_path, self.index_file)
+        except OSError as e:
+            logging.warning(f"Impossibile salvare l'indice della chat: {e}")
+
+    @staticmethod
+    def _signature(path):
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def _metadata_files(self):
+        files = {}
+        for folder in ("clips", "audio"):
+            for path in glob.glob(os.path.join(self.project_dir, folder, "*.json")):
+                files[f"{folder}/{os.path.basename(path)}"] = path
+        if os.path.exists(self.gnai_path):
+            files[os.path.basename(self.gnai_path)] = self.gnai_path
+        return files
+
+    @staticmethod
+    def _clip_passages(name, data):
+        """Passaggi di trascrizione e riassunti dal JSON di una clip."""
+        passages = []
+        transcription = (data.get('transcription_corrected') or data.get('transcription_original')
+                         or data.get('transcription_raw') or "")
+        for text in split_passages(transcription):
+            passages.append((f"{name} - trascrizione", text))
+        for key, summary in (data.get('summaries') or {}).items():
+            if isinstance(summary, str) and summary.strip():
+                for text in split_passages(summary):
+                    passages.append((f"{name} - riassunto {key}", text))
+        return passages
+
+    @staticmethod
+    def _project_passages(data):
+        # La trascrizione di progetto è la concatenazione di quelle delle clip, già indicizzate
+        passages = []
+        for key, summary in (data.get('projectSummaries') or {}).items():
+            if isinstance(summary, str) and summary.strip():
+                for text in split_passages(summary):
+                    passages.append((f"Progetto - riassunto {key}", text))
+        return passages
+
+    def refresh(self):
+        """Aggiorna l'indice con i file modificati; restituisce il numero di sorgenti rilette."""
+        with self._lock:
+            files = self._metadata_files()
+            updated = 0
+            for source_id in list(self.index.sources):
+                if source_id != CURRENT_CONTEXT_SOURCE and source_id not in files:
+                    self.index.remove_source(source_id)
+                    updated += 1
+            for source_id, path in files.items():
+                try:
+                    signature = self._signature(path)
+                    if self.index.sources.get(source_id, {}).get('signature') == signature:
+                        continue
+                    with open(path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except (OSError, ValueError) as e:
+                    logging.warning(f"Indice della chat: impossibile leggere {path}: {e}")
+                    continue
+                if path == self.gnai_path:
+                    passages = self._project_passages(data)
+                else:
+                    name = os.path.splitext(os.path.basename(path))[0]
+                    passages = self._clip_passages(name, data)
+                self.index.set_source(source_id, passages, signature)
+                updated += 1
+            if updated:
+                self._save()
+                logging.info(f"Indice della chat aggiornato: {updated} sorgenti rilette.")
+            return updated
+
+    def search(self, query, current_context=None, top_k=TOP_K):
+        """Passaggi più pertinenti del progetto e del testo attualmente aperto (non salvato su disco)."""
+        with self._lock:
+            self._set_current_context(current_context)
+            return self.index.search(query, top_k)
+
+    def _set_current_context(self, current_context):
+        signature = hashlib.sha1(current_context.encode('utf-8')).hexdigest() if current_context else None
+        current = self.index.sources.get(CURRENT_CONTEXT_SOURCE)
+        if current and current['signature'] == signature:
+            return
+        if signature:
+            passages = [("Testo aperto", text) for text in split_passages(current_context)]
+            self.index.set_source(CURRENT_CONTEXT_SOURCE, passages, signature)
+        else:
+            self.index.remove_source(CURRENT_CONTEXT_SOURCE)
+
+
+_project_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_project_index(gnai_path):
+    with _indexes_lock:
+        if gnai_path not in _project_indexes:
+            # Cartella letta al momento della chiamata, non fissata alla definizione di __init__
+            _project_indexes[gnai_path] = ProjectChatIndex(gnai_path, index_dir=CHAT_INDEX_DIR)
+        return _project_indexes[gnai_path]
+
+
+def format_passages(passages):
+    return "\n\n".join(f"[{p['label']}]\n{p['text']}" for p in passages)
+
+
+def build_chat_context(query, current_context, gnai_path=None, top_k=TOP_K):
+    """
+    Contesto da inviare al modello per una domanda della chat.
+
+    Senza progetto e con un testo breve il testo aperto viene inviato intero. Altrimenti
+    si inviano solo i `top_k` passaggi più pertinenti, cercati nel testo aperto e, se c'è
+    un progetto, nelle trascrizioni e nei riassunti delle sue clip.
+    """
+    current_context = current_context or ""
+    if not gnai_path and len(current_context) <= FULL_CONTEXT_CHARS:
+        return current_context
+
+    if gnai_path:
+        project_index = get_project_index(gnai_path)
+        project_index.refresh()
+        passages = project_index.search(query, current_context, top_k)
+    else:
+        index = BM25Index()
+        index.set_source(CURRENT_CONTEXT_SOURCE, [("Testo aperto", text) for text in split_passages(current_context)])
+        passages = index.search(query, top_k)
+
+    if not passages:
+        # Nessun termine in comune: meglio il testo aperto (troncato) che nessun contesto
+        return current_context[:FULL_CONTEXT_CHARS]
+    logging.info(f"Chat: {len(passages)} passaggi selezionati come contesto.")
+    return format_passages(passages)
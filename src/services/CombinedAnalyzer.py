@@ -5,7 +5,8 @@ from PyQt6.QtCore import QObject, pyqtSignal, QThread
 
 from src.services.FrameExtractor import FrameExtractor
 from src.services.AudioTranscript import TranscriptionThread
-from src.config import PROMPT_COMBINED_ANALYSIS, get_api_key, get_model_for_action
+from src.services.LLMClient import get_llm_client
+from src.config import PROMPT_COMBINED_ANALYSIS, get_model_for_action
 
 class FrameAnalysisThread(QThread):
     finished = pyqtSignal(str)
@@ -63,16 +64,7 @@ class CombinedAnalysisThread(QThread):
             self.error.emit(str(e))
 
     def generate_summary(self, prompt):
-        import google.generativeai as genai
-
-        api_key = get_api_key('google')
-        if not api_key:
-            raise ValueError("Google API Key not found for combined analysis.")
-
-        genai.configure(api_key=api_key)
-        model_name = get_model_for_action('summary')
-        model = genai.GenerativeModel(model_name)
-        response = model.generate_content(prompt)
+        response = get_llm_client().generate(get_model_for_action('summary'), prompt, name="analisi combinata")
         return response.text.strip()
 
 
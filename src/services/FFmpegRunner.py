@@ -0,0 +1,282 @@
+# File: src/services/FFmpegRunner.py
+import os
+import json
+import time
+import logging
+import datetime
+import threading
+import subprocess
+from collections import deque
+
+from src.config import FFMPEG_TIMINGS_FILE
+
+# Su Windows evita l'apertura di una console per ogni processo ffmpeg/ffprobe
+CREATION_FLAGS = getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+
+DEFAULT_PROGRESS_INTERVAL = 0.5
+STDERR_TAIL_LINES = 200
+JOB_HISTORY_SIZE = 200
+
+_job_history = deque(maxlen=JOB_HISTORY_SIZE)
+_timings_lock = threading.Lock()
+
+
+class FFmpegError(RuntimeError):
+    """ffmpeg è terminato con un codice di uscita diverso da zero."""
+
+    def __init__(self, returncode, stderr):
+        super().__init__(f"Errore FFmpeg (codice {returncode}): {stderr}")
+        self.returncode = returncode
+        self.stderr = stderr
+
+
+def _parse_float(value):
+    try:
+        return float(str(value).strip().rstrip('x').replace('kbits/s', ''))
+    except (TypeError, ValueError):
+        return None
+
+
+def concat_file_line(path):
+    """Riga 'file' per una lista del concat demuxer, con il percorso assoluto e gli apici escapati."""
+    escaped = os.path.abspath(path).replace('\\', '/').replace("'", "'\\''")
+    return f"file '{escaped}'\n"
+
+
+def parse_progress_block(values, duration=None, elapsed=None):
+    """
+    Converte un blocco chiave=valore di `-progress` in un dizionario di statistiche:
+    frame, fps, bitrate (kbit/s), total_size (byte), out_time (s), speed,
+    dup_frames, drop_frames e, se è nota la durata attesa, fraction ed eta (s).
+    """
+    stats = {'progress': values.get('progress', 'continue')}
+    for key in ('frame', 'dup_frames', 'drop_frames', 'total_size'):
+        number = _parse_float(values.get(key))
+        stats[key] = int(number) if number is not None else None
+    stats['fps'] = _parse_float(values.get('fps'))
+    stats['bitrate'] = _parse_float(values.get('bitrate'))
+    stats['speed'] = _parse_float(values.get('speed'))
+
+    out_time_us = _parse_float(values.get('out_time_us', values.get('out_time_ms')))
+    stats['out_time'] = max(0.0, out_time_us / 1_000_000) if out_time_us is not None else None
+
+    stats['fraction'] = None
+    stats['eta'] = None
+    if duration and duration > 0 and stats['out_time'] is not None:
+        stats['fraction'] = min(1.0, stats['out_time'] / duration)
+        speed = stats['speed']
+        if not speed and elapsed and stats['out_time'] > 0:
+            speed = stats['out_time'] / elapsed
+        if speed:
+            stats['eta'] = max(0.0, (duration - stats['out_time']) / speed)
+    return stats
+
+
+def job_history():
+    """Tempi degli ultimi job eseguiti in questa sessione (il più recente in fondo)."""
+    return list(_job_history)
+
+
+def _record_timing(record):
+    _job_history.append(record)
+    logging.info(f"Job ffmpeg '{record['name']}' {record['status']} in {record['wall_seconds']:.2f}s"
+                 + (f" (velocità media {record['average_speed']:.2f}x)" if record.get('average_speed') else ""))
+    if not FFMPEG_TIMINGS_FILE:
+        return
+    with _timings_lock:
+        try:
+            os.makedirs(os.path.dirname(FFMPEG_TIMINGS_FILE), exist_ok=True)
+            with open(FFMPEG_TIMINGS_FILE, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            logging.debug(f"Impossibile registrare i tempi del job ffmpeg: {e}")
+
+
+class FFmpegJob:
+    """
+    Esecuzione di un comando ffmpeg con avanzamento letto da `-progress pipe:1`.
+
+    stdout e stderr sono letti da thread in background, quindi il chiamante non
+    resta mai bloccato su una pipe piena; l'avanzamento arriva a `on_progress`
+    al più ogni `progress_interval` secondi, più un ultimo aggiornamento a fine job.
+    Al termine, i tempi del job sono registrati in FFMPEG_TIMINGS_FILE.
+    """
+
+    def __init__(self, command, duration=None, on_progress=None, name=None,
+                 progress_interval=DEFAULT_PROGRESS_INTERVAL, stdin=False):
+        self.command = self._with_progress_args(command)
+        self.duration = duration
+        self.on_progress = on_progress
+        self.name = name or os.path.basename(str(command[-1]))
+        self.progress_interval = progress_interval
+        self.use_stdin = stdin
+
+        self.process = None
+        self.stats = {}
+        self.returncode = None
+        self.started_at = None
+        self.finished_at = None
+        self._stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+        self._readers = []
+        self._cancelled = False
+        self._last_emit = 0.0
+
+    @staticmethod
+    def _with_progress_args(command):
+        command = list(command)
+        if '-progress' not in command:
+            command[1:1] = ['-progress', 'pipe:1', '-nostats']
+        return command
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    @property
+    def stdin(self):
+        return self.process.stdin if self.process else None
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def stderr(self):
+        return "\n".join(self._stderr_tail)
+
+    def start(self):
+        if self._cancelled:
+            raise InterruptedError("Operazione annullata.")
+        self.started_at = time.monotonic()
+        self._started_wall = datetime.datetime.now().isoformat(timespec='seconds')
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE if self.use_stdin else subprocess.DEVNULL,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            creationflags=CREATION_FLAGS
+        )
+        self._readers = [
+            threading.Thread(target=self._read_progress, daemon=True),
+            threading.Thread(target=self._read_stderr, daemon=True),
+        ]
+        for reader in self._readers:
+            reader.start()
+        return self
+
+    def wait(self, check=True):
+        """Attende la fine del processo; solleva InterruptedError se annullato, FFmpegError se fallito."""
+        if self.process is None:
+            self.start()
+        self.returncode = self.process.wait()
+        for reader in self._readers:
+            reader.join()
+        self.finished_at = time.monotonic()
+        self._record()
+
+        if self._cancelled:
+            raise InterruptedError("Operazione annullata.")
+        if check and self.returncode != 0:
+            raise FFmpegError(self.returncode, self.stderr)
+        return self.returncode
+
+    def run(self, check=True):
+        self.start()
+        return self.wait(check)
+
+    def cancel(self):
+        """Interrompe subito il processo."""
+        self._cancelled = True
+        self._kill()
+
+    def finish(self, timeout=5):
+        """
+        Chiede a ffmpeg di chiudere l'output in modo pulito ('q' su stdin), per
+        esempio al termine di una registrazione; se non risponde entro `timeout` lo termina.
+        """
+        if not self.process or self.process.poll() is not None:
+            return True
+        try:
+            self.process.stdin.write(b'q')
+            self.process.stdin.flush()
+            self.process.wait(timeout=timeout)
+            return True
+        except (AttributeError, OSError, ValueError, subprocess.TimeoutExpired):
+            self._kill()
+            return False
+
+    def _kill(self):
+        if self.process and self.process.poll() is None:
+            try:
+                self.process.kill()
+            except OSError:
+                pass
+
+    def _read_progress(self):
+        values = {}
+        for raw_line in self.process.stdout:
+            key, _, value = raw_line.decode('utf-8', errors='replace').strip().partition('=')
+            if not key:
+                continue
+            values[key] = value
+            if key == 'progress':
+                self.stats = parse_progress_block(values, self.duration, self.elapsed)
+                self._emit(force=(value == 'end'))
+                values = {}
+
+    def _read_stderr(self):
+        for raw_line in self.process.stderr:
+            line = raw_line.decode('utf-8', errors='replace').rstrip()
+            if line:
+                self._stderr_tail.append(line)
+
+    def _emit(self, force=False):
+        if not self.on_progress or not self.stats or self._cancelled:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_emit < self.progress_interval:
+            return
+        self._last_emit = now
+        try:
+            self.on_progress(dict(self.stats))
+        except Exception:
+            logging.exception("Errore nella callback di avanzamento ffmpeg")
+
+    def _record(self):
+        out_time = self.stats.get('out_time') or 0.0
+        wall_seconds = self.elapsed
+        if self._cancelled:
+            status = 'cancelled'
+        elif self.returncode == 0:
+            status = 'ok'
+        else:
+            status = 'failed'
+        _record_timing({
+            'name': self.name,
+            'started': self._started_wall,
+            'status': status,
+            'returncode': self.returncode,
+            'wall_seconds': round(wall_seconds, 3),
+            'media_seconds': round(out_time, 3),
+            'expected_seconds': self.duration,
+            'average_speed': round(out_time / wall_seconds, 3) if wall_seconds > 0 and out_time else None,
+            'frames': self.stats.get('frame'),
+            'dup_frames': self.stats.get('dup_frames'),
+            'drop_frames': self.stats.get('drop_frames'),
+        })
+
+
+def format_progress_message(prefix, stats):
+    """Testo di stato con percentuale, velocità e tempo stimato, per le barre di avanzamento."""
+    parts = [prefix]
+    if stats.get('fraction') is not None:
+        parts.append(f"{int(stats['fraction'] * 100)}%")
+    if stats.get('speed'):
+        parts.append(f"{stats['speed']:.2f}x")
+    if stats.get('fps'):
+        parts.append(f"{stats['fps']:.0f} fps")
+    if stats.get('eta') is not None:
+        minutes, seconds = divmod(int(stats['eta']), 60)
+        parts.append(f"ETA {minutes:02d}:{seconds:02d}")
+    return " - ".join(parts)
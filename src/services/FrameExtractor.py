@@ -1,8 +1,4 @@
 # File: src/services/FrameExtractor.py
-import re
-import anthropic
-import google.generativeai as genai
-import requests # Non strettamente necessario qui se non usi Ollama per vision, ma utile per consistenza
 import json
 import logging
 import base64
@@ -10,7 +6,6 @@ import cv2
 import numpy as np
 import sys
 import time # Per eventuali pause tra richieste API
-from moviepy.editor import VideoFileClip
 from tqdm import tqdm # Barra di progresso
 import io
 from PIL import Image
@@ -20,7 +15,26 @@ from src.config import (
     get_api_key, get_model_for_action,
     PROMPT_FRAMES_ANALYSIS, PROMPT_VIDEO_SUMMARY, PROMPT_SPECIFIC_OBJECT_RECOGNITION
 )
-from src.services.utils import _call_ollama_api
+from src.services.LLMClient import (
+    get_llm_client, image_part, provider_for_model, LLMError, PROVIDER_ANTHROPIC, PROVIDER_GOOGLE
+)
+from src.services.MediaInfo import get_media_info
+from src.services.StructuredOutput import JsonArrayStreamParser, array_schema, parse_json_array
+
+# Filtri di sicurezza di Gemini per l'analisi dei frame (ignorati dagli altri provider)
+GEMINI_SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+]
+
+# Schemi delle risposte (output strutturato del provider)
+FRAME_DESCRIPTION_SCHEMA = array_schema({"frame": {"type": "integer"}, "description": {"type": "string"}})
+OBJECT_SIGHTING_SCHEMA = array_schema({"timestamp": {"type": "string"}, "description": {"type": "string"}})
+
+# Nuove richieste, per i soli frame rimasti senza risultato, dopo una risposta incompleta o non valida
+MAX_FRAME_RETRIES = 1
 
 class FrameExtractor:
     """
@@ -58,10 +72,6 @@ class FrameExtractor:
         self.selected_model = get_model_for_action('frame_extractor')
         logging.info(f"FrameExtractor inizializzato con modello: {self.selected_model}")
 
-        # Inizializza il client corretto (verrà fatto nei metodi specifici)
-        self.anthropic_client = None
-        # Il client Gemini (genai) non richiede un'istanza persistente se configurato globalmente
-
         # Verifica prerequisiti
         if "gemini" in self.selected_model.lower() and not self.google_api_key:
              logging.warning("Modello Gemini selezionato ma GOOGLE_API_KEY non trovata.")
@@ -69,22 +79,13 @@ class FrameExtractor:
              logging.warning("Modello Claude selezionato ma ANTHROPIC_API_KEY non trovata.")
         # Aggiungere controllo per Ollama se implementato
 
-    def _init_anthropic_client(self):
-        """Inizializza il client Anthropic se non già fatto."""
-        if not self.anthropic_client and self.anthropic_api_key:
-            self.anthropic_client = anthropic.Anthropic(api_key=self.anthropic_api_key)
-        elif not self.anthropic_api_key:
-             raise ValueError("API Key Anthropic non fornita per inizializzare il client.")
-
-    def _configure_gemini(self):
-        """Configura l'SDK Gemini."""
-        if not self.google_api_key:
-            raise ValueError("API Key Google non fornita per configurare Gemini.")
+    def _api_key(self):
+        """Chiave passata al costruttore per il provider del modello selezionato (None: quella in configurazione)."""
         try:
-            genai.configure(api_key=self.google_api_key)
-        except Exception as e:
-            logging.exception("Errore durante la configurazione di google.generativeai")
-            raise ConnectionError(f"Impossibile configurare l'SDK Gemini: {e}")
+            provider, _ = provider_for_model(self.selected_model)
+        except ValueError:
+            return None
+        return {PROVIDER_ANTHROPIC: self.anthropic_api_key, PROVIDER_GOOGLE: self.google_api_key}.get(provider)
 
 
     def extract_frames(self):
@@ -257,182 +258,80 @@ class FrameExtractor:
 
         return frame_list
 
-    def _analyze_batch_claude(self, batch, batch_idx, language, prompt_template, search_query=None):
-        """Analizza un batch di frame usando Claude."""
-        self._init_anthropic_client()
-        if not self.anthropic_client: return [] # Errore già loggato
-
-        messages = [{"role": "user", "content": []}]
-        content_list = messages[0]["content"]
+    def _analyze_batch(self, batch, batch_idx, language, prompt_template, search_query=None, schema=None):
+        """
+        Analizza un batch di frame con il modello selezionato.
 
+        La risposta è richiesta in forma strutturata (`schema`) e letta in streaming: gli
+        elementi completi restano validi anche se la risposta si interrompe o contiene un
+        elemento non valido. Restituisce (elementi, risposta completa).
+        """
+        parts = []
         for idx, frame in enumerate(batch):
             timestamp_seconds = frame['timestamp']
             minutes = int(timestamp_seconds // 60)
             seconds = int(timestamp_seconds % 60)
-            timestamp_str = f"[{minutes:02d}:{seconds:02d}]"
-            content_list.append({"type": "text", "text": f"Frame {idx} at timestamp {timestamp_str}:"})
-            content_list.append({
-                "type": "image",
-                "source": { "type": "base64", "media_type": "image/jpeg", "data": frame["data"] }
-            })
-
-        format_vars = {'language': language, 'batch_size': len(batch)}
-        if search_query:
-            format_vars['search_query'] = search_query
-        formatted_prompt = prompt_template.format(**format_vars)
-        content_list.append({"type": "text", "text": formatted_prompt})
+            parts.append(f"Frame {idx} at timestamp [{minutes:02d}:{seconds:02d}]:")
+            parts.append(image_part(frame["data"]))
 
-        try:
-            response = self.anthropic_client.messages.create(
-                model=self.selected_model,
-                max_tokens=4096, # Aumenta se necessario
-                messages=messages
-            )
-            raw_text = response.content[0].text.strip()
-            # Aggiungi robustezza al parsing JSON
-            try:
-                # Cerca di estrarre solo il blocco JSON se l'AI aggiunge testo extra
-                json_match = re.search(r'```json\s*([\s\S]*?)\s*```|(\[[\s\S]*\]|\{[\s\S]*\})', raw_text)
-                if json_match:
-                    json_str = json_match.group(1) or json_match.group(2)
-                    frames_json = json.loads(json_str)
-                    logging.debug(f"Claude Batch {batch_idx} - JSON Parsed: {frames_json}")
-                    return frames_json
-                else:
-                    logging.error(f"Claude Batch {batch_idx} - Nessun blocco JSON trovato nella risposta: {raw_text}")
-                    return []
-            except json.JSONDecodeError as jde:
-                logging.error(f"Claude Batch {batch_idx} - Errore parsing JSON: {jde}\nRisposta grezza:\n{raw_text}")
-                return []
-        except Exception as e:
-            logging.exception(f"Errore API Claude durante analisi batch {batch_idx}")
-            return [] # Ritorna vuoto per questo batch in caso di errore API
-
-    def _analyze_batch_gemini(self, batch, batch_idx, language, prompt_template, search_query=None):
-        """Analizza un batch di frame usando Gemini."""
-        self._configure_gemini() # Assicura che l'SDK sia configurato
-
-        # Prepara il contenuto per Gemini (lista di testo e oggetti immagine)
-        gemini_content = []
-        for idx, frame in enumerate(batch):
-             timestamp_seconds = frame['timestamp']
-             minutes = int(timestamp_seconds // 60)
-             seconds = int(timestamp_seconds % 60)
-             timestamp_str = f"[{minutes:02d}:{seconds:02d}]"
-             gemini_content.append(f"Frame {idx} at timestamp {timestamp_str}:")
-             # Gemini richiede oggetti Immagine dall'SDK
-             try:
-                 # Decodifica base64 in bytes
-                 image_bytes = base64.b64decode(frame["data"])
-                 img_part = {"mime_type": "image/jpeg", "data": image_bytes}
-                 gemini_content.append(img_part)
-             except Exception as decode_err:
-                  logging.error(f"Gemini Batch {batch_idx} - Errore decodifica Base64 per frame {idx}: {decode_err}")
-                  # Potresti saltare questo frame o l'intero batch
-                  return [] # Errore nel batch
-
-        # Aggiungi il prompt testuale alla fine
         format_vars = {'language': language, 'batch_size': len(batch)}
         if search_query:
             format_vars['search_query'] = search_query
-        formatted_prompt = prompt_template.format(**format_vars)
-        gemini_content.append(formatted_prompt)
+        parts.append(prompt_template.format(**format_vars))
 
+        parser = JsonArrayStreamParser()
         try:
-            model = genai.GenerativeModel(self.selected_model)
-            # Impostazioni generazione (opzionale, per controllare output)
-            generation_config = genai.types.GenerationConfig(
-                 # response_mime_type="application/json", # Chiedi JSON direttamente
-                 temperature=0.5 # Riduci un po' la temperatura per risposte più consistenti
+            response = get_llm_client().generate(
+                self.selected_model,
+                parts,
+                system="Sei un analista video AI. Analizza i frame forniti e rispondi in formato JSON.",
+                max_tokens=4096,
+                temperature=0.5,  # Risposte più consistenti
+                name="analisi frame",
+                api_key=self._api_key(),
+                generation_options={'safety_settings': GEMINI_SAFETY_SETTINGS, 'response_schema': schema},
+                on_text=parser.feed,
             )
-            safety_settings = [ # Rilassa un po' i filtri se necessario, ma con cautela
-                 {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                 {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                 {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                 {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-            ]
-
-            response = model.generate_content(
-                 gemini_content,
-                 generation_config=generation_config,
-                 safety_settings=safety_settings
-            )
-
-            # Estrai e parsa il JSON dalla risposta
-            try:
-                # Gemini può restituire direttamente JSON se richiesto, o testo contenente JSON
-                # Prova a parsare direttamente response.text
-                raw_text = response.text
-                # Cerca blocco JSON come per Claude per robustezza
-                json_match = re.search(r'```json\s*([\s\S]*?)\s*```|(\[[\s\S]*\]|\{[\s\S]*\})', raw_text)
-                if json_match:
-                    json_str = json_match.group(1) or json_match.group(2)
-                    frames_json = json.loads(json_str)
-                    logging.debug(f"Gemini Batch {batch_idx} - JSON Parsed: {frames_json}")
-                    return frames_json
+            if not parser.complete:
+                # Il testo finale può differire dai frammenti (es. input del tool di Claude)
+                items, complete = parse_json_array(response.text)
+                if complete or len(items) > len(parser.items):
+                    return items, complete
+                logging.error(f"Batch {batch_idx} - Risposta JSON incompleta ({len(parser.items)} elementi validi):\n{response.text}")
+        except Exception:
+            logging.exception(f"Errore API {self.selected_model} durante analisi batch {batch_idx}")
+            if parser.items:
+                logging.info(f"Batch {batch_idx} - Recuperati {len(parser.items)} elementi ricevuti prima dell'errore.")
+        logging.debug(f"Batch {batch_idx} - JSON Parsed: {parser.items}")
+        return parser.items, parser.complete
+
+    def _describe_batch(self, batch, batch_idx, language, prompt_template):
+        """Descrizioni dei frame del batch per indice locale; i frame senza descrizione valida sono richiesti di nuovo."""
+        descriptions = {}
+        pending = list(range(len(batch)))
+        for attempt in range(MAX_FRAME_RETRIES + 1):
+            request_frames = [batch[i] for i in pending]
+            items, _ = self._analyze_batch(request_frames, batch_idx, language, prompt_template,
+                                           schema=FRAME_DESCRIPTION_SCHEMA)
+            for item in items:
+                try:
+                    # L'indice nel JSON è relativo ai frame inviati (0, 1, ...)
+                    local_index = int(item.get("frame", -1))
+                    description = str(item.get("description", "N/D")).strip()
+                except (AttributeError, TypeError, ValueError):
+                    logging.warning(f"Batch {batch_idx} - Elemento non valido nel JSON: {item}")
+                    continue
+                if 0 <= local_index < len(request_frames):
+                    descriptions.setdefault(pending[local_index], description)
                 else:
-                    logging.error(f"Gemini Batch {batch_idx} - Nessun blocco JSON trovato nella risposta: {raw_text}")
-                    return []
-            except json.JSONDecodeError as jde:
-                logging.error(f"Gemini Batch {batch_idx} - Errore parsing JSON: {jde}\nRisposta grezza:\n{raw_text}")
-                return []
-            except ValueError: # Potrebbe essere bloccato da safety
-                logging.warning(f"Gemini Batch {batch_idx} - Risposta bloccata o non valida. Feedback: {response.prompt_feedback}")
-                return [] # Ritorna vuoto se bloccato
-            except AttributeError: # Se response.text non esiste
-                 logging.error(f"Gemini Batch {batch_idx} - Attributo 'text' non trovato nella risposta. Risposta completa: {response}")
-                 return []
-
-        except Exception as e:
-            logging.exception(f"Errore API Gemini durante analisi batch {batch_idx}")
-            return [] # Ritorna vuoto per questo batch
-
-    def _analyze_batch_ollama(self, batch, batch_idx, language, prompt_template, search_query=None):
-        """Analizza un batch di frame usando un modello Vision di Ollama."""
-        # Prepara il prompt
-        format_vars = {'language': language, 'batch_size': len(batch)}
-        if search_query:
-            format_vars['search_query'] = search_query
+                    logging.warning(f"Batch {batch_idx} - Indice frame non valido ricevuto nel JSON: {local_index}. Item: {item}")
 
-        # Unisce i timestamp al prompt per dare contesto
-        timestamps_info = "\n".join(
-            f"Frame {idx} at timestamp [{int(f['timestamp'] // 60):02d}:{int(f['timestamp'] % 60):02d}]"
-            for idx, f in enumerate(batch)
-        )
-        user_prompt = f"{timestamps_info}\n\n{prompt_template.format(**format_vars)}"
-
-        system_prompt = "Sei un analista video AI. Analizza i frame forniti e rispondi in formato JSON."
-
-        # Estrai i dati base64 delle immagini
-        images_base64 = [frame["data"] for frame in batch]
-
-        try:
-            # Estrai il nome del modello dall'identificatore completo (es. "ollama:llava")
-            model_name = self.selected_model.split(":", 1)[1]
-
-            raw_text = _call_ollama_api(
-                model_name,
-                system_prompt,
-                user_prompt,
-                images=images_base64
-            )
-
-            # Parsing robusto del JSON dalla risposta
-            json_match = re.search(r'```json\s*([\s\S]*?)\s*```|(\[[\s\S]*\]|\{[\s\S]*\})', raw_text)
-            if json_match:
-                json_str = json_match.group(1) or json_match.group(2)
-                frames_json = json.loads(json_str)
-                logging.debug(f"Ollama Batch {batch_idx} - JSON Parsed: {frames_json}")
-                return frames_json
-            else:
-                logging.error(f"Ollama Batch {batch_idx} - Nessun blocco JSON trovato nella risposta: {raw_text}")
-                return []
-        except json.JSONDecodeError as jde:
-            logging.error(f"Ollama Batch {batch_idx} - Errore parsing JSON: {jde}\nRisposta grezza:\n{raw_text}")
-            return []
-        except Exception as e:
-            logging.exception(f"Errore API Ollama durante analisi batch {batch_idx}")
-            return []
+            pending = [i for i in pending if i not in descriptions]
+            if not pending:
+                break
+            if attempt < MAX_FRAME_RETRIES:
+                logging.warning(f"Batch {batch_idx} - {len(pending)} frame senza descrizione, nuova richiesta solo per questi.")
+        return descriptions
 
     # --- Metodo Principale di Analisi ---
     def analyze_frames_batch(self, frame_list, language):
@@ -453,7 +352,6 @@ class FrameExtractor:
 
         frame_data = [] # Risultato finale
         total_batches = (len(frame_list) + self.batch_size - 1) // self.batch_size # Calcolo corretto per l'ultimo batch
-        model_name_lower = self.selected_model.lower()
 
         # Leggi il template del prompt una sola volta
         try:
@@ -473,43 +371,21 @@ class FrameExtractor:
 
             if not current_batch: continue # Salta batch vuoti (non dovrebbe succedere)
 
-            batch_results = []
-            # Selezione API
-            if "claude" in model_name_lower:
-                batch_results = self._analyze_batch_claude(current_batch, batch_idx, language, prompt_template)
-            elif "gemini" in model_name_lower:
-                batch_results = self._analyze_batch_gemini(current_batch, batch_idx, language, prompt_template)
-            elif "ollama:" in model_name_lower:
-                batch_results = self._analyze_batch_ollama(current_batch, batch_idx, language, prompt_template)
-            else:
-                logging.error(f"Modello '{self.selected_model}' non supportato per l'analisi frame.")
-                # Puoi decidere se fermarti o continuare con gli altri batch
-                continue # Salta al prossimo batch
+            descriptions = self._describe_batch(current_batch, batch_idx, language, prompt_template)
 
             # Elabora i risultati del batch corrente
-            if batch_results:
-                 try:
-                      for item in batch_results:
-                           # L'indice nel JSON è relativo al batch (0, 1, ...)
-                           local_index = int(item.get("frame", -1))
-                           description = item.get("description", "N/D").strip()
-
-                           if 0 <= local_index < len(current_batch):
-                                # Calcola l'indice globale del frame
-                                global_frame_number = batch_start_index + local_index
-                                timestamp_seconds = current_batch[local_index]['timestamp']
-                                minutes = int(timestamp_seconds // 60)
-                                seconds = int(timestamp_seconds % 60)
-
-                                frame_data.append({
-                                    "frame_number": global_frame_number,
-                                    "description": description,
-                                    "timestamp": f"{minutes:02d}:{seconds:02d}",
-                                })
-                           else:
-                                logging.warning(f"Batch {batch_idx} - Indice frame non valido ricevuto nel JSON: {local_index}. Item: {item}")
-                 except (TypeError, ValueError) as parse_err:
-                       logging.error(f"Batch {batch_idx} - Errore durante l'elaborazione dei risultati JSON: {parse_err}. Risultati: {batch_results}")
+            for local_index, description in sorted(descriptions.items()):
+                # Calcola l'indice globale del frame
+                global_frame_number = batch_start_index + local_index
+                timestamp_seconds = current_batch[local_index]['timestamp']
+                minutes = int(timestamp_seconds // 60)
+                seconds = int(timestamp_seconds % 60)
+
+                frame_data.append({
+                    "frame_number": global_frame_number,
+                    "description": description,
+                    "timestamp": f"{minutes:02d}:{seconds:02d}",
+                })
 
             # Aggiungi una piccola pausa tra le chiamate API per evitare rate limiting (opzionale)
             # time.sleep(1)
@@ -536,7 +412,6 @@ class FrameExtractor:
 
         frame_data = [] # Risultato finale
         total_batches = (len(frame_list) + self.batch_size - 1) // self.batch_size
-        model_name_lower = self.selected_model.lower()
 
         try:
             with open(PROMPT_SPECIFIC_OBJECT_RECOGNITION, 'r', encoding='utf-8') as f:
@@ -554,30 +429,33 @@ class FrameExtractor:
 
             if not current_batch: continue
 
-            batch_results = []
-            if "claude" in model_name_lower:
-                batch_results = self._analyze_batch_claude(current_batch, batch_idx, language, prompt_template, search_query)
-            elif "gemini" in model_name_lower:
-                batch_results = self._analyze_batch_gemini(current_batch, batch_idx, language, prompt_template, search_query)
-            elif "ollama:" in model_name_lower:
-                batch_results = self._analyze_batch_ollama(current_batch, batch_idx, language, prompt_template, search_query)
-            else:
-                logging.error(f"Modello '{self.selected_model}' non supportato per la ricerca di oggetti specifici.")
-                continue
-
-            if batch_results:
-                try:
-                    for item in batch_results:
+            request_frames = current_batch
+            for attempt in range(MAX_FRAME_RETRIES + 1):
+                batch_results, complete = self._analyze_batch(request_frames, batch_idx, language, prompt_template,
+                                                              search_query, schema=OBJECT_SIGHTING_SCHEMA)
+                found = set()
+                for item in batch_results:
+                    try:
                         timestamp_str = item.get("timestamp")
-                        description = item.get("description", "N/D").strip()
-
-                        if timestamp_str is not None:
-                            frame_data.append({
-                                "timestamp": timestamp_str,
-                                "description": description,
-                            })
-                except (TypeError, ValueError) as parse_err:
-                    logging.error(f"Batch {batch_idx} - Errore durante l'elaborazione dei risultati JSON: {parse_err}. Risultati: {batch_results}")
+                        description = str(item.get("description", "N/D")).strip()
+                    except AttributeError:
+                        logging.warning(f"Batch {batch_idx} - Elemento non valido nel JSON: {item}")
+                        continue
+                    if timestamp_str is not None:
+                        found.add(str(timestamp_str).strip("[] "))
+                        frame_data.append({
+                            "timestamp": timestamp_str,
+                            "description": description,
+                        })
+                if complete:
+                    break
+                # Risposta interrotta: si ripetono solo i frame non ancora segnalati
+                request_frames = [frame for frame in request_frames
+                                  if f"{int(frame['timestamp'] // 60):02d}:{int(frame['timestamp'] % 60):02d}" not in found]
+                if not request_frames:
+                    break
+                if attempt < MAX_FRAME_RETRIES:
+                    logging.warning(f"Batch {batch_idx} - Risposta incompleta, nuova richiesta per {len(request_frames)} frame.")
 
         logging.info(f"Ricerca di '{search_query}' completata. Trovate {len(frame_data)} occorrenze.")
         return frame_data
@@ -585,8 +463,7 @@ class FrameExtractor:
     def get_video_duration(self):
         """Restituisce la durata del video in secondi."""
         try:
-             with VideoFileClip(self.video_path) as video:
-                  return video.duration
+             return get_media_info().duration(self.video_path)
         except Exception as e:
              logging.exception(f"Errore nel recuperare la durata del video: {self.video_path}")
              return 0.0 # Ritorna 0 in caso di errore
@@ -624,48 +501,22 @@ class FrameExtractor:
 
         # Selezione API (usa lo stesso modello dell'analisi frame o uno dedicato?)
         # Per ora riutilizziamo self.selected_model, assumendo sia testuale/multimodale
-        model_name_lower = self.selected_model.lower()
         logging.info(f"Generazione riassunto video con {self.selected_model}...")
 
         try:
-            if "claude" in model_name_lower:
-                self._init_anthropic_client()
-                if not self.anthropic_client: return None
-                response = self.anthropic_client.messages.create(
-                    model=self.selected_model,
-                    max_tokens=2048,
-                    messages=[{"role": "user", "content": prompt_text}] # Prompt semplice
-                )
-                summary = response.content[0].text.strip()
-                logging.info("Riassunto video generato con Claude.")
-                return summary
-
-            elif "gemini" in model_name_lower:
-                self._configure_gemini()
-                model = genai.GenerativeModel(self.selected_model)
-                response = model.generate_content(prompt_text)
-                try:
-                     summary = response.text.strip()
-                     logging.info("Riassunto video generato con Gemini.")
-                     return summary
-                except ValueError:
-                     logging.warning(f"Risposta riassunto Gemini bloccata. Feedback: {response.prompt_feedback}")
-                     return None
-
-            elif "ollama:" in model_name_lower:
-                model_name = self.selected_model.split(":", 1)[1]
-                summary = _call_ollama_api(
-                    model_name,
-                    "Sei un assistente AI specializzato nel riassumere video.",
-                    prompt_text
-                )
-                logging.info("Riassunto video generato con Ollama.")
-                return summary
-
-            else:
-                logging.error(f"Modello '{self.selected_model}' non supportato per il riassunto video.")
-                return None
-
+            response = get_llm_client().generate(
+                self.selected_model,
+                prompt_text,
+                system="Sei un assistente AI specializzato nel riassumere video.",
+                max_tokens=2048,
+                name="riassunto video",
+                api_key=self._api_key(),
+            )
+            logging.info(f"Riassunto video generato con {self.selected_model}.")
+            return response.text.strip()
+        except LLMError as e:
+            logging.warning(f"Risposta riassunto video non valida: {e}")
+            return None
         except Exception as e:
             logging.exception(f"Errore API durante generazione riassunto video con {self.selected_model}")
             return None # Ritorna None in caso di errore API
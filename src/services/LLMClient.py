@@ -0,0 +1,549 @@
+# File: src/services/LLMClient.py
+import os
+import json
+import time
+import base64
+import random
+import logging
+import datetime
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.config import get_api_key, get_ollama_endpoint, LLM_METRICS_FILE, LLM_PROMPT_LOG_FILE
+
+PROVIDER_ANTHROPIC = 'anthropic'
+PROVIDER_GOOGLE = 'google'
+PROVIDER_OLLAMA = 'ollama'
+PROVIDER_LOCAL = 'local'
+
+# Richieste contemporanee ammesse per provider: Ollama esegue un modello locale alla volta
+PROVIDER_CONCURRENCY = {
+    PROVIDER_ANTHROPIC: 4,
+    PROVIDER_GOOGLE: 4,
+    PROVIDER_OLLAMA: 1,
+    PROVIDER_LOCAL: 1,
+}
+
+# Nuovi tentativi con backoff esponenziale per gli errori transitori (rete, rate limit, sovraccarico)
+MAX_RETRIES = 3
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+_RETRYABLE_ERRORS = {
+    'APIConnectionError', 'APITimeoutError', 'RateLimitError', 'InternalServerError', 'OverloadedError',
+    'ResourceExhausted', 'ServiceUnavailable', 'DeadlineExceeded', 'TooManyRequests',
+}
+
+OLLAMA_TIMEOUT = 300
+STREAM_EMIT_INTERVAL = 0.1
+HTTP_POOL_SIZE = 8
+CALL_HISTORY_SIZE = 200
+
+# Con 'response_schema' Claude risponde chiamando questo tool, il cui input segue lo schema
+STRUCTURED_TOOL_NAME = "risultato"
+
+# Se impostata, i prompt inviati sono registrati in LLM_PROMPT_LOG_FILE per poterli
+# rieseguire con test/benchmark_llm_replay.py (contengono i testi dell'utente: solo su richiesta)
+RECORD_PROMPTS_ENV = "GENIUSAI_RECORD_PROMPTS"
+
+_call_history = deque(maxlen=CALL_HISTORY_SIZE)
+_metrics_lock = threading.Lock()
+
+
+class LLMError(RuntimeError):
+    """Il provider ha risposto, ma senza un testo utilizzabile (risposta vuota o bloccata)."""
+
+
+@dataclass
+class LLMResponse:
+    text: str
+    model: str
+    provider: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    stop_reason: str = None
+    latency: float = 0.0
+    attempts: int = 1
+    first_token_latency: float = None
+
+
+def provider_for_model(model):
+    """(provider, nome del modello per il provider) a partire dall'identificativo usato nella configurazione."""
+    model_lower = model.lower()
+    if model_lower.startswith('ollama:'):
+        return PROVIDER_OLLAMA, model.split(':', 1)[1]
+    if model_lower.startswith('local:'):
+        return PROVIDER_LOCAL, model.split(':', 1)[1]
+    if 'gemini' in model_lower:
+        return PROVIDER_GOOGLE, model
+    if 'claude' in model_lower:
+        return PROVIDER_ANTHROPIC, model
+    raise ValueError(f"Modello '{model}' non supportato.")
+
+
+def image_part(data, mime_type='image/jpeg'):
+    """Immagine (base64) da inserire nel contenuto di una richiesta, tra le parti di testo."""
+    return {'image': data, 'mime_type': mime_type}
+
+
+def is_retryable(error):
+    """True per gli errori transitori per cui ha senso ripetere la richiesta."""
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code in RETRYABLE_STATUS
+    if type(error).__name__ in _RETRYABLE_ERRORS:
+        return True
+    status = getattr(error, 'status_code', None) or getattr(error, 'code', None)
+    return isinstance(status, int) and status in RETRYABLE_STATUS
+
+
+def retry_delay(attempt, error=None):
+    """Attesa prima del tentativo `attempt` (da 1): Retry-After se indicato, altrimenti backoff con jitter."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        retry_after = float(headers.get('retry-after'))
+        return min(RETRY_MAX_DELAY, max(0.0, retry_after))
+    except (TypeError, ValueError):
+        pass
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** (attempt - 1)))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def call_history():
+    """Ultime chiamate ai modelli eseguite in questa sessione (latenza, token, esito)."""
+    return list(_call_history)
+
+
+def _record_call(record, metrics_file):
+    _call_history.append(record)
+    logging.info(f"Chiamata {record['provider']} '{record['name']}' ({record['model']}) {record['status']} "
+                 f"in {record['latency']:.2f}s, token {record['input_tokens']}/{record['output_tokens']}"
+                 + (f", tentativi {record['attempts']}" if record['attempts'] > 1 else ""))
+    if not metrics_file:
+        return
+    with _metrics_lock:
+        try:
+            os.makedirs(os.path.dirname(metrics_file), exist_ok=True)
+            with open(metrics_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            logging.debug(f"Impossibile registrare le metriche della chiamata: {e}")
+
+
+def _record_prompt(record, prompt_log_file):
+    with _metrics_lock:
+        try:
+            os.makedirs(os.path.dirname(prompt_log_file), exist_ok=True)
+            with open(prompt_log_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logging.debug(f"Impossibile registrare il prompt: {e}")
+
+
+def load_recorded_prompts(prompt_log_file=LLM_PROMPT_LOG_FILE):
+    """Richieste registrate con RECORD_PROMPTS_ENV, nell'ordine in cui sono state inviate."""
+    records = []
+    with open(prompt_log_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                records.append(json.loads(line))
+    return records
+
+
+class TextStreamBuffer:
+    """
+    Raggruppa i frammenti di una risposta in streaming e li consegna a `emit` al massimo
+    ogni `interval` secondi, per non ridisegnare la UI a ogni token.
+    """
+
+    def __init__(self, emit, interval=STREAM_EMIT_INTERVAL):
+        self.emit = emit
+        self.interval = interval
+        self._pending = []
+        self._last_emit = 0.0
+
+    def __call__(self, chunk):
+        self._pending.append(chunk)
+        now = time.monotonic()
+        if now - self._last_emit >= self.interval:
+            self._last_emit = now
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            text = "".join(self._pending)
+            self._pending = []
+            self.emit(text)
+
+
+def _gemini_schema(schema):
+    """Schema JSON nel formato di Gemini (tipi in maiuscolo)."""
+    if isinstance(schema, dict):
+        return {key: value.upper() if key == 'type' and isinstance(value, str) else _gemini_schema(value) for key, value in schema.items()}
+    if isinstance(schema, list):
+        return [_gemini_schema(value) for value in schema]
+    return schema
+
+
+def _split_parts(prompt):
+    """Il prompt può essere un testo o una lista di testi e immagini (image_part)."""
+    return [prompt] if isinstance(prompt, str) else list(prompt)
+
+
+class LLMClient:
+    """
+    Punto di accesso unico ai modelli linguistici (Claude, Gemini, Ollama e modelli locali).
+
+    I client dei provider sono creati una volta e riutilizzati, così le connessioni
+    HTTP restano aperte tra una richiesta e l'altra; ogni provider ha un limite di
+    richieste contemporanee e gli errori transitori vengono ripetuti con backoff.
+    Latenza e token di ogni chiamata sono registrati in `metrics_file`; se indicato,
+    il testo delle richieste è registrato in `prompt_log_file`.
+    """
+
+    def __init__(self, metrics_file=LLM_METRICS_FILE, concurrency=None, max_retries=MAX_RETRIES, session=None,
+                 prompt_log_file=None):
+        self.metrics_file = metrics_file
+        self.prompt_log_file = prompt_log_file
+        self.max_retries = max_retries
+        limits = dict(PROVIDER_CONCURRENCY, **(concurrency or {}))
+        self._semaphores = {provider: threading.BoundedSemaphore(limit) for provider, limit in limits.items()}
+        self._lock = threading.Lock()
+        self._anthropic_clients = {}
+        self._gemini_key = None
+        self.session = session or self._create_session()
+
+    @staticmethod
+    def _create_session():
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def generate(self, model, prompt, system=None, max_tokens=4096, temperature=None, name=None,
+                 timeout=OLLAMA_TIMEOUT, api_key=None, generation_options=None, on_text=None):
+        """
+        Esegue una richiesta e restituisce un LLMResponse.
+
+        Args:
+            model (str): identificativo del modello come in configurazione (es. "ollama:llava:latest").
+            prompt (str | list): testo dell'utente, oppure lista di testi e image_part().
+            system (str, optional): istruzioni di sistema.
+            name (str, optional): nome della chiamata nelle metriche.
+            api_key (str, optional): chiave da usare al posto di quella in configurazione.
+            generation_options (dict, optional): opzioni specifiche del provider
+                (per Gemini 'safety_settings'). 'response_schema' (schema JSON) chiede una
+                risposta strutturata: tool obbligatorio per Claude, JSON mode per Gemini,
+                'format' per Ollama; il testo restituito è il JSON della risposta.
+            on_text (callable, optional): se indicato la risposta arriva in streaming e
+                on_text(frammento) è chiamato per ogni parte di testo ricevuta.
+        """
+        provider, provider_model = provider_for_model(model)
+        handler = {
+            PROVIDER_ANTHROPIC: self._generate_anthropic,
+            PROVIDER_GOOGLE: self._generate_gemini,
+            PROVIDER_OLLAMA: self._generate_ollama,
+            PROVIDER_LOCAL: self._generate_local,
+        }[provider]
+        parts = _split_parts(prompt)
+        if self.prompt_log_file:
+            # Le immagini non vengono registrate: nel replay restano solo le parti di testo
+            _record_prompt({'name': name or provider, 'model': model, 'system': system,
+                            'prompt': [part for part in parts if not isinstance(part, dict)],
+                            'images': sum(1 for part in parts if isinstance(part, dict)),
+                            'max_tokens': max_tokens, 'temperature': temperature}, self.prompt_log_file)
+        options = dict(generation_options or {}, max_tokens=max_tokens, temperature=temperature, timeout=timeout,
+                       api_key=api_key)
+
+        started_wall = datetime.datetime.now().isoformat(timespec='seconds')
+        started = time.monotonic()
+        first_token = []
+        if on_text:
+            def stream_text(chunk):
+                if not chunk:
+                    return
+                if not first_token:
+                    first_token.append(time.monotonic() - started)
+                    logging.info(f"{provider} '{name or provider}': primo token dopo {first_token[0]:.2f}s")
+                on_text(chunk)
+            options['on_text'] = stream_text
+
+        attempts = 0
+        status = 'failed'
+        response = None
+        try:
+            with self._semaphores[provider]:
+                while True:
+                    attempts += 1
+                    try:
+                        response = handler(provider_model, parts, system, options)
+                        break
+                    except Exception as e:
+                        # Se parte della risposta è già stata consegnata non si può ripetere la richiesta
+                        if attempts > self.max_retries or first_token or not is_retryable(e):
+                            raise
+                        delay = retry_delay(attempts, e)
+                        logging.warning(f"{provider}: errore transitorio ({type(e).__name__}: {e}), "
+                                        f"nuovo tentativo tra {delay:.1f}s")
+                        time.sleep(delay)
+            status = 'ok'
+        finally:
+            latency = time.monotonic() - started
+            _record_call({
+                'name': name or provider,
+                'provider': provider,
+                'model': provider_model,
+                'started': started_wall,
+                'status': status,
+                'attempts': attempts,
+                'latency': round(latency, 3),
+                'first_token_latency': round(first_token[0], 3) if first_token else None,
+                'input_tokens': response.input_tokens if response else 0,
+                'output_tokens': response.output_tokens if response else 0,
+            }, self.metrics_file)
+
+        response.model = model
+        response.latency = latency
+        response.attempts = attempts
+        response.first_token_latency = first_token[0] if first_token else None
+        return response
+
+    # --- Anthropic ---
+
+    def _anthropic_client(self, api_key=None):
+        api_key = api_key or get_api_key('anthropic')
+        if not api_key:
+            raise ValueError("API Key Anthropic non configurata.")
+        with self._lock:
+            client = self._anthropic_clients.get(api_key)
+            if client is None:
+                import anthropic
+                # I nuovi tentativi sono gestiti da generate(), uguali per tutti i provider
+                client = anthropic.Anthropic(api_key=api_key, max_retries=0)
+                self._anthropic_clients[api_key] = client
+            return client
+
+    def _generate_anthropic(self, model, parts, system, options):
+        content = []
+        for part in parts:
+            if isinstance(part, dict):
+                content.append({"type": "image",
+                                "source": {"type": "base64", "media_type": part['mime_type'], "data": part['image']}})
+            else:
+                content.append({"type": "text", "text": part})
+        kwargs = {'model': model, 'max_tokens': options['max_tokens'],
+                  'messages': [{"role": "user", "content": content}]}
+        if system:
+            kwargs['system'] = system
+        if options['temperature'] is not None:
+            kwargs['temperature'] = options['temperature']
+        schema = options.get('response_schema')
+        if schema:
+            kwargs['tools'] = [{"name": STRUCTURED_TOOL_NAME, "description": "Restituisce il risultato nel formato richiesto.",
+                                "input_schema": {"type": "object", "properties": {"result": schema}, "required": ["result"]}}]
+            kwargs['tool_choice'] = {"type": "tool", "name": STRUCTURED_TOOL_NAME}
+
+        client = self._anthropic_client(options['api_key'])
+        if options.get('on_text'):
+            with client.messages.stream(**kwargs) as stream:
+                for event in stream:
+                    if event.type != 'content_block_delta':
+                        continue
+                    if event.delta.type == 'text_delta':
+                        options['on_text'](event.delta.text)
+                    elif event.delta.type == 'input_json_delta':
+                        # Input del tool in arrivo: JSON parziale, leggibile con JsonArrayStreamParser
+                        options['on_text'](event.delta.partial_json)
+                message = stream.get_final_message()
+        else:
+            message = client.messages.create(**kwargs)
+        if message.stop_reason == 'max_tokens':
+            logging.warning(f"Risposta Claude ({model}) troncata per max_tokens.")
+        if schema:
+            tool_inputs = [block.input for block in message.content if getattr(block, 'type', None) == 'tool_use']
+            if not tool_inputs:
+                raise LLMError(f"Claude ({model}) non ha restituito la risposta strutturata.")
+            text = json.dumps(tool_inputs[0].get('result', tool_inputs[0]), ensure_ascii=False)
+        else:
+            text = "".join(block.text for block in message.content if getattr(block, 'type', 'text') == 'text')
+        return LLMResponse(text=text, model=model, provider=PROVIDER_ANTHROPIC,
+                           input_tokens=message.usage.input_tokens, output_tokens=message.usage.output_tokens,
+                           stop_reason=message.stop_reason)
+
+    # --- Google Gemini ---
+
+    def _gemini(self, api_key=None):
+        api_key = api_key or get_api_key('google')
+        if not api_key:
+            raise ValueError("API Key Google non configurata.")
+        import google.generativeai as genai
+        with self._lock:
+            # genai.configure è globale: va ripetuto solo se la chiave cambia
+            if self._gemini_key != api_key:
+                genai.configure(api_key=api_key)
+                self._gemini_key = api_key
+        return genai
+
+    def _generate_gemini(self, model, parts, system, options):
+        genai = self._gemini(options['api_key'])
+        content = []
+        for part in parts:
+            if isinstance(part, dict):
+                content.append({"mime_type": part['mime_type'], "data": base64.b64decode(part['image'])})
+            else:
+                content.append(part)
+
+        # max_tokens non viene applicato: per Gemini vale il limite predefinito del modello
+        config = {}
+        if options['temperature'] is not None:
+            config['temperature'] = options['temperature']
+        if options.get('response_schema'):
+            config['response_mime_type'] = 'application/json'
+            config['response_schema'] = _gemini_schema(options['response_schema'])
+        gemini_model = genai.GenerativeModel(model, system_instruction=system) if system else genai.GenerativeModel(model)
+        on_text = options.get('on_text')
+        response = gemini_model.generate_content(
+            content,
+            generation_config=genai.types.GenerationConfig(**config) if config else None,
+            safety_settings=options.get('safety_settings'),
+            stream=bool(on_text),
+        )
+        try:
+            if on_text:
+                chunks = []
+                for chunk in response:
+                    try:
+                        piece = chunk.text
+                    except ValueError:
+                        if chunks:
+                            continue  # Frammento finale senza testo
+                        raise
+                    chunks.append(piece)
+                    on_text(piece)
+                text = "".join(chunks)
+            else:
+                text = response.text
+        except ValueError:
+            raise LLMError(f"Risposta da Gemini bloccata o non valida. Causa: {response.prompt_feedback}")
+
+        usage = getattr(response, 'usage_metadata', None)
+        return LLMResponse(text=text, model=model, provider=PROVIDER_GOOGLE,
+                           input_tokens=getattr(usage, 'prompt_token_count', 0) or 0,
+                           output_tokens=getattr(usage, 'candidates_token_count', 0) or 0)
+
+    # --- Ollama ---
+
+    def _post_ollama(self, path, payload, timeout, on_text=None):
+        """
+        Risposta JSON di Ollama. In streaming (on_text) Ollama invia una riga JSON per frammento:
+        il testo viene accumulato e restituito nel formato della risposta non in streaming.
+        """
+        url = f"{get_ollama_endpoint()}{path}"
+        if not on_text:
+            response = self.session.post(url, json=payload, timeout=timeout)
+            response.raise_for_status()
+            return response.json()
+
+        with self.session.post(url, json=dict(payload, stream=True), timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            chunks, final = [], {}
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get('error'):
+                    raise LLMError(f"Errore Ollama: {data['error']}")
+                piece = (data.get('message') or {}).get('content') or data.get('response') or ""
+                if piece:
+                    chunks.append(piece)
+                    on_text(piece)
+                if data.get('done'):
+                    final = data
+        text = "".join(chunks)
+        return dict(final, message={'content': text}, response=text)
+
+    def _generate_ollama(self, model, parts, system, options):
+        images = [part['image'] for part in parts if isinstance(part, dict)]
+        prompt = "\n".join(part for part in parts if not isinstance(part, dict))
+        generate_payload = {"model": model, "prompt": prompt, "stream": False}
+        if system:
+            generate_payload["system"] = system
+        if images:
+            generate_payload["images"] = images
+        model_options = {}
+        if options['temperature'] is not None:
+            model_options['temperature'] = options['temperature']
+        if model_options:
+            generate_payload["options"] = model_options
+        if options.get('response_schema'):
+            generate_payload["format"] = options['response_schema']
+
+        if not images:
+            # Modelli di solo testo: /api/chat, con fallback a /api/generate sulle versioni che non lo hanno
+            messages = ([{"role": "system", "content": system}] if system else []) + [{"role": "user", "content": prompt}]
+            chat_payload = {"model": model, "messages": messages, "stream": False}
+            if model_options:
+                chat_payload["options"] = model_options
+            if options.get('response_schema'):
+                chat_payload["format"] = options['response_schema']
+            try:
+                data = self._post_ollama("/api/chat", chat_payload, options['timeout'], options.get('on_text'))
+                text = (data.get("message") or {}).get("content", "").strip()
+                if not text:
+                    raise LLMError("Risposta vuota o formato non valido da /api/chat.")
+                return self._ollama_response(model, text, data)
+            except requests.exceptions.HTTPError as e:
+                if e.response is None or e.response.status_code != 404:
+                    raise
+                logging.warning("Endpoint /api/chat non trovato (404). Tento il fallback a /api/generate...")
+
+        data = self._post_ollama("/api/generate", generate_payload, options['timeout'], options.get('on_text'))
+        text = data.get("response", "").strip()
+        if not text:
+            raise LLMError("Risposta vuota o formato non valido da /api/generate.")
+        return self._ollama_response(model, text, data)
+
+    @staticmethod
+    def _ollama_response(model, text, data):
+        return LLMResponse(text=text, model=model, provider=PROVIDER_OLLAMA,
+                           input_tokens=data.get("prompt_eval_count") or 0,
+                           output_tokens=data.get("eval_count") or 0,
+                           stop_reason=data.get("done_reason"))
+
+
+    # --- Modelli locali ---
+
+    def _generate_local(self, model, parts, system, options):
+        from src.services.LocalLLM import get_local_backend
+
+        if any(isinstance(part, dict) for part in parts):
+            logging.warning(f"Il modello locale '{model}' non supporta le immagini: vengono ignorate.")
+        prompt = "\n".join(part for part in parts if not isinstance(part, dict))
+        text, input_tokens, output_tokens, stop_reason = get_local_backend(model).generate(
+            prompt, system=system, max_tokens=options['max_tokens'], temperature=options['temperature'],
+            on_text=options.get('on_text'))
+        if not text.strip():
+            raise LLMError(f"Risposta vuota dal modello locale '{model}'.")
+        return LLMResponse(text=text, model=model, provider=PROVIDER_LOCAL, input_tokens=input_tokens,
+                           output_tokens=output_tokens, stop_reason=stop_reason)
+
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+
+def get_llm_client():
+    """Istanza condivisa del client, usata da tutti i servizi AI."""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            record = os.environ.get(RECORD_PROMPTS_ENV, '').strip().lower() not in ('', '0', 'false', 'no')
+            _shared_client = LLMClient(prompt_log_file=LLM_PROMPT_LOG_FILE if record else None)
+        return _shared_client
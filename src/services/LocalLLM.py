@@ -0,0 +1,111 @@
+# File: src/services/LocalLLM.py
+import os
+import re
+import time
+import logging
+import threading
+
+from src.config import LOCAL_MODELS_DIR
+from src.services.TextChunking import CHARS_PER_TOKEN, estimate_tokens
+
+# Identificativo (dopo 'local:') del modello sostitutivo deterministico, che non richiede rete né pesi
+ECHO_MODEL = 'echo'
+
+# Velocità simulata dal modello sostitutivo (token al secondo, 0 = istantaneo), per misure più realistiche
+LOCAL_TOKENS_PER_SECOND_ENV = "GENIUSAI_LOCAL_TOKENS_PER_SECOND"
+
+# Contesto dei modelli GGUF caricati con llama.cpp
+LOCAL_CONTEXT_TOKENS = 8192
+
+_WORD = re.compile(r"\S+\s*")
+
+
+class EchoBackend:
+    """
+    Modello sostitutivo per build e benchmark senza rete: risponde in Markdown con un
+    titolo e un punto elenco per ognuna delle prime righe del prompt. La risposta
+    dipende solo dal prompt ed è quindi ripetibile tra un'esecuzione e l'altra.
+    """
+
+    def __init__(self, tokens_per_second=None):
+        if tokens_per_second is None:
+            try:
+                tokens_per_second = float(os.environ.get(LOCAL_TOKENS_PER_SECOND_ENV, 0))
+            except ValueError:
+                tokens_per_second = 0
+        self.tokens_per_second = tokens_per_second
+
+    def generate(self, prompt, system=None, max_tokens=4096, temperature=None, on_text=None):
+        lines = [line.strip() for line in prompt.splitlines() if line.strip()]
+        text = "## Risposta locale\n" + "\n".join(f"* {line[:200]}" for line in lines[:20])
+        text = text[:max_tokens * CHARS_PER_TOKEN]
+        delay = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+        if on_text or delay:
+            for piece in _WORD.findall(text):
+                if delay:
+                    time.sleep(delay * estimate_tokens(piece))
+                if on_text:
+                    on_text(piece)
+        input_tokens = estimate_tokens((system or "") + prompt)
+        return text, input_tokens, estimate_tokens(text), 'stop'
+
+
+class LlamaCppBackend:
+    """Modello GGUF eseguito nel processo con llama-cpp-python (importato solo al caricamento)."""
+
+    def __init__(self, model_path, n_ctx=LOCAL_CONTEXT_TOKENS):
+        from llama_cpp import Llama
+
+        load_start_time = time.time()
+        self.llama = Llama(model_path=model_path, n_ctx=n_ctx, verbose=False)
+        logging.info(f"Modello locale '{os.path.basename(model_path)}' caricato in {time.time() - load_start_time:.2f} secondi.")
+
+    def generate(self, prompt, system=None, max_tokens=4096, temperature=None, on_text=None):
+        messages = ([{"role": "system", "content": system}] if system else []) + [{"role": "user", "content": prompt}]
+        kwargs = {'messages': messages, 'max_tokens': max_tokens}
+        if temperature is not None:
+            kwargs['temperature'] = temperature
+
+        if not on_text:
+            result = self.llama.create_chat_completion(**kwargs)
+            choice = result['choices'][0]
+            usage = result.get('usage') or {}
+            return (choice['message'].get('content') or "", usage.get('prompt_tokens', 0),
+                    usage.get('completion_tokens', 0), choice.get('finish_reason'))
+
+        chunks, finish_reason = [], None
+        for chunk in self.llama.create_chat_completion(stream=True, **kwargs):
+            choice = chunk['choices'][0]
+            piece = (choice.get('delta') or {}).get('content')
+            if piece:
+                chunks.append(piece)
+                on_text(piece)
+            finish_reason = choice.get('finish_reason') or finish_reason
+        text = "".join(chunks)
+        # In streaming llama.cpp non restituisce l'uso dei token: stima come per il modello sostitutivo
+        return text, estimate_tokens((system or "") + prompt), estimate_tokens(text), finish_reason
+
+
+def resolve_model_path(name):
+    """Percorso del file GGUF: assoluto oppure relativo a LOCAL_MODELS_DIR."""
+    path = name if os.path.isabs(name) else os.path.join(LOCAL_MODELS_DIR, name)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Modello locale non trovato: {path}")
+    return path
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_local_backend(name):
+    """Backend per 'local:<name>', creato al primo utilizzo e poi riutilizzato (i pesi restano in memoria)."""
+    with _backends_lock:
+        backend = _backends.get(name)
+        if backend is None:
+            if name == ECHO_MODEL:
+                backend = EchoBackend()
+            else:
+                backend = LlamaCppBackend(resolve_model_path(name))
+            _backends[name] = backend
+        return backend
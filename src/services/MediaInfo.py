@@ -0,0 +1,236 @@
+# File: src/services/MediaInfo.py
+import os
+import json
+import atexit
+import logging
+import threading
+import subprocess
+
+from src.config import FFPROBE_PATH, MEDIA_INFO_CACHE_FILE
+from src.services.FFmpegRunner import CREATION_FLAGS
+
+MAX_CACHE_ENTRIES = 2000
+# Le voci nuove sono scritte su disco insieme, al più una volta ogni SAVE_DELAY_SECONDS
+SAVE_DELAY_SECONDS = 5.0
+
+
+def parse_frame_rate(rate, default=25.0):
+    """Converte un frame rate ffprobe ('30000/1001', '25') in float."""
+    num, _, den = str(rate or '').partition('/')
+    try:
+        value = float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return default
+    return value if value > 0 else default
+
+
+class MediaInfo:
+    """
+    Metadati dei file multimediali letti con ffprobe.
+
+    Ogni file viene analizzato una sola volta: il risultato è memorizzato in memoria
+    e su disco, indicizzato per (percorso, dimensione, data di modifica), quindi un
+    file sovrascritto viene rianalizzato automaticamente. L'indice dei keyframe è
+    calcolato solo alla prima richiesta e poi conservato nella stessa voce.
+    Le analisi non riuscite non vengono memorizzate.
+    """
+
+    def __init__(self, cache_file=MEDIA_INFO_CACHE_FILE, ffprobe_path=FFPROBE_PATH, max_entries=MAX_CACHE_ENTRIES,
+                 save_delay=SAVE_DELAY_SECONDS):
+        self.cache_file = cache_file
+        self.ffprobe_path = ffprobe_path
+        self.max_entries = max_entries
+        self.save_delay = save_delay
+        self._entries = None
+        self._dirty = False
+        self._save_timer = None
+        self._lock = threading.RLock()
+
+    # --- Cache ---
+
+    @staticmethod
+    def _cache_key(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    @staticmethod
+    def _signature(path):
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = {}
+        if self.cache_file and os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Cache dei metadati non leggibile, verrà ricreata: {e}")
+
+    def _save(self):
+        if not self.cache_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            temp_path = f"{self.cache_file}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f)
+            os.replace(temp_path, self.cache_file)
+        except OSError as e:
+            logging.warning(f"Impossibile salvare la cache dei metadati: {e}")
+
+    def _schedule_save(self):
+        """Segna la cache come modificata; il salvataggio avviene dopo `save_delay` secondi."""
+        if not self.cache_file:
+            return
+        self._dirty = True
+        if self.save_delay <= 0:
+            self.flush()
+        elif self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """Scrive subito su disco le modifiche in sospeso."""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if self._dirty:
+                self._dirty = False
+                self._save()
+
+    def _entry(self, path):
+        """Restituisce la voce di cache valida per `path`, analizzando il file se necessario."""
+        size, mtime = self._signature(path)
+        key = self._cache_key(path)
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry and entry.get('size') == size and entry.get('mtime') == mtime:
+                # Le voci usate di recente finiscono in coda e sono le ultime a essere eliminate
+                self._entries[key] = self._entries.pop(key)
+                return entry
+
+        probe = self._run_ffprobe(['-show_format', '-show_streams'], path)
+        if probe is None:
+            # Non memorizzata: la prossima richiesta riproverà l'analisi
+            return {'size': size, 'mtime': mtime, 'format': {}, 'streams': [], 'keyframes': []}
+        entry = {'size': size, 'mtime': mtime,
+                 'format': probe.get('format', {}), 'streams': probe.get('streams', [])}
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._schedule_save()
+        return entry
+
+    def invalidate(self, path):
+        with self._lock:
+            self._load()
+            if self._entries.pop(self._cache_key(path), None) is not None:
+                self._schedule_save()
+
+    def _run_ffprobe(self, args, path):
+        """Output JSON di ffprobe, o None se l'analisi non è riuscita."""
+        command = [self.ffprobe_path, '-v', 'error'] + args + ['-print_format', 'json', path]
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, creationflags=CREATION_FLAGS)
+            if result.returncode != 0:
+                logging.error(f"ffprobe non riuscito su {path}: {result.stderr.strip()}")
+                return None
+            return json.loads(result.stdout or '{}')
+        except (OSError, ValueError) as e:
+            logging.error(f"ffprobe non riuscito su {path}: {e}")
+            return None
+
+    # --- Interrogazioni ---
+
+    def probe(self, path):
+        """Restituisce il dizionario {'format': ..., 'streams': [...]} di ffprobe."""
+        entry = self._entry(path)
+        return {'format': entry['format'], 'streams': entry['streams']}
+
+    def streams(self, path):
+        return self._entry(path)['streams']
+
+    def stream(self, path, codec_type):
+        """Primo stream del tipo indicato ('video', 'audio'), o None."""
+        return next((s for s in self.streams(path) if s.get('codec_type') == codec_type), None)
+
+    def has_video(self, path):
+        video = self.stream(path, 'video')
+        return video is not None and not video.get('disposition', {}).get('attached_pic')
+
+    def duration(self, path):
+        """Durata in secondi (0 se non determinabile)."""
+        entry = self._entry(path)
+        try:
+            return float(entry['format'].get('duration') or 0)
+        except ValueError:
+            pass
+        durations = []
+        for stream in entry['streams']:
+            try:
+                durations.append(float(stream.get('duration') or 0))
+            except ValueError:
+                continue
+        return max(durations, default=0.0)
+
+    def fps(self, path, default=0.0):
+        video = self.stream(path, 'video')
+        if video is None:
+            return default
+        return parse_frame_rate(video.get('avg_frame_rate') or video.get('r_frame_rate'), default)
+
+    def keyframe_packets(self, path):
+        """Coppie (pts, dts) in secondi dei keyframe del primo stream video, ordinate."""
+        entry = self._entry(path)
+        if 'keyframes' not in entry:
+            probe = self._run_ffprobe(['-select_streams', 'v:0', '-show_entries', 'packet=pts_time,dts_time,flags'],
+                                      path)
+            if probe is None:
+                return []
+            keyframes = []
+            for packet in probe.get('packets', []):
+                if 'K' not in packet.get('flags', ''):
+                    continue
+                try:
+                    pts = float(packet['pts_time'])
+                except (KeyError, ValueError):
+                    continue
+                try:
+                    dts = float(packet['dts_time'])
+                except (KeyError, ValueError):
+                    dts = pts
+                keyframes.append([pts, dts])
+            keyframes.sort()
+            with self._lock:
+                entry['keyframes'] = keyframes
+                self._schedule_save()
+        return [tuple(packet) for packet in entry['keyframes']]
+
+    def keyframe_times(self, path):
+        return [pts for pts, _ in self.keyframe_packets(path)]
+
+
+_shared_instances = {}
+_shared_lock = threading.Lock()
+
+
+def get_media_info(ffprobe_path=FFPROBE_PATH):
+    """
+    Istanza condivisa del servizio per `ffprobe_path`. Quella dell'ffprobe predefinito
+    usa la cache su disco, le altre (test, benchmark) solo quella in memoria.
+    """
+    with _shared_lock:
+        media_info = _shared_instances.get(ffprobe_path)
+        if media_info is None:
+            cache_file = MEDIA_INFO_CACHE_FILE if ffprobe_path == FFPROBE_PATH else None
+            media_info = MediaInfo(cache_file=cache_file, ffprobe_path=ffprobe_path)
+            atexit.register(media_info.flush)
+            _shared_instances[ffprobe_path] = media_info
+        return media_info
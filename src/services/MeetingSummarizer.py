@@ -1,7 +1,5 @@
 # File: src/services/MeetingSummarizer.py
 
-import anthropic
-import google.generativeai as genai
 import requests
 import json
 import logging
@@ -11,10 +9,12 @@ from dotenv import load_dotenv
 
 # Importa la configurazione delle azioni e le chiavi/endpoint necessari
 from src.config import (
-    get_api_key, get_model_for_action, get_ollama_endpoint,
+    get_model_for_action, get_ollama_endpoint,
     PROMPT_MEETING_SUMMARY # Assicurati che questo percorso sia corretto
 )
-from src.services.utils import _call_ollama_api
+from src.services.LLMClient import get_llm_client, provider_for_model, TextStreamBuffer
+from src.services.ResponseCache import get_response_cache, response_cache_enabled
+from src.services.TextChunking import needs_chunking, condense_text
 
 load_dotenv()
 
@@ -24,10 +24,11 @@ class MeetingSummarizer(QThread):
     utilizzando il modello AI selezionato (Claude, Gemini, Ollama).
     """
     progress = pyqtSignal(int, str) # Segnale (percentuale, messaggio)
+    partial_text = pyqtSignal(str)  # Frammenti del riassunto in streaming
     completed = pyqtSignal(str)     # Segnale con il riassunto completato
     error = pyqtSignal(str)        # Segnale in caso di errore
 
-    def __init__(self, text, language, parent=None):
+    def __init__(self, text, language, parent=None, use_cache=None):
         """
         Inizializza il thread del riassuntore.
 
@@ -35,16 +36,17 @@ class MeetingSummarizer(QThread):
             text (str): La trascrizione della riunione da riassumere.
             language (str): La lingua del testo e del riassunto desiderato.
             parent (QObject, optional): Il parent Qt. Defaults to None.
+            use_cache (bool, optional): riusa il riassunto memorizzato per lo stesso testo.
+                                        Defaults to None (segue l'impostazione dell'applicazione).
         """
         super().__init__(parent)
         self.text = text
         self.language = language
         self.result = None
+        self.use_cache = response_cache_enabled() if use_cache is None else use_cache
 
         # Recupera il modello selezionato per l'azione 'summary'
         self.selected_model = get_model_for_action('summary')
-        self.anthropic_api_key = get_api_key('anthropic')
-        self.google_api_key = get_api_key('google')
 
         logging.info(f"MeetingSummarizer inizializzato con modello: {self.selected_model}")
 
@@ -75,112 +77,103 @@ class MeetingSummarizer(QThread):
 
     def _summarize_with_selected_model(self, text_to_summarize):
         """
-        Metodo interno che seleziona l'API corretta e genera il riassunto.
+        Genera il riassunto con il modello selezionato, inoltrando avanzamento e streaming ai segnali del thread.
         Restituisce una tupla (testo_riassunto, input_tokens, output_tokens) o una stringa di errore.
         """
-        # 0. Verifica preliminare del modello selezionato
-        if self.selected_model.startswith('---'):
-            return "Errore: Seleziona un modello AI valido dal menu."
+        on_text = self.partial_text.emit if self.receivers(self.partial_text) > 0 else None
+        return summarize_meeting(text_to_summarize, self.language, self.selected_model,
+                                 use_cache=self.use_cache, progress=self.progress.emit, on_text=on_text)
 
-        # 1. Verifica percorso prompt
-        if not PROMPT_MEETING_SUMMARY or not os.path.exists(PROMPT_MEETING_SUMMARY):
-             error_msg = f"File prompt non trovato per riassunto meeting: {PROMPT_MEETING_SUMMARY}"
-             logging.error(error_msg)
-             return error_msg
-
-        # 2. Leggi e formatta il prompt
-        try:
-            with open(PROMPT_MEETING_SUMMARY, 'r', encoding='utf-8') as f:
-                prompt_template = f.read()
-            system_prompt_content = prompt_template.format(language=self.language)
-        except Exception as e:
-            logging.exception(f"Errore lettura/formattazione prompt '{PROMPT_MEETING_SUMMARY}'")
-            return f"Errore lettura prompt riassunto: {e}"
-
-        # L'input effettivo per l'LLM
-        user_prompt = f"Trascrizione della riunione:\n{text_to_summarize}\n\n---\nGenera il riassunto come richiesto."
-
-        # 3. Selezione e chiamata API
-        model_name_lower = self.selected_model.lower()
-        logging.debug(f"Tentativo riassunto meeting con modello: {self.selected_model}")
-        self.progress.emit(20, f"Preparazione richiesta per {self.selected_model}...")
 
+def summarize_meeting(text_to_summarize, language, model, use_cache=True, progress=None, on_text=None):
+    """
+    Riassunto strutturato di una trascrizione di riunione con `model`. Usata dal thread
+    MeetingSummarizer e, senza segnali Qt, dai lavori in parallelo (es. il riassunto multiplo
+    delle clip). `progress` e `on_text` ricevono avanzamento e frammenti in streaming.
+    Restituisce una tupla (testo_riassunto, input_tokens, output_tokens) o una stringa di errore.
+    """
+    progress = progress or (lambda value, message: None)
+
+    # 0. Verifica preliminare del modello selezionato
+    if model.startswith('---'):
+        return "Errore: Seleziona un modello AI valido dal menu."
+
+    # 1. Verifica percorso prompt
+    if not PROMPT_MEETING_SUMMARY or not os.path.exists(PROMPT_MEETING_SUMMARY):
+        error_msg = f"File prompt non trovato per riassunto meeting: {PROMPT_MEETING_SUMMARY}"
+        logging.error(error_msg)
+        return error_msg
+
+    # 2. Leggi e formatta il prompt
+    try:
+        with open(PROMPT_MEETING_SUMMARY, 'r', encoding='utf-8') as f:
+            prompt_template = f.read()
+        system_prompt_content = prompt_template.format(language=language)
+    except Exception as e:
+        logging.exception(f"Errore lettura/formattazione prompt '{PROMPT_MEETING_SUMMARY}'")
+        return f"Errore lettura prompt riassunto: {e}"
+
+    # 3. Riassunto già calcolato per lo stesso modello, prompt, lingua e trascrizione
+    cache_key = get_response_cache().make_key(
+        model, "meeting_summary", prompt_template, language, text_to_summarize)
+    cached = get_response_cache().get(cache_key) if use_cache else None
+    if cached is not None:
+        logging.info(f"Riassunto meeting ({model}) dalla cache.")
+        progress(85, "Riassunto dalla cache...")
+        return cached, 0, 0
+
+    progress(20, f"Preparazione richiesta per {model}...")
+
+    # 4. Trascrizioni troppo lunghe: riassunti parziali dei blocchi (map), poi le note sui riassunti
+    if needs_chunking(text_to_summarize, model):
         try:
-            if "ollama:" in model_name_lower:
-                logging.info(f"Usando Ollama ({self.selected_model}) per riassunto meeting.")
-                self.progress.emit(40, f"Invio a Ollama...")
-                ollama_model_name = self.selected_model.split(":", 1)[1]
-
-                result_text = _call_ollama_api(
-                    ollama_model_name,
-                    system_prompt_content,
-                    user_prompt
-                )
-                self.progress.emit(85, f"Ricevuta risposta da Ollama...")
-                logging.info(f"Ollama riassunto meeting completato.")
-                return result_text, 0, 0
-
-            elif "gemini" in model_name_lower:
-                # --- Logica per Google Gemini ---
-                logging.info(f"Usando Gemini ({self.selected_model}) per riassunto meeting.")
-                if not self.google_api_key: raise ValueError("API Key Google non configurata.")
-                self.progress.emit(40, f"Invio a Gemini...")
-                genai.configure(api_key=self.google_api_key)
-                # Passa le istruzioni di sistema direttamente al modello
-                model = genai.GenerativeModel(self.selected_model, system_instruction=system_prompt_content)
-                # Invia solo il prompt dell'utente
-                response = model.generate_content(user_prompt)
-                self.progress.emit(85, f"Ricevuta risposta da Gemini...")
-                try:
-                    result_text = response.text.strip()
-                except ValueError as ve:
-                     logging.warning(f"Possibile blocco risposta Gemini (riassunto): {ve}. Feedback: {response.prompt_feedback}")
-                     raise Exception(f"Risposta da Gemini bloccata o non valida (riassunto). Causa: {response.prompt_feedback}")
-                except AttributeError: # Se response.text non esiste
-                     logging.error(f"Attributo 'text' non trovato nella risposta Gemini (riassunto). Risposta: {response}")
-                     raise Exception("Formato risposta Gemini inatteso (manca .text).")
-
-                logging.info(f"Gemini riassunto meeting completato.")
-                return result_text, 0, 0 # Token non disponibili facilmente
-
-            elif "claude" in model_name_lower:
-                # --- Logica per Anthropic Claude ---
-                logging.info(f"Usando Claude ({self.selected_model}) per riassunto meeting.")
-                if not self.anthropic_api_key: raise ValueError("API Key Anthropic non configurata.")
-                self.progress.emit(40, f"Invio a Claude...")
-                client = anthropic.Anthropic(api_key=self.anthropic_api_key)
-                message = client.messages.create(
-                    model=self.selected_model,
-                    max_tokens=4096, # Massimo per Claude 3.5
-                    temperature=0.7,
-                    system=system_prompt_content, # Usa prompt di sistema
-                    messages=[{"role": "user", "content": [{"type": "text", "text": user_prompt}]}] # Passa testo come user
-                )
-                self.progress.emit(85, f"Ricevuta risposta da Claude...")
-                if message.stop_reason == 'max_tokens':
-                     logging.warning(f"Risposta Claude (riassunto) troncata per max_tokens.")
-
-                testo_resultante = message.content[0].text.strip()
-                input_tokens = message.usage.input_tokens
-                output_tokens = message.usage.output_tokens
-                logging.info(f"Claude riassunto meeting completato.")
-                return testo_resultante, input_tokens, output_tokens
-
-            # Aggiungere qui blocchi elif per altri provider se necessario
-
-            else:
-                logging.error(f"Modello '{self.selected_model}' non gestito per il riassunto meeting.")
-                return f"Errore: Modello '{self.selected_model}' non supportato."
-
-        # Gestione eccezioni API specifiche
-        except requests.exceptions.ConnectionError:
-             endpoint = get_ollama_endpoint()
-             logging.error(f"Impossibile connettersi a Ollama: {endpoint}")
-             return f"Errore di connessione a Ollama ({endpoint}). Verifica che sia in esecuzione."
-        except requests.exceptions.Timeout:
-             logging.error(f"Timeout durante connessione a Ollama ({self.selected_model}) per riassunto")
-             return f"Timeout Ollama ({self.selected_model}). Il modello potrebbe essere lento o non rispondere."
+            text_to_summarize = condense_text(
+                model, text_to_summarize, language, use_cache=use_cache,
+                progress=lambda done, total: progress(
+                    20 + int(20 * done / total), f"Riassunto dei blocchi ({done}/{total})..."),
+                name="riassunto meeting")
         except Exception as e:
-             # Errore generico durante la chiamata API
-             logging.exception(f"Errore API durante riassunto meeting con {self.selected_model}")
-             return f"Errore API ({type(e).__name__}): {str(e)}"
\ No newline at end of file
+            logging.exception(f"Errore durante il riassunto a blocchi con {model}")
+            return f"Errore API durante il riassunto a blocchi ({type(e).__name__}): {str(e)}"
+
+    # L'input effettivo per l'LLM
+    user_prompt = f"Trascrizione della riunione:\n{text_to_summarize}\n\n---\nGenera il riassunto come richiesto."
+
+    # 5. Chiamata API attraverso il client condiviso
+    logging.debug(f"Tentativo riassunto meeting con modello: {model}")
+
+    try:
+        provider, _ = provider_for_model(model)
+        logging.info(f"Usando {model} ({provider}) per riassunto meeting.")
+        progress(40, f"Invio a {model}...")
+        stream = TextStreamBuffer(on_text) if on_text else None
+        response = get_llm_client().generate(
+            model,
+            user_prompt,
+            system=system_prompt_content,
+            max_tokens=4096,
+            temperature=0.7,
+            name="riassunto meeting",
+            on_text=stream,
+        )
+        if stream:
+            stream.flush()
+        progress(85, f"Ricevuta risposta da {model}...")
+        logging.info(f"Riassunto meeting completato.")
+        summary = response.text.strip()
+        if summary:
+            get_response_cache().put(cache_key, summary, model=model, mode="meeting_summary")
+        return summary, response.input_tokens, response.output_tokens
+
+    # Gestione eccezioni API specifiche
+    except requests.exceptions.ConnectionError:
+        endpoint = get_ollama_endpoint()
+        logging.error(f"Impossibile connettersi a Ollama: {endpoint}")
+        return f"Errore di connessione a Ollama ({endpoint}). Verifica che sia in esecuzione."
+    except requests.exceptions.Timeout:
+        logging.error(f"Timeout durante connessione a Ollama ({model}) per riassunto")
+        return f"Timeout Ollama ({model}). Il modello potrebbe essere lento o non rispondere."
+    except Exception as e:
+        # Errore generico durante la chiamata API
+        logging.exception(f"Errore API durante riassunto meeting con {model}")
+        return f"Errore API ({type(e).__name__}): {str(e)}"
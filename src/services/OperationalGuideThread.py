@@ -1,15 +1,13 @@
 # src/services/OperationalGuideThread.py
 
 import logging
-import base64
 import re
 import json
 from PyQt6.QtCore import QThread, pyqtSignal
 
 from src.services.FrameExtractor import FrameExtractor
+from src.services.LLMClient import get_llm_client, image_part
 from src.config import get_model_for_action, PROMPT_OPERATIONAL_GUIDE
-import anthropic
-import google.generativeai as genai
 
 class OperationalGuideThread(QThread):
     """
@@ -75,63 +73,18 @@ class OperationalGuideThread(QThread):
         except Exception as e:
             raise RuntimeError(f"Impossibile leggere o formattare il file prompt della guida operativa: {e}")
 
-        model_name_lower = self.selected_model.lower()
-
-        if "claude" in model_name_lower:
-            return self._generate_with_claude(frames, formatted_prompt)
-        elif "gemini" in model_name_lower:
-            return self._generate_with_gemini(frames, formatted_prompt)
-        else:
-            raise ValueError(f"Modello non supportato per la generazione di guide operative: {self.selected_model}")
-
-    def _generate_with_claude(self, frames, system_prompt):
-        self.extractor._init_anthropic_client()
-        if not self.extractor.anthropic_client:
-            raise ConnectionError("Client Anthropic non inizializzato.")
-
-        messages = [{"role": "user", "content": []}]
-        content_list = messages[0]["content"]
-
+        parts = []
         for idx, frame in enumerate(frames):
-            content_list.append({"type": "text", "text": f"Frame {idx + 1}:"})
-            content_list.append({
-                "type": "image",
-                "source": {"type": "base64", "media_type": "image/jpeg", "data": frame["data"]}
-            })
-
-        self.progress.emit(50, "Invio dei fotogrammi a Claude...")
-        response = self.extractor.anthropic_client.messages.create(
-            model=self.selected_model,
+            parts.append(f"Frame {idx + 1}:")
+            parts.append(image_part(frame["data"]))
+
+        self.progress.emit(50, f"Invio dei fotogrammi a {self.selected_model}...")
+        response = get_llm_client().generate(
+            self.selected_model,
+            parts,
+            system=formatted_prompt,
             max_tokens=4096,
-            system=system_prompt,
-            messages=messages
+            name="guida operativa",
         )
-        self.progress.emit(90, "Risposta ricevuta da Claude.")
-        return response.content[0].text.strip()
-
-    def _generate_with_gemini(self, frames, system_prompt):
-        self.extractor._configure_gemini()
-
-        gemini_content = []
-        for idx, frame in enumerate(frames):
-            gemini_content.append(f"Frame {idx + 1}:")
-            try:
-                image_bytes = base64.b64decode(frame["data"])
-                img_part = {"mime_type": "image/jpeg", "data": image_bytes}
-                gemini_content.append(img_part)
-            except Exception as e:
-                logging.error(f"Errore nella decodifica base64 per Gemini: {e}")
-                continue
-
-        # Gemini uses a different way to set the system prompt
-        model = genai.GenerativeModel(self.selected_model, system_instruction=system_prompt)
-
-        self.progress.emit(50, "Invio dei fotogrammi a Gemini...")
-        response = model.generate_content(gemini_content)
-        self.progress.emit(90, "Risposta ricevuta da Gemini.")
-
-        try:
-            return response.text
-        except ValueError:
-            logging.warning(f"Risposta di Gemini bloccata o non valida. Feedback: {response.prompt_feedback}")
-            raise Exception(f"Risposta di Gemini bloccata. Causa: {response.prompt_feedback}")
\ No newline at end of file
+        self.progress.emit(90, f"Risposta ricevuta da {self.selected_model}.")
+        return response.text.strip()
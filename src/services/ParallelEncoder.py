@@ -0,0 +1,280 @@
+# File: src/services/ParallelEncoder.py
+import os
+import bisect
+import shutil
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from src.config import FFMPEG_PATH, FFPROBE_PATH
+from src.services.FFmpegRunner import FFmpegJob, FFmpegError, concat_file_line
+from src.services.MediaInfo import get_media_info
+
+DEFAULT_ENCODER_ARGS = ['-c:v', 'libx264', '-preset', 'medium', '-crf', '23', '-pix_fmt', 'yuv420p']
+DEFAULT_AUDIO_ARGS = ['-c:a', 'aac', '-b:a', '192k']
+MIN_SEGMENT_DURATION = 2.0
+# Intermedio scritto da moviepy prima della codifica a segmenti: veloce, quasi senza
+# perdita e con un keyframe ogni INTERMEDIATE_KEYFRAME_SECONDS per avere punti di taglio
+INTERMEDIATE_VIDEO_PARAMS = ['-crf', '12', '-pix_fmt', 'yuv420p']
+INTERMEDIATE_KEYFRAME_SECONDS = 2
+
+
+def plan_segments(keyframes, duration, num_segments, min_segment_duration=MIN_SEGMENT_DURATION):
+    """
+    Divide la timeline [0, duration] in al massimo `num_segments` intervalli
+    i cui punti di taglio cadono sui keyframe più vicini ai confini ideali.
+
+    Returns:
+        list[tuple[float, float]]: Le coppie (inizio, fine) di ogni segmento.
+    """
+    if duration <= 0:
+        return []
+
+    num_segments = max(1, min(int(num_segments), int(duration // min_segment_duration) or 1))
+    candidates = sorted(k for k in set(keyframes) if min_segment_duration <= k <= duration - min_segment_duration)
+
+    cuts = []
+    for i in range(1, num_segments):
+        if not candidates:
+            break
+        target = duration * i / num_segments
+        pos = bisect.bisect_left(candidates, target)
+        neighbours = candidates[max(0, pos - 1):pos + 1]
+        nearest = min(neighbours, key=lambda k: abs(k - target))
+        if not cuts or nearest - cuts[-1] >= min_segment_duration:
+            cuts.append(nearest)
+
+    bounds = [0.0] + cuts + [float(duration)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+class ParallelSegmentEncoder:
+    """
+    Rendering a segmenti: la timeline viene divisa sui keyframe, ogni segmento
+    viene codificato da un processo ffmpeg dedicato (con le stesse impostazioni
+    dell'encoder) e i segmenti vengono riuniti con il concat demuxer.
+    """
+
+    def __init__(self, num_segments=None, max_workers=None, ffmpeg_path=FFMPEG_PATH, ffprobe_path=FFPROBE_PATH):
+        cpu_count = os.cpu_count() or 2
+        self.max_workers = max(1, max_workers or cpu_count)
+        self.num_segments = max(1, num_segments or self.max_workers)
+        # Ripartisce i core tra i processi per non sovraccaricare la CPU
+        self.threads_per_job = max(1, cpu_count // self.max_workers)
+        self.ffmpeg_path = ffmpeg_path
+        self.media_info = get_media_info(ffprobe_path)
+        self._jobs = set()
+        self._lock = threading.Lock()
+        self._cancelled = False
+
+    def cancel(self):
+        """Interrompe tutti i processi ffmpeg ancora in esecuzione."""
+        with self._lock:
+            self._cancelled = True
+            jobs = list(self._jobs)
+        for job in jobs:
+            job.cancel()
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def encode(self, input_path, output_path, encoder_args=None, video_filters=None,
+               audio_source=None, audio_args=None, audio_filters=None,
+               time_scale=1.0, progress_callback=None):
+        """
+        Codifica `input_path` in `output_path` usando segmenti paralleli.
+
+        La traccia video viene codificata a segmenti; l'audio (da `audio_source`,
+        di default il file di input) viene codificato una sola volta durante
+        l'unione finale, per evitare discontinuità AAC ai confini dei segmenti.
+
+        Args:
+            time_scale (float): Rapporto tra durata di output e di input (es. per setpts).
+            progress_callback (callable): Riceve l'avanzamento complessivo in [0, 1].
+        """
+        encoder_args = encoder_args or DEFAULT_ENCODER_ARGS
+        duration = self.media_info.duration(input_path)
+        keyframes = self.media_info.keyframe_times(input_path)
+        segments = plan_segments(keyframes, duration, self.num_segments)
+        if not segments:
+            raise RuntimeError(f"Impossibile determinare la durata di {input_path}.")
+
+        logging.info(f"Rendering parallelo: {len(segments)} segmenti su {self.max_workers} processi.")
+
+        jobs = []
+        for index, (start, end) in enumerate(segments):
+            is_last = index == len(segments) - 1
+            command = [self.ffmpeg_path, '-y', '-nostdin', '-v', 'error', '-progress', 'pipe:1', '-nostats',
+                       '-ss', f"{start:.6f}"]
+            if not is_last:
+                command.extend(['-t', f"{end - start:.6f}"])
+            command.extend(['-i', input_path, '-map', '0:v:0', '-an'])
+            if video_filters:
+                command.extend(['-filter:v', ",".join(video_filters)])
+            if not is_last:
+                # Evita i frame duplicati in coda al segmento introdotti dal frame rate costante
+                command.extend(['-t', f"{(end - start) * time_scale:.6f}"])
+            command.extend(encoder_args)
+            command.extend(['-threads', str(self.threads_per_job)])
+            jobs.append((command, (end - start) * time_scale))
+
+        work_dir = tempfile.mkdtemp(prefix="genius_segments_")
+        try:
+            segment_paths = self._run_jobs(jobs, work_dir, progress_callback)
+            self._concat(segment_paths, output_path, work_dir,
+                         audio_source=audio_source or input_path,
+                         audio_args=audio_args or DEFAULT_AUDIO_ARGS,
+                         audio_filters=audio_filters)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        if progress_callback:
+            progress_callback(1.0)
+        return output_path
+
+    def encode_clips(self, clip_paths, output_path, target_size, fps,
+                     encoder_args=None, audio_args=None, progress_callback=None):
+        """
+        Normalizza ogni clip (risoluzione, fps, audio) in un processo dedicato e
+        unisce i risultati con il concat demuxer in stream copy.
+        """
+        encoder_args = encoder_args or DEFAULT_ENCODER_ARGS
+        audio_args = audio_args or DEFAULT_AUDIO_ARGS
+        width, height = target_size
+        video_filter = f"scale={width}:{height},setsar=1,fps={fps}"
+
+        jobs = []
+        for clip_path in clip_paths:
+            has_audio = self.media_info.stream(clip_path, 'audio') is not None
+            command = [self.ffmpeg_path, '-y', '-nostdin', '-v', 'error', '-progress', 'pipe:1', '-nostats',
+                       '-i', clip_path]
+            if has_audio:
+                command.extend(['-map', '0:v:0', '-map', '0:a:0'])
+            else:
+                # Traccia silenziosa per mantenere gli stream compatibili con il concat
+                command.extend(['-f', 'lavfi', '-i', 'anullsrc=r=48000:cl=stereo',
+                                '-map', '0:v:0', '-map', '1:a:0', '-shortest'])
+            command.extend(['-filter:v', video_filter])
+            command.extend(encoder_args)
+            command.extend(audio_args)
+            command.extend(['-ar', '48000', '-ac', '2', '-threads', str(self.threads_per_job)])
+            jobs.append((command, self.media_info.duration(clip_path)))
+
+        work_dir = tempfile.mkdtemp(prefix="genius_segments_")
+        try:
+            segment_paths = self._run_jobs(jobs, work_dir, progress_callback)
+            self._concat(segment_paths, output_path, work_dir)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        if progress_callback:
+            progress_callback(1.0)
+        return output_path
+
+    def _run_jobs(self, jobs, work_dir, progress_callback):
+        """Esegue i comandi in parallelo e restituisce i segmenti nell'ordine originale."""
+        segment_paths = [os.path.join(work_dir, f"segment_{i:04d}.mp4") for i in range(len(jobs))]
+        total_duration = sum(max(d, 0.001) for _, d in jobs)
+        done_seconds = [0.0] * len(jobs)
+        progress_lock = threading.Lock()
+
+        def report(index, seconds):
+            if not progress_callback:
+                return
+            with progress_lock:
+                done_seconds[index] = min(seconds, jobs[index][1])
+                fraction = sum(done_seconds) / total_duration
+            progress_callback(min(fraction, 0.99))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._run_ffmpeg, command + [segment_paths[i]], lambda s, i=i: report(i, s)): i
+                for i, (command, _) in enumerate(jobs)
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception:
+                    self.cancel()
+                    raise
+
+        if self._cancelled:
+            raise InterruptedError("Rendering parallelo annullato.")
+        return segment_paths
+
+    def _run_ffmpeg(self, command, on_time=None):
+        def on_progress(stats):
+            if on_time and stats.get('out_time') is not None:
+                on_time(stats['out_time'])
+
+        job = FFmpegJob(command, on_progress=on_progress)
+        with self._lock:
+            if self._cancelled:
+                return
+            self._jobs.add(job)
+        try:
+            job.run()
+        except InterruptedError:
+            return
+        except FFmpegError as e:
+            if self._cancelled:
+                return
+            raise RuntimeError(f"Errore FFmpeg nel segmento: {e.stderr}") from e
+        finally:
+            with self._lock:
+                self._jobs.discard(job)
+
+    def _concat(self, segment_paths, output_path, work_dir, audio_source=None, audio_args=None, audio_filters=None):
+        list_path = os.path.join(work_dir, "segments.txt")
+        with open(list_path, 'w', encoding='utf-8') as f:
+            for path in segment_paths:
+                f.write(concat_file_line(path))
+
+        command = [self.ffmpeg_path, '-y', '-nostdin', '-v', 'error',
+                   '-f', 'concat', '-safe', '0', '-i', list_path]
+        if audio_source:
+            command.extend(['-i', audio_source, '-map', '0:v:0', '-map', '1:a:0?', '-c:v', 'copy'])
+            if audio_filters:
+                command.extend(['-filter:a', ",".join(audio_filters)])
+            command.extend(audio_args or DEFAULT_AUDIO_ARGS)
+        else:
+            command.extend(['-c', 'copy'])
+        command.extend(['-movflags', '+faststart', output_path])
+
+        self._run_ffmpeg(command)
+        if self._cancelled:
+            raise InterruptedError("Rendering parallelo annullato.")
+
+
+def write_clip(clip, output_path, parallel=False, encoder=None, progress_callback=None, **write_kwargs):
+    """
+    Scrive una clip moviepy in `output_path`.
+
+    Senza `parallel` equivale a `clip.write_videofile(output_path, **write_kwargs)`.
+    Con `parallel` moviepy compone i frame in un intermedio a codifica veloce, con
+    keyframe regolari, e la codifica finale è affidata a `encoder`
+    (ParallelSegmentEncoder) a segmenti paralleli; l'audio viene codificato una volta sola.
+    """
+    if not parallel:
+        clip.write_videofile(output_path, **write_kwargs)
+        return output_path
+
+    fps = write_kwargs.get('fps') or getattr(clip, 'fps', None) or 25
+    encoder = encoder or ParallelSegmentEncoder()
+    work_dir = tempfile.mkdtemp(prefix="genius_clip_")
+    try:
+        intermediate_path = os.path.join(work_dir, "intermediate.mkv")
+        clip.write_videofile(
+            intermediate_path, fps=fps, codec='libx264', preset='ultrafast',
+            audio_codec='pcm_s16le', temp_audiofile=os.path.join(work_dir, "audio.wav"),
+            ffmpeg_params=INTERMEDIATE_VIDEO_PARAMS + ['-g', str(max(1, round(fps * INTERMEDIATE_KEYFRAME_SECONDS)))],
+            logger=write_kwargs.get('logger', 'bar')
+        )
+        if encoder.cancelled:
+            raise InterruptedError("Rendering parallelo annullato.")
+        encoder.encode(intermediate_path, output_path, progress_callback=progress_callback)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return output_path
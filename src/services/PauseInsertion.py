@@ -0,0 +1,272 @@
+# File: src/services/PauseInsertion.py
+import os
+import bisect
+import logging
+import shutil
+import tempfile
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from src.config import FFMPEG_PATH
+from src.services.FFmpegRunner import FFmpegJob, concat_file_line
+from src.services.MediaInfo import get_media_info, parse_frame_rate
+
+# Codec per cui i tratti ricodificati possono essere uniti in stream copy a quelli originali
+_SMART_CUT_CODECS = {'h264': 'libx264', 'hevc': 'libx265'}
+
+# Profili riportati da ffprobe e corrispondenti valori di -profile:v degli encoder
+_ENCODER_PROFILES = {
+    'h264': {'Constrained Baseline': 'baseline', 'Baseline': 'baseline', 'Main': 'main', 'High': 'high',
+             'High 10': 'high10', 'High 4:2:2': 'high422', 'High 4:4:4 Predictive': 'high444'},
+    'hevc': {'Main': 'main', 'Main 10': 'main10'},
+}
+
+# Parametri che il GOP ricodificato deve condividere con l'originale per poter essere unito in stream copy
+_SIGNATURE_KEYS = ('codec_name', 'profile', 'width', 'height', 'pix_fmt', 'has_b_frames')
+
+# Scarto massimo ammesso sulla durata finale, in frame
+_DURATION_TOLERANCE_FRAMES = 1.5
+
+
+def stream_signature(video_stream):
+    return tuple(video_stream.get(key) for key in _SIGNATURE_KEYS)
+
+
+def smart_cut_encoder_args(video_stream):
+    """
+    Parametri dell'encoder per ricodificare un GOP in modo compatibile con lo stream
+    originale: stesso codec, profilo, livello, formato pixel e ritardo di riordino dei
+    B-frame (che determina lo scarto tra DTS e PTS ai punti di unione).
+    Restituisce None se il codec non è supportato.
+    """
+    codec = video_stream.get('codec_name')
+    encoder = _SMART_CUT_CODECS.get(codec)
+    if not encoder:
+        return None
+
+    args = ['-c:v', encoder, '-preset', 'medium', '-crf', '18',
+            '-pix_fmt', video_stream.get('pix_fmt') or 'yuv420p']
+    profile = _ENCODER_PROFILES[codec].get(video_stream.get('profile'))
+    if profile:
+        args.extend(['-profile:v', profile])
+
+    reorder_depth = int(video_stream.get('has_b_frames') or 0)
+    if codec == 'h264':
+        level = int(video_stream.get('level') or 0)
+        if level > 0:
+            args.extend(['-level', f"{level / 10:.1f}"])
+        if reorder_depth == 0:
+            args.extend(['-bf', '0'])
+        elif reorder_depth == 1:
+            args.extend(['-x264-params', 'b-pyramid=none'])
+    elif reorder_depth == 0:
+        args.extend(['-x265-params', 'bframes=0'])
+
+    frame_rate = video_stream.get('avg_frame_rate') or video_stream.get('r_frame_rate')
+    if frame_rate and frame_rate != '0/0':
+        args.extend(['-r', frame_rate])
+    time_base = video_stream.get('time_base', '')
+    if time_base.startswith('1/'):
+        args.extend(['-video_track_timescale', time_base[2:]])
+    return args
+
+
+class _FfmpegPauseThread(QThread):
+    progress = pyqtSignal(int, str)
+    completed = pyqtSignal(str)
+    error = pyqtSignal(str)
+
+    def __init__(self, video_path, start_time, pause_duration, output_path, parent=None):
+        super().__init__(parent)
+        self.video_path = video_path
+        self.start_time = max(0.0, float(start_time))
+        self.pause_duration = float(pause_duration)
+        self.output_path = output_path
+        self.ffmpeg_job = None
+        self.running = True
+
+    def stop(self):
+        self.running = False
+        job = self.ffmpeg_job
+        if job:
+            job.cancel()
+
+    def _run_ffmpeg(self, command):
+        if not self.running:
+            raise InterruptedError("Operazione annullata.")
+        self.ffmpeg_job = FFmpegJob(command)
+        try:
+            self.ffmpeg_job.run()
+        finally:
+            self.ffmpeg_job = None
+        if not self.running:
+            raise InterruptedError("Operazione annullata.")
+
+    def run(self):
+        try:
+            if not os.path.exists(self.video_path):
+                self.error.emit(f"File non trovato: {self.video_path}")
+                return
+            if self.pause_duration <= 0:
+                self.error.emit("La durata della pausa deve essere maggiore di zero.")
+                return
+
+            self.insert_pause()
+
+            if self.running:
+                self.progress.emit(100, "Completato")
+                self.completed.emit(self.output_path)
+        except InterruptedError:
+            pass
+        except Exception as e:
+            if self.running:
+                self.error.emit(str(e))
+
+
+class AudioPauseThread(_FfmpegPauseThread):
+    """
+    Inserisce una pausa di silenzio nella traccia audio a `start_time`.
+    Il video viene copiato senza ricodifica e la durata resta quella del video.
+    """
+
+    def insert_pause(self):
+        self.progress.emit(10, "Inserimento pausa audio...")
+        delay_ms = int(round(self.pause_duration * 1000))
+        filter_graph = (
+            f"[0:a]asplit=2[head][tail];"
+            f"[head]atrim=end={self.start_time:.6f}[a1];"
+            f"[tail]atrim=start={self.start_time:.6f},asetpts=PTS-STARTPTS,adelay={delay_ms}:all=1[a2];"
+            f"[a1][a2]concat=n=2:v=0:a=1[aout]"
+        )
+        duration = get_media_info().duration(self.video_path)
+        command = [FFMPEG_PATH, '-y', '-v', 'error', '-i', self.video_path,
+                   '-filter_complex', filter_graph,
+                   '-map', '0:v:0?', '-map', '[aout]',
+                   '-c:v', 'copy', '-c:a', 'aac', '-b:a', '192k']
+        if duration > 0:
+            command.extend(['-t', f"{duration:.6f}"])
+        command.extend(['-movflags', '+faststart', self.output_path])
+        self._run_ffmpeg(command)
+
+
+class FreezeFramePauseThread(_FfmpegPauseThread):
+    """
+    Congela il frame a `start_time` per `pause_duration` secondi.
+
+    Con codec H.264/HEVC viene ricodificato solo il GOP che contiene il punto di
+    pausa (con tpad=stop_mode=clone); i tratti precedente e successivo sono
+    presi in stream copy dal file originale tramite il concat demuxer. L'audio originale è
+    copiato invariato, come nella versione precedente basata su moviepy.
+    Se il GOP ricodificato non è compatibile con l'originale o la durata finale non
+    torna, il video viene ricodificato per intero.
+    """
+
+    def insert_pause(self):
+        media_info = get_media_info()
+        video_stream = media_info.stream(self.video_path, 'video')
+        if video_stream is None:
+            raise ValueError("Il file non contiene una traccia video.")
+
+        duration = media_info.duration(self.video_path)
+        self.start_time = min(self.start_time, duration) if duration > 0 else self.start_time
+        self.frame_rate = parse_frame_rate(video_stream.get('avg_frame_rate') or video_stream.get('r_frame_rate'))
+        # La pausa dura un numero intero di frame, così il tratto finale resta allineato alla griglia dei frame
+        self.pause_duration = max(1, round(self.pause_duration * self.frame_rate)) / self.frame_rate
+
+        encode_args = smart_cut_encoder_args(video_stream)
+        if encode_args and self._smart_cut(video_stream, encode_args, duration):
+            return
+        self._full_render()
+
+    def _freeze_filter_graph(self, offset):
+        """
+        Grafo che congela per la durata della pausa il frame visualizzato a `offset`
+        secondi dall'inizio dell'input (come get_frame di moviepy): il taglio cade a
+        metà tra quel frame e il successivo, così il frame resta nel tratto iniziale.
+        """
+        frame_index = int(offset * self.frame_rate + 1e-6)
+        cut = (frame_index + 0.5) / self.frame_rate
+        return (
+            f"[0:v]split=2[head][tail];"
+            f"[head]trim=end={cut:.6f},setpts=PTS-STARTPTS,"
+            f"tpad=stop_mode=clone:stop_duration={self.pause_duration:.6f}[v1];"
+            f"[tail]trim=start={cut:.6f},setpts=PTS-STARTPTS[v2];"
+            f"[v1][v2]concat=n=2:v=1:a=0[vout]"
+        )
+
+    def _full_render(self):
+        self.progress.emit(10, "Inserimento fermo immagine...")
+        filter_graph = self._freeze_filter_graph(self.start_time)
+        command = [FFMPEG_PATH, '-y', '-v', 'error', '-i', self.video_path,
+                   '-filter_complex', filter_graph,
+                   '-map', '[vout]', '-map', '0:a:0?',
+                   '-c:v', 'libx264', '-preset', 'medium', '-crf', '18', '-pix_fmt', 'yuv420p',
+                   '-c:a', 'copy', '-movflags', '+faststart', self.output_path]
+        self._run_ffmpeg(command)
+
+    def _smart_cut(self, video_stream, encode_args, duration):
+        """
+        Ricodifica solo il GOP della pausa. Restituisce False se il risultato non è
+        compatibile con l'originale (il chiamante ripiega sul rendering completo).
+        """
+        self.progress.emit(5, "Analisi keyframe...")
+        keyframes = get_media_info().keyframe_packets(self.video_path) or [(0.0, 0.0)]
+        index = bisect.bisect_right([pts for pts, _ in keyframes], self.start_time)
+        gop_start, gop_start_dts = keyframes[index - 1] if index > 0 else (0.0, 0.0)
+        gop_end = keyframes[index][0] if index < len(keyframes) else None
+
+        filter_graph = self._freeze_filter_graph(self.start_time - gop_start)
+
+        work_dir = tempfile.mkdtemp(prefix="genius_pause_")
+        try:
+            # Solo il GOP che contiene il punto di pausa viene ricodificato
+            self.progress.emit(20, "Ricodifica del GOP con il fermo immagine...")
+            middle = os.path.join(work_dir, "middle.mp4")
+            command = [FFMPEG_PATH, '-y', '-v', 'error', '-ss', f"{gop_start:.6f}"]
+            if gop_end is not None:
+                command.extend(['-t', f"{gop_end - gop_start:.6f}"])
+            command.extend(['-i', self.video_path, '-filter_complex', filter_graph, '-map', '[vout]'])
+            self._run_ffmpeg(command + encode_args + [middle])
+
+            middle_stream = self._video_stream(middle)
+            if stream_signature(middle_stream) != stream_signature(video_stream):
+                logging.warning(f"GOP ricodificato non compatibile con l'originale ({stream_signature(middle_stream)} "
+                                f"invece di {stream_signature(video_stream)}): rendering completo.")
+                return False
+
+            # I tratti prima e dopo il GOP sono letti dal file originale in stream copy.
+            # L'outpoint del concat demuxer è espresso in DTS, quindi si usa il DTS del keyframe;
+            # la durata esplicita fa partire il tratto successivo dal PTS del keyframe e non dal DTS
+            middle_duration = (gop_end if gop_end is not None else duration) - gop_start + self.pause_duration
+            entries = []
+            if gop_start > 0:
+                entries.append(f"{concat_file_line(self.video_path)}outpoint {gop_start_dts:.6f}\n"
+                               f"duration {gop_start:.6f}\n")
+            entries.append(f"{concat_file_line(middle)}duration {middle_duration:.6f}\n")
+            if gop_end is not None and gop_end < duration:
+                entries.append(f"{concat_file_line(self.video_path)}inpoint {gop_end:.6f}\n")
+
+            list_path = os.path.join(work_dir, "parts.txt")
+            with open(list_path, 'w', encoding='utf-8') as f:
+                f.writelines(entries)
+
+            self.progress.emit(80, "Unione dei tratti in stream copy...")
+            self._run_ffmpeg([FFMPEG_PATH, '-y', '-v', 'error', '-f', 'concat', '-safe', '0', '-i', list_path,
+                              '-i', self.video_path, '-map', '0:v:0', '-map', '1:a:0?',
+                              '-c', 'copy', '-movflags', '+faststart', self.output_path])
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        expected = duration + self.pause_duration
+        actual = float(self._video_stream(self.output_path).get('duration') or 0)
+        if duration > 0 and abs(actual - expected) > _DURATION_TOLERANCE_FRAMES / self.frame_rate:
+            logging.warning(f"Durata dopo l'unione in stream copy {actual:.3f}s invece di {expected:.3f}s: "
+                            f"rendering completo.")
+            return False
+        return True
+
+    @staticmethod
+    def _video_stream(path):
+        # File appena scritti: la voce in cache di un'eventuale versione precedente non vale più
+        media_info = get_media_info()
+        media_info.invalidate(path)
+        return media_info.stream(path, 'video') or {}
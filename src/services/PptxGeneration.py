@@ -1,10 +1,14 @@
 # File: src/services/PptxGeneration.py
 
-import anthropic
-import google.generativeai as genai
+import io
+import math
+import hashlib
 import requests
 import json
 import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from PyQt6.QtWidgets import QFileDialog, QMessageBox, QDialog, QVBoxLayout, QLabel, QPushButton, QHBoxLayout, QApplication
 from PyQt6.QtCore import Qt
 from pptx import Presentation
@@ -20,13 +24,26 @@ from dotenv import load_dotenv
 
 # Importa la configurazione delle azioni e le chiavi/endpoint necessari
 from src.config import (
-    get_api_key, get_model_for_action, get_ollama_endpoint,
+    get_model_for_action, get_ollama_endpoint,
     PROMPT_PPTX_GENERATION # Assicurati che questo percorso sia corretto e il file esista
 )
-from src.services.utils import _call_ollama_api
+from src.services.LLMClient import get_llm_client, provider_for_model, PROVIDER_CONCURRENCY
+from src.services.TextChunking import chunk_text, estimate_tokens
 
 load_dotenv() # Carica .env se necessario
 
+# Oltre LARGE_DECK_SLIDES slide il testo sorgente è diviso in parti di circa SLIDES_PER_PART
+# slide ciascuna, generate in parallelo e poi unite nell'ordine originale
+LARGE_DECK_SLIDES = 12
+SLIDES_PER_PART = 6
+
+# Presentazioni già costruite (anteprima e salvataggio dello stesso testo non la ricostruiscono)
+DECK_CACHE_SIZE = 4
+
+_template_cache = {}
+_deck_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
 class PptxGeneration:
     """
     Classe statica per gestire la generazione di presentazioni PowerPoint
@@ -110,7 +127,7 @@ class PptxGeneration:
         selected_model = get_model_for_action('pptx_generation')
         logging.info(f"Generazione PPTX: Utilizzo del modello '{selected_model}'")
 
-        # 2. Leggi e formatta il prompt
+        # 2. Leggi il prompt
         try:
             with open(PROMPT_PPTX_GENERATION, 'r', encoding='utf-8') as f:
                 prompt_template = f.read()
@@ -124,6 +141,12 @@ class PptxGeneration:
             f"Crea una presentazione personalizzata per {company_name} basata sull'argomento fornito."
             if company_name else ""
         )
+
+        # 3. Presentazioni lunghe: una richiesta per parte del testo, in parallelo
+        parts = PptxGeneration._split_for_slides(testo, num_slide)
+        if len(parts) > 1:
+            return PptxGeneration._generate_parts(selected_model, prompt_template, parts, language, company_info)
+
         try:
             system_prompt_content = prompt_template.format(
                 num_slide=num_slide,
@@ -135,89 +158,23 @@ class PptxGeneration:
              return f"Errore nel template del prompt: chiave '{e}' mancante."
 
         user_prompt = f"Testo sorgente:\n{testo}\n\n---\nGenera la struttura della presentazione come richiesto." # Input principale per l'LLM
+        return PptxGeneration._request_slide_text(selected_model, system_prompt_content, user_prompt)
 
-        # 3. Selezione e chiamata API
-        model_name_lower = selected_model.lower()
-
+    @staticmethod
+    def _request_slide_text(selected_model, system_prompt_content, user_prompt, name="testo presentazione"):
+        """Chiamata API attraverso il client condiviso; (testo, input_tokens, output_tokens) o stringa di errore."""
         try:
-            if "ollama:" in model_name_lower:
-                logging.info(f"Chiamata API Ollama: {selected_model}")
-                ollama_model_name = selected_model.split(":", 1)[1]
-
-                result_text = _call_ollama_api(
-                    ollama_model_name,
-                    system_prompt_content,
-                    user_prompt
-                )
-                logging.info("Risposta ricevuta da Ollama.")
-                return result_text, 0, 0
-
-            elif "gemini" in model_name_lower:
-                # --- Logica per Google Gemini ---
-                logging.info(f"Chiamata API Gemini: {selected_model}")
-                google_api_key = get_api_key('google')
-                if not google_api_key: raise ValueError("API Key Google non configurata.")
-                genai.configure(api_key=google_api_key)
-                model = genai.GenerativeModel(selected_model, system_instruction=system_prompt_content) # Usa system instruction
-                response = model.generate_content(user_prompt) # Passa solo lo user prompt
-                # Aggiungi gestione errori risposta Gemini se necessario (es. blocco per safety)
-                try:
-                    result_text = response.text
-                except ValueError as ve:
-                     # Potrebbe essere bloccato per safety
-                     logging.warning(f"Possibile blocco risposta Gemini: {ve}. Dettagli: {response.prompt_feedback}")
-                     raise Exception(f"Risposta da Gemini bloccata o non valida. Causa: {response.prompt_feedback}")
-
-                logging.info("Risposta ricevuta da Gemini.")
-                return result_text, 0, 0 # Token non disponibili facilmente
-
-            elif "claude" in model_name_lower:
-                # --- Logica per Anthropic Claude ---
-                logging.info(f"Chiamata API Claude: {selected_model}")
-                anthropic_api_key = get_api_key('anthropic')
-                if not anthropic_api_key: raise ValueError("API Key Anthropic non configurata.")
-                client = anthropic.Anthropic(api_key=anthropic_api_key)
-                message = client.messages.create(
-                    model=selected_model,
-                    max_tokens=4096,
-                    temperature=0.7,
-                    system=system_prompt_content,
-                    messages=[{"role": "user", "content": [{"type": "text", "text": user_prompt}]}]
-                )
-                # Aggiungi controllo sul motivo di stop
-                if message.stop_reason == 'max_tokens':
-                     logging.warning("Risposta Claude troncata per max_tokens.")
-
-                testo_resultante = message.content[0].text
-                input_tokens = message.usage.input_tokens
-                output_tokens = message.usage.output_tokens
-                logging.info("Risposta ricevuta da Claude.")
-                return testo_resultante, input_tokens, output_tokens
-
-            # elif "gpt" in model_name_lower:
-                # --- Logica per OpenAI (Esempio) ---
-                # logging.info(f"Chiamata API OpenAI: {selected_model}")
-                # if not OPENAI_API_KEY: raise ValueError("API Key OpenAI non configurata.")
-                # from openai import OpenAI
-                # client = OpenAI(api_key=OPENAI_API_KEY)
-                # response = client.chat.completions.create(
-                #     model=selected_model,
-                #     messages=[
-                #         {"role": "system", "content": system_prompt_content},
-                #         {"role": "user", "content": user_prompt}
-                #     ],
-                #     temperature=0.7,
-                #     max_tokens=4000
-                # )
-                # testo_resultante = response.choices[0].message.content
-                # input_tokens = response.usage.prompt_tokens
-                # output_tokens = response.usage.completion_tokens
-                # logging.info("Risposta ricevuta da OpenAI.")
-                # return testo_resultante, input_tokens, output_tokens
-
-            else:
-                logging.error(f"Modello '{selected_model}' non gestito per PPTX.")
-                return f"Errore: Modello '{selected_model}' non supportato."
+            logging.info(f"Chiamata API {selected_model} per PPTX")
+            response = get_llm_client().generate(
+                selected_model,
+                user_prompt,
+                system=system_prompt_content,
+                max_tokens=4096,
+                temperature=0.7,
+                name=name,
+            )
+            logging.info(f"Risposta ricevuta da {selected_model}.")
+            return response.text, response.input_tokens, response.output_tokens
 
         except requests.exceptions.ConnectionError:
              endpoint = get_ollama_endpoint()
@@ -230,6 +187,60 @@ class PptxGeneration:
              logging.exception(f"Errore API durante la generazione del testo per PPTX con {selected_model}")
              return f"Errore API ({type(e).__name__}): {str(e)}"
 
+    @staticmethod
+    def _split_for_slides(testo, num_slide):
+        """
+        Parti del testo sorgente con il numero di slide assegnato a ciascuna, in proporzione
+        alla lunghezza. Le parti seguono i confini tra le clip; sotto LARGE_DECK_SLIDES slide
+        (o se il testo non si divide) si ottiene un'unica parte.
+        """
+        if not num_slide or num_slide < LARGE_DECK_SLIDES:
+            return [(testo, num_slide)]
+        target_parts = math.ceil(num_slide / SLIDES_PER_PART)
+        chunks = chunk_text(testo, max(1, math.ceil(estimate_tokens(testo) / target_parts)), pack_sections=True)
+        if len(chunks) < 2 or len(chunks) > num_slide:
+            return [(testo, num_slide)]
+
+        # Almeno una slide per parte, le restanti col metodo dei resti più grandi
+        weights = [estimate_tokens(chunk) for chunk in chunks]
+        spare = num_slide - len(chunks)
+        shares = [spare * weight / sum(weights) for weight in weights]
+        counts = [1 + int(share) for share in shares]
+        by_remainder = sorted(range(len(chunks)), key=lambda i: shares[i] - int(shares[i]), reverse=True)
+        for i in by_remainder[:num_slide - sum(counts)]:
+            counts[i] += 1
+        return list(zip(chunks, counts))
+
+    @staticmethod
+    def _generate_parts(selected_model, prompt_template, parts, language, company_info):
+        """Genera le slide di ogni parte in parallelo (entro il limite del provider) e le unisce nell'ordine."""
+        try:
+            provider, _ = provider_for_model(selected_model)
+            requests_args = []
+            for index, (part_text, part_slides) in enumerate(parts, start=1):
+                system_prompt_content = prompt_template.format(
+                    num_slide=part_slides, language=language, company_info=company_info
+                )
+                user_prompt = (f"Testo sorgente (parte {index} di {len(parts)} della presentazione):\n{part_text}"
+                               f"\n\n---\nGenera la struttura delle slide di questa parte come richiesto.")
+                requests_args.append((selected_model, system_prompt_content, user_prompt, f"testo presentazione {index}/{len(parts)}"))
+        except KeyError as e:
+            logging.error(f"Errore nella formattazione del prompt PPTX. Chiave mancante: {e}")
+            return f"Errore nel template del prompt: chiave '{e}' mancante."
+        except ValueError as e:
+            return str(e)
+
+        logging.info(f"Generazione PPTX in {len(parts)} parti ({[count for _, count in parts]} slide).")
+        with ThreadPoolExecutor(max_workers=min(len(parts), PROVIDER_CONCURRENCY.get(provider, 1))) as executor:
+            results = list(executor.map(lambda args: PptxGeneration._request_slide_text(*args), requests_args))
+
+        for result in results:
+            if not isinstance(result, tuple):
+                return result
+        return ("\n\n".join(text.strip() for text, _, _ in results),
+                sum(input_tokens for _, input_tokens, _ in results),
+                sum(output_tokens for _, _, output_tokens in results))
+
 
     @staticmethod
     def creaPresentazione(parent, transcriptionTextArea, num_slide, company_name, language, template_path=None):
@@ -316,93 +327,148 @@ class PptxGeneration:
         return slides_data
 
     @staticmethod
-    def createPresentationFromText(parent, testo, output_file, template_path=None, num_slides=None, is_preview=False):
-        """Crea il file .pptx dal testo strutturato generato dall'AI, usando un approccio robusto per i layout."""
-        logging.info(f"Tentativo di creare file PPTX: {output_file} con template: {template_path}")
-        try:
-            if template_path and os.path.exists(template_path):
-                prs = Presentation(template_path)
-                # Rimuovi tutte le slide esistenti dal template
-                for i in range(len(prs.slides) - 1, -1, -1):
-                    rId = prs.slides._sldIdLst[i].rId
-                    prs.part.drop_rel(rId)
-                    del prs.slides._sldIdLst[i]
-            else:
-                prs = Presentation()
-
-            title_slide_layout = PptxGeneration._find_layout_by_placeholder_types(prs, PP_PLACEHOLDER.TITLE)
-            content_slide_layout = PptxGeneration._find_layout_by_placeholder_types(prs, PP_PLACEHOLDER.TITLE, PP_PLACEHOLDER.BODY)
-
-            if not content_slide_layout:
-                if parent:
-                    QMessageBox.critical(parent, "Errore Template", "Impossibile trovare un layout 'Titolo e Contenuto' adeguato nel template.")
-                return
-            if not title_slide_layout:
-                logging.warning("Nessun layout solo titolo trovato, userò 'Titolo e Contenuto' come fallback.")
-                title_slide_layout = content_slide_layout
+    def _template_key(template_path):
+        if not template_path or not os.path.exists(template_path):
+            return None
+        stat = os.stat(template_path)
+        return (os.path.normcase(os.path.abspath(template_path)), stat.st_size, stat.st_mtime_ns)
 
-            clean_text = re.sub(r'\*\*(Titolo|Sottotitolo|Contenuto)\*\*:', r'\1:', testo, flags=re.IGNORECASE)
-            slide_blocks = re.split(r'\n(?=Titolo:)', clean_text.strip(), flags=re.IGNORECASE)
+    @staticmethod
+    def _load_template(template_path):
+        """
+        Template senza slide (come bytes) e indici dei layout titolo e titolo/contenuto.
+        Il file viene letto e i layout analizzati una sola volta finché il template non cambia.
+        """
+        key = PptxGeneration._template_key(template_path)
+        with _cache_lock:
+            if key in _template_cache:
+                return _template_cache[key]
+
+        if key:
+            prs = Presentation(template_path)
+            # Rimuovi tutte le slide esistenti dal template
+            for i in range(len(prs.slides) - 1, -1, -1):
+                rId = prs.slides._sldIdLst[i].rId
+                prs.part.drop_rel(rId)
+                del prs.slides._sldIdLst[i]
+        else:
+            prs = Presentation()
+
+        title_layout = PptxGeneration._find_layout_by_placeholder_types(prs, PP_PLACEHOLDER.TITLE)
+        content_layout = PptxGeneration._find_layout_by_placeholder_types(prs, PP_PLACEHOLDER.TITLE, PP_PLACEHOLDER.BODY)
+        buffer = io.BytesIO()
+        prs.save(buffer)
+        template = {
+            'data': buffer.getvalue(),
+            'title_layout': prs.slide_layouts.index(title_layout) if title_layout is not None else None,
+            'content_layout': prs.slide_layouts.index(content_layout) if content_layout is not None else None,
+        }
+        with _cache_lock:
+            _template_cache[key] = template
+        return template
 
-            slides_data = []
-            for block in slide_blocks:
-                if not block.strip():
-                    continue
+    @staticmethod
+    def parse_slides(testo):
+        """Slide ({'titolo', 'sottotitolo', 'contenuto'}) dal testo strutturato generato dall'AI."""
+        clean_text = re.sub(r'\*\*(Titolo|Sottotitolo|Contenuto)\*\*:', r'\1:', testo, flags=re.IGNORECASE)
+        slide_blocks = re.split(r'\n(?=Titolo:)', clean_text.strip(), flags=re.IGNORECASE)
+
+        slides_data = []
+        for block in slide_blocks:
+            if not block.strip():
+                continue
 
-                titolo_match = re.search(r'Titolo:\s*(.*)', block, re.IGNORECASE)
-                sottotitolo_match = re.search(r'Sottotitolo:\s*(.*)', block, re.IGNORECASE)
-                contenuto_match = re.search(r'Contenuto:\s*((.|\n)*)', block, re.IGNORECASE)
+            titolo_match = re.search(r'Titolo:\s*(.*)', block, re.IGNORECASE)
+            sottotitolo_match = re.search(r'Sottotitolo:\s*(.*)', block, re.IGNORECASE)
+            contenuto_match = re.search(r'Contenuto:\s*((.|\n)*)', block, re.IGNORECASE)
 
-                titolo = titolo_match.group(1).strip() if titolo_match else ''
-                sottotitolo = sottotitolo_match.group(1).strip() if sottotitolo_match else ''
-                contenuto = contenuto_match.group(1).strip() if contenuto_match else ''
+            titolo = titolo_match.group(1).strip() if titolo_match else ''
+            sottotitolo = sottotitolo_match.group(1).strip() if sottotitolo_match else ''
+            contenuto = contenuto_match.group(1).strip() if contenuto_match else ''
 
-                if titolo:
-                    slides_data.append({
-                        'titolo': titolo,
-                        'sottotitolo': sottotitolo,
-                        'contenuto': contenuto
-                    })
+            if titolo:
+                slides_data.append({
+                    'titolo': titolo,
+                    'sottotitolo': sottotitolo,
+                    'contenuto': contenuto
+                })
+        return slides_data
 
-            if not slides_data:
-                if hasattr(parent, 'show_status_message'):
-                    parent.show_status_message("Impossibile estrarre dati strutturati dal testo dell'AI.", error=True)
-                return
+    @staticmethod
+    def _fill_slide(slide, slide_data):
+        if slide.shapes.title:
+            slide.shapes.title.text = slide_data.get('titolo', '').strip()
+        subtitle_shape = PptxGeneration._find_placeholder(slide, PP_PLACEHOLDER.SUBTITLE)
+        if subtitle_shape and slide_data.get('sottotitolo'):
+            subtitle_shape.text = slide_data.get('sottotitolo', '').strip()
+        if slide_data.get('contenuto'):
+            PptxGeneration._add_content_to_slide(slide, slide_data.get('contenuto', '').strip())
 
-            if num_slides is not None:
-                slides_data = PptxGeneration._truncate_slides(slides_data, num_slides)
+    @staticmethod
+    def _build_deck(template, slides_data):
+        """File .pptx (bytes) con le slide indicate, a partire dal template in cache."""
+        prs = Presentation(io.BytesIO(template['data']))
+        content_slide_layout = prs.slide_layouts[template['content_layout']]
+        title_slide_layout = content_slide_layout
+        if template['title_layout'] is not None:
+            title_slide_layout = prs.slide_layouts[template['title_layout']]
+
+        first_slide_data = slides_data[0]
+        layout_per_prima_slide = content_slide_layout if first_slide_data.get('contenuto', '').strip() else title_slide_layout
+        PptxGeneration._fill_slide(prs.slides.add_slide(layout_per_prima_slide), first_slide_data)
+        for slide_data in slides_data[1:]:
+            PptxGeneration._fill_slide(prs.slides.add_slide(content_slide_layout), slide_data)
+
+        buffer = io.BytesIO()
+        prs.save(buffer)
+        return buffer.getvalue()
 
-            if not slides_data:
+    @staticmethod
+    def createPresentationFromText(parent, testo, output_file, template_path=None, num_slides=None, is_preview=False):
+        """Crea il file .pptx dal testo strutturato generato dall'AI, usando un approccio robusto per i layout."""
+        logging.info(f"Tentativo di creare file PPTX: {output_file} con template: {template_path}")
+        try:
+            template = PptxGeneration._load_template(template_path)
+            if template['content_layout'] is None:
+                if parent:
+                    QMessageBox.critical(parent, "Errore Template", "Impossibile trovare un layout 'Titolo e Contenuto' adeguato nel template.")
                 return
+            if template['title_layout'] is None:
+                logging.warning("Nessun layout solo titolo trovato, userò 'Titolo e Contenuto' come fallback.")
 
-            first_slide_data = slides_data.pop(0)
-            layout_per_prima_slide = content_slide_layout if first_slide_data.get('contenuto', '').strip() else title_slide_layout
-            slide = prs.slides.add_slide(layout_per_prima_slide)
-
-            if slide.shapes.title:
-                slide.shapes.title.text = first_slide_data.get('titolo', '').strip()
-            subtitle_shape = PptxGeneration._find_placeholder(slide, PP_PLACEHOLDER.SUBTITLE)
-            if subtitle_shape and first_slide_data.get('sottotitolo'):
-                subtitle_shape.text = first_slide_data.get('sottotitolo', '').strip()
-            if first_slide_data.get('contenuto'):
-                PptxGeneration._add_content_to_slide(slide, first_slide_data.get('contenuto', '').strip())
-
-            for slide_data in slides_data:
-                slide = prs.slides.add_slide(content_slide_layout)
-                if slide.shapes.title:
-                    slide.shapes.title.text = slide_data.get('titolo', '').strip()
-                subtitle_shape = PptxGeneration._find_placeholder(slide, PP_PLACEHOLDER.SUBTITLE)
-                if subtitle_shape and slide_data.get('sottotitolo'):
-                    subtitle_shape.text = slide_data.get('sottotitolo', '').strip()
-                if slide_data.get('contenuto'):
-                    PptxGeneration._add_content_to_slide(slide, slide_data.get('contenuto', '').strip())
-
-            if prs.slides:
-                prs.save(output_file)
-                logging.info(f"Presentazione salvata con successo: {output_file}")
-                # La notifica e l'apertura del file sono gestite dal thread
+            # Anteprima e salvataggio dello stesso testo usano la stessa presentazione già costruita
+            deck_key = (hashlib.sha256(testo.encode('utf-8')).hexdigest(),
+                        PptxGeneration._template_key(template_path), num_slides)
+            with _cache_lock:
+                deck = _deck_cache.get(deck_key)
+                if deck is not None:
+                    _deck_cache.move_to_end(deck_key)
+
+            if deck is None:
+                slides_data = PptxGeneration.parse_slides(testo)
+                if not slides_data:
+                    if hasattr(parent, 'show_status_message'):
+                        parent.show_status_message("Impossibile estrarre dati strutturati dal testo dell'AI.", error=True)
+                    return
+
+                if num_slides is not None:
+                    slides_data = PptxGeneration._truncate_slides(slides_data, num_slides)
+
+                if not slides_data:
+                    return
+
+                deck = PptxGeneration._build_deck(template, slides_data)
+                with _cache_lock:
+                    _deck_cache[deck_key] = deck
+                    while len(_deck_cache) > DECK_CACHE_SIZE:
+                        _deck_cache.popitem(last=False)
             else:
-                logging.warning("Nessuna slide è stata generata.")
+                logging.info("Presentazione già costruita per questo testo: riuso.")
+
+            with open(output_file, 'wb') as f:
+                f.write(deck)
+            logging.info(f"Presentazione salvata con successo: {output_file}")
+            # La notifica e l'apertura del file sono gestite dal thread
 
         except Exception as e:
             logging.exception("Errore durante la creazione del file PPTX")
@@ -1,7 +1,5 @@
 # File: src/services/ProcessTextAI.py
 
-import anthropic
-import google.generativeai as genai
 import requests
 import json
 import logging
@@ -11,12 +9,18 @@ from dotenv import load_dotenv
 
 # Importa la configurazione delle azioni e le chiavi/endpoint necessari
 from src.config import (
-    get_api_key, get_model_for_action, get_ollama_endpoint,
+    get_model_for_action, get_ollama_endpoint,
     PROMPT_TEXT_SUMMARY, PROMPT_TEXT_FIX, PROMPT_YOUTUBE_SUMMARY, PROMPT_VIDEO_INTEGRATION,
     PROMPT_COMBINED_ANALYSIS, PROMPT_COMBINED_SUMMARY_TEXT_ONLY, PROMPT_GENERATE_FILENAME,
     PROMPT_DOCUMENT_INTEGRATION, PROMPT_CHAT_SUMMARY
 )
-from src.services.utils import _call_ollama_api
+from src.services.LLMClient import get_llm_client, provider_for_model, TextStreamBuffer
+from src.services.ResponseCache import get_response_cache, response_cache_enabled, CACHEABLE_MODES
+from src.services.TextChunking import needs_chunking, condense_text
+from src.services.ChatRetrieval import build_chat_context
+
+# Modalità di riassunto che, su testi troppo lunghi, riassumono prima i blocchi e poi i riassunti parziali
+MAP_REDUCE_MODES = ("summary", "youtube_summary", "combined_summary_text_only")
 
 load_dotenv()
 
@@ -26,10 +30,11 @@ class ProcessTextAI(QThread):
     Supporta diverse modalità come riassunto, correzione e integrazione video.
     """
     progress = pyqtSignal(int, str)
+    partial_text = pyqtSignal(str)  # Frammenti della risposta in streaming
     completed = pyqtSignal(str)
     error = pyqtSignal(str)
 
-    def __init__(self, mode, language, prompt_vars, parent=None):
+    def __init__(self, mode, language, prompt_vars, parent=None, use_cache=None):
         """
         Inizializza il thread.
 
@@ -39,11 +44,14 @@ class ProcessTextAI(QThread):
             prompt_vars (dict): Un dizionario con le variabili da inserire nel prompt.
                                 Esempio: {'text': 'Il mio testo...', 'current_summary': '...'}
             parent (QObject, optional): Il parent Qt. Defaults to None.
+            use_cache (bool, optional): riusa le risposte memorizzate per le modalità deterministiche.
+                                        Defaults to None (segue l'impostazione dell'applicazione).
         """
         super().__init__(parent)
         self.language = language
         self.prompt_vars = prompt_vars
         self.result = None
+        self.use_cache = response_cache_enabled() if use_cache is None else use_cache
 
         # Valida la modalità
         valid_modes = ["summary", "fix", "youtube_summary", "video_integration", "combined_summary", "combined_summary_text_only", "generate_filename", "document_integration", "chat_summary"]
@@ -56,8 +64,6 @@ class ProcessTextAI(QThread):
             self.selected_model = get_model_for_action('chat')
         else:
             self.selected_model = get_model_for_action('text_processing')
-        self.anthropic_api_key = get_api_key('anthropic')
-        self.google_api_key = get_api_key('google')
 
         logging.info(f"ProcessTextAI ({self.mode}) inizializzato con modello: {self.selected_model}")
 
@@ -88,140 +94,153 @@ class ProcessTextAI(QThread):
 
     def _process_text_with_selected_model(self):
         """
-        Metodo interno che seleziona l'API corretta e processa il testo.
+        Elabora il testo con il modello selezionato, inoltrando avanzamento e streaming ai segnali del thread.
         Restituisce una tupla (testo_risultante, input_tokens, output_tokens) o una stringa di errore.
         """
-        # 1. Scegli il file del prompt corretto in base alla modalità
-        if self.mode == "summary":
-            prompt_file_path = PROMPT_TEXT_SUMMARY
-        elif self.mode == "fix":
-            prompt_file_path = PROMPT_TEXT_FIX
-        elif self.mode == "youtube_summary":
-            prompt_file_path = PROMPT_YOUTUBE_SUMMARY
-        elif self.mode == "video_integration":
-            prompt_file_path = PROMPT_VIDEO_INTEGRATION
-        elif self.mode == "combined_summary":
-            prompt_file_path = PROMPT_COMBINED_ANALYSIS
-        elif self.mode == "combined_summary_text_only":
-            prompt_file_path = PROMPT_COMBINED_SUMMARY_TEXT_ONLY
-        elif self.mode == "generate_filename":
-            prompt_file_path = PROMPT_GENERATE_FILENAME
-        elif self.mode == "document_integration":
-            prompt_file_path = PROMPT_DOCUMENT_INTEGRATION
-        elif self.mode == "chat_summary":
-            prompt_file_path = PROMPT_CHAT_SUMMARY
-        else:
-            error_msg = f"Modalità non valida: {self.mode}"
-            logging.error(error_msg)
-            return error_msg
+        # Streaming solo se qualcuno mostra il testo man mano che arriva
+        on_text = self.partial_text.emit if self.receivers(self.partial_text) > 0 else None
+        return process_text(self.mode, self.language, self.prompt_vars, self.selected_model,
+                            use_cache=self.use_cache, progress=self.progress.emit, on_text=on_text)
 
-        if not prompt_file_path or not os.path.exists(prompt_file_path):
-             error_msg = f"File prompt non trovato per la modalità '{self.mode}': {prompt_file_path}"
-             logging.error(error_msg)
-             return error_msg
 
-        # 2. Leggi e formatta il prompt
-        try:
-            with open(prompt_file_path, 'r', encoding='utf-8') as f:
-                prompt_template = f.read()
-
-            # Logica di formattazione condizionale
-            if self.mode in ["video_integration", "combined_summary", "document_integration", "chat_summary"]:
-                # Queste modalità usano un template completo con più variabili
-                format_data = self.prompt_vars.copy()
-                format_data['language'] = self.language
-                system_prompt_content = prompt_template.format(**format_data)
-                user_prompt = "Procedi con la generazione del contenuto come da istruzioni."
-            else:
-                # Le altre modalità hanno un template semplice e una singola variabile 'text'
-                if self.mode == "combined_summary_text_only":
-                    system_prompt_content = prompt_template.format(language=self.language, text=self.prompt_vars.get('text', ''))
-                    user_prompt = "Procedi con la generazione del riassunto come da istruzioni."
-                else:
-                    system_prompt_content = prompt_template.format(language=self.language)
-                    if 'text' not in self.prompt_vars:
-                        raise ValueError(f"La modalità '{self.mode}' richiede una variabile 'text' in prompt_vars.")
-                    text_to_process = self.prompt_vars['text']
-                    user_prompt = f"Testo da elaborare ({self.mode}):\n{text_to_process}\n\n---\nOutput:"
+def _format_text_prompts(mode, language, prompt_template, text):
+    """Prompt di sistema e utente per le modalità con la sola variabile 'text'."""
+    if mode == "combined_summary_text_only":
+        return (prompt_template.format(language=language, text=text),
+                "Procedi con la generazione del riassunto come da istruzioni.")
+    return (prompt_template.format(language=language),
+            f"Testo da elaborare ({mode}):\n{text}\n\n---\nOutput:")
 
-        except Exception as e:
-            logging.exception(f"Errore lettura/formattazione prompt '{prompt_file_path}'")
-            return f"Errore lettura prompt ({self.mode}): {e}"
 
-        # 3. Selezione e chiamata API
-        model_name_lower = self.selected_model.lower()
-        logging.debug(f"Tentativo elaborazione testo ({self.mode}) con modello: {self.selected_model}")
+def process_text(mode, language, prompt_vars, model, use_cache=True, progress=None, on_text=None):
+    """
+    Elabora il testo nella modalità indicata con `model`. Usata dal thread ProcessTextAI
+    e, senza segnali Qt, dai lavori in parallelo (es. il riassunto multiplo delle clip).
 
+    `progress(percentuale, messaggio)` riceve l'avanzamento e `on_text` i frammenti della
+    risposta in streaming. Restituisce una tupla (testo_risultante, input_tokens,
+    output_tokens) o una stringa di errore.
+    """
+    progress = progress or (lambda value, message: None)
+
+    # 1. Scegli il file del prompt corretto in base alla modalità
+    if mode == "summary":
+        prompt_file_path = PROMPT_TEXT_SUMMARY
+    elif mode == "fix":
+        prompt_file_path = PROMPT_TEXT_FIX
+    elif mode == "youtube_summary":
+        prompt_file_path = PROMPT_YOUTUBE_SUMMARY
+    elif mode == "video_integration":
+        prompt_file_path = PROMPT_VIDEO_INTEGRATION
+    elif mode == "combined_summary":
+        prompt_file_path = PROMPT_COMBINED_ANALYSIS
+    elif mode == "combined_summary_text_only":
+        prompt_file_path = PROMPT_COMBINED_SUMMARY_TEXT_ONLY
+    elif mode == "generate_filename":
+        prompt_file_path = PROMPT_GENERATE_FILENAME
+    elif mode == "document_integration":
+        prompt_file_path = PROMPT_DOCUMENT_INTEGRATION
+    elif mode == "chat_summary":
+        prompt_file_path = PROMPT_CHAT_SUMMARY
+    else:
+        error_msg = f"Modalità non valida: {mode}"
+        logging.error(error_msg)
+        return error_msg
+
+    if not prompt_file_path or not os.path.exists(prompt_file_path):
+        error_msg = f"File prompt non trovato per la modalità '{mode}': {prompt_file_path}"
+        logging.error(error_msg)
+        return error_msg
+
+    # La chat riceve solo i passaggi pertinenti alla domanda, dal testo aperto e dal progetto
+    if mode == "chat_summary":
         try:
-            if "ollama:" in model_name_lower:
-                logging.info(f"Usando Ollama ({self.selected_model}) per {self.mode}.")
-                self.progress.emit(30, f"Invio a Ollama ({self.mode})...")
-                ollama_model_name = self.selected_model.split(":", 1)[1]
-
-                result_text = _call_ollama_api(
-                    ollama_model_name,
-                    system_prompt_content,
-                    user_prompt
-                )
-                self.progress.emit(80, f"Ricevuta risposta da Ollama ({self.mode})...")
-                logging.info(f"Ollama ({self.mode}) completato.")
-                return result_text, 0, 0
-
-            elif "gemini" in model_name_lower:
-                # --- Logica per Google Gemini ---
-                logging.info(f"Usando Gemini ({self.selected_model}) per {self.mode}.")
-                if not self.google_api_key: raise ValueError("API Key Google non configurata.")
-                self.progress.emit(30, f"Invio a Gemini ({self.mode})...")
-                genai.configure(api_key=self.google_api_key)
-                model = genai.GenerativeModel(self.selected_model, system_instruction=system_prompt_content)
-                response = model.generate_content(user_prompt) # Passa solo user prompt
-                self.progress.emit(80, f"Ricevuta risposta da Gemini ({self.mode})...")
-                try:
-                    result_text = response.text
-                except ValueError as ve:
-                     logging.warning(f"Possibile blocco risposta Gemini ({self.mode}): {ve}. Dettagli: {response.prompt_feedback}")
-                     raise Exception(f"Risposta da Gemini bloccata o non valida ({self.mode}). Causa: {response.prompt_feedback}")
-                logging.info(f"Gemini ({self.mode}) completato.")
-                return result_text, 0, 0 # Token non disponibili facilmente
-
-            elif "claude" in model_name_lower:
-                # --- Logica per Anthropic Claude ---
-                logging.info(f"Usando Claude ({self.selected_model}) per {self.mode}.")
-                if not self.anthropic_api_key: raise ValueError("API Key Anthropic non configurata.")
-                self.progress.emit(30, f"Invio a Claude ({self.mode})...")
-                client = anthropic.Anthropic(api_key=self.anthropic_api_key)
-                message = client.messages.create(
-                    model=self.selected_model,
-                    max_tokens=8192, # Massimo per Claude 3.5
-                    temperature=0.7,
-                    system=system_prompt_content,
-                    messages=[{"role": "user", "content": [{"type": "text", "text": user_prompt}]}]
-                )
-                self.progress.emit(80, f"Ricevuta risposta da Claude ({self.mode})...")
-                if message.stop_reason == 'max_tokens':
-                     logging.warning(f"Risposta Claude ({self.mode}) troncata per max_tokens.")
-
-                testo_resultante = message.content[0].text
-                input_tokens = message.usage.input_tokens
-                output_tokens = message.usage.output_tokens
-                logging.info(f"Claude ({self.mode}) completato.")
-                return testo_resultante, input_tokens, output_tokens
-
-            # Aggiungere qui blocchi elif per altri provider se necessario (es. OpenAI)
-
-            else:
-                logging.error(f"Modello '{self.selected_model}' non gestito per l'elaborazione testo.")
-                return f"Errore: Modello '{self.selected_model}' non supportato."
-
-        # Gestione eccezioni API specifiche
-        except requests.exceptions.ConnectionError:
-             endpoint = get_ollama_endpoint()
-             logging.error(f"Impossibile connettersi a Ollama: {endpoint}")
-             return f"Errore di connessione a Ollama ({endpoint}). Verifica che sia in esecuzione."
-        except requests.exceptions.Timeout:
-             logging.error(f"Timeout durante connessione a Ollama ({self.selected_model})")
-             return f"Timeout Ollama ({self.selected_model}). Il modello potrebbe essere lento o non rispondere."
+            progress(20, "Ricerca dei passaggi pertinenti...")
+            prompt_vars = dict(prompt_vars, summary_text=build_chat_context(
+                prompt_vars.get('user_query', ''), prompt_vars.get('summary_text', ''),
+                prompt_vars.get('gnai_path')))
+        except Exception:
+            logging.exception("Ricerca dei passaggi per la chat non riuscita, uso il testo aperto.")
+
+    # 2. Leggi e formatta il prompt
+    try:
+        with open(prompt_file_path, 'r', encoding='utf-8') as f:
+            prompt_template = f.read()
+
+        # Logica di formattazione condizionale
+        if mode in ["video_integration", "combined_summary", "document_integration", "chat_summary"]:
+            # Queste modalità usano un template completo con più variabili
+            format_data = prompt_vars.copy()
+            format_data['language'] = language
+            system_prompt_content = prompt_template.format(**format_data)
+            user_prompt = "Procedi con la generazione del contenuto come da istruzioni."
+        else:
+            # Le altre modalità hanno un template semplice e una singola variabile 'text'
+            if mode != "combined_summary_text_only" and 'text' not in prompt_vars:
+                raise ValueError(f"La modalità '{mode}' richiede una variabile 'text' in prompt_vars.")
+            system_prompt_content, user_prompt = _format_text_prompts(
+                mode, language, prompt_template, prompt_vars.get('text', ''))
+
+    except Exception as e:
+        logging.exception(f"Errore lettura/formattazione prompt '{prompt_file_path}'")
+        return f"Errore lettura prompt ({mode}): {e}"
+
+    # 3. Risposta già calcolata per lo stesso modello, prompt, lingua e testo
+    cache_key = None
+    if mode in CACHEABLE_MODES:
+        cache_key = get_response_cache().make_key(model, mode, prompt_template, language, prompt_vars)
+        cached = get_response_cache().get(cache_key) if use_cache else None
+        if cached is not None:
+            logging.info(f"{model} ({mode}): risposta dalla cache.")
+            progress(80, f"Risposta dalla cache ({mode})...")
+            return cached, 0, 0
+
+    # 4. Testi troppo lunghi: riassunti parziali dei blocchi (map), poi il riassunto finale su di essi
+    if mode in MAP_REDUCE_MODES and needs_chunking(prompt_vars.get('text'), model):
+        try:
+            condensed = condense_text(
+                model, prompt_vars['text'], language, use_cache=use_cache,
+                progress=lambda done, total: progress(30 + int(40 * done / total), f"Riassunto dei blocchi ({done}/{total})..."),
+                name=f"testo {mode}")
         except Exception as e:
-             # Errore generico durante la chiamata API
-             logging.exception(f"Errore API durante l'elaborazione testo ({self.mode}) con {self.selected_model}")
-             return f"Errore API ({type(e).__name__}): {str(e)}"
\ No newline at end of file
+            logging.exception(f"Errore durante il riassunto a blocchi ({mode}) con {model}")
+            return f"Errore API durante il riassunto a blocchi ({type(e).__name__}): {str(e)}"
+        system_prompt_content, user_prompt = _format_text_prompts(mode, language, prompt_template, condensed)
+
+    # 5. Chiamata API attraverso il client condiviso
+    logging.debug(f"Tentativo elaborazione testo ({mode}) con modello: {model}")
+
+    try:
+        provider, _ = provider_for_model(model)
+        logging.info(f"Usando {model} ({provider}) per {mode}.")
+        progress(30, f"Invio a {model} ({mode})...")
+        stream = TextStreamBuffer(on_text) if on_text else None
+        response = get_llm_client().generate(
+            model,
+            user_prompt,
+            system=system_prompt_content,
+            max_tokens=8192,
+            temperature=0.7,
+            name=f"testo {mode}",
+            on_text=stream,
+        )
+        if stream:
+            stream.flush()
+        progress(80, f"Ricevuta risposta ({mode})...")
+        logging.info(f"{model} ({mode}) completato.")
+        if cache_key and response.text.strip():
+            get_response_cache().put(cache_key, response.text, model=model, mode=mode)
+        return response.text, response.input_tokens, response.output_tokens
+
+    # Gestione eccezioni API specifiche
+    except requests.exceptions.ConnectionError:
+        endpoint = get_ollama_endpoint()
+        logging.error(f"Impossibile connettersi a Ollama: {endpoint}")
+        return f"Errore di connessione a Ollama ({endpoint}). Verifica che sia in esecuzione."
+    except requests.exceptions.Timeout:
+        logging.error(f"Timeout durante connessione a Ollama ({model})")
+        return f"Timeout Ollama ({model}). Il modello potrebbe essere lento o non rispondere."
+    except Exception as e:
+        # Errore generico durante la chiamata API
+        logging.exception(f"Errore API durante l'elaborazione testo ({mode}) con {model}")
+        return f"Errore API ({type(e).__name__}): {str(e)}"
@@ -0,0 +1,139 @@
+# File: src/services/ProxyGenerator.py
+import os
+import logging
+import threading
+from collections import deque
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from src.config import FFMPEG_PATH
+from src.services.MediaInfo import get_media_info
+from src.services.FFmpegRunner import FFmpegJob
+
+PROXY_HEIGHT = 540
+
+# Tutti i frame sono keyframe (-g 1): seek e avanzamento frame per frame non devono
+# decodificare un GOP intero, a differenza delle registrazioni originali
+PROXY_VIDEO_ARGS = ['-c:v', 'libx264', '-preset', 'veryfast', '-tune', 'fastdecode', '-crf', '26',
+                    '-g', '1', '-pix_fmt', 'yuv420p']
+PROXY_AUDIO_ARGS = ['-c:a', 'aac', '-b:a', '128k']
+
+
+def build_proxy_command(source_path, proxy_path, source_height=None, ffmpeg_path=FFMPEG_PATH):
+    """Comando ffmpeg per il proxy all-intra di `source_path`, con gli stessi timestamp dell'originale."""
+    command = [ffmpeg_path, '-y', '-v', 'error', '-threads', '2', '-i', source_path,
+               '-map', '0:v:0', '-map', '0:a:0?']
+    if not source_height or source_height > PROXY_HEIGHT:
+        command.extend(['-filter:v', f"scale=-2:{PROXY_HEIGHT}"])
+    command.extend(PROXY_VIDEO_ARGS)
+    command.extend(PROXY_AUDIO_ARGS)
+    command.extend(['-movflags', '+faststart', '-f', 'mp4', proxy_path])
+    return command
+
+
+class ProxyGenerationThread(QThread):
+    """
+    Genera in background i proxy delle clip di progetto, una alla volta.
+
+    Le clip possono essere accodate anche mentre il thread è in esecuzione, finché non
+    viene fermato o non ha svuotato la coda (in quel caso `enqueue` restituisce False e
+    serve un nuovo thread). Il proxy
+    viene scritto in un file temporaneo e rinominato solo a generazione completata,
+    così un proxy parziale non viene mai usato per la riproduzione.
+    """
+    progress = pyqtSignal(int, str)
+    proxy_ready = pyqtSignal(str, str)
+    completed = pyqtSignal(int)
+    error = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._queue = deque()
+        self._queued_paths = set()
+        self._lock = threading.Lock()
+        self._current_job = None
+        self._accepting = True
+        self.running = True
+
+    def enqueue(self, items):
+        """
+        Accoda coppie (percorso originale, percorso proxy) non ancora in coda.
+        Restituisce False, senza accodare nulla, se il thread sta terminando.
+        """
+        with self._lock:
+            if not self._accepting:
+                return False
+            for source_path, proxy_path in items:
+                if source_path not in self._queued_paths:
+                    self._queued_paths.add(source_path)
+                    self._queue.append((source_path, proxy_path))
+            return True
+
+    def pending(self):
+        with self._lock:
+            return len(self._queue)
+
+    def stop(self):
+        with self._lock:
+            self._accepting = False
+        self.running = False
+        if self._current_job:
+            self._current_job.cancel()
+
+    def _next_item(self):
+        with self._lock:
+            if not self._queue:
+                # La decisione di terminare avviene sotto lock: nessuna clip accodata va persa
+                self._accepting = False
+                return None
+            item = self._queue.popleft()
+            self._queued_paths.discard(item[0])
+            return item
+
+    def run(self):
+        generated = 0
+        while self.running:
+            item = self._next_item()
+            if item is None:
+                break
+            source_path, proxy_path = item
+            try:
+                if self._generate(source_path, proxy_path):
+                    generated += 1
+                    self.proxy_ready.emit(source_path, proxy_path)
+            except InterruptedError:
+                break
+            except Exception as e:
+                logging.error(f"Generazione proxy non riuscita per {source_path}: {e}")
+                self.error.emit(f"Proxy non generato per {os.path.basename(source_path)}: {e}")
+
+        if self.running:
+            self.completed.emit(generated)
+
+    def _generate(self, source_path, proxy_path):
+        if not os.path.exists(source_path):
+            return False
+
+        media_info = get_media_info()
+        video_stream = media_info.stream(source_path, 'video')
+        if video_stream is None:
+            return False
+
+        os.makedirs(os.path.dirname(proxy_path), exist_ok=True)
+        temp_path = proxy_path + ".part"
+        name = os.path.basename(source_path)
+
+        def on_progress(stats):
+            if self.running and stats.get('fraction') is not None:
+                self.progress.emit(int(stats['fraction'] * 100), f"Proxy {name}")
+
+        command = build_proxy_command(source_path, temp_path, int(video_stream.get('height') or 0))
+        self._current_job = FFmpegJob(command, duration=media_info.duration(source_path),
+                                      on_progress=on_progress, name=f"proxy {name}")
+        try:
+            self._current_job.run()
+            os.replace(temp_path, proxy_path)
+        finally:
+            self._current_job = None
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return True
@@ -0,0 +1,142 @@
+# File: src/services/ResponseCache.py
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+
+from PyQt6.QtCore import QSettings
+
+from src.config import AI_RESPONSE_CACHE_DIR
+
+# Azioni il cui risultato dipende solo da modello, prompt, lingua e testo in ingresso:
+# rieseguirle sullo stesso testo può riusare la risposta precedente
+CACHEABLE_MODES = ("fix", "summary", "generate_filename", "youtube_summary", "meeting_summary")
+
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+# Impostazione della finestra Impostazioni e variabile d'ambiente (o --no-ai-cache) per ignorare la cache
+CACHE_SETTING_KEY = "ai/useResponseCache"
+CACHE_DISABLE_ENV = "GENIUSAI_NO_RESPONSE_CACHE"
+
+
+def hash_text(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def response_cache_enabled():
+    """True se le risposte AI possono essere lette dalla cache (impostazioni e variabile d'ambiente)."""
+    if os.environ.get(CACHE_DISABLE_ENV, "").strip().lower() in ("1", "true", "yes"):
+        return False
+    return QSettings("Genius", "GeniusAI").value(CACHE_SETTING_KEY, True, type=bool)
+
+
+class ResponseCache:
+    """
+    Cache su disco delle risposte dei modelli per le azioni deterministiche.
+
+    La chiave è l'hash di (modello, modalità, hash del template del prompt, lingua,
+    hash del testo in ingresso): modificare il file del prompt o cambiare modello
+    invalida le voci precedenti. Ogni risposta è un file JSON separato; la data di
+    modifica del file registra l'ultimo uso e, oltre `max_bytes`, si eliminano le
+    voci usate meno di recente.
+    """
+
+    def __init__(self, cache_dir=AI_RESPONSE_CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model, mode, prompt_template, language, inputs):
+        """Chiave della risposta; `inputs` è il testo o il dizionario di variabili del prompt."""
+        if not isinstance(inputs, str):
+            inputs = json.dumps(inputs, sort_keys=True, ensure_ascii=False)
+        parts = [model, mode, hash_text(prompt_template), language or "", hash_text(inputs)]
+        return hash_text("\x1f".join(parts))
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Testo della risposta memorizzata, o None."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)  # Aggiorna l'ultimo uso per l'ordine LRU
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Voce della cache delle risposte non leggibile, verrà ignorata: {e}")
+            return None
+        return entry.get('text')
+
+    def put(self, key, text, **metadata):
+        if not self.cache_dir:
+            return
+        entry = dict(metadata, text=text, created=time.time())
+        path = self._path(key)
+        with self._lock:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                temp_path = f"{path}.tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(entry, f, ensure_ascii=False)
+                os.replace(temp_path, path)
+            except OSError as e:
+                logging.warning(f"Impossibile salvare la risposta nella cache: {e}")
+                return
+            self._evict()
+
+    def _entries(self):
+        """(ultimo uso, dimensione, percorso) delle voci presenti."""
+        entries = []
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for item in it:
+                    if item.name.endswith('.json') and item.is_file():
+                        stat = item.stat()
+                        entries.append((stat.st_mtime, stat.st_size, item.path))
+        except OSError:
+            pass
+        return entries
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError as e:
+                logging.debug(f"Impossibile eliminare la voce di cache {path}: {e}")
+
+    def size(self):
+        """Numero di voci e occupazione su disco in byte."""
+        entries = self._entries()
+        return len(entries), sum(size for _, size, _ in entries)
+
+    def clear(self):
+        with self._lock:
+            for _, _, path in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Cache condivisa dalle azioni AI dell'applicazione."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache()
+        return _shared_cache
@@ -0,0 +1,188 @@
+# File: src/services/SegmentMerger.py
+import os
+import logging
+import tempfile
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from src.config import FFMPEG_PATH
+from src.services.MediaInfo import get_media_info
+from src.services.FFmpegRunner import FFmpegJob, concat_file_line
+
+# Parametri che devono coincidere perché i segmenti possano essere uniti in stream copy
+_VIDEO_KEYS = ('codec_name', 'width', 'height', 'pix_fmt')
+_AUDIO_KEYS = ('codec_name', 'sample_rate', 'channels')
+
+# Scarto massimo ammesso tra la durata del file unito e la somma dei segmenti
+DURATION_TOLERANCE = 1.0
+
+
+def segment_signature(streams):
+    """Parametri di video e audio di un segmento, confrontabili tra segmenti diversi."""
+    signature = {}
+    for codec_type, keys in (('video', _VIDEO_KEYS), ('audio', _AUDIO_KEYS)):
+        stream = next((s for s in streams if s.get('codec_type') == codec_type), None)
+        signature[codec_type] = tuple(str(stream.get(key)) for key in keys) if stream else None
+    return signature
+
+
+def find_incompatible_segments(signatures):
+    """
+    Indici dei segmenti i cui parametri differiscono da quelli del primo:
+    il concat demuxer con -c copy produrrebbe un file corrotto.
+    """
+    if not signatures:
+        return []
+    reference = signatures[0]
+    return [i for i, signature in enumerate(signatures) if signature != reference]
+
+
+class SegmentMergeThread(QThread):
+    """
+    Unisce in background i segmenti di una registrazione (pausa/ripresa) con il
+    concat demuxer in stream copy.
+
+    I segmenti sono verificati prima di iniziare (file vuoti scartati, parametri
+    di codifica uguali) e il risultato è confrontato con la durata attesa; i
+    segmenti originali vengono eliminati solo se l'unione è andata a buon fine.
+    """
+    progress = pyqtSignal(int, str)
+    completed = pyqtSignal(str)
+    error = pyqtSignal(str)
+
+    def __init__(self, segment_paths, output_path, work_dir=None, leftover_files=(), parent=None):
+        super().__init__(parent)
+        self.segment_paths = list(segment_paths)
+        self.leftover_files = tuple(leftover_files)
+        self.output_path = output_path
+        self.work_dir = work_dir or tempfile.gettempdir()
+        self.ffmpeg_job = None
+        self.running = True
+
+    def stop(self):
+        self.running = False
+        if self.ffmpeg_job:
+            self.ffmpeg_job.cancel()
+
+    def run(self):
+        try:
+            self.progress.emit(5, "Verifica dei segmenti registrati...")
+            segments, durations = self._valid_segments()
+            if not segments:
+                raise ValueError("Nessun segmento valido da unire.")
+
+            if len(segments) == 1:
+                # Un solo segmento utilizzabile: è già la registrazione finale
+                final_path = segments[0]
+                if os.path.abspath(final_path) != os.path.abspath(self.output_path):
+                    os.replace(final_path, self.output_path)
+                    final_path = self.output_path
+                self._remove_segments(exclude=final_path)
+                self.progress.emit(100, "Registrazione salvata")
+                self.completed.emit(final_path)
+                return
+
+            self._merge(segments, sum(durations))
+            if not self.running:
+                return
+
+            self._remove_segments()
+            self.progress.emit(100, "Segmenti uniti")
+            self.completed.emit(self.output_path)
+        except InterruptedError:
+            self._remove_output()
+        except Exception as e:
+            logging.error(f"Unione dei segmenti non riuscita: {e}")
+            self._remove_output()
+            if self.running:
+                self.error.emit(str(e))
+
+    def _valid_segments(self):
+        media_info = get_media_info()
+        segments, durations, signatures = [], [], []
+        for path in self.segment_paths:
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                logging.warning(f"Segmento di registrazione vuoto o mancante ignorato: {path}")
+                continue
+            try:
+                streams = media_info.streams(path)
+                duration = media_info.duration(path)
+            except Exception as e:
+                logging.warning(f"Segmento di registrazione non leggibile ignorato: {path} ({e})")
+                continue
+            if not streams:
+                continue
+            segments.append(path)
+            durations.append(duration)
+            signatures.append(segment_signature(streams))
+
+        incompatible = find_incompatible_segments(signatures)
+        if incompatible:
+            names = ", ".join(os.path.basename(segments[i]) for i in incompatible)
+            raise ValueError(f"I segmenti non hanno gli stessi parametri di codifica e non possono essere "
+                             f"uniti senza ricodifica: {names}. I segmenti originali sono stati conservati.")
+        return segments, durations
+
+    def _merge(self, segments, expected_duration):
+        os.makedirs(self.work_dir, exist_ok=True)
+        list_file = os.path.join(self.work_dir, f"segments_{os.getpid()}_{id(self)}.txt")
+        try:
+            with open(list_file, "w", encoding="utf-8") as f:
+                for segment in segments:
+                    f.write(concat_file_line(segment))
+
+            def on_progress(stats):
+                if self.running and stats.get('fraction') is not None:
+                    percent = int(stats['fraction'] * 100)
+                    self.progress.emit(10 + int(percent * 0.85), f"Unione dei segmenti: {percent}%")
+
+            command = [FFMPEG_PATH, '-y', '-v', 'error', '-f', 'concat', '-safe', '0', '-i', list_file,
+                       '-map', '0', '-c', 'copy', self.output_path]
+            self.ffmpeg_job = FFmpegJob(command, duration=expected_duration, on_progress=on_progress,
+                                        name="unione segmenti")
+            self.ffmpeg_job.run()
+        finally:
+            self.ffmpeg_job = None
+            if os.path.exists(list_file):
+                os.remove(list_file)
+
+        get_media_info().invalidate(self.output_path)
+        merged_duration = get_media_info().duration(self.output_path)
+        if expected_duration > 0 and abs(merged_duration - expected_duration) > DURATION_TOLERANCE:
+            raise RuntimeError(f"Il file unito dura {merged_duration:.1f}s invece di {expected_duration:.1f}s. "
+                               f"I segmenti originali sono stati conservati.")
+
+    def _remove_segments(self, exclude=None):
+        output_dir = os.path.dirname(os.path.abspath(self.output_path))
+        segment_dirs = set()
+        for segment in self.segment_paths:
+            segment_dirs.add(os.path.dirname(os.path.abspath(segment)))
+            if segment == exclude:
+                continue
+            try:
+                if os.path.exists(segment):
+                    os.remove(segment)
+            except OSError as e:
+                logging.warning(f"Impossibile rimuovere il segmento {segment}: {e}")
+
+        # Cartelle dedicate ai segmenti (registrazione a segmenti): rimosse se rimaste vuote
+        for segment_dir in segment_dirs - {output_dir}:
+            for leftover in self.leftover_files:
+                leftover_path = os.path.join(segment_dir, leftover)
+                try:
+                    if os.path.exists(leftover_path):
+                        os.remove(leftover_path)
+                except OSError as e:
+                    logging.warning(f"Impossibile rimuovere il file {leftover_path}: {e}")
+            try:
+                os.rmdir(segment_dir)
+            except OSError:
+                pass
+
+    def _remove_output(self):
+        if self.output_path in self.segment_paths:
+            return
+        try:
+            if os.path.exists(self.output_path):
+                os.remove(self.output_path)
+        except OSError:
+            pass
@@ -0,0 +1,181 @@
+# File: src/services/SpeedAlign.py
+import os
+
+from src.config import FFMPEG_PATH, FFPROBE_PATH
+from src.services.FFmpegRunner import FFmpegJob
+from src.services.MediaInfo import get_media_info
+
+DEFAULT_VIDEO_ARGS = ['-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '23', '-pix_fmt', 'yuv420p']
+DEFAULT_AUDIO_ARGS = ['-c:a', 'aac', '-b:a', '192k']
+
+
+def compute_speed_factor(video_duration, audio_duration):
+    """
+    Fattore di velocità da applicare al video perché duri quanto l'audio.
+    Non viene arrotondato: anche uno scarto di 0.01x su un video lungo
+    si traduce in secondi di disallineamento a fine clip.
+    """
+    if video_duration <= 0 or audio_duration <= 0:
+        raise ValueError("Durata del video o dell'audio non valida")
+    return video_duration / audio_duration
+
+
+def build_speed_align_command(video_path, audio_path, output_path, speed_factor, output_duration,
+                              frame_rate=None, video_args=None, audio_args=None, ffmpeg_path=FFMPEG_PATH):
+    """
+    Comando ffmpeg che in un solo passaggio cambia la velocità del video (setpts),
+    mantiene il frame rate originale e lo accoppia alla nuova traccia audio.
+    """
+    video_filter = f"setpts=PTS/{speed_factor:.9f}"
+    if frame_rate and frame_rate != '0/0':
+        video_filter += f",fps={frame_rate}"
+
+    command = [ffmpeg_path, '-y', '-nostdin', '-v', 'error', '-progress', 'pipe:1', '-nostats',
+               '-i', video_path, '-i', audio_path,
+               '-filter:v', video_filter,
+               '-map', '0:v:0', '-map', '1:a:0']
+    command.extend(video_args or DEFAULT_VIDEO_ARGS)
+    command.extend(audio_args or DEFAULT_AUDIO_ARGS)
+    command.extend(['-t', f"{output_duration:.6f}", '-movflags', '+faststart', output_path])
+    return command
+
+
+SPLICE_SAMPLE_FORMAT = "aresample=48000,aformat=sample_fmts=fltp:channel_layouts=stereo"
+
+
+def build_audio_splice_command(video_path, audio_path, output_path, start_time, audio_duration, video_duration,
+                               has_original_audio=True, audio_args=None, ffmpeg_path=FFMPEG_PATH):
+    """
+    Comando ffmpeg che inserisce `audio_path` nella traccia del video a partire da `start_time`,
+    sostituendo l'audio originale per la durata del nuovo audio (atrim + concat).
+    Il video è copiato senza ricodifica e la durata resta quella del video.
+    """
+    resume_time = start_time + audio_duration
+    new_audio = f"[1:a]{SPLICE_SAMPLE_FORMAT},asetpts=PTS-STARTPTS"
+
+    if not has_original_audio:
+        delay_ms = int(round(start_time * 1000))
+        filter_graph = f"{new_audio},adelay=delays={delay_ms}:all=1,apad[aout]"
+    else:
+        parts, labels = [], []
+        original = f"[0:a]{SPLICE_SAMPLE_FORMAT},asplit=2[orig_head][orig_tail]"
+        if start_time > 0:
+            parts.append(f"[orig_head]atrim=end={start_time:.6f},asetpts=PTS-STARTPTS[head]")
+            labels.append('[head]')
+        else:
+            parts.append("[orig_head]anullsink")
+        parts.append(f"{new_audio}[new]")
+        labels.append('[new]')
+        if resume_time < video_duration:
+            parts.append(f"[orig_tail]atrim=start={resume_time:.6f},asetpts=PTS-STARTPTS[tail]")
+            labels.append('[tail]')
+        else:
+            parts.append("[orig_tail]anullsink")
+        filter_graph = ";".join([original] + parts +
+                                [f"{''.join(labels)}concat=n={len(labels)}:v=0:a=1[aout]"])
+
+    command = [ffmpeg_path, '-y', '-nostdin', '-v', 'error', '-progress', 'pipe:1', '-nostats',
+               '-i', video_path, '-i', audio_path,
+               '-filter_complex', filter_graph,
+               '-map', '0:v:0', '-map', '[aout]', '-c:v', 'copy']
+    command.extend(audio_args or DEFAULT_AUDIO_ARGS)
+    command.extend(['-t', f"{video_duration:.6f}", '-movflags', '+faststart', output_path])
+    return command
+
+
+class SpeedAlignEngine:
+    """
+    Sostituisce la traccia audio di un video, adattando opzionalmente la velocità
+    del video alla durata del nuovo audio. Ogni operazione è una singola
+    invocazione di ffmpeg con avanzamento letto da `-progress`, qualunque sia
+    la dimensione del file.
+    """
+
+    def __init__(self, ffmpeg_path=FFMPEG_PATH, ffprobe_path=FFPROBE_PATH, video_args=None, audio_args=None):
+        self.ffmpeg_path = ffmpeg_path
+        self.media_info = get_media_info(ffprobe_path)
+        self.video_args = video_args or DEFAULT_VIDEO_ARGS
+        self.audio_args = audio_args or DEFAULT_AUDIO_ARGS
+        self._job = None
+        self._cancelled = False
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def cancel(self):
+        self._cancelled = True
+        job = self._job
+        if job:
+            job.cancel()
+
+    def align(self, video_path, audio_path, output_path, progress_callback=None):
+        """
+        Adatta la velocità del video alla durata di `audio_path` e applica l'audio.
+        Restituisce il fattore di velocità usato.
+        """
+        video_duration = self.media_info.duration(video_path)
+        audio_duration = self.media_info.duration(audio_path)
+        speed_factor = compute_speed_factor(video_duration, audio_duration)
+
+        video_stream = self.media_info.stream(video_path, 'video')
+        if video_stream is None:
+            raise ValueError("Il file non contiene una traccia video.")
+        frame_rate = video_stream.get('avg_frame_rate') or video_stream.get('r_frame_rate')
+
+        command = build_speed_align_command(video_path, audio_path, output_path, speed_factor, audio_duration,
+                                            frame_rate, self.video_args, self.audio_args, self.ffmpeg_path)
+        self._run(command, audio_duration, output_path, progress_callback)
+        return speed_factor
+
+    def replace_audio(self, video_path, audio_path, output_path, progress_callback=None):
+        """Sostituisce l'audio senza ricodificare il video; la durata resta quella del video."""
+        video_duration = self.media_info.duration(video_path)
+        command = [self.ffmpeg_path, '-y', '-nostdin', '-v', 'error', '-progress', 'pipe:1', '-nostats',
+                   '-i', video_path, '-i', audio_path,
+                   '-map', '0:v:0', '-map', '1:a:0', '-c:v', 'copy']
+        command.extend(self.audio_args)
+        if video_duration > 0:
+            command.extend(['-t', f"{video_duration:.6f}"])
+        command.extend(['-movflags', '+faststart', output_path])
+        self._run(command, video_duration, output_path, progress_callback)
+
+    def splice_audio(self, video_path, audio_path, output_path, start_time, progress_callback=None):
+        """
+        Sostituisce l'audio originale con `audio_path` da `start_time` in poi, per la
+        durata del nuovo audio; prima e dopo resta l'audio originale. Il video non viene ricodificato.
+        """
+        video_duration = self.media_info.duration(video_path)
+        audio_duration = self.media_info.duration(audio_path)
+        if video_duration <= 0 or audio_duration <= 0:
+            raise ValueError("Durata del video o dell'audio non valida")
+        if start_time > video_duration:
+            raise ValueError("Il tempo di inizio supera la durata del video.")
+
+        has_original_audio = self.media_info.stream(video_path, 'audio') is not None
+        command = build_audio_splice_command(video_path, audio_path, output_path, max(0.0, start_time),
+                                             audio_duration, video_duration, has_original_audio,
+                                             self.audio_args, self.ffmpeg_path)
+        self._run(command, video_duration, output_path, progress_callback)
+
+    def _run(self, command, output_duration, output_path, progress_callback):
+        if self._cancelled:
+            raise InterruptedError("Operazione annullata.")
+
+        def on_progress(stats):
+            if progress_callback and stats.get('fraction') is not None:
+                progress_callback(stats['fraction'])
+
+        self._job = FFmpegJob(command, duration=output_duration if output_duration > 0 else None,
+                              on_progress=on_progress)
+        try:
+            self._job.run()
+        except InterruptedError:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            raise
+        finally:
+            self._job = None
+
+        if progress_callback:
+            progress_callback(1.0)
@@ -0,0 +1,107 @@
+# File: src/services/StructuredOutput.py
+import json
+import logging
+
+
+def array_schema(properties, required=None):
+    """Schema JSON di un array di oggetti, da passare al client come 'response_schema'."""
+    return {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": properties,
+            "required": list(required or properties),
+        },
+    }
+
+
+class JsonArrayStreamParser:
+    """
+    Estrae gli oggetti del primo array JSON di una risposta man mano che arriva.
+
+    Ogni elemento viene restituito appena la sua parentesi di chiusura è ricevuta, quindi
+    se la risposta si interrompe o è troppo lunga restano validi tutti gli elementi
+    completi. Il testo prima dell'array (blocchi ```json, frasi di cortesia o l'oggetto
+    che lo contiene, come nelle risposte tramite tool) viene ignorato; un elemento non
+    valido viene scartato senza perdere gli altri.
+    """
+
+    def __init__(self, on_item=None):
+        self.on_item = on_item
+        self.items = []
+        self.complete = False
+        self._depth = 0
+        self._array_depth = None
+        self._in_string = False
+        self._escape = False
+        self._element = []
+        self._stray = False
+
+    def feed(self, chunk):
+        """Aggiunge un frammento di testo; restituisce gli elementi completati da questo frammento."""
+        completed = []
+        for char in chunk:
+            if self.complete:
+                break
+            capturing = self._array_depth is not None and self._depth > self._array_depth
+            if capturing:
+                self._element.append(char)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if self._array_depth is not None and self._depth == self._array_depth and char not in ' \t\r\n,{]':
+                # Testo che non è un oggetto dentro le parentesi (es. "[00:12]" prima del JSON)
+                self._stray = True
+
+            if char == '"':
+                self._in_string = True
+            elif char in '[{':
+                self._depth += 1
+                if self._array_depth is None and char == '[':
+                    self._array_depth = self._depth
+                elif self._array_depth is not None and self._depth == self._array_depth + 1:
+                    self._element = [char]
+            elif char in ']}':
+                self._depth -= 1
+                if self._array_depth is None:
+                    continue
+                if self._depth == self._array_depth and capturing:
+                    item = self._parse_element("".join(self._element))
+                    self._element = []
+                    if item is not None:
+                        completed.append(item)
+                elif self._depth < self._array_depth:
+                    if self._stray and not self.items and not completed:
+                        # Non era l'array dei risultati: si continua a cercarlo
+                        self._array_depth = None
+                        self._stray = False
+                    else:
+                        self.complete = True
+
+        self.items.extend(completed)
+        if self.on_item:
+            for item in completed:
+                self.on_item(item)
+        return completed
+
+    @staticmethod
+    def _parse_element(text):
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as e:
+            logging.warning(f"Elemento JSON non valido scartato: {e}")
+            return None
+
+
+def parse_json_array(text):
+    """(elementi validi, array completo) da una risposta già ricevuta per intero."""
+    parser = JsonArrayStreamParser()
+    parser.feed(text)
+    return parser.items, parser.complete
@@ -1,36 +1,165 @@
+import gc
+import time
+import logging
+import threading
 from PyQt6.QtCore import QThread, pyqtSignal
-from transformers import pipeline, AutoTokenizer
+
+BART_MODEL = "facebook/bart-large-cnn"
+# Lunghezza massima (in token) dell'input accettato da BART
+MAX_INPUT_TOKENS = 1024
+# Blocchi elaborati insieme in una sola chiamata alla pipeline
+BATCH_SIZE = 4
+# Il modello viene scaricato dalla memoria dopo questo periodo senza utilizzi
+IDLE_UNLOAD_SECONDS = 600
+
+
+def _load_pipeline(model_name, quantize):
+    # Import locali: transformers e torch servono solo quando il modello viene davvero caricato
+    import torch
+    from transformers import pipeline, AutoTokenizer, AutoModelForSeq2SeqLM
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+    device = 0 if torch.cuda.is_available() else -1
+    if quantize and device == -1:
+        # Quantizzazione dinamica int8 dei layer lineari: meno memoria e inferenza più rapida su CPU
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    model.eval()
+    return pipeline("summarization", model=model, tokenizer=tokenizer, device=device)
+
+
+class SummarizerModelCache:
+    """
+    Pipeline BART condivisa tra tutti i SummarizerThread. Viene caricata al primo utilizzo
+    (dal thread di lavoro, non dalla GUI) e scaricata dopo IDLE_UNLOAD_SECONDS senza utilizzi.
+    """
+    _pipeline = None
+    _key = None
+    _users = 0
+    _unload_timer = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def acquire(cls, model_name=BART_MODEL, quantize=False, progress_signal=None):
+        with cls._lock:
+            cls._cancel_unload()
+            key = (model_name, bool(quantize))
+            if cls._pipeline is None or cls._key != key:
+                cls._release_pipeline()
+                if progress_signal:
+                    progress_signal.emit(5, f"Caricamento del modello {model_name}...")
+                load_start_time = time.time()
+                cls._pipeline = _load_pipeline(model_name, quantize)
+                cls._key = key
+                logging.info(f"Modello di riassunto '{model_name}' caricato in {time.time() - load_start_time:.2f} secondi "
+                             f"(int8: {bool(quantize)}).")
+            cls._users += 1
+            return cls._pipeline
+
+    @classmethod
+    def release(cls, idle_seconds=IDLE_UNLOAD_SECONDS):
+        with cls._lock:
+            cls._users = max(0, cls._users - 1)
+            if cls._users == 0 and cls._pipeline is not None:
+                cls._unload_timer = threading.Timer(idle_seconds, cls.unload)
+                cls._unload_timer.daemon = True
+                cls._unload_timer.start()
+
+    @classmethod
+    def unload(cls):
+        with cls._lock:
+            if cls._users == 0:
+                cls._cancel_unload()
+                cls._release_pipeline()
+
+    @classmethod
+    def is_loaded(cls):
+        return cls._pipeline is not None
+
+    @classmethod
+    def _cancel_unload(cls):
+        if cls._unload_timer is not None:
+            cls._unload_timer.cancel()
+            cls._unload_timer = None
+
+    @classmethod
+    def _release_pipeline(cls):
+        if cls._pipeline is None:
+            return
+        cls._pipeline = None
+        cls._key = None
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+        logging.info("Modello di riassunto scaricato dalla memoria.")
+
 
 class SummarizerThread(QThread):
     update_progress = pyqtSignal(int, str)
     summarization_complete = pyqtSignal(str)
     error_occurred = pyqtSignal(str)
 
-    def __init__(self, input_text, summary_length, parent=None):
+    def __init__(self, input_text, summary_length, parent=None, model_name=BART_MODEL, quantize=False, batch_size=BATCH_SIZE):
         super().__init__(parent)
         self.input_text = input_text
         self.summary_length = summary_length
-        self.summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
-        self.tokenizer = AutoTokenizer.from_pretrained("facebook/bart-large-cnn")
+        self.model_name = model_name
+        self.quantize = quantize
+        self.batch_size = batch_size
+        self.running = True
+
+    def stop(self):
+        self.running = False
 
     def run(self):
         try:
-            chunks = self.split_text_into_chunks(self.input_text, 1024)
-            summaries = []
-            total_chunks = len(chunks)
-            for i, chunk in enumerate(chunks):
-                chunk_length = len(chunk.split())
-                max_length = min(self.summary_length, chunk_length)
-                min_length = max_length // 2
-                summary = self.summarizer(chunk, max_length=max_length, min_length=min_length, do_sample=False)
-                summaries.append(summary[0]['summary_text'])
-                self.update_progress.emit(int(((i + 1) / total_chunks) * 100), f"Summarizing chunk {i + 1}/{total_chunks}")
-            full_summary = self.summarizer(" ".join(summaries), max_length=self.summary_length, min_length=self.summary_length // 2, do_sample=False)
+            summarizer = SummarizerModelCache.acquire(self.model_name, self.quantize, self.update_progress)
+        except Exception as e:
+            logging.error(f"Impossibile caricare il modello di riassunto: {e}")
+            self.error_occurred.emit(str(e))
+            return
+        try:
+            chunks = self.split_text_into_chunks(summarizer.tokenizer, self.input_text, MAX_INPUT_TOKENS)
+            summaries = self.summarize_chunks(summarizer, chunks)
+            if summaries is None:
+                return
+            full_summary = summarizer(" ".join(summaries), max_length=self.summary_length,
+                                      min_length=self.summary_length // 2, do_sample=False, truncation=True)
             self.summarization_complete.emit(full_summary[0]['summary_text'])
         except Exception as e:
             self.error_occurred.emit(str(e))
+        finally:
+            SummarizerModelCache.release()
+
+    def summarize_chunks(self, summarizer, chunks):
+        """Riassume i blocchi a gruppi di `batch_size`; restituisce None se il thread è stato fermato."""
+        # I blocchi con la stessa lunghezza di riassunto (tutti tranne di solito l'ultimo) vanno nello stesso batch
+        groups = {}
+        for index, chunk in enumerate(chunks):
+            max_length = min(self.summary_length, len(chunk.split()))
+            groups.setdefault(max_length, []).append(index)
+
+        summaries = [None] * len(chunks)
+        done = 0
+        for max_length, indices in groups.items():
+            for start in range(0, len(indices), self.batch_size):
+                if not self.running:
+                    return None
+                batch = indices[start:start + self.batch_size]
+                results = summarizer([chunks[i] for i in batch], max_length=max_length, min_length=max_length // 2,
+                                     do_sample=False, truncation=True, batch_size=len(batch))
+                for i, result in zip(batch, results):
+                    summaries[i] = result['summary_text']
+                done += len(batch)
+                self.update_progress.emit(int(done / len(chunks) * 100), f"Summarizing chunk {done}/{len(chunks)}")
+        return summaries
 
-    def split_text_into_chunks(self, text, max_length):
-        tokens = self.tokenizer.encode(text, add_special_tokens=False)
+    @staticmethod
+    def split_text_into_chunks(tokenizer, text, max_length):
+        tokens = tokenizer.encode(text, add_special_tokens=False)
         chunks = [tokens[i:i + max_length] for i in range(0, len(tokens), max_length)]
-        return [self.tokenizer.decode(chunk) for chunk in chunks]
\ No newline at end of file
+        return [tokenizer.decode(chunk) for chunk in chunks]
@@ -0,0 +1,210 @@
+# File: src/services/TextChunking.py
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from src.config import PROMPT_CHUNK_SUMMARY
+from src.services.LLMClient import (
+    get_llm_client, provider_for_model, PROVIDER_CONCURRENCY,
+    PROVIDER_ANTHROPIC, PROVIDER_GOOGLE, PROVIDER_OLLAMA
+)
+from src.services.ResponseCache import get_response_cache
+
+# Stima dei token senza tokenizer: circa 4 caratteri per token per le lingue europee
+CHARS_PER_TOKEN = 4
+
+# Oltre SINGLE_PASS_TOKENS il testo viene riassunto a blocchi di al più CHUNK_TOKENS (map) e
+# il riassunto finale è calcolato sui riassunti parziali (reduce). I modelli locali hanno
+# contesti molto più piccoli e sono lenti su prompt lunghi.
+SINGLE_PASS_TOKENS = {
+    PROVIDER_ANTHROPIC: 60000,
+    PROVIDER_GOOGLE: 120000,
+    PROVIDER_OLLAMA: 6000,
+}
+CHUNK_TOKENS = {
+    PROVIDER_ANTHROPIC: 16000,
+    PROVIDER_GOOGLE: 24000,
+    PROVIDER_OLLAMA: 3000,
+}
+MAP_MAX_TOKENS = 2048
+MAX_REDUCE_LEVELS = 3
+
+CHUNK_SEPARATOR = "\n\n---\n\n"
+
+# Separatori tra le trascrizioni delle clip: '---' (trascrizione batch) o un'intestazione con il nome del file
+_SECTION_SEPARATOR = re.compile(r'^\s*---(?:\s*Trascrizione per:.*---)?\s*$')
+_SECTION_HEADER = re.compile(r'^\s*---\s*Trascrizione per:.*---\s*$')
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def needs_chunking(text, model):
+    """True se `text` è troppo lungo per un'unica richiesta al modello `model`."""
+    try:
+        provider, _ = provider_for_model(model)
+    except ValueError:
+        return False
+    return estimate_tokens(text or "") > SINGLE_PASS_TOKENS.get(provider, SINGLE_PASS_TOKENS[PROVIDER_OLLAMA])
+
+
+def chunk_tokens_for(model):
+    try:
+        provider, _ = provider_for_model(model)
+    except ValueError:
+        provider = PROVIDER_OLLAMA
+    return CHUNK_TOKENS.get(provider, CHUNK_TOKENS[PROVIDER_OLLAMA])
+
+
+def split_sections(text):
+    """Divide il testo nelle trascrizioni delle singole clip; l'intestazione resta con la sua sezione."""
+    sections, current = [], []
+
+    def close_section():
+        if any(line.strip() and not _SECTION_HEADER.match(line) for line in current):
+            sections.append("\n".join(current).strip())
+
+    for line in text.splitlines():
+        if _SECTION_SEPARATOR.match(line):
+            close_section()
+            current = [line.strip()] if _SECTION_HEADER.match(line) else []
+        else:
+            current.append(line)
+    close_section()
+    return sections
+
+
+def _split_long_line(line, max_chars):
+    """Spezza una riga troppo lunga (trascrizioni senza a capo) alla fine di una frase o di una parola."""
+    while len(line) > max_chars:
+        cut = line.rfind('. ', 0, max_chars)
+        if cut < max_chars // 2:
+            cut = line.rfind(' ', 0, max_chars)
+        cut = cut + 1 if cut > 0 else max_chars
+        yield line[:cut].rstrip()
+        line = line[cut:].lstrip()
+    yield line
+
+
+def _split_section(section, max_tokens):
+    if estimate_tokens(section) <= max_tokens:
+        return [section]
+    lines = section.splitlines()
+    header = lines[0] if _SECTION_HEADER.match(lines[0]) else None
+    body = lines[1:] if header else lines
+    # Ogni blocco ripete l'intestazione, così il modello sa da quale clip proviene
+    max_chars = max(1, max_tokens * CHARS_PER_TOKEN - (len(header) + 1 if header else 0))
+
+    chunks, current, size = [], [], 0
+    for line in body:
+        for piece in _split_long_line(line, max_chars):
+            if current and size + len(piece) + 1 > max_chars:
+                chunks.append(current)
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + 1
+    if current:
+        chunks.append(current)
+    return ["\n".join(([header] if header else []) + chunk).strip() for chunk in chunks]
+
+
+def chunk_text(text, max_tokens, pack_sections=False):
+    """
+    Blocchi di al più `max_tokens` (stimati) che non attraversano il confine tra due clip.
+
+    Di norma ogni clip produce i propri blocchi: modificare la trascrizione di una clip
+    cambia solo i suoi blocchi e gli altri riassunti parziali restano in cache. Con
+    `pack_sections` le sezioni brevi consecutive sono unite fino al limite (usato per
+    ridurre ulteriormente i riassunti parziali).
+    """
+    chunks = []
+    for section in split_sections(text):
+        for piece in _split_section(section, max_tokens):
+            if (pack_sections and chunks
+                    and estimate_tokens(chunks[-1]) + estimate_tokens(piece) + 2 <= max_tokens):
+                chunks[-1] = f"{chunks[-1]}{CHUNK_SEPARATOR}{piece}"
+            else:
+                chunks.append(piece)
+    return chunks
+
+
+def summarize_chunks(model, chunks, language, use_cache=True, progress=None, name="riassunto"):
+    """
+    Riassunti parziali dei blocchi (fase map), nell'ordine dei blocchi.
+
+    I blocchi già riassunti con lo stesso modello, prompt e lingua sono letti dalla cache;
+    gli altri sono inviati in parallelo entro il limite di concorrenza del provider.
+    `progress(completati, totale)` è chiamato dopo ogni blocco.
+    """
+    with open(PROMPT_CHUNK_SUMMARY, 'r', encoding='utf-8') as f:
+        prompt_template = f.read()
+    system = prompt_template.format(language=language)
+    cache = get_response_cache()
+    client = get_llm_client()
+
+    results = [None] * len(chunks)
+    pending = []
+    for index, chunk in enumerate(chunks):
+        key = cache.make_key(model, "chunk_summary", prompt_template, language, chunk)
+        cached = cache.get(key) if use_cache else None
+        if cached is not None:
+            results[index] = cached
+        else:
+            pending.append((index, chunk, key))
+    logging.info(f"{name}: {len(chunks)} blocchi, {len(chunks) - len(pending)} già in cache.")
+
+    def summarize(chunk, key):
+        response = client.generate(
+            model,
+            f"Parte della trascrizione:\n{chunk}\n\n---\nRiassunto della parte:",
+            system=system,
+            max_tokens=MAP_MAX_TOKENS,
+            temperature=0.3,
+            name=f"{name} (blocco)",
+        )
+        text = response.text.strip()
+        if text:
+            # Salvato subito: se un altro blocco fallisce, al nuovo tentativo questo non si ripete
+            cache.put(key, text, model=model, mode="chunk_summary")
+        return text
+
+    done = len(chunks) - len(pending)
+    if progress:
+        progress(done, len(chunks))
+    if not pending:
+        return results
+
+    provider, _ = provider_for_model(model)
+    executor = ThreadPoolExecutor(max_workers=min(len(pending), PROVIDER_CONCURRENCY.get(provider, 1)))
+    try:
+        futures = {executor.submit(summarize, chunk, key): index for index, chunk, key in pending}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            done += 1
+            if progress:
+                progress(done, len(chunks))
+    except Exception:
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+    return results
+
+
+def condense_text(model, text, language, use_cache=True, progress=None, name="riassunto"):
+    """
+    Riduce un testo troppo lungo ai riassunti parziali dei suoi blocchi, ripetendo la
+    riduzione finché il risultato entra in un'unica richiesta. Il testo restituito,
+    con i riassunti separati da '---', è l'ingresso della fase reduce.
+    """
+    max_tokens = chunk_tokens_for(model)
+    pack_sections = False
+    for _ in range(MAX_REDUCE_LEVELS):
+        chunks = chunk_text(text, max_tokens, pack_sections=pack_sections)
+        partials = summarize_chunks(model, chunks, language, use_cache=use_cache, progress=progress, name=name)
+        text = CHUNK_SEPARATOR.join(partial for partial in partials if partial)
+        if not needs_chunking(text, model) or len(chunks) <= 1:
+            break
+        logging.info(f"{name}: i riassunti parziali sono ancora troppo lunghi, nuovo livello di riduzione.")
+        pack_sections = True
+    return text
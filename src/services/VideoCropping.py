@@ -1,43 +1,127 @@
-import re
 import os
+import logging
 import tempfile
-import subprocess
-import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from PyQt6.QtCore import QThread, pyqtSignal
-from moviepy.editor import VideoFileClip
-from proglog import ProgressBarLogger
+from src.config import FFMPEG_PATH
 from src.services.utils import generate_unique_filename
+from src.services.MediaInfo import get_media_info
+from src.services.FFmpegRunner import FFmpegJob
 
-class CropLogger(ProgressBarLogger):
-    def __init__(self, progress_signal, thread):
-        super().__init__()
-        self.progress_signal = progress_signal
-        self.thread = thread
-        self.duration = None
-        self.re_duration = re.compile(r"Duration: (\d{2}):(\d{2}):(\d{2})\.\d{2}")
-        self.re_time = re.compile(r"time=(\d{2}):(\d{2}):(\d{2})\.\d{2}")
-
-    def callback(self, **kwargs):
-        if not self.thread.running:
-            # Moviepy non ha un modo pulito per interrompere, quindi solleviamo un'eccezione
-            # per fermare il processo di scrittura del file.
-            raise InterruptedError("Cropping cancelled by user.")
-
-        line = kwargs.get("message", "")
-        if "Duration" in line:
-            match = self.re_duration.search(line)
-            if match:
-                h, m, s = map(float, match.groups())
-                self.duration = h * 3600 + m * 60 + s
-
-        if self.duration and "time=" in line:
-            match = self.re_time.search(line)
-            if match:
-                h, m, s = map(float, match.groups())
-                elapsed = h * 3600 + m * 60 + s
-                progress = int((elapsed / self.duration) * 100)
-                if self.thread.running:
-                    self.progress_signal.emit(progress)
+# Codec audio che il contenitore di uscita accetta così come sono: in questi casi
+# l'audio viene copiato invece di essere ricodificato. None = qualsiasi codec.
+AUDIO_COPY_CODECS = {
+    '.mp4': {'aac', 'mp3', 'ac3', 'eac3', 'alac'},
+    '.m4v': {'aac', 'mp3', 'ac3', 'eac3', 'alac'},
+    '.mov': {'aac', 'mp3', 'ac3', 'eac3', 'alac', 'pcm_s16le', 'pcm_s24le'},
+    '.mkv': None,
+}
+FALLBACK_AUDIO_ARGS = ['-c:a', 'aac', '-ar', '44100']
+CROP_VIDEO_ARGS = ['-c:v', 'libx264', '-pix_fmt', 'yuv420p']
+
+
+def normalize_crop_rect(crop_rect, video_width, video_height):
+    """
+    Limita il rettangolo alle dimensioni del video e lo rende di lato pari.
+    Restituisce (larghezza, altezza, x, y) oppure None se l'area non è valida.
+    """
+    x1 = crop_rect.x()
+    y1 = crop_rect.y()
+    x2 = crop_rect.x() + crop_rect.width()
+    y2 = crop_rect.y() + crop_rect.height()
+
+    # Ensure coordinates are within the video dimensions
+    x1, y1 = max(0, x1), max(0, y1)
+    x2, y2 = min(video_width, x2), min(video_height, y2)
+
+    # Adjust dimensions to be even to avoid codec errors
+    if (x2 - x1) % 2 != 0:
+        x2 -= 1
+    if (y2 - y1) % 2 != 0:
+        y2 -= 1
+
+    if x1 >= x2 or y1 >= y2:
+        return None
+    return x2 - x1, y2 - y1, x1, y1
+
+
+def audio_codec_args(audio_codec, output_path):
+    """Copia l'audio se il contenitore di `output_path` lo supporta, altrimenti lo ricodifica in AAC."""
+    ext = os.path.splitext(output_path)[1].lower()
+    if audio_codec and ext in AUDIO_COPY_CODECS:
+        allowed = AUDIO_COPY_CODECS[ext]
+        if allowed is None or audio_codec in allowed:
+            return ['-c:a', 'copy']
+    return list(FALLBACK_AUDIO_ARGS)
+
+
+def build_crop_command(video_path, output_path, crop, start_time=None, end_time=None,
+                       audio_codec=None, threads=None, ffmpeg_path=FFMPEG_PATH):
+    """
+    Comando ffmpeg per ritagliare `video_path` all'area `crop` = (larghezza, altezza, x, y).
+
+    L'intervallo start/end è applicato come seek sull'input, così ffmpeg salta
+    direttamente al keyframe precedente invece di decodificare tutto il video.
+    """
+    command = [ffmpeg_path, '-y', '-v', 'error']
+    if threads:
+        command.extend(['-threads', str(threads)])
+    if start_time is not None and end_time is not None:
+        command.extend(['-ss', f"{start_time:.6f}", '-t', f"{max(0.0, end_time - start_time):.6f}"])
+    command.extend(['-i', video_path])
+
+    width, height, x, y = crop
+    command.extend(['-filter:v', f"crop={width}:{height}:{x}:{y}", '-map', '0:v:0', '-map', '0:a:0?'])
+    command.extend(CROP_VIDEO_ARGS)
+    command.extend(audio_codec_args(audio_codec, output_path))
+    if os.path.splitext(output_path)[1].lower() in ('.mp4', '.m4v', '.mov'):
+        command.extend(['-movflags', '+faststart'])
+    command.append(output_path)
+    return command
+
+
+def crop_output_path(video_path, project_path):
+    """Percorso univoco del video ritagliato: nella cartella clip del progetto, o nella cartella temporanea."""
+    if project_path:
+        clip_dir = os.path.join(project_path, "clips")
+        os.makedirs(clip_dir, exist_ok=True)
+        base, ext = os.path.splitext(os.path.basename(video_path))
+        ext = ext if ext else '.mp4'
+        return generate_unique_filename(os.path.join(clip_dir, f"{base}_cropped{ext}"))
+    # Still use unique filename for temp files to be safe
+    output_filename = f"cropped_{os.path.splitext(os.path.basename(video_path))[0]}.mp4"
+    return generate_unique_filename(os.path.join(tempfile.gettempdir(), output_filename))
+
+
+def prepare_crop_job(video_path, crop_rect, project_path, start_time=None, end_time=None,
+                     on_progress=None, threads=None):
+    """
+    Prepara il job ffmpeg di ritaglio di un video: (FFmpegJob, percorso di uscita).
+    Solleva ValueError se il file non ha video o se l'area non è valida.
+    """
+    media_info = get_media_info()
+    video_stream = media_info.stream(video_path, 'video')
+    if video_stream is None:
+        raise ValueError("Il file non contiene una traccia video.")
+
+    crop = normalize_crop_rect(crop_rect, int(video_stream['width']), int(video_stream['height']))
+    if crop is None:
+        raise ValueError("L'area di ritaglio non è valida.")
+
+    if start_time is not None and end_time is not None:
+        duration = end_time - start_time
+    else:
+        duration = media_info.duration(video_path)
+
+    audio_stream = media_info.stream(video_path, 'audio')
+    output_path = crop_output_path(video_path, project_path)
+    command = build_crop_command(video_path, output_path, crop, start_time, end_time,
+                                 audio_codec=audio_stream.get('codec_name') if audio_stream else None,
+                                 threads=threads)
+    job = FFmpegJob(command, duration=duration, on_progress=on_progress,
+                    name=f"ritaglio {os.path.basename(video_path)}")
+    return job, output_path
 
 
 class CropThread(QThread):
@@ -52,116 +136,147 @@ class CropThread(QThread):
         self.project_path = project_path
         self.start_time = start_time
         self.end_time = end_time
-        self.process = None
+        self.ffmpeg_job = None
         self.running = True
-        self.original_popen = None
 
     def stop(self):
         self.running = False
-        if self.process:
-            try:
-                self.process.kill()
-                self.process = None
-                self.error.emit("Ritaglio video annullato.")
-            except Exception as e:
-                self.error.emit(f"Errore durante l'annullamento: {e}")
-
-    def _monkey_patch_subprocess(self):
-        """Sostituisce temporaneamente subprocess.Popen per catturare il processo ffmpeg."""
-        self.original_popen = subprocess.Popen
-        def custom_popen(*args, **kwargs):
-            # Assicurati che CREATE_NO_WINDOW sia usato se su Windows
-            if os.name == 'nt':
-                kwargs.setdefault('creationflags', subprocess.CREATE_NO_WINDOW)
-            self.process = self.original_popen(*args, **kwargs)
-            return self.process
-        subprocess.Popen = custom_popen
-
-    def _unpatch_subprocess(self):
-        """Ripristina l'originale subprocess.Popen."""
-        if self.original_popen:
-            subprocess.Popen = self.original_popen
-            self.original_popen = None
-
+        if self.ffmpeg_job:
+            self.ffmpeg_job.cancel()
+            self.error.emit("Ritaglio video annullato.")
 
     def run(self):
         if not self.running:
             return
 
-        self._monkey_patch_subprocess()
+        output_path = None
         try:
-            video = VideoFileClip(self.video_path)
-
-            # Se sono specificati start_time e end_time (bookmark), taglia il video prima
-            if self.start_time is not None and self.end_time is not None:
-                video = video.subclip(self.start_time, self.end_time)
-
-            video_width, video_height = video.size
-
-            x1 = self.crop_rect.x()
-            y1 = self.crop_rect.y()
-            x2 = self.crop_rect.x() + self.crop_rect.width()
-            y2 = self.crop_rect.y() + self.crop_rect.height()
-
-            # Ensure coordinates are within the video dimensions
-            x1, y1 = max(0, x1), max(0, y1)
-            x2, y2 = min(video_width, x2), min(video_height, y2)
-
-            # Adjust dimensions to be even to avoid codec errors
-            width = x2 - x1
-            if width % 2 != 0:
-                x2 -= 1
-
-            height = y2 - y1
-            if height % 2 != 0:
-                y2 -= 1
-
-            if x1 >= x2 or y1 >= y2:
-                self.error.emit("L'area di ritaglio non è valida.")
-                return
-
-            cropped_video = video.crop(x1=x1, y1=y1, x2=x2, y2=y2)
-
-            # Ensure the duration of the cropped video is the same as the original
-            cropped_video = cropped_video.set_duration(video.duration)
-
-            if self.project_path:
-                clip_dir = os.path.join(self.project_path, "clips")
-                os.makedirs(clip_dir, exist_ok=True)
-                original_filename = os.path.basename(self.video_path)
-                base, ext = os.path.splitext(original_filename)
-                ext = ext if ext else '.mp4'
-                output_filename = f"{base}_cropped{ext}"
-                output_path = generate_unique_filename(os.path.join(clip_dir, output_filename))
-            else:
-                # Still use unique filename for temp files to be safe
-                temp_dir = tempfile.gettempdir()
-                output_filename = f"cropped_{os.path.splitext(os.path.basename(self.video_path))[0]}.mp4"
-                output_path = generate_unique_filename(os.path.join(temp_dir, output_filename))
-
-            logger = CropLogger(self.progress, self)
-
-            cropped_video.write_videofile(
-                output_path,
-                fps=video.fps,
-                codec='libx264',
-                audio_codec='aac',
-                audio_fps=44100,
-                logger=logger,
-                ffmpeg_params=['-movflags', 'faststart', '-fflags', '+genpts', '-pix_fmt', 'yuv420p']
+            def on_progress(stats):
+                if self.running and stats.get('fraction') is not None:
+                    self.progress.emit(int(stats['fraction'] * 100))
+
+            self.ffmpeg_job, output_path = prepare_crop_job(
+                self.video_path, self.crop_rect, self.project_path,
+                self.start_time, self.end_time, on_progress=on_progress
             )
+            self.ffmpeg_job.run()
 
             if self.running:
                 self.completed.emit(output_path)
         except InterruptedError:
-            # This exception is raised by our custom logger when cancelled
-            if not self.running:
-                # Se l'interruzione è dovuta a una cancellazione, non segnalare un errore.
-                pass # L'errore è già stato emesso dal metodo stop()
+            # L'errore di annullamento è già stato emesso dal metodo stop()
+            _remove_partial(output_path)
         except Exception as e:
+            _remove_partial(output_path)
             if self.running:
                 self.error.emit(str(e))
         finally:
-            # Ripristina sempre la funzione originale
-            self._unpatch_subprocess()
-            self.process = None
\ No newline at end of file
+            self.ffmpeg_job = None
+
+
+class BatchCropThread(QThread):
+    """
+    Ritaglia più clip con la stessa area, eseguendo fino a `max_workers` processi
+    ffmpeg in parallelo. I core disponibili vengono ripartiti tra i processi.
+    """
+    progress = pyqtSignal(int, str)
+    clip_cropped = pyqtSignal(str, str)
+    completed = pyqtSignal(str)
+    error = pyqtSignal(str)
+
+    def __init__(self, video_paths, crop_rect, project_path, max_workers=None, parent=None):
+        super().__init__(parent)
+        self.video_paths = list(video_paths)
+        self.crop_rect = crop_rect
+        self.project_path = project_path
+        cpu_count = os.cpu_count() or 2
+        self.max_workers = max(1, min(max_workers or max(1, cpu_count // 2), len(self.video_paths) or 1))
+        self.threads_per_job = max(1, cpu_count // self.max_workers)
+        self._jobs = set()
+        self._lock = threading.Lock()
+        self.running = True
+
+    def stop(self):
+        self.running = False
+        with self._lock:
+            jobs = list(self._jobs)
+        for job in jobs:
+            job.cancel()
+
+    def run(self):
+        total = len(self.video_paths)
+        if not total:
+            self.error.emit("Nessuna clip selezionata per il ritaglio.")
+            return
+
+        fractions = [0.0] * total
+        progress_lock = threading.Lock()
+
+        def report(index, fraction):
+            with progress_lock:
+                fractions[index] = fraction
+                overall = sum(fractions) / total
+                done = sum(1 for f in fractions if f >= 1.0)
+            if self.running:
+                self.progress.emit(int(overall * 100), f"Ritaglio clip: {done}/{total} completate")
+
+        outputs, failures = [], []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._crop_one, i, path, report): path
+                       for i, path in enumerate(self.video_paths)}
+            for future in as_completed(futures):
+                source_path = futures[future]
+                try:
+                    output_path = future.result()
+                    if output_path:
+                        outputs.append(output_path)
+                        self.clip_cropped.emit(source_path, output_path)
+                except InterruptedError:
+                    pass
+                except Exception as e:
+                    logging.error(f"Ritaglio non riuscito per {source_path}: {e}")
+                    failures.append(f"{os.path.basename(source_path)}: {e}")
+
+        if not self.running:
+            return
+        if failures and not outputs:
+            self.error.emit("Ritaglio non riuscito:\n" + "\n".join(failures))
+            return
+
+        message = f"{len(outputs)} clip ritagliate."
+        if failures:
+            message += " Errori:\n" + "\n".join(failures)
+        self.completed.emit(message)
+
+    def _crop_one(self, index, video_path, report):
+        if not self.running:
+            return None
+
+        def on_progress(stats):
+            if stats.get('fraction') is not None:
+                report(index, min(stats['fraction'], 0.99))
+
+        job, output_path = prepare_crop_job(video_path, self.crop_rect, self.project_path,
+                                            on_progress=on_progress, threads=self.threads_per_job)
+        with self._lock:
+            if not self.running:
+                return None
+            self._jobs.add(job)
+        try:
+            job.run()
+        except Exception:
+            _remove_partial(output_path)
+            raise
+        finally:
+            with self._lock:
+                self._jobs.discard(job)
+        report(index, 1.0)
+        return output_path
+
+
+def _remove_partial(output_path):
+    if output_path and os.path.exists(output_path):
+        try:
+            os.remove(output_path)
+        except OSError:
+            pass
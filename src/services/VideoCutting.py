@@ -1,9 +1,9 @@
 import os
-import subprocess
 from PyQt6.QtCore import QThread, pyqtSignal
 from moviepy.editor import VideoFileClip, AudioFileClip, ImageClip, CompositeVideoClip
 from src.services.utils import generate_unique_filename
 from src.config import FFMPEG_PATH
+from src.services.FFmpegRunner import FFmpegJob, FFmpegError, format_progress_message
 
 class VideoCuttingThread(QThread):
     progress = pyqtSignal(int, str)
@@ -21,6 +21,11 @@ class VideoCuttingThread(QThread):
         self.watermark_path = watermark_path
         self.watermark_size = watermark_size
         self.watermark_position = watermark_position
+        self.ffmpeg_job = None
+
+    def stop(self):
+        if self.ffmpeg_job:
+            self.ffmpeg_job.cancel()
 
     def run(self):
         is_video = self.media_path.lower().endswith(('.mp4', '.mov', '.avi'))
@@ -37,6 +42,7 @@ class VideoCuttingThread(QThread):
             try:
                 command = [
                     FFMPEG_PATH,
+                    '-v', 'error',
                     '-i', self.media_path,
                     '-ss', str(self.start_time),
                     '-to', str(end_time),
@@ -47,15 +53,22 @@ class VideoCuttingThread(QThread):
                     self.output_path
                 ]
 
-                process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
-                stdout, stderr = process.communicate()
+                def on_progress(stats):
+                    if stats.get('fraction') is not None:
+                        self.progress.emit(min(int(stats['fraction'] * 100), 99),
+                                           format_progress_message("Taglio in corso", stats))
+
+                self.ffmpeg_job = FFmpegJob(command, duration=end_time - self.start_time,
+                                            on_progress=on_progress, name="taglio video")
+                self.ffmpeg_job.run()
 
-                if process.returncode == 0:
-                    self.progress.emit(100, "Taglio completato con successo")
-                    self.completed.emit(self.output_path)
-                else:
-                    self.error.emit(f"Errore durante il taglio con ffmpeg: {stderr}")
+                self.progress.emit(100, "Taglio completato con successo")
+                self.completed.emit(self.output_path)
 
+            except InterruptedError:
+                pass
+            except FFmpegError as e:
+                self.error.emit(f"Errore durante il taglio con ffmpeg: {e.stderr}")
             except Exception as e:
                 self.error.emit(f"Errore imprevisto durante l'esecuzione di ffmpeg: {e}")
             return
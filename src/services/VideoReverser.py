@@ -0,0 +1,224 @@
+# File: src/services/VideoReverser.py
+import os
+import wave
+import shutil
+import logging
+import tempfile
+import subprocess
+import numpy as np
+
+from src.config import FFMPEG_PATH, FFPROBE_PATH
+from src.services.MediaInfo import get_media_info, parse_frame_rate
+from src.services.FFmpegRunner import FFmpegJob, FFmpegError, CREATION_FLAGS
+
+DEFAULT_WINDOW_BYTES = 256 * 1024 * 1024
+AUDIO_BLOCK_SAMPLES = 1024 * 1024
+
+
+def reverse_pcm_to_wav(pcm_path, wav_path, channels, sample_rate, block_samples=AUDIO_BLOCK_SAMPLES):
+    """
+    Scrive in `wav_path` il PCM s16le di `pcm_path` invertito nel tempo.
+    Il file sorgente è letto tramite memmap a blocchi, quindi la memoria resta costante.
+    """
+    frame_count = os.path.getsize(pcm_path) // (2 * channels)
+    with wave.open(wav_path, 'wb') as out:
+        out.setnchannels(channels)
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+        if frame_count == 0:
+            return
+
+        samples = np.memmap(pcm_path, dtype=np.int16, mode='r', shape=(frame_count, channels))
+        try:
+            end = frame_count
+            while end > 0:
+                start = max(0, end - block_samples)
+                out.writeframes(np.ascontiguousarray(samples[start:end][::-1]).tobytes())
+                end = start
+        finally:
+            del samples
+
+
+class ChunkedReverseEngine:
+    """
+    Inversione di un intervallo audio/video a memoria costante.
+
+    Il video viene decodificato a finestre in un file di scratch mappato in memoria
+    (np.memmap); ogni finestra viene poi inviata al contrario a un unico encoder,
+    partendo dall'ultima. L'audio viene estratto in PCM su disco e invertito a blocchi.
+    """
+
+    def __init__(self, ffmpeg_path=FFMPEG_PATH, ffprobe_path=FFPROBE_PATH, window_bytes=DEFAULT_WINDOW_BYTES):
+        self.ffmpeg_path = ffmpeg_path
+        self.media_info = get_media_info(ffprobe_path)
+        self.window_bytes = window_bytes
+        self._job = None
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+        job = self._job
+        if job:
+            job.cancel()
+
+    def _check_cancelled(self):
+        if self._cancelled:
+            raise InterruptedError("Inversione annullata.")
+
+    def _run(self, command):
+        self._check_cancelled()
+        self._job = FFmpegJob(command)
+        try:
+            self._job.run()
+        finally:
+            self._job = None
+        self._check_cancelled()
+
+    def _range_args(self, start_time, duration):
+        args = []
+        if start_time:
+            args.extend(['-ss', f"{start_time:.6f}"])
+        if duration is not None:
+            args.extend(['-t', f"{duration:.6f}"])
+        return args
+
+    def _reverse_audio(self, source_path, start_time, duration, audio_stream, work_dir):
+        """Estrae l'intervallo audio in PCM grezzo e lo inverte in un WAV."""
+        channels = int(audio_stream.get('channels') or 2)
+        sample_rate = int(audio_stream.get('sample_rate') or 44100)
+        pcm_path = os.path.join(work_dir, "audio.pcm")
+        wav_path = os.path.join(work_dir, "audio_reversed.wav")
+
+        command = [self.ffmpeg_path, '-y', '-v', 'error']
+        command.extend(self._range_args(start_time, duration))
+        command.extend(['-i', source_path, '-vn', '-f', 's16le', '-acodec', 'pcm_s16le',
+                        '-ac', str(channels), '-ar', str(sample_rate), pcm_path])
+        self._run(command)
+        self._check_cancelled()
+
+        reverse_pcm_to_wav(pcm_path, wav_path, channels, sample_rate)
+        os.remove(pcm_path)
+        return wav_path
+
+    def reverse_audio(self, source_path, output_path, start_time=None, end_time=None, progress_callback=None):
+        """Inverte solo l'audio di `source_path` e lo salva in `output_path`."""
+        audio_stream = self.media_info.stream(source_path, 'audio')
+        if audio_stream is None:
+            raise ValueError("Il file non contiene una traccia audio.")
+
+        start_time = start_time or 0.0
+        duration = (end_time - start_time) if end_time is not None else None
+
+        work_dir = tempfile.mkdtemp(prefix="genius_reverse_")
+        try:
+            if progress_callback: progress_callback(0.1)
+            wav_path = self._reverse_audio(source_path, start_time, duration, audio_stream, work_dir)
+            if progress_callback: progress_callback(0.7)
+            self._run([self.ffmpeg_path, '-y', '-v', 'error', '-i', wav_path, output_path])
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        if progress_callback: progress_callback(1.0)
+        return output_path
+
+    def reverse_video(self, source_path, output_path, start_time=None, end_time=None, progress_callback=None):
+        """Inverte video (e audio, se presente) di `source_path` e lo salva in `output_path`."""
+        video_stream = self.media_info.stream(source_path, 'video')
+        audio_stream = self.media_info.stream(source_path, 'audio')
+        if video_stream is None:
+            raise ValueError("Il file non contiene una traccia video.")
+
+        width = int(video_stream['width'])
+        height = int(video_stream['height'])
+        fps = parse_frame_rate(video_stream.get('avg_frame_rate') or video_stream.get('r_frame_rate'))
+
+        start_time = start_time or 0.0
+        if end_time is None:
+            end_time = self.media_info.duration(source_path)
+        duration = max(0.0, end_time - start_time)
+        total_frames = int(round(duration * fps))
+        if total_frames <= 0:
+            raise ValueError("L'intervallo da invertire è vuoto.")
+
+        frame_bytes = width * height * 3
+        window_frames = max(1, self.window_bytes // frame_bytes)
+        window_starts = list(range(0, total_frames, window_frames))
+
+        work_dir = tempfile.mkdtemp(prefix="genius_reverse_")
+        try:
+            wav_path = None
+            if audio_stream is not None:
+                wav_path = self._reverse_audio(source_path, start_time, duration, audio_stream, work_dir)
+            if progress_callback: progress_callback(0.2)
+
+            encoder = [self.ffmpeg_path, '-y', '-v', 'error',
+                       '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f"{width}x{height}", '-r', f"{fps:.6f}",
+                       '-i', 'pipe:0']
+            if wav_path:
+                encoder.extend(['-i', wav_path, '-map', '0:v:0', '-map', '1:a:0', '-c:a', 'aac'])
+            encoder.extend(['-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-movflags', '+faststart', output_path])
+
+            scratch_path = os.path.join(work_dir, "window.raw")
+            scratch = np.memmap(scratch_path, dtype=np.uint8, mode='w+', shape=(window_frames, height, width, 3))
+
+            self._check_cancelled()
+            encoder_job = self._job = FFmpegJob(encoder, duration=duration, stdin=True, name="inversione video")
+            try:
+                encoder_job.start()
+                for done, first_frame in enumerate(reversed(window_starts)):
+                    self._check_cancelled()
+                    count = min(window_frames, total_frames - first_frame)
+                    decoded = self._decode_window(source_path, start_time + first_frame / fps, count, scratch)
+                    for index in range(decoded - 1, -1, -1):
+                        encoder_job.stdin.write(scratch[index].data)
+                    if progress_callback:
+                        progress_callback(0.2 + 0.79 * (done + 1) / len(window_starts))
+            except BrokenPipeError:
+                # L'encoder è terminato in anticipo: l'errore è riportato dal codice di uscita
+                pass
+            finally:
+                try:
+                    encoder_job.stdin.close()
+                except (AttributeError, OSError):
+                    pass
+                del scratch
+                if encoder_job.process is not None:
+                    encoder_job.wait(check=False)
+                self._job = None
+
+            self._check_cancelled()
+            if encoder_job.returncode != 0:
+                raise FFmpegError(encoder_job.returncode, encoder_job.stderr)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        if progress_callback: progress_callback(1.0)
+        return output_path
+
+    def _decode_window(self, source_path, window_start, frame_count, scratch):
+        """Decodifica `frame_count` frame a partire da `window_start` nel buffer di scratch."""
+        command = [self.ffmpeg_path, '-v', 'error', '-ss', f"{window_start:.6f}", '-i', source_path,
+                   '-frames:v', str(frame_count), '-an', '-f', 'rawvideo', '-pix_fmt', 'rgb24', 'pipe:1']
+        decoder = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                   creationflags=CREATION_FLAGS)
+        decoded = 0
+        try:
+            while decoded < frame_count and not self._cancelled:
+                target = memoryview(scratch[decoded]).cast('B')
+                filled = 0
+                while filled < len(target):
+                    read = decoder.stdout.readinto(target[filled:])
+                    if not read:
+                        break
+                    filled += read
+                if filled < len(target):
+                    break
+                decoded += 1
+        finally:
+            decoder.stdout.close()
+            decoder.kill()
+            decoder.wait()
+
+        if decoded < frame_count:
+            logging.debug(f"Finestra a {window_start:.3f}s: decodificati {decoded}/{frame_count} frame.")
+        return decoded
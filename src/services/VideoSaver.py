@@ -1,14 +1,15 @@
 import os
-import subprocess
-import re
 import json
 import shutil
 import tempfile
 import cv2
 import numpy as np
 from PyQt6.QtCore import QThread, pyqtSignal
-from moviepy.editor import VideoFileClip
 from src.services.utils import generate_unique_filename
+from src.services.ParallelEncoder import ParallelSegmentEncoder
+from src.services.MediaInfo import get_media_info
+from src.services.FFmpegRunner import FFmpegJob, FFmpegError, format_progress_message
+from src.config import FFMPEG_PATH
 
 class VideoProcessingThread(QThread):
     progress = pyqtSignal(int, str)
@@ -20,29 +21,32 @@ class VideoProcessingThread(QThread):
         self.source_path = source_path
         self.target_path = generate_unique_filename(target_path)
         self.options = options
-        self.process = None
+        self.parallel_encoder = None
+        self.ffmpeg_job = None
         self.running = True
         self.temp_interpolated_video = None
 
     def stop(self):
         self.running = False
-        if self.process:
-            self.process.kill()
-            self.process = None
+        if self.parallel_encoder:
+            self.parallel_encoder.cancel()
+        if self.ffmpeg_job:
+            self.ffmpeg_job.cancel()
         self.progress.emit(0, "Operazione annullata.")
 
     def run(self):
         try:
-            video_input_path = self.source_path
-
-            # Stage 1: Frame Interpolation (Optional)
             if self.options.get('use_interpolation'):
-                self.temp_interpolated_video = self._run_interpolation_stage()
-                if not self.running: return
-                video_input_path = self.temp_interpolated_video
-
-            # Stage 2: FFmpeg Processing
-            self._run_ffmpeg_stage(video_input_path)
+                if self.options.get('use_parallel_encoding', False):
+                    # Il rendering a segmenti richiede un file di input: usa un intermedio lossless
+                    self.temp_interpolated_video = self._run_interpolation_stage()
+                    if not self.running: return
+                    self._run_ffmpeg_stage(self.temp_interpolated_video)
+                else:
+                    # Interpolazione in streaming: i frame vanno direttamente nell'encoder finale
+                    self._run_streaming_interpolation_stage()
+            else:
+                self._run_ffmpeg_stage(self.source_path)
 
         except Exception as e:
             if self.running:
@@ -52,9 +56,7 @@ class VideoProcessingThread(QThread):
             if self.temp_interpolated_video and os.path.exists(self.temp_interpolated_video):
                 os.remove(self.temp_interpolated_video)
 
-    def _run_interpolation_stage(self):
-        self.progress.emit(0, "Fase 1: Interpolazione frame con Optical Flow...")
-
+    def _open_source_capture(self):
         cap = cv2.VideoCapture(self.source_path)
         if not cap.isOpened():
             raise IOError("Impossibile aprire il file video sorgente.")
@@ -63,70 +65,155 @@ class VideoProcessingThread(QThread):
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         fps = cap.get(cv2.CAP_PROP_FPS)
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        return cap, width, height, fps, total_frames
+
+    def _interpolated_frames(self, cap, width, height, total_frames, progress_span):
+        """
+        Generatore dei frame interpolati (BGR). Le griglie di coordinate e i buffer
+        vengono allocati una sola volta; il flusso ottico è calcolato su una versione
+        ridotta del frame e poi riportato alla risoluzione piena.
+        """
         factor = self.options['interpolation_factor']
-
-        temp_video_path = os.path.join(tempfile.gettempdir(), f"temp_interpolated_{os.path.basename(self.target_path)}")
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(temp_video_path, fourcc, fps * factor, (width, height))
+        flow_scale = min(max(float(self.options.get('interpolation_flow_scale', 0.5)), 0.1), 1.0)
+        flow_w = max(16, int(width * flow_scale))
+        flow_h = max(16, int(height * flow_scale))
+        scale_x = width / flow_w
+        scale_y = height / flow_h
+
+        grid_x, grid_y = np.meshgrid(np.arange(width, dtype=np.float32), np.arange(height, dtype=np.float32))
+        map_x = np.empty((height, width), dtype=np.float32)
+        map_y = np.empty((height, width), dtype=np.float32)
+        flow = np.empty((height, width, 2), dtype=np.float32)
+        interp_frame = np.empty((height, width, 3), dtype=np.uint8)
+
+        def flow_gray(image):
+            if (flow_w, flow_h) != (width, height):
+                image = cv2.resize(image, (flow_w, flow_h), interpolation=cv2.INTER_AREA)
+            return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
 
         ret, prev_frame = cap.read()
         if not ret:
             raise ValueError("Impossibile leggere il primo frame del video.")
 
-        prev_gray = cv2.cvtColor(prev_frame, cv2.COLOR_BGR2GRAY)
+        prev_gray = flow_gray(prev_frame)
         frame_count = 0
+        last_percent = -1
 
         while self.running:
             ret, frame = cap.read()
             if not ret:
                 break
 
-            progress_percent = int((frame_count / total_frames) * 50) # Interpolation is 50% of the work
-            self.progress.emit(progress_percent, f"Interpolazione: Frame {frame_count}/{total_frames}")
+            if total_frames > 0:
+                percent = int((frame_count / total_frames) * progress_span)
+                if percent != last_percent:
+                    last_percent = percent
+                    self.progress.emit(percent, f"Interpolazione: Frame {frame_count}/{total_frames}")
 
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            flow = cv2.calcOpticalFlowFarneback(prev_gray, gray, None, 0.5, 3, 15, 3, 5, 1.2, 0)
+            gray = flow_gray(frame)
+            small_flow = cv2.calcOpticalFlowFarneback(prev_gray, gray, None, 0.5, 3, 15, 3, 5, 1.2, 0)
+            flow = cv2.resize(small_flow, (width, height), dst=flow, interpolation=cv2.INTER_LINEAR)
 
-            out.write(prev_frame)
+            yield prev_frame
 
-            h, w = flow.shape[:2]
-            x, y = np.meshgrid(np.arange(w), np.arange(h))
             for i in range(1, factor):
                 if not self.running: break
                 alpha = i / factor
-                map_x = (x + alpha * flow[..., 0]).astype(np.float32)
-                map_y = (y + alpha * flow[..., 1]).astype(np.float32)
-                interp_frame = cv2.remap(prev_frame, map_x, map_y, cv2.INTER_LINEAR)
-                out.write(interp_frame)
-
-            if not self.running: break
+                np.multiply(flow[..., 0], alpha * scale_x, out=map_x)
+                np.multiply(flow[..., 1], alpha * scale_y, out=map_y)
+                map_x += grid_x
+                map_y += grid_y
+                interp_frame = cv2.remap(prev_frame, map_x, map_y, cv2.INTER_LINEAR, dst=interp_frame)
+                yield interp_frame
 
             prev_frame = frame
             prev_gray = gray
             frame_count += 1
 
         if self.running:
-            out.write(prev_frame)
+            yield prev_frame
 
-        cap.release()
-        out.release()
+    def _pipe_frames(self, command, frames):
+        """Avvia ffmpeg con input rawvideo su stdin e vi scrive i frame generati."""
+        job = self.ffmpeg_job = FFmpegJob(command, stdin=True, name="interpolazione")
+        try:
+            job.start()
+            try:
+                for frame in frames:
+                    job.stdin.write(frame.data)
+            except BrokenPipeError:
+                # ffmpeg è terminato in anticipo: l'errore è riportato dal codice di uscita
+                pass
+            finally:
+                try:
+                    job.stdin.close()
+                except OSError:
+                    pass
+                job.wait(check=False)
+        except InterruptedError:
+            raise InterruptedError("Processo FFmpeg annullato.")
 
         if not self.running:
-            raise InterruptedError("Processo di interpolazione annullato.")
+            raise InterruptedError("Processo FFmpeg annullato.")
+        if job.returncode != 0:
+            raise FFmpegError(job.returncode, job.stderr)
+
+    def _raw_video_input_args(self, width, height, fps):
+        return ['-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f"{width}x{height}", '-r', f"{fps:.6f}", '-i', 'pipe:0']
+
+    def _run_interpolation_stage(self):
+        """Interpolazione verso un file intermedio lossless (usato dal rendering a segmenti)."""
+        self.progress.emit(0, "Fase 1: Interpolazione frame con Optical Flow...")
+
+        cap, width, height, fps, total_frames = self._open_source_capture()
+        factor = self.options['interpolation_factor']
+        temp_video_path = os.path.join(
+            tempfile.gettempdir(),
+            f"temp_interpolated_{os.path.splitext(os.path.basename(self.target_path))[0]}.mkv"
+        )
+
+        command = [FFMPEG_PATH, '-y', '-loglevel', 'error']
+        command.extend(self._raw_video_input_args(width, height, fps * factor))
+        command.extend(['-c:v', 'libx264', '-preset', 'ultrafast', '-qp', '0', temp_video_path])
+
+        try:
+            self._pipe_frames(command, self._interpolated_frames(cap, width, height, total_frames, 50))
+        finally:
+            cap.release()
 
         return temp_video_path
 
-    def _run_ffmpeg_stage(self, video_input_path):
-        self.progress.emit(50, "Fase 2: Processo FFmpeg...")
+    def _run_streaming_interpolation_stage(self):
+        """Interpola i frame e li invia come rawvideo direttamente al processo FFmpeg finale."""
+        self.progress.emit(0, "Interpolazione frame con Optical Flow...")
 
-        ffmpeg_path = 'ffmpeg/bin/ffmpeg.exe'
-        command = [ffmpeg_path, '-y', '-i', video_input_path]
+        cap, width, height, fps, total_frames = self._open_source_capture()
+        factor = self.options['interpolation_factor']
+        settings = self._build_encoding_settings()
 
+        command = [FFMPEG_PATH, '-y', '-loglevel', 'error']
+        command.extend(self._raw_video_input_args(width, height, fps * factor))
         # Audio input must always be the original source
         command.extend(['-i', self.source_path])
+        command.extend(self._filter_args(settings))
+        command.extend(settings['video_args'])
+        command.extend(settings['audio_args'])
+        command.extend(['-map', '0:v:0', '-map', '1:a:0?'])
+        command.append(self.target_path)
+
+        try:
+            self._pipe_frames(command, self._interpolated_frames(cap, width, height, total_frames, 99))
+        finally:
+            cap.release()
+
+        self.progress.emit(100, "Completato")
+        self.completed.emit(self.target_path)
 
+    def _build_encoding_settings(self):
+        """Filtri e parametri dell'encoder comuni a tutte le varianti dello stage FFmpeg."""
         video_filters = []
         audio_filters = []
+        time_scale = 1.0
 
         # Speed change
         if self.options.get('save_with_speed', False):
@@ -136,6 +223,7 @@ class VideoProcessingThread(QThread):
 
             if playback_rate != 1.0 and playback_rate > 0:
                 video_filters.append(f"setpts={1.0/playback_rate}*PTS")
+                time_scale = 1.0 / playback_rate
 
                 # Build atempo filter chain for audio
                 atempo_filters = []
@@ -148,66 +236,97 @@ class VideoProcessingThread(QThread):
                 if atempo_filters:
                     audio_filters.append(','.join(atempo_filters))
 
-        if video_filters:
-            command.extend(['-filter:v', ",".join(video_filters)])
-        if audio_filters:
-            command.extend(['-filter:a', ",".join(audio_filters)])
-
         # Compression
         if self.options.get('use_compression', False):
             quality = self.options.get('compression_quality', 5)
             crf = 28 - quality
-            command.extend(['-c:v', 'libx264', '-preset', 'medium', '-crf', str(crf)])
-            command.extend(['-c:a', 'aac', '-b:a', '128k'])
+            video_args = ['-c:v', 'libx264', '-preset', 'medium', '-crf', str(crf)]
+            audio_args = ['-c:a', 'aac', '-b:a', '128k']
         else:
-            command.extend(['-c:v', 'libx264', '-preset', 'medium', '-crf', '18'])
-            command.extend(['-c:a', 'aac', '-b:a', '192k'])
+            video_args = ['-c:v', 'libx264', '-preset', 'medium', '-crf', '18']
+            audio_args = ['-c:a', 'aac', '-b:a', '192k']
+
+        return {
+            'video_filters': video_filters,
+            'audio_filters': audio_filters,
+            'time_scale': time_scale,
+            'video_args': video_args,
+            'audio_args': audio_args,
+        }
+
+    def _filter_args(self, settings):
+        args = []
+        if settings['video_filters']:
+            args.extend(['-filter:v', ",".join(settings['video_filters'])])
+        if settings['audio_filters']:
+            args.extend(['-filter:a', ",".join(settings['audio_filters'])])
+        return args
+
+    def _run_ffmpeg_stage(self, video_input_path):
+        self.progress.emit(50, "Fase 2: Processo FFmpeg...")
+
+        settings = self._build_encoding_settings()
+        if self.options.get('use_parallel_encoding', False):
+            self._run_parallel_ffmpeg_stage(video_input_path, settings)
+            return
+
+        command = [FFMPEG_PATH, '-y', '-v', 'error', '-i', video_input_path]
+
+        # Audio input must always be the original source
+        command.extend(['-i', self.source_path])
+        command.extend(self._filter_args(settings))
+        command.extend(settings['video_args'])
+        command.extend(settings['audio_args'])
 
         # Map streams: video from the (potentially interpolated) input, audio from the original source
         command.extend(['-map', '0:v:0', '-map', '1:a:0?'])
         command.extend([self.target_path])
 
-        self.process = subprocess.Popen(
-            command,
-            stderr=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            universal_newlines=True,
-            creationflags=subprocess.CREATE_NO_WINDOW
-        )
+        def on_progress(stats):
+            if self.running and stats.get('fraction') is not None:
+                percent = 50 + min(int(stats['fraction'] * 50), 49)
+                self.progress.emit(percent, format_progress_message("Finalizzazione", stats))
 
-        duration = self._get_video_duration(self.source_path)
+        duration = self._get_video_duration(self.source_path) * settings['time_scale']
+        self.ffmpeg_job = FFmpegJob(command, duration=duration, on_progress=on_progress, name="salvataggio video")
+        try:
+            self.ffmpeg_job.run()
+        except InterruptedError:
+            raise InterruptedError("Processo FFmpeg annullato.")
 
-        while self.running:
-            if self.process is None or self.process.poll() is not None:
-                break
+        self.progress.emit(100, "Completato")
+        self.completed.emit(self.target_path)
 
-            line = self.process.stderr.readline()
-            if 'time=' in line:
-                match = re.search(r'time=(\d+:\d+:\d+\.\d+)', line)
-                if match:
-                    current_time_str = match.group(1)
-                    h, m, s_ms = current_time_str.split(':')
-                    seconds = float(h) * 3600 + float(m) * 60 + float(s_ms)
-                    if duration > 0:
-                        percent = 50 + min(int((seconds / duration) * 50), 49)
-                        self.progress.emit(percent, f"Finalizzazione: {percent}%")
+    def _run_parallel_ffmpeg_stage(self, video_input_path, settings):
+        """Variante a segmenti paralleli dello stage FFmpeg, con le stesse impostazioni dell'encoder."""
+        self.parallel_encoder = ParallelSegmentEncoder(num_segments=self.options.get('parallel_segments') or None)
 
-        if not self.running:
-             raise InterruptedError("Processo FFmpeg annullato.")
+        def on_progress(fraction):
+            if self.running:
+                percent = 50 + min(int(fraction * 50), 49)
+                self.progress.emit(percent, f"Rendering parallelo: {percent}%")
+
+        self.parallel_encoder.encode(
+            video_input_path,
+            self.target_path,
+            encoder_args=settings['video_args'],
+            video_filters=settings['video_filters'],
+            audio_source=self.source_path,
+            audio_args=settings['audio_args'],
+            audio_filters=settings['audio_filters'],
+            time_scale=settings['time_scale'],
+            progress_callback=on_progress
+        )
 
-        if self.process.returncode != 0:
-            error_output = self.process.stderr.read()
-            raise RuntimeError(f"Errore FFmpeg: {error_output}")
+        if not self.running:
+            raise InterruptedError("Processo FFmpeg annullato.")
 
         self.progress.emit(100, "Completato")
         self.completed.emit(self.target_path)
 
     def _get_video_duration(self, video_path):
         try:
-            clip = VideoFileClip(video_path)
-            duration = clip.duration
-            clip.close()
-            return duration
+            return get_media_info().duration(video_path)
         except Exception:
             return 0
 
@@ -218,7 +337,8 @@ class VideoSaver:
 
     def save_video(self, source_path, target_path, options):
         # If no special options are selected, just copy the file
-        if not options.get('use_interpolation') and not options.get('save_with_speed') and not options.get('use_compression'):
+        if not options.get('use_interpolation') and not options.get('save_with_speed') and not options.get('use_compression') \
+                and not options.get('use_parallel_encoding'):
              # We use a simple copy thread for consistency
             return CopyThread(source_path, target_path, self.parent)
 
@@ -63,92 +63,18 @@ def parse_timestamp_to_seconds(timestamp_str):
             return 0
     except (ValueError, TypeError):
         return 0
-import requests
-import logging
 from bs4 import BeautifulSoup
-from src.config import get_ollama_endpoint
+from src.services.LLMClient import get_llm_client, image_part
 
 def _call_ollama_api(model_name, system_prompt, user_prompt, images=None, timeout=300):
     """
-    Funzione helper centralizzata per chiamare l'API di Ollama, con gestione per modelli di testo e vision.
+    Chiama un modello Ollama (testo o vision) attraverso il client condiviso, che riusa
+    le connessioni HTTP e gestisce fallback a /api/generate e nuovi tentativi.
     """
-    endpoint = get_ollama_endpoint()
-    # Se vengono fornite immagini, usa sempre e solo /api/generate
-    if images:
-        logging.info(f"Modalità Vision: tentativo Ollama con /api/generate per il modello '{model_name}'...")
-        api_url = f"{endpoint}/api/generate"
-        payload = {
-            "model": model_name,
-            "prompt": user_prompt,
-            "system": system_prompt,
-            "images": images,
-            "stream": False
-        }
-        try:
-            response = requests.post(api_url, json=payload, timeout=timeout)
-            response.raise_for_status()
-            response_data = response.json()
-            result_text = response_data.get("response", "").strip()
-            if result_text:
-                logging.info("Successo con /api/generate in modalità Vision.")
-                return result_text
-            raise Exception("Risposta vuota o formato non valido da /api/generate in modalità Vision.")
-        except Exception as e:
-            logging.error(f"Errore in modalità Vision con /api/generate: {e}")
-            raise e
-
-    # Logica esistente per i modelli di solo testo
-    # Tentativo 1: /api/chat (moderno)
-    try:
-        logging.info(f"Modalità Testo: tentativo Ollama con /api/chat per il modello '{model_name}'...")
-        api_url = f"{endpoint}/api/chat"
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
-        payload = {"model": model_name, "messages": messages, "stream": False}
-
-        response = requests.post(api_url, json=payload, timeout=timeout)
-        response.raise_for_status()
-        response_data = response.json()
-
-        if "message" in response_data and "content" in response_data["message"]:
-            result_text = response_data["message"]["content"].strip()
-            if result_text:
-                logging.info("Successo con /api/chat.")
-                return result_text
-        raise Exception("Risposta vuota o formato non valido da /api/chat.")
-
-    except requests.exceptions.HTTPError as e:
-        if e.response.status_code == 404:
-            logging.warning("Endpoint /api/chat non trovato (404). Tento il fallback a /api/generate...")
-        else:
-            raise e
-    except Exception as e:
-        logging.error(f"Errore durante la chiamata a /api/chat: {e}")
-        raise e
-
-    # Tentativo 2: /api/generate (fallback per testo)
-    try:
-        logging.info(f"Modalità Testo: tentativo Ollama con /api/generate per il modello '{model_name}'...")
-        api_url = f"{endpoint}/api/generate"
-        payload = {
-            "model": model_name,
-            "prompt": user_prompt,
-            "system": system_prompt,
-            "stream": False
-        }
-        response = requests.post(api_url, json=payload, timeout=timeout)
-        response.raise_for_status()
-        response_data = response.json()
-        result_text = response_data.get("response", "").strip()
-        if result_text:
-            logging.info("Successo con /api/generate.")
-            return result_text
-        raise Exception("Risposta vuota o formato non valido da /api/generate.")
-    except Exception as e:
-        logging.error(f"Anche il fallback a /api/generate è fallito: {e}")
-        raise e
+    prompt = [user_prompt] + [image_part(image) for image in images or []]
+    response = get_llm_client().generate(f"ollama:{model_name}", prompt, system=system_prompt,
+                                         timeout=timeout, name="ollama")
+    return response.text
 
 def get_frame_at_timestamp(video_path, seconds):
     """
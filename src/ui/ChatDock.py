@@ -20,6 +20,8 @@ class ChatDock(CustomDock):
         self.font_size = 14        # Default font size
         self.current_context_content = "" # To store the context text
         self.default_title = title
+        self._stream_chunks = None  # Chunks of the AI message being streamed
+        self._stream_start = None   # Document position where the streamed message starts
         self._setup_ui()
 
     def update_context(self, context_name, context_content):
@@ -87,6 +89,13 @@ class ChatDock(CustomDock):
         if not self.history_text_edit.toPlainText().strip() == "":
             cursor.insertBlock()
 
+        cursor.insertHtml(self._message_html(sender, message))
+
+        # Ensure the view scrolls to the bottom
+        self.history_text_edit.ensureCursorVisible()
+
+    def _message_html(self, sender, message):
+        """Builds the HTML block for a chat message."""
         if sender.lower() == "user":
             # User messages are on a single line, with "Tu:" and the message together.
             html = f"""
@@ -105,10 +114,60 @@ class ChatDock(CustomDock):
             </div>
             {html_message}
             """
+        return html.strip()
 
-        cursor.insertHtml(html.strip())
+    def begin_stream_message(self):
+        """
+        Starts an AI message whose text arrives in chunks.
+        The message is re-rendered from its start position on every update.
+        """
+        self._stream_chunks = []
+        self._stream_start = None
 
-        # Ensure the view scrolls to the bottom
+    def append_stream_text(self, chunk):
+        """Appends a chunk to the AI message being streamed and re-renders it."""
+        if self._stream_chunks is None:
+            self.begin_stream_message()
+        self._stream_chunks.append(chunk)
+        self._render_stream_message("".join(self._stream_chunks))
+
+    def finish_stream_message(self, message):
+        """
+        Replaces the streamed text with the final response.
+        Falls back to a regular message if nothing was streamed.
+        """
+        if self._stream_start is None:
+            self.add_message("AI", message)
+        else:
+            self._render_stream_message(message)
+        self._stream_chunks = None
+        self._stream_start = None
+
+    def discard_stream_message(self):
+        """Removes the partially streamed AI message (e.g. after an error) and resets the stream state."""
+        if self._stream_start is not None:
+            cursor = self.history_text_edit.textCursor()
+            cursor.setPosition(self._stream_start)
+            cursor.movePosition(cursor.MoveOperation.End, cursor.MoveMode.KeepAnchor)
+            cursor.removeSelectedText()
+            # Also remove the block separator inserted before the message
+            if cursor.position() > 0:
+                cursor.deletePreviousChar()
+        self._stream_chunks = None
+        self._stream_start = None
+
+    def _render_stream_message(self, message):
+        cursor = self.history_text_edit.textCursor()
+        if self._stream_start is None:
+            cursor.movePosition(cursor.MoveOperation.End)
+            if not self.history_text_edit.toPlainText().strip() == "":
+                cursor.insertBlock()
+            self._stream_start = cursor.position()
+        else:
+            cursor.setPosition(self._stream_start)
+            cursor.movePosition(cursor.MoveOperation.End, cursor.MoveMode.KeepAnchor)
+            cursor.removeSelectedText()
+        cursor.insertHtml(self._message_html("AI", message))
         self.history_text_edit.ensureCursorVisible()
 
     def clear_chat(self):
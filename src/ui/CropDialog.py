@@ -6,15 +6,20 @@ from .ResizableRubberBand import ResizableRubberBand
 from src.services.utils import parse_timestamp_to_seconds
 from .CustomSlider import CustomSlider
 from screeninfo import get_monitors
+from src.services.MediaInfo import get_media_info
 
 class CropDialog(QDialog):
-    def __init__(self, video_path, current_time=0, start_time=None, end_time=None, parent=None):
+    def __init__(self, video_path, current_time=0, start_time=None, end_time=None, parent=None, preview_path=None):
         super().__init__(parent)
         self.setWindowTitle("Ritaglia Video")
         self.setModal(True)
 
+        # I frame possono essere letti da un proxy a bassa risoluzione: il rettangolo
+        # restituito da get_crop_rect resta comunque in pixel del video originale
         self.video_path = video_path
-        self.cap = cv2.VideoCapture(video_path)
+        self.preview_path = preview_path or video_path
+        self.source_size = self._get_source_size() if self.preview_path != video_path else None
+        self.cap = cv2.VideoCapture(self.preview_path)
         self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
         self.fps = self.cap.get(cv2.CAP_PROP_FPS)
 
@@ -203,7 +208,26 @@ class CropDialog(QDialog):
     def prev_frame(self):
         self.update_frame(self.current_frame_pos - 1)
 
+    def _get_source_size(self):
+        try:
+            video_stream = get_media_info().stream(self.video_path, 'video')
+        except OSError:
+            return None
+        if not video_stream:
+            return None
+        return QSize(int(video_stream['width']), int(video_stream['height']))
+
     def get_crop_rect(self):
+        """Rettangolo di ritaglio in pixel del video originale."""
+        rect = self._get_pixmap_crop_rect()
+        if self.source_size is None or rect.isNull() or self.original_pixmap.width() == 0:
+            return rect
+        scale_w = self.source_size.width() / self.original_pixmap.width()
+        scale_h = self.source_size.height() / self.original_pixmap.height()
+        return QRect(int(rect.x() * scale_w), int(rect.y() * scale_h),
+                     int(rect.width() * scale_w), int(rect.height() * scale_h))
+
+    def _get_pixmap_crop_rect(self):
         pixmap_w = self.display_pixmap.width()
         pixmap_h = self.display_pixmap.height()
 
@@ -229,7 +253,7 @@ class CropDialog(QDialog):
         )
 
     def get_cropped_pixmap(self):
-        crop_rect = self.get_crop_rect()
+        crop_rect = self._get_pixmap_crop_rect()
         return self.original_pixmap.copy(crop_rect)
 
     def get_selected_size_percentage(self):
@@ -15,6 +15,7 @@ from .ImageCropDialog import ImageCropDialog
 from services.utils import get_frame_at_timestamp
 from .ImageSizeDialog import ResizedImageDialog
 from src.config import get_resource
+from src.services.MediaInfo import get_media_info
 
 class CustomTextDocument(QTextDocument):
     def loadResource(self, type, name):
@@ -198,11 +199,10 @@ class CustomTextEdit(QTextEdit):
         self.viewport().update()
 
     def _get_fps(self, video_path):
-        import cv2
-        cap = cv2.VideoCapture(video_path)
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        cap.release()
-        return fps if fps > 0 else 30
+        try:
+            return get_media_info().fps(video_path, default=30)
+        except OSError:
+            return 30
 
     def handle_previous_frame(self, image_name):
         metadata = self.image_metadata.get(image_name)
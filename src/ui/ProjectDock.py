@@ -1,4 +1,4 @@
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QGroupBox, QTreeWidget, QTreeWidgetItem, QPushButton, QFormLayout, QHeaderView, QMenu, QHBoxLayout, QInputDialog, QFileDialog
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QGroupBox, QTreeWidget, QTreeWidgetItem, QPushButton, QFormLayout, QHeaderView, QMenu, QHBoxLayout, QInputDialog, QFileDialog, QAbstractItemView
 from PyQt6.QtCore import Qt, pyqtSignal, QFileSystemWatcher, QTimer, QEvent
 from PyQt6.QtGui import QIcon
 from src.ui.CustomDock import CustomDock
@@ -53,7 +53,9 @@ class ProjectDock(CustomDock):
     project_clips_folder_changed = pyqtSignal() # Segnale generico di modifica
     batch_transcribe_requested = pyqtSignal()
     batch_summarize_requested = pyqtSignal()
+    clip_summaries_requested = pyqtSignal()
     separate_audio_requested = pyqtSignal(str)
+    crop_clips_requested = pyqtSignal(list)
 
     def __init__(self, title="Progetto", closable=True, parent=None):
         super().__init__(title, closable=closable, parent=parent)
@@ -149,6 +151,9 @@ class ProjectDock(CustomDock):
             # Aggiungi "Separa Audio" solo per le clip video
             if not is_audio_clip:
                 separate_audio_action = menu.addAction("Separa Audio")
+                crop_paths = self._selected_video_paths(item)
+                crop_label = f"Ritaglia {len(crop_paths)} clip selezionate..." if len(crop_paths) > 1 else "Ritaglia..."
+                crop_action = menu.addAction(crop_label)
                 menu.addSeparator()
 
             # Verifica se esiste un riassunto per abilitare l'azione
@@ -180,6 +185,8 @@ class ProjectDock(CustomDock):
                 self.open_in_output_player_requested.emit(file_path)
             elif 'separate_audio_action' in locals() and action == separate_audio_action:
                 self.separate_audio_requested.emit(file_path)
+            elif 'crop_action' in locals() and action == crop_action:
+                self.crop_clips_requested.emit(crop_paths)
             elif action == rename_action:
                 self._trigger_rename(item)
             elif action == rename_from_summary_action:
@@ -187,6 +194,20 @@ class ProjectDock(CustomDock):
             elif action == delete_action:
                 self.delete_clip_requested.emit(clip_filename) # Usa la variabile locale
 
+    def _selected_video_paths(self, clicked_item):
+        """Percorsi delle clip video online selezionate, con la clip cliccata per prima."""
+        items = [clicked_item] + [i for i in self.tree_clips.selectedItems() if i is not clicked_item]
+        paths = []
+        for item in items:
+            if not item.parent() or item.parent().text(0) == "Clip Audio":
+                continue
+            if item.data(0, Qt.ItemDataRole.UserRole + 1) == "offline":
+                continue
+            path = item.data(0, Qt.ItemDataRole.UserRole)
+            if path and os.path.exists(path) and path not in paths:
+                paths.append(path)
+        return paths
+
     def _setup_ui(self):
         main_widget = QWidget()
         main_layout = QVBoxLayout(main_widget)
@@ -215,6 +236,7 @@ class ProjectDock(CustomDock):
         self.tree_clips.setColumnCount(6)
         self.tree_clips.setHeaderLabels(["Nome File", "Data", "Durata", "Dimensione", "Trascrizione", "Riassunto"])
         self.tree_clips.setToolTip("Fai doppio click su una clip per caricarla.")
+        self.tree_clips.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         self.tree_clips.itemDoubleClicked.connect(self._on_clip_selected)
 
         header = self.tree_clips.header()
@@ -242,6 +264,11 @@ class ProjectDock(CustomDock):
         self.btn_batch_summarize.clicked.connect(self.batch_summarize_requested.emit)
         buttons_layout.addWidget(self.btn_batch_summarize)
 
+        self.btn_clip_summaries = QPushButton("Riassumi Ogni Clip")
+        self.btn_clip_summaries.setToolTip("Genera il riassunto di ogni clip trascritta, più clip alla volta. Le clip con un riassunto aggiornato sono saltate.")
+        self.btn_clip_summaries.clicked.connect(self.clip_summaries_requested.emit)
+        buttons_layout.addWidget(self.btn_clip_summaries)
+
         buttons_layout.addStretch()
 
         self.btn_refresh_clips = QPushButton()
@@ -308,6 +335,68 @@ class ProjectDock(CustomDock):
         except (ValueError, TypeError):
             return "N/A"
 
+    def _add_clip_item(self, root_item, clip, clips_dir):
+        """Crea la riga dell'albero per una clip del progetto."""
+        item = SortableTreeWidgetItem(root_item)
+        clip_filename = clip.get("clip_filename", "N/A")
+        full_path = os.path.join(clips_dir, clip_filename)
+
+        # --- Carica dati JSON ---
+        has_transcription = "❌"
+        has_summary = "❌"
+        json_path = os.path.splitext(full_path)[0] + ".json"
+        if os.path.exists(json_path):
+            try:
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    json_data = json.load(f)
+                # Funzione helper per verificare se il contenuto HTML ha testo visibile
+                def html_has_text(html_content):
+                    if not html_content or not html_content.strip():
+                        return False
+                    soup = BeautifulSoup(html_content, 'html.parser')
+                    return soup.get_text(strip=True) != ""
+
+                # Verifica che il contenuto esista e non sia una stringa vuota/whitespace
+                transcription_original = json_data.get("transcription_original", "")
+                transcription_corrected = json_data.get("transcription_corrected", "")
+                if html_has_text(transcription_original) or html_has_text(transcription_corrected):
+                    has_transcription = "✔️"
+
+                summaries = json_data.get("summaries", {})
+                # Controlla tutti i possibili riassunti
+                if any(html_has_text(summary) for summary in summaries.values()):
+                    has_summary = "✔️"
+            except (json.JSONDecodeError, IOError):
+                pass # Il file JSON potrebbe essere corrotto o vuoto
+
+        # Imposta l'icona in base allo stato
+        status = clip.get("status", "N/A")
+        if status == "online":
+            item.setIcon(0, QIcon(get_resource("online.png")))
+        elif status == "offline":
+            item.setIcon(0, QIcon(get_resource("offline.png")))
+
+        creation_date = clip.get("creation_date")
+        duration = clip.get("duration")
+        size = clip.get("size")
+
+        item.setText(0, clip_filename)
+        item.setToolTip(0, full_path) # Tooltip con percorso completo
+        item.setText(1, self._format_date(creation_date))
+        item.setText(2, self._format_duration(duration))
+        item.setText(3, self._format_size(size))
+        item.setText(4, has_transcription)
+        item.setText(5, has_summary)
+
+        # Salva il percorso completo e lo stato per un facile accesso
+        item.setData(0, Qt.ItemDataRole.UserRole, full_path)
+        item.setData(0, Qt.ItemDataRole.UserRole + 1, status)
+        # Salva i dati grezzi per l'ordinamento
+        item.setData(1, Qt.ItemDataRole.UserRole, creation_date)
+        item.setData(2, Qt.ItemDataRole.UserRole, duration)
+        item.setData(3, Qt.ItemDataRole.UserRole, size)
+        return item
+
     def load_project_data(self, project_data, project_dir, gnai_path):
         # Rimuovi i percorsi precedenti dal watcher
         if self.file_watcher.directories():
@@ -336,65 +425,7 @@ class ProjectDock(CustomDock):
                 self.file_watcher.addPath(clips_dir)
 
             for clip in clips:
-                item = SortableTreeWidgetItem(root_item)
-                clip_filename = clip.get("clip_filename", "N/A")
-                full_path = os.path.join(clips_dir, clip_filename)
-
-                # --- Carica dati JSON ---
-                has_transcription = "❌"
-                has_summary = "❌"
-                json_path = os.path.splitext(full_path)[0] + ".json"
-                if os.path.exists(json_path):
-                    try:
-                        with open(json_path, 'r', encoding='utf-8') as f:
-                            json_data = json.load(f)
-                        # Funzione helper per verificare se il contenuto HTML ha testo visibile
-                        def html_has_text(html_content):
-                            if not html_content or not html_content.strip():
-                                return False
-                            soup = BeautifulSoup(html_content, 'html.parser')
-                            return soup.get_text(strip=True) != ""
-
-                        # Verifica che il contenuto esista e non sia una stringa vuota/whitespace
-                        transcription_original = json_data.get("transcription_original", "")
-                        transcription_corrected = json_data.get("transcription_corrected", "")
-                        if html_has_text(transcription_original) or html_has_text(transcription_corrected):
-                            has_transcription = "✔️"
-
-                        summaries = json_data.get("summaries", {})
-                        # Controlla tutti i possibili riassunti
-                        if any(html_has_text(summary) for summary in summaries.values()):
-                            has_summary = "✔️"
-                    except (json.JSONDecodeError, IOError):
-                        pass # Il file JSON potrebbe essere corrotto o vuoto
-
-                # Imposta l'icona in base allo stato
-                status = clip.get("status", "N/A")
-                if status == "online":
-                    item.setIcon(0, QIcon(get_resource("online.png")))
-                elif status == "offline":
-                    item.setIcon(0, QIcon(get_resource("offline.png")))
-
-                creation_date = clip.get("creation_date")
-                duration = clip.get("duration")
-                size = clip.get("size")
-
-                item.setText(0, clip_filename)
-                item.setToolTip(0, full_path) # Tooltip con percorso completo
-                item.setText(1, self._format_date(creation_date))
-                item.setText(2, self._format_duration(duration))
-                item.setText(3, self._format_size(size))
-                item.setText(4, has_transcription)
-                item.setText(5, has_summary)
-
-                # Salva il percorso completo e lo stato per un facile accesso
-                item.setData(0, Qt.ItemDataRole.UserRole, full_path)
-                item.setData(0, Qt.ItemDataRole.UserRole + 1, status)
-                # Salva i dati grezzi per l'ordinamento
-                item.setData(1, Qt.ItemDataRole.UserRole, creation_date)
-                item.setData(2, Qt.ItemDataRole.UserRole, duration)
-                item.setData(3, Qt.ItemDataRole.UserRole, size)
-
+                self._add_clip_item(root_item, clip, clips_dir)
 
         # Carica clip video e audio
         project_clips = sorted(project_data.get("clips", []), key=lambda x: x.get("creation_date", ""))
@@ -443,6 +474,45 @@ class ProjectDock(CustomDock):
             item.setText(0, "Nessuna clip trovata.")
             item.setDisabled(True)
 
+    def add_clip(self, clip_info, clip_type='video'):
+        """
+        Aggiunge una clip appena registrata nel progetto all'albero, senza ricaricare
+        l'intero progetto. Se la clip è già presente, la riga viene aggiornata.
+        """
+        if not self.project_dir or self.project_data is None:
+            return
+        list_key = "clips" if clip_type == 'video' else "audio_clips"
+        root_text = "Clip Video" if clip_type == 'video' else "Clip Audio"
+        subfolder = "clips" if clip_type == 'video' else "audio"
+
+        clips = self.project_data.setdefault(list_key, [])
+        clips[:] = [c for c in clips if c.get("clip_filename") != clip_info.get("clip_filename")]
+        clips.append(clip_info)
+
+        root_item = None
+        for i in range(self.tree_clips.topLevelItemCount()):
+            top_item = self.tree_clips.topLevelItem(i)
+            if top_item.text(0) == root_text:
+                root_item = top_item
+            elif top_item.isDisabled():
+                # Segnaposto "Nessuna clip trovata."
+                self.tree_clips.takeTopLevelItem(i)
+                break
+        if root_item is None:
+            root_item = SortableTreeWidgetItem(self.tree_clips)
+            root_item.setText(0, root_text)
+            root_item.setExpanded(True)
+
+        for i in range(root_item.childCount()):
+            if root_item.child(i).text(0) == clip_info.get("clip_filename"):
+                root_item.removeChild(root_item.child(i))
+                break
+
+        clips_dir = os.path.join(self.project_dir, subfolder)
+        if os.path.exists(clips_dir) and clips_dir not in self.file_watcher.directories():
+            self.file_watcher.addPath(clips_dir)
+        return self._add_clip_item(root_item, clip_info, clips_dir)
+
     def clear_project(self):
         """Resetta il dock allo stato iniziale, pulendo i dati del progetto."""
         if self.file_watcher.directories():
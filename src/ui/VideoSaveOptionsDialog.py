@@ -81,6 +81,11 @@ class VideoSaveOptionsDialog(QDialog):
         interpolationLayout.addStretch()
         layout.addWidget(self.interpolationGroup)
 
+        # Parallel segment rendering
+        self.parallelEncodingCheck = QCheckBox("Rendering parallelo a segmenti (usa tutti i core CPU)")
+        self.parallelEncodingCheck.setChecked(self.settings.value("render/parallelEncoding", False, type=bool))
+        layout.addWidget(self.parallelEncodingCheck)
+
         # Enable/disable options based on selection
         self.originalRadio.toggled.connect(self.update_options_state)
         self.compressedRadio.toggled.connect(self.update_options_state)
@@ -104,7 +109,9 @@ class VideoSaveOptionsDialog(QDialog):
             'compression_quality': self.qualitySlider.value(),
             'save_with_speed': self.saveWithPlaybackSpeedCheck.isChecked(),
             'use_interpolation': self.interpolationGroup.isChecked(),
-            'interpolation_factor': self.interpolationFactorSpinBox.value()
+            'interpolation_factor': self.interpolationFactorSpinBox.value(),
+            'use_parallel_encoding': self.parallelEncodingCheck.isChecked(),
+            'parallel_segments': self.settings.value("render/parallelSegments", 0, type=int)
         }
 
     def get_file_size_info(self):
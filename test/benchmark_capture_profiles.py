@@ -0,0 +1,110 @@
+"""
+Benchmark dei profili di cattura della registrazione schermo.
+
+Per ogni profilo di CaptureOptions esegue la stessa pipeline di ScreenRecorder
+(encoder, CRF/bitrate per risoluzione, watermark) su una sorgente Linux al posto
+di gdigrab:
+  - testsrc: testsrc2 letto a velocità reale (-re), sempre disponibile;
+  - x11grab: cattura reale del display X indicato da $DISPLAY.
+
+Riporta frame scritti, frame duplicati/persi, velocità dell'encoder, CPU media
+(in core) e bitrate del file, con il watermark ridimensionato in anticipo o nel
+grafo dei filtri come nella versione precedente.
+
+Uso:
+    python test/benchmark_capture_profiles.py [--source testsrc|x11grab] [--size 1920x1080]
+        [--fps 25] [--duration 10] [--watermark percorso.png] [--only balanced ...]
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import FFMPEG_PATH, WATERMARK_IMAGE
+from src.services.FFmpegRunner import FFmpegJob
+from src.recorder.CaptureOptions import (
+    CAPTURE_PROFILES, video_encoder_args, watermark_overlay, prescaled_watermark
+)
+
+
+def source_args(source, width, height, fps):
+    if source == 'x11grab':
+        return ['-f', 'x11grab', '-framerate', str(fps), '-video_size', f"{width}x{height}",
+                '-i', os.environ.get('DISPLAY', ':0')]
+    return ['-re', '-f', 'lavfi', '-i', f"testsrc2=size={width}x{height}:rate={fps}"]
+
+
+def build_command(args, profile, watermark_mode, watermark_path, prescaled_path, output_path):
+    width, height = (int(v) for v in args.size.split('x'))
+    command = [FFMPEG_PATH, '-y', '-v', 'error'] + source_args(args.source, width, height, args.fps)
+    if watermark_mode == 'prescaled':
+        command.extend(['-i', prescaled_path,
+                        '-filter_complex', f"[0:v][1:v]{watermark_overlay('Bottom Right')}[v_out]", '-map', '[v_out]'])
+    elif watermark_mode == 'filter':
+        command.extend(['-i', watermark_path,
+                        '-filter_complex', f"[1:v]scale=-1:ih*{args.watermark_size / 100}[wm];"
+                                           f"[0:v][wm]{watermark_overlay('Bottom Right')}[v_out]",
+                        '-map', '[v_out]'])
+    else:
+        command.extend(['-map', '0:v'])
+    command.extend(video_encoder_args(profile, height, args.fps))
+    command.extend(['-t', str(args.duration), output_path])
+    return command
+
+
+def run_case(command, duration):
+    cpu_before = os.times()
+    job = FFmpegJob(command, duration=duration, name="benchmark cattura")
+    started = time.perf_counter()
+    job.run()
+    wall = time.perf_counter() - started
+    cpu_after = os.times()
+    cpu_seconds = (cpu_after.children_user - cpu_before.children_user) + \
+                  (cpu_after.children_system - cpu_before.children_system)
+    return job.stats, wall, cpu_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dei profili di cattura")
+    parser.add_argument('--source', choices=['testsrc', 'x11grab'], default='testsrc')
+    parser.add_argument('--size', default='1920x1080')
+    parser.add_argument('--fps', type=int, default=25)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--watermark', default=WATERMARK_IMAGE)
+    parser.add_argument('--watermark-size', type=int, default=10)
+    parser.add_argument('--only', nargs='*', choices=sorted(CAPTURE_PROFILES), help="Profili da eseguire")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="genius_capture_bench_")
+    try:
+        watermark_modes = ['none']
+        prescaled_path = None
+        if args.watermark and os.path.exists(args.watermark):
+            prescaled_path = prescaled_watermark(args.watermark, args.watermark_size, work_dir)
+            watermark_modes = ['filter', 'prescaled'] if prescaled_path else ['filter']
+
+        expected_frames = int(args.duration * args.fps)
+        print(f"Sorgente: {args.source} {args.size} @ {args.fps} fps per {args.duration:.0f}s "
+              f"({expected_frames} frame attesi)\n")
+        print(f"{'profilo':<13}{'watermark':<11}{'frame':>7}{'dup':>6}{'drop':>6}{'velocità':>10}"
+              f"{'CPU (core)':>12}{'kbit/s':>9}")
+
+        for profile in args.only or CAPTURE_PROFILES:
+            for watermark_mode in watermark_modes:
+                output_path = os.path.join(work_dir, f"{profile}_{watermark_mode}.mp4")
+                command = build_command(args, profile, watermark_mode, args.watermark, prescaled_path, output_path)
+                stats, wall, cpu_seconds = run_case(command, args.duration)
+                bitrate = os.path.getsize(output_path) * 8 / 1000 / args.duration
+                print(f"{profile:<13}{watermark_mode:<11}{stats.get('frame') or 0:>7}{stats.get('dup_frames') or 0:>6}"
+                      f"{stats.get('drop_frames') or 0:>6}{(stats.get('speed') or 0):>9.2f}x"
+                      f"{cpu_seconds / wall:>12.2f}{bitrate:>9.0f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark delle richieste ai modelli linguistici rieseguite da una registrazione.
+
+Le richieste si registrano avviando l'applicazione con GENIUSAI_RECORD_PROMPTS=1
+(vengono scritte in LLM_PROMPT_LOG_FILE) e si rieseguono qui contro un modello a
+scelta; con il modello sostitutivo 'local:echo' il benchmark non richiede rete né
+chiavi API e misura solo il costo della pipeline attorno al modello.
+
+Uso:
+    python test/benchmark_llm_replay.py [--file llm_prompts.jsonl] [--model local:echo | --recorded-model]
+                                        [--stream] [--workers 1] [--limit N] [--repeat 1]
+
+Senza registrazione vengono usati prompt sintetici costruiti dai template di riassunto e correzione.
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import LLM_PROMPT_LOG_FILE, LOCAL_ECHO, PROMPT_TEXT_SUMMARY, PROMPT_TEXT_FIX, PROMPT_MEETING_SUMMARY
+from src.services.LLMClient import LLMClient, load_recorded_prompts, provider_for_model
+
+
+def synthetic_prompts(sentences=400):
+    transcript = "\n".join(f"[00:{i // 60:02d}:{i % 60:02d}] Frase numero {i} della riunione di prova." for i in range(sentences))
+    records = []
+    for name, template_path in (("testo summary", PROMPT_TEXT_SUMMARY), ("testo fix", PROMPT_TEXT_FIX),
+                                ("riassunto meeting", PROMPT_MEETING_SUMMARY)):
+        with open(template_path, 'r', encoding='utf-8') as f:
+            template = f.read()
+        records.append({'name': name, 'model': LOCAL_ECHO, 'system': template, 'prompt': [transcript],
+                        'max_tokens': 4096, 'temperature': 0.7})
+    return records
+
+
+def replay(client, record, model, stream):
+    first_token = []
+    started = time.perf_counter()
+
+    def on_text(chunk):
+        if not first_token:
+            first_token.append(time.perf_counter() - started)
+
+    response = client.generate(model, record['prompt'], system=record.get('system'),
+                               max_tokens=record.get('max_tokens') or 4096, temperature=record.get('temperature'),
+                               name=f"replay {record.get('name')}", on_text=on_text if stream else None)
+    return time.perf_counter() - started, first_token[0] if first_token else None, response
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Riesecuzione e misura delle richieste registrate ai modelli")
+    parser.add_argument('--file', default=LLM_PROMPT_LOG_FILE, help="Registrazione JSONL delle richieste")
+    parser.add_argument('--model', default=LOCAL_ECHO, help="Modello contro cui rieseguire le richieste")
+    parser.add_argument('--recorded-model', action='store_true', help="Usa il modello registrato con ogni richiesta")
+    parser.add_argument('--stream', action='store_true', help="Richieste in streaming (misura anche il primo token)")
+    parser.add_argument('--workers', type=int, default=1, help="Richieste contemporanee")
+    parser.add_argument('--limit', type=int, help="Numero massimo di richieste")
+    parser.add_argument('--repeat', type=int, default=1, help="Ripetizioni di ogni richiesta")
+    args = parser.parse_args()
+
+    if os.path.exists(args.file):
+        records = load_recorded_prompts(args.file)
+        print(f"Registrazione: {args.file} ({len(records)} richieste)")
+    else:
+        records = synthetic_prompts()
+        print(f"Registrazione {args.file} non trovata: uso {len(records)} prompt sintetici")
+    records = (records[:args.limit] if args.limit else records) * args.repeat
+
+    models = [record['model'] if args.recorded_model else args.model for record in records]
+    concurrency = {provider_for_model(model)[0]: args.workers for model in set(models)}
+    # Le misure del benchmark non finiscono nelle metriche dell'applicazione
+    client = LLMClient(metrics_file=None, concurrency=concurrency)
+
+    print(f"\n{'richiesta':<28}{'modello':<24}{'tempo (s)':>10}{'1° token':>10}{'token out':>11}{'token/s':>12}")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(replay, client, record, model, args.stream) for record, model in zip(records, models)]
+        results = []
+        for record, model, future in zip(records, models, futures):
+            try:
+                elapsed, first_token, response = future.result()
+            except Exception as e:
+                print(f"{record.get('name', '?')[:27]:<28}{model[:23]:<24} errore: {e}")
+                continue
+            results.append((elapsed, response.output_tokens))
+            first = f"{first_token:.3f}" if first_token is not None else "-"
+            rate = response.output_tokens / elapsed if elapsed else 0
+            print(f"{record.get('name', '?')[:27]:<28}{model[:23]:<24}{elapsed:>10.3f}{first:>10}"
+                  f"{response.output_tokens:>11}{rate:>12.1f}")
+    total = time.perf_counter() - started
+
+    if results:
+        latencies = sorted(elapsed for elapsed, _ in results)
+        output_tokens = sum(tokens for _, tokens in results)
+        print(f"\n{len(results)}/{len(records)} richieste in {total:.2f}s, latenza mediana "
+              f"{latencies[len(latencies) // 2]:.3f}s, massima {latencies[-1]:.3f}s, "
+              f"{output_tokens / total if total else 0:.1f} token/s complessivi")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark dell'allineamento velocità video/audio.
+
+Confronta i tre percorsi storici con il motore a passaggio singolo:
+  - moviepy: speedx + set_audio + write_videofile (AudioProcessingThread.sync_and_apply,
+    adattaVelocitaVideoAAudio e AudioVideoThread per i file sotto i 500 MB);
+  - ffmpeg_two_pass: ricodifica setpts su file temporaneo e poi mux dell'audio
+    (AudioVideoThread.process_large_files);
+  - moviepy_mux: video senza audio scritto da moviepy, audio scritto a parte e
+    unione finale con ffmpeg (AudioVideoThread.save_with_ffmpeg);
+  - single_pass: SpeedAlignEngine.align.
+
+Uso:
+    python test/benchmark_speed_align.py [video audio] [--duration 30] [--only single_pass ...]
+
+Senza file in ingresso viene generata una coppia sintetica con testsrc/sine.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import FFMPEG_PATH
+from src.services.MediaInfo import MediaInfo
+from src.services.SpeedAlign import SpeedAlignEngine, compute_speed_factor
+
+# Durate lette senza usare la cache su disco dell'applicazione
+media_info = MediaInfo(cache_file=None)
+
+
+def generate_inputs(work_dir, duration, ffmpeg_path):
+    video_path = os.path.join(work_dir, "input.mp4")
+    audio_path = os.path.join(work_dir, "input.wav")
+    subprocess.run([ffmpeg_path, '-y', '-v', 'error', '-f', 'lavfi', '-i', f"testsrc=size=1280x720:rate=30:duration={duration}",
+                    '-f', 'lavfi', '-i', f"sine=frequency=440:duration={duration}",
+                    '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-c:a', 'aac', '-shortest', video_path], check=True)
+    subprocess.run([ffmpeg_path, '-y', '-v', 'error', '-f', 'lavfi', '-i', f"sine=frequency=220:duration={duration * 0.8:.3f}",
+                    audio_path], check=True)
+    return video_path, audio_path
+
+
+def run_moviepy(video_path, audio_path, output_path, work_dir):
+    from moviepy.editor import VideoFileClip, AudioFileClip, vfx
+    video_clip = VideoFileClip(video_path)
+    audio_clip = AudioFileClip(audio_path)
+    try:
+        speed_factor = round(video_clip.duration / audio_clip.duration, 2)
+        final_video = video_clip.fx(vfx.speedx, speed_factor).set_audio(audio_clip)
+        final_video.write_videofile(output_path, codec="libx264", audio_codec="aac", fps=video_clip.fps,
+                                    preset='ultrafast', ffmpeg_params=['-crf', '23'], logger=None)
+    finally:
+        video_clip.close()
+        audio_clip.close()
+
+
+def run_ffmpeg_two_pass(video_path, audio_path, output_path, work_dir):
+    speed_factor = round(media_info.duration(video_path) / media_info.duration(audio_path), 2)
+    temp_video = os.path.join(work_dir, "two_pass_video.mp4")
+    subprocess.run([FFMPEG_PATH, '-y', '-v', 'error', '-i', video_path,
+                    '-filter_complex', f'[0:v]setpts={1 / speed_factor}*PTS[v]', '-map', '[v]',
+                    '-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '23', temp_video], check=True)
+    subprocess.run([FFMPEG_PATH, '-y', '-v', 'error', '-i', temp_video, '-i', audio_path,
+                    '-map', '0:v', '-map', '1:a', '-c:v', 'copy', '-c:a', 'aac', '-shortest', output_path], check=True)
+
+
+def run_moviepy_mux(video_path, audio_path, output_path, work_dir):
+    from moviepy.editor import VideoFileClip, AudioFileClip, vfx
+    video_clip = VideoFileClip(video_path)
+    audio_clip = AudioFileClip(audio_path)
+    try:
+        speed_factor = round(video_clip.duration / audio_clip.duration, 2)
+        video_modified = video_clip.fx(vfx.speedx, speed_factor)
+        temp_video = os.path.join(work_dir, "mux_video.mp4")
+        temp_audio = os.path.join(work_dir, "mux_audio.aac")
+        video_modified.without_audio().write_videofile(temp_video, codec='libx264', audio=False, fps=video_clip.fps,
+                                                       preset='ultrafast', logger=None)
+        audio_clip.write_audiofile(temp_audio, codec='aac', logger=None)
+        subprocess.run([FFMPEG_PATH, '-y', '-v', 'error', '-i', temp_video, '-i', temp_audio,
+                        '-c:v', 'copy', '-c:a', 'aac', '-map', '0:v', '-map', '1:a', '-shortest', output_path], check=True)
+    finally:
+        video_clip.close()
+        audio_clip.close()
+
+
+def run_single_pass(video_path, audio_path, output_path, work_dir):
+    SpeedAlignEngine().align(video_path, audio_path, output_path)
+
+
+STRATEGIES = {
+    'moviepy': run_moviepy,
+    'ffmpeg_two_pass': run_ffmpeg_two_pass,
+    'moviepy_mux': run_moviepy_mux,
+    'single_pass': run_single_pass,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dell'allineamento velocità video/audio")
+    parser.add_argument('video', nargs='?')
+    parser.add_argument('audio', nargs='?')
+    parser.add_argument('--duration', type=float, default=30.0, help="Durata dell'input sintetico in secondi")
+    parser.add_argument('--only', nargs='*', choices=sorted(STRATEGIES), help="Strategie da eseguire")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="genius_speed_bench_")
+    try:
+        if args.video and args.audio:
+            video_path, audio_path = args.video, args.audio
+        else:
+            video_path, audio_path = generate_inputs(work_dir, args.duration, FFMPEG_PATH)
+
+        audio_duration = media_info.duration(audio_path)
+        speed_factor = compute_speed_factor(media_info.duration(video_path), audio_duration)
+        print(f"Video: {video_path}\nAudio: {audio_path} ({audio_duration:.3f}s), fattore {speed_factor:.4f}x\n")
+        print(f"{'strategia':<18}{'tempo (s)':>10}{'durata out':>12}{'scarto':>10}")
+
+        for name in args.only or STRATEGIES:
+            output_path = os.path.join(work_dir, f"{name}.mp4")
+            started = time.perf_counter()
+            STRATEGIES[name](video_path, audio_path, output_path, work_dir)
+            elapsed = time.perf_counter() - started
+            output_duration = media_info.duration(output_path)
+            print(f"{name:<18}{elapsed:>10.2f}{output_duration:>12.3f}{output_duration - audio_duration:>+10.3f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
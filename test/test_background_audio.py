@@ -0,0 +1,38 @@
+import unittest
+import os
+import sys
+
+# Add the project root to the Python path to allow 'src.' imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.BackgroundAudio import build_background_audio_command
+
+
+class TestBackgroundAudio(unittest.TestCase):
+
+    def _command(self, **kwargs):
+        return build_background_audio_command('in.mp4', 'music.mp3', 'out.mp4', 0.25, 30.0,
+                                              ffmpeg_path='ffmpeg', **kwargs)
+
+    def test_video_is_stream_copied(self):
+        """Only the audio is encoded, the video stream is copied."""
+        command = self._command()
+        self.assertEqual(command[command.index('-c:v') + 1], 'copy')
+        self.assertEqual(command[command.index('-t') + 1], '30.000000')
+
+    def test_loop_is_applied_to_the_music_input(self):
+        """The music input is looped by the demuxer only when requested."""
+        command = self._command(loop_audio=True)
+        self.assertEqual(command.index('-stream_loop') + 3, command.index('music.mp3'))
+        self.assertNotIn('-stream_loop', self._command(loop_audio=False))
+
+    def test_ducking_uses_the_voice_as_sidechain(self):
+        """With ducking the original audio drives the compressor on the music."""
+        graph = self._command(duck=True)[self._command(duck=True).index('-filter_complex') + 1]
+        self.assertIn('[music][key]sidechaincompress', graph)
+        graph = self._command(has_voice=False)[self._command(has_voice=False).index('-filter_complex') + 1]
+        self.assertNotIn('amix', graph)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+import threading
+from unittest.mock import patch
+
+# Add the project root to the Python path to allow 'src.' imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.BatchSummarization import (
+    BatchSummarizationThread, SUMMARY_DETAILED, SUMMARY_MEETING, CLIP_JSON_LOCK, transcript_hash
+)
+from src.services.ResponseCache import ResponseCache
+from src.services.LLMClient import LLMResponse
+
+
+class FakeClient:
+    def __init__(self):
+        self.prompts = []
+        self.lock = threading.Lock()
+
+    def generate(self, model, prompt, system=None, **kwargs):
+        with self.lock:
+            self.prompts.append(prompt)
+        return LLMResponse("## Riassunto\n* punto", model, "anthropic", 10, 2)
+
+
+class TestBatchSummarization(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.client = FakeClient()
+        cache = ResponseCache(cache_dir=os.path.join(self.work_dir.name, "cache"))
+        self.patches = [
+            patch('src.services.ProcessTextAI.get_llm_client', return_value=self.client),
+            patch('src.services.ProcessTextAI.get_response_cache', return_value=cache),
+            patch('src.services.MeetingSummarizer.get_llm_client', return_value=self.client),
+            patch('src.services.MeetingSummarizer.get_response_cache', return_value=cache),
+        ]
+        for p in self.patches:
+            p.start()
+        self.clips = [self.write_clip(f"clip{i}", f"[00:0{i}] Trascrizione della clip {i}.") for i in range(4)]
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.work_dir.cleanup()
+
+    def write_clip(self, name, transcription, summaries=None):
+        clip_path = os.path.join(self.work_dir.name, f"{name}.mp4")
+        with open(os.path.splitext(clip_path)[0] + ".json", 'w', encoding='utf-8') as f:
+            json.dump({"transcription_original": transcription, "summaries": summaries or {"detailed": ""}}, f)
+        return clip_path
+
+    def read_clip(self, clip_path):
+        with open(os.path.splitext(clip_path)[0] + ".json", encoding='utf-8') as f:
+            return json.load(f)
+
+    def run_batch(self, force=False, summary_type=SUMMARY_DETAILED):
+        thread = BatchSummarizationThread(self.clips, summary_type, "italiano", force=force, max_workers=3)
+        summarized, messages = [], []
+        thread.clip_summarized.connect(lambda path, html: summarized.append(path))
+        thread.completed.connect(messages.append)
+        thread.run()
+        return summarized, messages
+
+    def test_every_clip_is_summarized_and_saved(self):
+        summarized, messages = self.run_batch()
+        self.assertEqual(sorted(summarized), sorted(self.clips))
+        self.assertEqual(messages, ["4 clip riassunte, 0 saltate."])
+        data = self.read_clip(self.clips[0])
+        self.assertIn("<h2>Riassunto</h2>", data['summaries']['detailed'])
+        self.assertEqual(data['summary_hashes']['detailed'], transcript_hash(data['transcription_original']))
+
+    def test_unchanged_clips_are_skipped(self):
+        """Al secondo giro si riassume solo la clip con la trascrizione modificata."""
+        self.run_batch()
+        data = self.read_clip(self.clips[2])
+        data['transcription_corrected'] = "[00:02] Trascrizione corretta della clip 2."
+        with open(os.path.splitext(self.clips[2])[0] + ".json", 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        self.client.prompts.clear()
+
+        summarized, messages = self.run_batch()
+        self.assertEqual(summarized, [self.clips[2]])
+        self.assertEqual(len(self.client.prompts), 1)
+        self.assertEqual(messages, ["1 clip riassunte, 3 saltate."])
+
+    def test_existing_summaries_are_kept_unless_forced(self):
+        """Un riassunto generato dalla singola clip (senza hash) non viene sovrascritto, salvo rigenerazione."""
+        self.write_clip("clip0", "[00:00] Trascrizione della clip 0.", summaries={"detailed": "<p>Manuale</p>"})
+        self.write_clip("clip1", "", summaries={})
+        summarized, _ = self.run_batch()
+        self.assertEqual(sorted(summarized), sorted(self.clips[2:]))
+        self.assertEqual(self.read_clip(self.clips[0])['summaries']['detailed'], "<p>Manuale</p>")
+
+        summarized, _ = self.run_batch(force=True)
+        self.assertEqual(len(summarized), 3)
+
+    def test_meeting_summaries_do_not_create_threads(self):
+        """Workers call the model functions directly instead of building a QThread per clip."""
+        with patch('src.services.MeetingSummarizer.MeetingSummarizer.__init__', side_effect=AssertionError), \
+                patch('src.services.ProcessTextAI.ProcessTextAI.__init__', side_effect=AssertionError):
+            summarized, messages = self.run_batch(summary_type=SUMMARY_MEETING)
+        self.assertEqual(len(summarized), 4)
+        self.assertIn("<h2>Riassunto</h2>", self.read_clip(self.clips[1])['summaries']['meeting'])
+
+    def test_saves_wait_for_the_shared_json_lock(self):
+        """A clip JSON being updated by the UI is not overwritten halfway by a worker."""
+        thread = BatchSummarizationThread(self.clips, SUMMARY_DETAILED, "italiano")
+        transcript = self.read_clip(self.clips[0])['transcription_original']
+        with CLIP_JSON_LOCK:
+            writer = threading.Thread(target=thread._save_summary, args=(self.clips[0], transcript, "<p>nuovo</p>"))
+            writer.start()
+            writer.join(0.2)
+            self.assertTrue(writer.is_alive())
+            self.assertEqual(self.read_clip(self.clips[0])['summaries']['detailed'], "")
+        writer.join(5)
+        self.assertEqual(self.read_clip(self.clips[0])['summaries']['detailed'], "<p>nuovo</p>")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import os
+import sys
+import tempfile
+
+# Add the project root to the Python path to allow 'src.' imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.recorder.CaptureOptions import (
+    CAPTURE_MODE_MP4, CAPTURE_MODE_FRAGMENTED, CAPTURE_MODE_SEGMENTED, SEGMENT_LIST_NAME,
+    container_args, segment_dir_for, read_segment_list, video_encoder_args, capture_area,
+    parse_capture_region, watermark_overlay, prescaled_watermark, unique_recording_path
+)
+
+
+class TestCaptureOptions(unittest.TestCase):
+
+    def test_standard_mode_uses_faststart(self):
+        """The classic mode keeps a single MP4 with the index at the front."""
+        args = container_args(CAPTURE_MODE_MP4, 'rec.mp4', 25)
+        self.assertEqual(args[args.index('-movflags') + 1], '+faststart')
+        self.assertEqual(args[-1], 'rec.mp4')
+
+    def test_fragmented_mode_writes_fragments(self):
+        """Fragmented MP4 starts with an empty moov and is flushed per fragment."""
+        args = container_args(CAPTURE_MODE_FRAGMENTED, 'rec.mp4', 30)
+        self.assertIn('empty_moov', args[args.index('-movflags') + 1])
+        self.assertEqual(args[args.index('-g') + 1], '60')
+        self.assertEqual(args[args.index('-flush_packets') + 1], '1')
+
+    def test_segmented_mode_writes_into_its_own_folder(self):
+        """Segments and their list live in a folder next to the recording."""
+        output_path = os.path.join('clips', 'rec.mp4')
+        args = container_args(CAPTURE_MODE_SEGMENTED, output_path, 25, segment_seconds=6)
+        segment_dir = segment_dir_for(output_path)
+        self.assertEqual(segment_dir, os.path.join('clips', 'rec_segments'))
+        self.assertEqual(args[args.index('-segment_time') + 1], '6')
+        self.assertEqual(args[args.index('-segment_list') + 1], os.path.join(segment_dir, SEGMENT_LIST_NAME))
+        self.assertEqual(args[-1], os.path.join(segment_dir, 'rec_%05d.mp4'))
+
+    def test_resumed_session_gets_its_own_segment_folder(self):
+        """A second session with the same name must not reuse the segments of the first one."""
+        with tempfile.TemporaryDirectory() as work_dir:
+            first = unique_recording_path(work_dir, 'rec', '.mp4')
+            self.assertEqual(first, os.path.join(work_dir, 'rec.mp4'))
+            # In modalità a segmenti esiste solo la cartella, non il file finale
+            os.makedirs(segment_dir_for(first))
+
+            second = unique_recording_path(work_dir, 'rec', '.mp4')
+            self.assertNotEqual(second, first)
+            os.makedirs(segment_dir_for(second))
+            third = unique_recording_path(work_dir, 'rec', '.mp4')
+            self.assertNotIn(third, (first, second))
+
+            first_args = container_args(CAPTURE_MODE_SEGMENTED, first, 25)
+            second_args = container_args(CAPTURE_MODE_SEGMENTED, second, 25)
+            self.assertNotEqual(first_args[first_args.index('-segment_list') + 1],
+                                second_args[second_args.index('-segment_list') + 1])
+            self.assertNotEqual(first_args[-1], second_args[-1])
+
+    def test_segment_list_is_resolved_next_to_the_list(self):
+        """Entries written by ffmpeg are relative to the list file."""
+        with tempfile.TemporaryDirectory() as work_dir:
+            list_path = os.path.join(work_dir, SEGMENT_LIST_NAME)
+            with open(list_path, 'w', encoding='utf-8') as f:
+                f.write("rec_00000.mp4\nrec_00001.mp4\n\n")
+            self.assertEqual(read_segment_list(list_path),
+                             [os.path.join(work_dir, 'rec_00000.mp4'), os.path.join(work_dir, 'rec_00001.mp4')])
+            self.assertEqual(read_segment_list(os.path.join(work_dir, 'missing.txt')), [])
+
+    def test_crf_and_bitrate_follow_the_resolution(self):
+        """Larger captures get a higher CRF and bitrate cap; profiles shift the CRF."""
+        args = video_encoder_args('balanced', 1080, 25)
+        self.assertEqual(args[args.index('-crf') + 1], '25')
+        self.assertEqual(args[args.index('-maxrate') + 1], '8000k')
+        self.assertEqual(args[args.index('-preset') + 1], 'ultrafast')
+        args = video_encoder_args('quality', 720, 60)
+        self.assertEqual(args[args.index('-crf') + 1], '20')
+        self.assertEqual(args[args.index('-maxrate') + 1], '8000k')
+        self.assertIn('zerolatency', video_encoder_args('performance', 2160, 25))
+
+    def test_capture_area_is_clamped_to_the_monitor(self):
+        """Regions are relative to the monitor, clipped to it and made even."""
+        monitor = (1920, 0, 1920, 1080)
+        self.assertEqual(capture_area(monitor), (1920, 0, 1920, 1080))
+        self.assertEqual(capture_area(monitor, (100, 50, 801, 2000)), (2020, 50, 800, 1030))
+        self.assertEqual(parse_capture_region(" 10, 20, 640, 480 "), (10, 20, 640, 480))
+        self.assertIsNone(parse_capture_region(""))
+        self.assertIsNone(parse_capture_region("10,20,0,480"))
+
+    def test_watermark_is_prescaled_once(self):
+        """The scaled watermark is written to the cache and reused."""
+        from PIL import Image
+        with tempfile.TemporaryDirectory() as work_dir:
+            source = os.path.join(work_dir, "wm.png")
+            Image.new('RGBA', (400, 200), (255, 0, 0, 128)).save(source)
+            cache_dir = os.path.join(work_dir, "cache")
+            scaled = prescaled_watermark(source, 25, cache_dir)
+            with Image.open(scaled) as image:
+                self.assertEqual(image.size, (100, 50))
+            self.assertEqual(prescaled_watermark(source, 25, cache_dir), scaled)
+            self.assertIsNone(prescaled_watermark(os.path.join(work_dir, "missing.png"), 25, cache_dir))
+        self.assertEqual(watermark_overlay("Top Right"), "overlay=W-w-10:10")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+from unittest.mock import patch
+
+# Add the project root to the Python path to allow 'src.' imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.ChatRetrieval import (
+    BM25Index, ProjectChatIndex, split_passages, plain_text, build_chat_context, get_project_index,
+    FULL_CONTEXT_CHARS
+)
+
+
+def write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+class TestChatRetrieval(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.project_dir = os.path.join(self.work_dir.name, "Progetto")
+        os.makedirs(os.path.join(self.project_dir, "clips"))
+        self.gnai_path = os.path.join(self.project_dir, "Progetto.gnai")
+        write_json(self.gnai_path, {"clips": [], "projectSummaries": {"combinedDetailed": "<p>Sintesi del progetto</p>"}})
+        self.write_clip("budget", "[00:10] Il budget del marketing per il 2025 è di 40 mila euro.")
+        self.write_clip("assunzioni", "[00:05] Si assumono due sviluppatori backend entro marzo.")
+        self.index_dir = os.path.join(self.work_dir.name, "index")
+
+    def tearDown(self):
+        self.work_dir.cleanup()
+
+    def write_clip(self, name, transcription, summary=""):
+        write_json(os.path.join(self.project_dir, "clips", f"{name}.json"),
+                   {"transcription_original": transcription, "summaries": {"detailed": summary}})
+
+    def test_passages_keep_lines_and_strip_html(self):
+        self.assertEqual(plain_text("<h2>Titolo</h2><p>uno &amp; due</p>"), "Titolo\nuno & due")
+        passages = split_passages("\n".join(f"[00:{i:02d}] riga {i} " + "parola " * 20 for i in range(20)), max_words=50)
+        self.assertGreater(len(passages), 1)
+        self.assertTrue(all(p.startswith("[00:") for p in passages))
+
+    def test_bm25_ranks_matching_passages_first(self):
+        index = BM25Index()
+        index.set_source("a", [("a", "riunione sul budget del marketing"), ("a", "pranzo aziendale")])
+        index.set_source("b", [("b", "budget budget per le assunzioni")])
+        results = index.search("qual è il budget del marketing?", top_k=2)
+        self.assertEqual(results[0]['text'], "riunione sul budget del marketing")
+        self.assertEqual(len(results), 2)
+        self.assertEqual(index.search("parola assente"), [])
+
+    def test_index_is_saved_and_updated_incrementally(self):
+        """Solo i JSON modificati vengono riletti; le clip rimosse escono dall'indice."""
+        index = ProjectChatIndex(self.gnai_path, index_dir=self.index_dir)
+        self.assertEqual(index.refresh(), 3)
+        self.assertEqual(index.search("sviluppatori")[0]['label'], "assunzioni - trascrizione")
+
+        reloaded = ProjectChatIndex(self.gnai_path, index_dir=self.index_dir)
+        self.assertEqual(reloaded.refresh(), 0)
+
+        self.write_clip("budget", "[00:10] Il budget è stato ridotto a 30 mila euro.", summary="<p>Taglio del budget</p>")
+        os.remove(os.path.join(self.project_dir, "clips", "assunzioni.json"))
+        self.assertEqual(reloaded.refresh(), 2)
+        self.assertEqual(reloaded.search("sviluppatori"), [])
+        labels = {r['label'] for r in reloaded.search("budget")}
+        self.assertEqual(labels, {"budget - trascrizione", "budget - riassunto detailed"})
+
+    def test_chat_context_sends_only_relevant_passages(self):
+        """Testo breve senza progetto: invariato; con il progetto si inviano i passaggi pertinenti."""
+        self.assertEqual(build_chat_context("domanda", "testo breve"), "testo breve")
+
+        with patch('src.services.ChatRetrieval.CHAT_INDEX_DIR', self.index_dir), \
+                patch.dict('src.services.ChatRetrieval._project_indexes', clear=True):
+            context = build_chat_context("Quanti sviluppatori si assumono?", "Nota aperta sul pranzo.", self.gnai_path)
+            index_file = get_project_index(self.gnai_path).index_file
+        self.assertEqual(os.path.dirname(index_file), self.index_dir)
+        self.assertTrue(os.path.exists(index_file))
+        self.assertIn("[assunzioni - trascrizione]", context)
+        self.assertNotIn("marketing", context)
+
+        long_text = "\n".join(["riga di riempimento senza interesse"] * 1000 + ["la scadenza del progetto è aprile"])
+        self.assertGreater(len(long_text), FULL_CONTEXT_CHARS)
+        self.assertIn("aprile", build_chat_context("qual è la scadenza?", long_text))
+        self.assertLess(len(build_chat_context("qual è la scadenza?", long_text)), FULL_CONTEXT_CHARS)
+
+
+if __name__ == '__main__':
+    unittest.main()
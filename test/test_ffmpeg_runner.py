@@ -0,0 +1,52 @@
+import unittest
+import os
+import sys
+
+# Add the project root to the Python path to allow 'src.' imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.FFmpegRunner import FFmpegJob, parse_progress_block, format_progress_message
+
+
+class TestFFmpegRunner(unittest.TestCase):
+
+    def test_progress_block_is_parsed(self):
+        """Values from -progress are converted to numbers with fraction and ETA."""
+        block = {'frame': '300', 'fps': '60.00', 'bitrate': '1536.4kbits/s', 'total_size': '2048000',
+                 'out_time_us': '5000000', 'dup_frames': '2', 'drop_frames': '0', 'speed': '2.5x',
+                 'progress': 'continue'}
+        stats = parse_progress_block(block, duration=10.0)
+        self.assertEqual(stats['frame'], 300)
+        self.assertEqual(stats['bitrate'], 1536.4)
+        self.assertEqual(stats['out_time'], 5.0)
+        self.assertEqual(stats['fraction'], 0.5)
+        self.assertEqual(stats['eta'], 2.0)
+        self.assertEqual(stats['dup_frames'], 2)
+
+    def test_unknown_values_are_none(self):
+        """'N/A' values at the start of a job do not break the parser."""
+        stats = parse_progress_block({'out_time_us': 'N/A', 'speed': 'N/A', 'bitrate': 'N/A'}, duration=10.0)
+        self.assertIsNone(stats['out_time'])
+        self.assertIsNone(stats['fraction'])
+        self.assertIsNone(stats['speed'])
+
+    def test_eta_falls_back_to_elapsed_time(self):
+        """Without a reported speed the ETA is derived from wall-clock time."""
+        stats = parse_progress_block({'out_time_us': '4000000'}, duration=12.0, elapsed=2.0)
+        self.assertEqual(stats['eta'], 4.0)
+
+    def test_progress_arguments_are_added_once(self):
+        """The runner asks ffmpeg for machine-readable progress on stdout."""
+        job = FFmpegJob(['ffmpeg', '-i', 'in.mp4', 'out.mp4'])
+        self.assertEqual(job.command[:4], ['ffmpeg', '-progress', 'pipe:1', '-nostats'])
+        job = FFmpegJob(['ffmpeg', '-progress', 'pipe:1', '-i', 'in.mp4', 'out.mp4'])
+        self.assertEqual(job.command.count('-progress'), 1)
+
+    def test_progress_message(self):
+        """The status text shows percentage, speed and ETA."""
+        message = format_progress_message("Rendering", {'fraction': 0.25, 'speed': 1.5, 'eta': 75})
+        self.assertEqual(message, "Rendering - 25% - 1.50x - ETA 01:15")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest.mock import patch
+
+# Add the project root to the Python path to allow 'src.' imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.LLMClient import (
+    LLMClient, TextStreamBuffer, provider_for_model, is_retryable, image_part,
+    PROVIDER_OLLAMA, PROVIDER_GOOGLE, PROVIDER_ANTHROPIC
+)
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """Server Ollama minimale: risponde in base allo scenario impostato sul server."""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with server.lock:
+            server.requests.append((self.path, payload))
+            server.ports.add(self.client_address[1])
+            status = server.failures.pop(0) if server.failures else 200
+        if self.path == '/api/chat' and server.chat_missing:
+            status = 404
+        body = {}
+        if status == 200:
+            text = payload.get('prompt') or payload['messages'][-1]['content']
+            body = {'message': {'content': f"eco: {text}"}, 'response': f"eco: {text}",
+                    'prompt_eval_count': 7, 'eval_count': 3}
+        if status == 200 and payload.get('stream'):
+            # Una riga JSON per parola, come lo streaming di Ollama
+            words = f"eco: {text}".split(" ")
+            lines = [{'message': {'content': word + (" " if i < len(words) - 1 else "")}, 'done': False}
+                     for i, word in enumerate(words)]
+            lines.append({'message': {'content': ""}, 'done': True, 'prompt_eval_count': 7, 'eval_count': 3})
+            data = "".join(json.dumps(line) + "\n" for line in lines).encode()
+        else:
+            data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class TestLLMClient(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeOllamaHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests, self.server.ports, self.server.failures = [], set(), []
+        self.server.chat_missing = False
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        endpoint = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.endpoint_patch = patch('src.services.LLMClient.get_ollama_endpoint', return_value=endpoint)
+        self.endpoint_patch.start()
+        self.delay_patch = patch('src.services.LLMClient.retry_delay', return_value=0)
+        self.delay_patch.start()
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.metrics_file = os.path.join(self.work_dir.name, "llm_metrics.jsonl")
+        self.client = LLMClient(metrics_file=self.metrics_file)
+
+    def tearDown(self):
+        self.endpoint_patch.stop()
+        self.delay_patch.stop()
+        self.client.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.work_dir.cleanup()
+
+    def test_provider_for_model(self):
+        """L'identificativo in configurazione determina provider e nome del modello."""
+        self.assertEqual(provider_for_model("ollama:llava:latest"), (PROVIDER_OLLAMA, "llava:latest"))
+        self.assertEqual(provider_for_model("gemini-2.5-flash"), (PROVIDER_GOOGLE, "gemini-2.5-flash"))
+        self.assertEqual(provider_for_model("claude-sonnet-4-5"), (PROVIDER_ANTHROPIC, "claude-sonnet-4-5"))
+        with self.assertRaises(ValueError):
+            provider_for_model("gpt-4o")
+
+    def test_connections_are_reused_and_metrics_recorded(self):
+        """Richieste successive usano la stessa connessione; latenza e token finiscono nelle metriche."""
+        for i in range(3):
+            response = self.client.generate("ollama:llama3", f"domanda {i}", system="sistema", name="prova")
+            self.assertEqual(response.text, f"eco: domanda {i}")
+        self.assertEqual(len(self.server.ports), 1)
+        self.assertEqual(self.server.requests[0][1]['messages'][0], {"role": "system", "content": "sistema"})
+
+        with open(self.metrics_file, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 3)
+        self.assertEqual((records[0]['name'], records[0]['status']), ("prova", "ok"))
+        self.assertEqual((records[0]['input_tokens'], records[0]['output_tokens']), (7, 3))
+
+    def test_transient_errors_are_retried(self):
+        """Un 503 viene ripetuto, un 400 no."""
+        self.server.failures = [503, 503]
+        response = self.client.generate("ollama:llama3", "ciao")
+        self.assertEqual(response.attempts, 3)
+
+        self.server.failures = [400]
+        with self.assertRaises(Exception) as ctx:
+            self.client.generate("ollama:llama3", "ciao")
+        self.assertFalse(is_retryable(ctx.exception))
+
+    def test_chat_falls_back_to_generate_and_images_use_generate(self):
+        """Senza /api/chat si usa /api/generate; le immagini vanno sempre a /api/generate."""
+        self.server.chat_missing = True
+        self.assertEqual(self.client.generate("ollama:llama3", "ciao").text, "eco: ciao")
+        self.assertEqual([path for path, _ in self.server.requests], ['/api/chat', '/api/generate'])
+
+        self.server.requests.clear()
+        self.client.generate("ollama:llava", ["descrivi", image_part("aGVsbG8=")])
+        path, payload = self.server.requests[0]
+        self.assertEqual((path, payload['images']), ('/api/generate', ["aGVsbG8="]))
+
+    def test_streaming_delivers_chunks_and_first_token_latency(self):
+        """In streaming i frammenti arrivano man mano e il tempo al primo token viene registrato."""
+        chunks = []
+        response = self.client.generate("ollama:llama3", "una domanda lunga", name="stream", on_text=chunks.append)
+        self.assertEqual(chunks, ["eco: ", "una ", "domanda ", "lunga"])
+        self.assertEqual(response.text, "eco: una domanda lunga")
+        self.assertEqual((response.input_tokens, response.output_tokens), (7, 3))
+        self.assertIsNotNone(response.first_token_latency)
+        self.assertTrue(self.server.requests[0][1]['stream'])
+
+        with open(self.metrics_file, encoding='utf-8') as f:
+            record = json.loads(f.readline())
+        self.assertIsNotNone(record['first_token_latency'])
+
+    def test_stream_buffer_coalesces_chunks(self):
+        """Il buffer raggruppa i frammenti ravvicinati e consegna il resto con flush()."""
+        emitted = []
+        buffer = TextStreamBuffer(emitted.append, interval=60)
+        for chunk in ["a", "b", "c"]:
+            buffer(chunk)
+        self.assertEqual(emitted, ["a"])
+        buffer.flush()
+        self.assertEqual(emitted, ["a", "bc"])
+
+    def test_concurrency_is_limited_per_provider(self):
+        """Le richieste oltre il limite del provider aspettano il proprio turno."""
+        client = LLMClient(metrics_file=None, concurrency={PROVIDER_OLLAMA: 2})
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def slow_handler(model, parts, system, options):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            threading.Event().wait(0.05)
+            with lock:
+                active[0] -= 1
+            return client._ollama_response(model, "ok", {})
+
+        with patch.object(client, '_generate_ollama', side_effect=slow_handler):
+            threads = [threading.Thread(target=client.generate, args=("ollama:llama3", "ciao")) for _ in range(6)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(peak[0], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
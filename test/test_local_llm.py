@@ -0,0 +1,63 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+# Add the project root to the Python path to allow 'src.' imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import get_model_for_action, MODEL_OVERRIDE_ENV, LOCAL_ECHO
+from src.services.LLMClient import LLMClient, load_recorded_prompts, provider_for_model, PROVIDER_LOCAL
+from src.services.ProcessTextAI import ProcessTextAI
+from src.services.ResponseCache import ResponseCache
+
+
+class TestLocalLLM(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.prompt_log = os.path.join(self.work_dir.name, "prompts.jsonl")
+        self.client = LLMClient(metrics_file=None, prompt_log_file=self.prompt_log)
+
+    def tearDown(self):
+        self.work_dir.cleanup()
+
+    def test_echo_model_is_deterministic_and_streams(self):
+        self.assertEqual(provider_for_model(LOCAL_ECHO), (PROVIDER_LOCAL, "echo"))
+        prompt = "Prima riga del testo\n\nSeconda riga"
+        first = self.client.generate(LOCAL_ECHO, prompt, system="Riassumi")
+        self.assertEqual(first.text, "## Risposta locale\n* Prima riga del testo\n* Seconda riga")
+        self.assertEqual(first.provider, PROVIDER_LOCAL)
+        self.assertGreater(first.output_tokens, 0)
+
+        chunks = []
+        second = self.client.generate(LOCAL_ECHO, prompt, system="Riassumi", on_text=chunks.append)
+        self.assertEqual("".join(chunks), first.text)
+        self.assertIsNotNone(second.first_token_latency)
+
+    def test_prompts_are_recorded_for_replay(self):
+        self.client.generate(LOCAL_ECHO, "testo da correggere", system="Correggi", max_tokens=100, name="testo fix")
+        records = load_recorded_prompts(self.prompt_log)
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]['name'], "testo fix")
+        self.assertEqual(records[0]['prompt'], ["testo da correggere"])
+        self.assertEqual(records[0]['max_tokens'], 100)
+
+    def test_override_selects_the_local_model_for_text_modes(self):
+        # use_cache=False salta solo la lettura: la risposta viene comunque scritta nella cache
+        cache = ResponseCache(cache_dir=os.path.join(self.work_dir.name, "cache"))
+        with patch.dict(os.environ, {MODEL_OVERRIDE_ENV: LOCAL_ECHO}), \
+                patch('src.services.ProcessTextAI.get_llm_client', return_value=self.client), \
+                patch('src.services.ProcessTextAI.get_response_cache', return_value=cache):
+            self.assertEqual(get_model_for_action('summary'), LOCAL_ECHO)
+            self.assertNotEqual(get_model_for_action('tts_generation'), LOCAL_ECHO)
+
+            thread = ProcessTextAI("fix", "italiano", {'text': "[00:01] testo da correggere"}, use_cache=False)
+            self.assertEqual(thread.selected_model, LOCAL_ECHO)
+            result = thread._process_text_with_selected_model()
+        self.assertIn("## Risposta locale", result[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+from unittest.mock import patch
+
+# Add the project root to the Python path to allow 'src.' imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.MediaInfo import MediaInfo, parse_frame_rate
+
+PROBE_RESULT = {
+    'format': {'duration': '12.500000'},
+    'streams': [
+        {'codec_type': 'video', 'avg_frame_rate': '30000/1001'},
+        {'codec_type': 'audio', 'sample_rate': '48000'},
+    ],
+}
+
+
+class TestMediaInfo(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.media_path = os.path.join(self.work_dir.name, "clip.mp4")
+        with open(self.media_path, 'wb') as f:
+            f.write(b'\0' * 16)
+        self.cache_file = os.path.join(self.work_dir.name, "cache", "media_info.json")
+
+    def tearDown(self):
+        self.work_dir.cleanup()
+
+    def test_parse_frame_rate(self):
+        """Fractional and invalid frame rates are handled."""
+        self.assertAlmostEqual(parse_frame_rate('30000/1001'), 29.97, places=2)
+        self.assertEqual(parse_frame_rate('0/0', default=30), 30)
+        self.assertEqual(parse_frame_rate(None, default=25.0), 25.0)
+
+    def test_file_is_probed_once(self):
+        """Repeated queries on the same file reuse the cached probe."""
+        media_info = MediaInfo(cache_file=self.cache_file)
+        with patch.object(MediaInfo, '_run_ffprobe', return_value=PROBE_RESULT) as run:
+            self.assertEqual(media_info.duration(self.media_path), 12.5)
+            self.assertAlmostEqual(media_info.fps(self.media_path), 29.97, places=2)
+            self.assertIsNotNone(media_info.stream(self.media_path, 'audio'))
+        self.assertEqual(run.call_count, 1)
+
+    def test_cache_persists_on_disk(self):
+        """A new instance reads the probe back from the cache file."""
+        media_info = MediaInfo(cache_file=self.cache_file)
+        with patch.object(MediaInfo, '_run_ffprobe', return_value=PROBE_RESULT):
+            media_info.duration(self.media_path)
+        media_info.flush()
+        with patch.object(MediaInfo, '_run_ffprobe', return_value={}) as run:
+            self.assertEqual(MediaInfo(cache_file=self.cache_file).duration(self.media_path), 12.5)
+        run.assert_not_called()
+
+    def test_new_entries_are_saved_together(self):
+        """Several misses in a row produce a single write of the cache file."""
+        other_path = os.path.join(self.work_dir.name, "other.mp4")
+        with open(other_path, 'wb') as f:
+            f.write(b'\0')
+        media_info = MediaInfo(cache_file=self.cache_file, save_delay=60)
+        with patch.object(MediaInfo, '_run_ffprobe', return_value=PROBE_RESULT), \
+                patch.object(MediaInfo, '_save', wraps=media_info._save) as save:
+            media_info.duration(self.media_path)
+            media_info.duration(other_path)
+            self.assertFalse(os.path.exists(self.cache_file))
+            media_info.flush()
+            media_info.flush()
+        self.assertEqual(save.call_count, 1)
+        with open(self.cache_file, encoding='utf-8') as f:
+            self.assertEqual(len(json.load(f)), 2)
+
+    def test_failed_probe_is_not_cached(self):
+        """A file that ffprobe could not read is probed again on the next request."""
+        media_info = MediaInfo(cache_file=self.cache_file)
+        with patch.object(MediaInfo, '_run_ffprobe', side_effect=[None, PROBE_RESULT]) as run:
+            self.assertEqual(media_info.duration(self.media_path), 0.0)
+            self.assertEqual(media_info.duration(self.media_path), 12.5)
+        self.assertEqual(run.call_count, 2)
+
+        with patch.object(MediaInfo, '_run_ffprobe', side_effect=[None, {'packets': []}]) as run:
+            self.assertEqual(media_info.keyframe_packets(self.media_path), [])
+            self.assertEqual(media_info.keyframe_packets(self.media_path), [])
+        self.assertEqual(run.call_count, 2)
+
+    def test_modified_file_is_probed_again(self):
+        """A change in size invalidates the cached entry."""
+        media_info = MediaInfo(cache_file=self.cache_file)
+        with patch.object(MediaInfo, '_run_ffprobe', return_value=PROBE_RESULT) as run:
+            media_info.duration(self.media_path)
+            with open(self.media_path, 'ab') as f:
+                f.write(b'\0')
+            media_info.duration(self.media_path)
+        self.assertEqual(run.call_count, 2)
+
+    def test_keyframes_are_cached_with_the_entry(self):
+        """The keyframe index is computed once, sorted, and kept."""
+        packets = {'packets': [{'pts_time': '2.0', 'dts_time': '1.9', 'flags': 'K_'},
+                               {'pts_time': '1.0', 'dts_time': '0.9', 'flags': '__'},
+                               {'pts_time': '0.0', 'dts_time': '-0.1', 'flags': 'K_'}]}
+        media_info = MediaInfo(cache_file=self.cache_file)
+        with patch.object(MediaInfo, '_run_ffprobe', side_effect=[PROBE_RESULT, packets]) as run:
+            self.assertEqual(media_info.keyframe_times(self.media_path), [0.0, 2.0])
+            self.assertEqual(media_info.keyframe_packets(self.media_path), [(0.0, -0.1), (2.0, 1.9)])
+        self.assertEqual(run.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
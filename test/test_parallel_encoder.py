@@ -0,0 +1,120 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+# Add the project root to the Python path to allow 'src.' imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.ParallelEncoder import plan_segments, write_clip, ParallelSegmentEncoder
+
+
+class TestPlanSegments(unittest.TestCase):
+
+    def test_cuts_fall_on_keyframes(self):
+        """Every internal cut point must be one of the given keyframes."""
+        keyframes = [0.0, 2.5, 5.1, 7.4, 10.2, 12.6, 15.0, 17.3]
+        segments = plan_segments(keyframes, 20.0, 4)
+        self.assertEqual(len(segments), 4)
+        for start, _ in segments[1:]:
+            self.assertIn(start, keyframes)
+
+    def test_segments_cover_whole_timeline(self):
+        """Segments are contiguous and span from zero to the full duration."""
+        keyframes = [i * 2.0 for i in range(30)]
+        segments = plan_segments(keyframes, 60.0, 6)
+        self.assertEqual(segments[0][0], 0.0)
+        self.assertEqual(segments[-1][1], 60.0)
+        for (_, end), (start, _) in zip(segments, segments[1:]):
+            self.assertEqual(end, start)
+
+    def test_no_keyframes_gives_single_segment(self):
+        """Without usable keyframes the timeline is rendered as one segment."""
+        self.assertEqual(plan_segments([0.0], 30.0, 8), [(0.0, 30.0)])
+
+    def test_short_clip_is_not_oversplit(self):
+        """Segments never get shorter than the minimum segment duration."""
+        keyframes = [i * 0.5 for i in range(10)]
+        segments = plan_segments(keyframes, 5.0, 16)
+        for start, end in segments:
+            self.assertGreaterEqual(end - start, 2.0)
+
+    def test_zero_duration(self):
+        """An unknown duration produces no segments."""
+        self.assertEqual(plan_segments([0.0, 1.0], 0, 4), [])
+
+
+# Processo che scrive molto su stderr prima dell'avanzamento e poi fallisce, come ffmpeg con molti avvisi
+NOISY_FAILING_SCRIPT = (
+    "import sys\n"
+    "sys.stderr.write('avviso\\n' * 50000)\n"
+    "sys.stdout.write('out_time_us=1500000\\nprogress=end\\n')\n"
+    "sys.exit(1)\n"
+)
+
+
+class FakeClip:
+    fps = 30
+
+    def __init__(self):
+        self.writes = []
+
+    def write_videofile(self, path, **kwargs):
+        self.writes.append((path, kwargs))
+        with open(path, 'wb') as f:
+            f.write(b'frames')
+
+
+class FakeEncoder:
+    cancelled = False
+
+    def __init__(self):
+        self.inputs = []
+
+    def encode(self, input_path, output_path, progress_callback=None):
+        self.inputs.append((input_path, os.path.exists(input_path)))
+        progress_callback(1.0)
+        return output_path
+
+
+class TestSegmentEncoder(unittest.TestCase):
+
+    def test_segment_errors_report_stderr_without_blocking(self):
+        """A segment that floods stderr and fails raises with its message instead of hanging."""
+        times = []
+        encoder = ParallelSegmentEncoder(max_workers=1)
+        with patch('src.services.FFmpegRunner.FFMPEG_TIMINGS_FILE', None):
+            with self.assertRaises(RuntimeError) as context:
+                encoder._run_ffmpeg([sys.executable, '-c', NOISY_FAILING_SCRIPT, '-progress'], times.append)
+        self.assertIn("avviso", str(context.exception))
+        self.assertEqual(times, [1.5])
+
+    def test_cancelled_encoder_does_not_start_jobs(self):
+        encoder = ParallelSegmentEncoder(max_workers=1)
+        encoder.cancel()
+        self.assertIsNone(encoder._run_ffmpeg([sys.executable, '-c', 'raise SystemExit(1)', '-progress']))
+
+
+class TestWriteClip(unittest.TestCase):
+
+    def test_sequential_write_is_unchanged(self):
+        clip = FakeClip()
+        write_clip(clip, os.devnull, codec='libx264', logger=None)
+        self.assertEqual(clip.writes, [(os.devnull, {'codec': 'libx264', 'logger': None})])
+
+    def test_parallel_write_encodes_an_intermediate_with_regular_keyframes(self):
+        """moviepy only composes the frames; the final encode is done in parallel segments."""
+        clip, encoder, progress = FakeClip(), FakeEncoder(), []
+        write_clip(clip, "out.mp4", parallel=True, encoder=encoder, progress_callback=progress.append, logger=None)
+
+        intermediate_path, kwargs = clip.writes[0]
+        self.assertEqual(kwargs['preset'], 'ultrafast')
+        self.assertEqual(kwargs['ffmpeg_params'][-2:], ['-g', '60'])
+        self.assertEqual(encoder.inputs, [(intermediate_path, True)])
+        self.assertEqual(progress, [1.0])
+        # La cartella temporanea dell'intermedio viene rimossa
+        self.assertFalse(os.path.exists(os.path.dirname(intermediate_path)))
+
+
+if __name__ == '__main__':
+    unittest.main()
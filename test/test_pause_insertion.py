@@ -0,0 +1,138 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+# Add the project root to the Python path to allow 'src.' imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.PauseInsertion import FreezeFramePauseThread, smart_cut_encoder_args
+
+SOURCE_STREAM = {
+    'codec_type': 'video', 'codec_name': 'h264', 'profile': 'High', 'level': 40, 'has_b_frames': 2,
+    'width': 1920, 'height': 1080, 'pix_fmt': 'yuv420p', 'avg_frame_rate': '25/1', 'time_base': '1/12800',
+}
+# Keyframe ogni 2 secondi, con DTS in anticipo di due frame per il riordino dei B-frame
+KEYFRAMES = [(t, t - 0.08) for t in (0.0, 2.0, 4.0, 6.0, 8.0, 10.0)]
+
+
+class TestSmartCutEncoderArgs(unittest.TestCase):
+
+    def option(self, args, name):
+        return args[args.index(name) + 1] if name in args else None
+
+    def test_settings_follow_the_source_stream(self):
+        """The re-encoded GOP uses the source profile, level and B-frame reordering."""
+        args = smart_cut_encoder_args(SOURCE_STREAM)
+        self.assertEqual(self.option(args, '-c:v'), 'libx264')
+        self.assertEqual(self.option(args, '-profile:v'), 'high')
+        self.assertEqual(self.option(args, '-level'), '4.0')
+        self.assertEqual(self.option(args, '-video_track_timescale'), '12800')
+        self.assertNotIn('-bf', args)
+
+    def test_reorder_depth_selects_the_b_frame_layout(self):
+        baseline = smart_cut_encoder_args({**SOURCE_STREAM, 'profile': 'Constrained Baseline', 'has_b_frames': 0})
+        self.assertEqual(self.option(baseline, '-profile:v'), 'baseline')
+        self.assertEqual(self.option(baseline, '-bf'), '0')
+        no_pyramid = smart_cut_encoder_args({**SOURCE_STREAM, 'has_b_frames': 1})
+        self.assertEqual(self.option(no_pyramid, '-x264-params'), 'b-pyramid=none')
+
+    def test_unsupported_codec(self):
+        self.assertIsNone(smart_cut_encoder_args({**SOURCE_STREAM, 'codec_name': 'vp9'}))
+
+
+class FakeMediaInfo:
+    """Metadati della sorgente (12 s), del GOP ricodificato e del file finale definiti dal test."""
+
+    def __init__(self, test):
+        self.test = test
+
+    def stream(self, path, codec_type):
+        if path == self.test.video_path:
+            return SOURCE_STREAM
+        if path == self.test.output_path:
+            return {**SOURCE_STREAM, 'duration': str(self.test.output_duration)}
+        return self.test.middle_stream
+
+    def duration(self, path):
+        return 12.0
+
+    def keyframe_packets(self, path):
+        return KEYFRAMES
+
+    def invalidate(self, path):
+        pass
+
+
+class TestFreezeFramePause(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.video_path = os.path.join(self.work_dir.name, "source.mp4")
+        open(self.video_path, 'wb').close()
+        self.output_path = os.path.join(self.work_dir.name, "output.mp4")
+        self.commands = []
+        self.concat_lists = []
+        self.middle_stream = dict(SOURCE_STREAM)
+        self.output_duration = 14.0
+
+    def tearDown(self):
+        self.work_dir.cleanup()
+
+    def fake_run_ffmpeg(self, command):
+        self.commands.append(command)
+        if 'concat' in command:
+            with open(command[command.index('-i') + 1], encoding='utf-8') as f:
+                self.concat_lists.append(f.read())
+
+    def run_pause(self, start_time, pause_duration):
+        thread = FreezeFramePauseThread(self.video_path, start_time, pause_duration, self.output_path)
+        thread.error.connect(self.fail)
+        with patch('src.services.PauseInsertion.get_media_info', return_value=FakeMediaInfo(self)), \
+                patch.object(FreezeFramePauseThread, '_run_ffmpeg', side_effect=self.fake_run_ffmpeg):
+            thread.run()
+        return thread
+
+    def test_only_the_gop_of_the_pause_is_re_encoded(self):
+        """Parts before and after the GOP are stream-copied with explicit durations."""
+        self.run_pause(5.0, 2.0)
+
+        encode, concat = self.commands
+        self.assertEqual(encode[encode.index('-ss') + 1], "4.000000")
+        self.assertEqual(encode[encode.index('-t') + 1], "2.000000")
+        # Il frame visualizzato a 5.0s (offset 1.0 nel GOP) resta nel tratto congelato
+        self.assertIn("trim=end=1.020000", encode[encode.index('-filter_complex') + 1])
+        self.assertIn('copy', concat)
+
+        entries = self.concat_lists[0]
+        self.assertIn("outpoint 3.920000\nduration 4.000000\n", entries)
+        self.assertIn("middle.mp4'\nduration 4.000000\n", entries)
+        self.assertIn("inpoint 6.000000\n", entries)
+
+    def test_pause_is_rounded_to_whole_frames(self):
+        self.output_duration = 12.48
+        thread = self.run_pause(0.0, 0.5)
+        self.assertAlmostEqual(thread.pause_duration, 0.48)
+        self.assertIn("trim=end=0.020000", self.commands[0][self.commands[0].index('-filter_complex') + 1])
+        self.assertEqual(len(self.commands), 2)
+
+    def test_incompatible_gop_falls_back_to_full_render(self):
+        """If the encoder cannot reproduce the source layout the whole video is re-encoded."""
+        self.middle_stream['has_b_frames'] = 1
+        self.run_pause(5.0, 2.0)
+        self.assertEqual(len(self.commands), 2)
+        self.assertEqual(self.concat_lists, [])
+        full_render = self.commands[-1]
+        self.assertIn("trim=end=5.020000", full_render[full_render.index('-filter_complex') + 1])
+        self.assertEqual(full_render[-1], self.output_path)
+
+    def test_wrong_joined_duration_falls_back_to_full_render(self):
+        self.output_duration = 13.92
+        self.run_pause(5.0, 2.0)
+        self.assertEqual(len(self.commands), 3)
+        self.assertNotIn('concat', self.commands[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+import os
+import re
+import sys
+import tempfile
+import threading
+from unittest.mock import patch
+
+# Add the project root to the Python path to allow 'src.' imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pptx import Presentation
+
+from src.services import PptxGeneration as pptx_module
+from src.services.PptxGeneration import PptxGeneration
+from src.services.LLMClient import LLMResponse
+
+
+def slide_text(count, prefix="Slide"):
+    return "\n".join(f"Titolo: {prefix} {i}\nSottotitolo:\nContenuto:\n- punto {i}\n  - dettaglio" for i in range(1, count + 1))
+
+
+class FakeClient:
+    """Genera il numero di slide richiesto nel prompt di sistema, con il titolo della parte."""
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def generate(self, model, prompt, system=None, **kwargs):
+        with self.lock:
+            self.calls.append(prompt)
+        count = int(re.search(r"exactly (\d+) slides", system).group(1))
+        part = re.search(r"parte (\d+) di", prompt)
+        return LLMResponse(slide_text(count, prefix=f"Parte {part.group(1) if part else 1}"), model, "anthropic", 100, 50)
+
+
+class TestPptxGeneration(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.template_path = os.path.join(self.work_dir.name, "template.pptx")
+        template = Presentation()
+        template.slides.add_slide(template.slide_layouts[0])
+        template.save(self.template_path)
+        self.patches = [
+            patch.dict(pptx_module._template_cache, clear=True),
+            patch.dict(pptx_module._deck_cache, clear=True),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.work_dir.cleanup()
+
+    def output(self, name):
+        return os.path.join(self.work_dir.name, name)
+
+    def test_template_layouts_are_scanned_once(self):
+        scan = PptxGeneration._find_layout_by_placeholder_types
+        with patch.object(PptxGeneration, '_find_layout_by_placeholder_types', side_effect=scan) as find_layout:
+            PptxGeneration.createPresentationFromText(None, slide_text(3), self.output("a.pptx"), self.template_path)
+            PptxGeneration.createPresentationFromText(None, slide_text(4), self.output("b.pptx"), self.template_path)
+        self.assertEqual(find_layout.call_count, 2)
+
+        deck = Presentation(self.output("b.pptx"))
+        self.assertEqual(len(deck.slides), 4)
+        self.assertEqual(deck.slides[1].shapes.title.text, "Slide 2")
+
+    def test_preview_and_save_reuse_the_built_deck(self):
+        build = PptxGeneration._build_deck
+        with patch.object(PptxGeneration, '_build_deck', side_effect=build) as build_deck:
+            PptxGeneration.createPresentationFromText(None, slide_text(5), self.output("preview.pptx"), num_slides=3, is_preview=True)
+            PptxGeneration.createPresentationFromText(None, slide_text(5), self.output("final.pptx"), num_slides=3)
+        self.assertEqual(build_deck.call_count, 1)
+        self.assertEqual(len(Presentation(self.output("final.pptx")).slides), 3)
+
+    def test_large_decks_are_generated_per_part(self):
+        source = "\n".join(f"--- Trascrizione per: clip{i}.mp4 ---\n" + "\n".join(f"[00:{j:02d}] frase {j}" for j in range(60))
+                           for i in range(4))
+        client = FakeClient()
+        with patch('src.services.PptxGeneration.get_llm_client', return_value=client), \
+                patch('src.services.PptxGeneration.get_model_for_action', return_value="claude-sonnet-4-5-20250929"):
+            text, input_tokens, _ = PptxGeneration.generaTestoPerSlide(source, 14, "", "Italiano")
+            self.assertGreater(len(client.calls), 1)
+            slides = PptxGeneration.parse_slides(text)
+            self.assertEqual(len(slides), 14)
+            self.assertEqual(slides[0]['titolo'], "Parte 1 1")
+            self.assertTrue(slides[-1]['titolo'].startswith(f"Parte {len(client.calls)} "))
+            self.assertEqual(input_tokens, 100 * len(client.calls))
+
+            client.calls.clear()
+            PptxGeneration.generaTestoPerSlide(source, 5, "", "Italiano")
+            self.assertEqual(len(client.calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
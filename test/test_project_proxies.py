@@ -0,0 +1,89 @@
+import unittest
+import os
+import sys
+import tempfile
+
+# Add the project root to the Python path to allow 'src.' imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.managers.ProjectManager import ProjectManager
+from src.services.ProxyGenerator import build_proxy_command, ProxyGenerationThread
+
+
+class TestProjectProxies(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.manager = ProjectManager(self.work_dir.name)
+        self.project_dir, self.gnai_path = self.manager.create_project("Demo")
+        self.clip_path = os.path.join(self.project_dir, "clips", "recording.mov")
+        with open(self.clip_path, 'wb') as f:
+            f.write(b'\0')
+
+    def tearDown(self):
+        self.work_dir.cleanup()
+
+    def _write_proxy(self):
+        proxy_path = self.manager.get_proxy_path(self.clip_path)
+        os.makedirs(os.path.dirname(proxy_path), exist_ok=True)
+        with open(proxy_path, 'wb') as f:
+            f.write(b'\0')
+        later = os.path.getmtime(self.clip_path) + 1
+        os.utime(proxy_path, (later, later))
+        return proxy_path
+
+    def test_proxy_path_is_inside_the_project(self):
+        """Project clips map to <project>/proxies/<name>_proxy.mp4."""
+        self.assertEqual(self.manager.get_proxy_path(self.clip_path),
+                         os.path.join(self.project_dir, "proxies", "recording_proxy.mp4"))
+
+    def test_files_outside_projects_have_no_proxy(self):
+        """Loose files are always played from the original."""
+        loose = os.path.join(self.work_dir.name, "loose.mp4")
+        self.assertIsNone(self.manager.get_proxy_path(loose))
+        self.assertEqual(self.manager.get_playback_path(loose), loose)
+
+    def test_playback_uses_a_fresh_proxy(self):
+        """Playback is redirected to the proxy once it has been generated."""
+        self.assertEqual(self.manager.get_playback_path(self.clip_path), self.clip_path)
+        proxy_path = self._write_proxy()
+        self.assertEqual(self.manager.get_playback_path(self.clip_path), proxy_path)
+
+    def test_stale_proxy_is_ignored(self):
+        """A proxy older than its clip is not used."""
+        proxy_path = self._write_proxy()
+        earlier = os.path.getmtime(self.clip_path) - 10
+        os.utime(proxy_path, (earlier, earlier))
+        self.assertEqual(self.manager.get_playback_path(self.clip_path), self.clip_path)
+
+    def test_proxy_command_is_all_intra(self):
+        """Proxies are downscaled and made of keyframes only."""
+        command = build_proxy_command('in.mp4', 'out.mp4', source_height=2160, ffmpeg_path='ffmpeg')
+        self.assertEqual(command[command.index('-g') + 1], '1')
+        self.assertIn('scale=-2:540', command)
+        command = build_proxy_command('in.mp4', 'out.mp4', source_height=480, ffmpeg_path='ffmpeg')
+        self.assertNotIn('-filter:v', command)
+
+
+class TestProxyQueue(unittest.TestCase):
+
+    def test_stopping_thread_rejects_new_clips(self):
+        """Clips enqueued while the thread stops are refused, so the caller can start a new thread."""
+        thread = ProxyGenerationThread()
+        self.assertTrue(thread.enqueue([("a.mov", "a_proxy.mp4")]))
+        thread.stop()
+        self.assertFalse(thread.enqueue([("b.mov", "b_proxy.mp4")]))
+
+    def test_drained_thread_rejects_new_clips(self):
+        """Once the queue is empty the worker exits and no longer accepts clips."""
+        thread = ProxyGenerationThread()
+        generated = []
+        thread._generate = lambda source, proxy: generated.append(source) or True
+        thread.enqueue([("a.mov", "a_proxy.mp4")])
+        thread.run()
+        self.assertEqual(generated, ["a.mov"])
+        self.assertFalse(thread.enqueue([("b.mov", "b_proxy.mp4")]))
+
+
+if __name__ == '__main__':
+    unittest.main()
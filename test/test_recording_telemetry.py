@@ -0,0 +1,85 @@
+import unittest
+import os
+import sys
+import csv
+import tempfile
+
+# Add the project root to the Python path to allow 'src.' imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.recorder.RecordingTelemetry import (
+    RecordingTelemetry, HEALTH_OK, HEALTH_LAGGING, telemetry_path_for, lighter_profile
+)
+
+
+def feed(telemetry, seconds, fps=30, speed=1.0, drops_per_second=0, start=0, frame=0, drops=0):
+    """Un campione al secondo, come -progress con intervallo di 1s."""
+    samples = []
+    out_time = frame / fps if fps else 0
+    for t in range(start, start + seconds):
+        frame += fps
+        drops += drops_per_second
+        out_time += speed
+        samples.append(telemetry.update({'frame': frame, 'fps': fps, 'speed': 1.0, 'drop_frames': drops,
+                                         'dup_frames': 0, 'total_size': frame * 1000, 'out_time': out_time},
+                                        now=float(t)))
+    return samples, frame, drops
+
+
+class TestRecordingTelemetry(unittest.TestCase):
+
+    def test_effective_fps_and_write_rate(self):
+        """fps effettivi e scrittura su disco sono calcolati tra campioni consecutivi."""
+        telemetry = RecordingTelemetry(30)
+        samples, _, _ = feed(telemetry, 4, fps=24)
+        self.assertEqual(samples[-1]['effective_fps'], 24)
+        self.assertAlmostEqual(samples[-1]['fps_ratio'], 0.8)
+        self.assertEqual(samples[-1]['write_rate'], 24000)
+
+    def test_slow_encoder_is_reported_once_and_recovers(self):
+        """Il ritardo è segnalato dopo alcuni campioni lenti, una volta per episodio."""
+        telemetry = RecordingTelemetry(30, 'balanced')
+        _, frame, drops = feed(telemetry, 6)
+        slow, frame, drops = feed(telemetry, 5, speed=0.8, start=6, frame=frame, drops=drops)
+        self.assertEqual([s.get('lag_started') for s in slow].count(True), 1)
+        self.assertEqual(telemetry.health, HEALTH_LAGGING)
+
+        fast, _, _ = feed(telemetry, 3, start=11, frame=frame, drops=drops)
+        self.assertTrue(fast[-1].get('lag_ended'))
+        self.assertEqual(telemetry.health, HEALTH_OK)
+        summary = telemetry.summary()
+        self.assertEqual(summary['lag_episodes'], 1)
+        self.assertEqual(summary['suggested_profile'], lighter_profile('balanced'))
+
+    def test_dropped_frames_trigger_lag_immediately(self):
+        """Molti frame persi in un intervallo bastano a segnalare il ritardo."""
+        telemetry = RecordingTelemetry(30)
+        _, frame, drops = feed(telemetry, 6)
+        samples, _, _ = feed(telemetry, 1, drops_per_second=10, start=6, frame=frame, drops=drops)
+        self.assertTrue(samples[0].get('lag_started'))
+
+    def test_warmup_is_ignored(self):
+        """I primi secondi, in cui ffmpeg avvia la cattura, non contano."""
+        telemetry = RecordingTelemetry(30)
+        feed(telemetry, 5, speed=0.5)
+        self.assertEqual(telemetry.lag_episodes, 0)
+
+    def test_time_series_is_saved_next_to_the_recording(self):
+        """La serie temporale va in un CSV accanto alla registrazione."""
+        with tempfile.TemporaryDirectory() as work_dir:
+            recording = os.path.join(work_dir, "demo.mp4")
+            path = telemetry_path_for(recording)
+            self.assertEqual(path, os.path.join(work_dir, "demo_telemetry.csv"))
+            self.assertIsNone(RecordingTelemetry(30).save(path))
+
+            telemetry = RecordingTelemetry(30)
+            feed(telemetry, 3)
+            telemetry.save(path)
+            with open(path, newline='', encoding='utf-8') as f:
+                rows = list(csv.DictReader(f))
+            self.assertEqual(len(rows), 3)
+            self.assertEqual(rows[-1]['health'], HEALTH_OK)
+
+
+if __name__ == '__main__':
+    unittest.main()
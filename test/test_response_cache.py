@@ -0,0 +1,78 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import patch, MagicMock
+
+# Add the project root to the Python path to allow 'src.' imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.ResponseCache import ResponseCache
+from src.services.LLMClient import LLMResponse
+from src.services.ProcessTextAI import ProcessTextAI
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(cache_dir=os.path.join(self.work_dir.name, "ai_responses"))
+
+    def tearDown(self):
+        self.work_dir.cleanup()
+
+    def test_key_depends_on_every_component(self):
+        """Modello, modalità, template, lingua e testo cambiano tutti la chiave."""
+        base = ("claude-sonnet-4-5", "fix", "Correggi in {language}", "italiano", {'text': "ciao"})
+        key = ResponseCache.make_key(*base)
+        self.assertEqual(key, ResponseCache.make_key(*base))
+        for index, value in enumerate(["gemini-2.5-flash", "summary", "Riassumi", "inglese", {'text': "ciao!"}]):
+            variant = list(base)
+            variant[index] = value
+            self.assertNotEqual(key, ResponseCache.make_key(*variant))
+
+    def test_put_and_get(self):
+        key = ResponseCache.make_key("m", "fix", "t", "italiano", "testo")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, "risposta", model="m", mode="fix")
+        self.assertEqual(self.cache.get(key), "risposta")
+        self.assertEqual(self.cache.size()[0], 1)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """Oltre il limite di spazio si eliminano le voci usate meno di recente."""
+        keys = [ResponseCache.make_key("m", "fix", "t", "italiano", str(i)) for i in range(3)]
+        for i, key in enumerate(keys):
+            self.cache.put(key, "x" * 1000)
+            os.utime(self.cache._path(key), (1000 + i, 1000 + i))
+        self.cache.get(keys[0])  # La prima voce torna la più recente
+
+        self.cache.max_bytes = 2 * self.cache.size()[1] // 3 + 100  # Spazio per due voci
+        self.cache.put(ResponseCache.make_key("m", "fix", "t", "italiano", "nuovo"), "x" * 1000)
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNone(self.cache.get(keys[2]))
+
+    def test_process_text_reuses_cached_response(self):
+        """Una seconda correzione dello stesso testo non chiama il modello; senza cache sì."""
+        client = MagicMock()
+        client.generate.return_value = LLMResponse("testo corretto", "m", "anthropic", 10, 5)
+        with patch('src.services.ProcessTextAI.get_llm_client', return_value=client), \
+                patch('src.services.ProcessTextAI.get_response_cache', return_value=self.cache):
+            first = ProcessTextAI("fix", "italiano", {'text': "testo da corregere"}, use_cache=True)
+            self.assertEqual(first._process_text_with_selected_model(), ("testo corretto", 10, 5))
+            second = ProcessTextAI("fix", "italiano", {'text': "testo da corregere"}, use_cache=True)
+            self.assertEqual(second._process_text_with_selected_model(), ("testo corretto", 0, 0))
+            self.assertEqual(client.generate.call_count, 1)
+
+            bypass = ProcessTextAI("fix", "italiano", {'text': "testo da corregere"}, use_cache=False)
+            bypass._process_text_with_selected_model()
+            self.assertEqual(client.generate.call_count, 2)
+
+            chat = ProcessTextAI("chat_summary", "italiano", {'summary_text': "s", 'user_query': "q"}, use_cache=True)
+            chat._process_text_with_selected_model()
+            chat._process_text_with_selected_model()
+            self.assertEqual(client.generate.call_count, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+# Add the project root to the Python path to allow 'src.' imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.SegmentMerger import segment_signature, find_incompatible_segments, SegmentMergeThread
+
+VIDEO = {'codec_type': 'video', 'codec_name': 'h264', 'width': 1920, 'height': 1080, 'pix_fmt': 'yuv420p'}
+AUDIO = {'codec_type': 'audio', 'codec_name': 'aac', 'sample_rate': '44100', 'channels': 2}
+
+
+class TestSegmentMerger(unittest.TestCase):
+
+    def test_matching_segments_are_compatible(self):
+        """Segments recorded with the same settings can be stream-copied together."""
+        signatures = [segment_signature([VIDEO, AUDIO]), segment_signature([dict(VIDEO), dict(AUDIO)])]
+        self.assertEqual(find_incompatible_segments(signatures), [])
+
+    def test_different_parameters_are_reported(self):
+        """A segment with another resolution or without audio is flagged."""
+        signatures = [
+            segment_signature([VIDEO, AUDIO]),
+            segment_signature([dict(VIDEO, width=1280, height=720), AUDIO]),
+            segment_signature([VIDEO]),
+            segment_signature([VIDEO, AUDIO]),
+        ]
+        self.assertEqual(find_incompatible_segments(signatures), [1, 2])
+
+
+class TestSegmentCleanup(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.segment_dir = os.path.join(self.work_dir.name, "rec_segments")
+        os.makedirs(self.segment_dir)
+        self.segments = []
+        for i in range(2):
+            path = os.path.join(self.segment_dir, f"rec_{i:05d}.mp4")
+            with open(path, 'wb') as f:
+                f.write(b'\0')
+            self.segments.append(path)
+        self.list_path = os.path.join(self.segment_dir, "segments.txt")
+        with open(self.list_path, 'w', encoding='utf-8') as f:
+            f.write("rec_00000.mp4\nrec_00001.mp4\n")
+        self.output_path = os.path.join(self.work_dir.name, "rec.mp4")
+
+    def tearDown(self):
+        self.work_dir.cleanup()
+
+    def fake_merge(self, segments, expected_duration):
+        with open(self.output_path, 'wb') as f:
+            f.write(b'merged')
+
+    def test_failed_leftover_removal_keeps_the_merged_recording(self):
+        """A segment list that cannot be deleted (e.g. locked on Windows) must not cost the merged file."""
+        thread = SegmentMergeThread(self.segments, self.output_path, leftover_files=("segments.txt",))
+        completed, errors = [], []
+        thread.completed.connect(completed.append)
+        thread.error.connect(errors.append)
+        real_remove = os.remove
+
+        def remove(path):
+            if path == self.list_path:
+                raise PermissionError("file in uso")
+            real_remove(path)
+
+        with patch.object(SegmentMergeThread, '_valid_segments', return_value=(self.segments, [1.0, 1.0])), \
+                patch.object(SegmentMergeThread, '_merge', self.fake_merge), \
+                patch('src.services.SegmentMerger.os.remove', side_effect=remove):
+            thread.run()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(completed, [self.output_path])
+        self.assertTrue(os.path.exists(self.output_path))
+        self.assertFalse(any(os.path.exists(path) for path in self.segments))
+        self.assertTrue(os.path.exists(self.list_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
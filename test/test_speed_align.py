@@ -0,0 +1,55 @@
+import unittest
+import os
+import sys
+
+# Add the project root to the Python path to allow 'src.' imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.SpeedAlign import compute_speed_factor, build_speed_align_command, build_audio_splice_command
+
+
+class TestSpeedAlign(unittest.TestCase):
+
+    def test_speed_factor_is_not_rounded(self):
+        """The factor keeps full precision so long videos do not drift."""
+        self.assertAlmostEqual(compute_speed_factor(600.0, 487.0), 600.0 / 487.0)
+
+    def test_invalid_durations_raise(self):
+        """Zero or negative durations are rejected."""
+        with self.assertRaises(ValueError):
+            compute_speed_factor(10.0, 0)
+        with self.assertRaises(ValueError):
+            compute_speed_factor(0, 10.0)
+
+    def test_command_is_single_pass(self):
+        """Speed change, frame rate and audio mapping happen in one invocation."""
+        command = build_speed_align_command('in.mp4', 'voice.wav', 'out.mp4', 1.25, 8.0,
+                                            frame_rate='30/1', ffmpeg_path='ffmpeg')
+        self.assertEqual(command.count('-i'), 2)
+        video_filter = command[command.index('-filter:v') + 1]
+        self.assertTrue(video_filter.startswith('setpts=PTS/1.25'))
+        self.assertTrue(video_filter.endswith(',fps=30/1'))
+        self.assertIn('1:a:0', command)
+        self.assertEqual(command[command.index('-t') + 1], '8.000000')
+        self.assertEqual(command[-1], 'out.mp4')
+
+    def test_splice_copies_video_and_keeps_original_audio_around_the_insert(self):
+        """Original audio is kept before and after the new audio, the video is copied."""
+        command = build_audio_splice_command('in.mp4', 'voice.wav', 'out.mp4', 5.0, 3.0, 20.0,
+                                             ffmpeg_path='ffmpeg')
+        graph = command[command.index('-filter_complex') + 1]
+        self.assertIn('atrim=end=5.000000', graph)
+        self.assertIn('atrim=start=8.000000', graph)
+        self.assertIn('[head][new][tail]concat=n=3', graph)
+        self.assertEqual(command[command.index('-c:v') + 1], 'copy')
+        self.assertEqual(command[command.index('-t') + 1], '20.000000')
+
+    def test_splice_past_the_end_has_no_tail(self):
+        """New audio running past the end of the video replaces the rest of the track."""
+        command = build_audio_splice_command('in.mp4', 'voice.wav', 'out.mp4', 18.0, 3.0, 20.0,
+                                             ffmpeg_path='ffmpeg')
+        self.assertIn('[head][new]concat=n=2', command[command.index('-filter_complex') + 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
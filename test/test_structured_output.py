@@ -0,0 +1,92 @@
+import unittest
+import os
+import sys
+import json
+from unittest.mock import patch
+
+# Add the project root to the Python path to allow 'src.' imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.StructuredOutput import JsonArrayStreamParser, parse_json_array
+from src.services.FrameExtractor import FrameExtractor, FRAME_DESCRIPTION_SCHEMA
+from src.services.LLMClient import LLMResponse, _gemini_schema
+
+
+class FakeVisionClient:
+    """Restituisce in streaming le risposte indicate, una per chiamata."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def generate(self, model, prompt, on_text=None, generation_options=None, **kwargs):
+        self.calls.append({'images': sum(1 for part in prompt if isinstance(part, dict)),
+                           'schema': (generation_options or {}).get('response_schema')})
+        text = self.responses.pop(0)
+        if isinstance(text, Exception):
+            raise text
+        for start in range(0, len(text), 7):
+            on_text(text[start:start + 7])
+        return LLMResponse(text, model, "anthropic", 10, 10)
+
+
+class TestStructuredOutput(unittest.TestCase):
+
+    def test_parser_returns_items_as_they_complete(self):
+        parser = JsonArrayStreamParser()
+        self.assertEqual(parser.feed('```json\n[{"frame": 0, "description": "una } graffa"}, {"fra'), [
+            {"frame": 0, "description": "una } graffa"}])
+        self.assertEqual(parser.feed('me": 1, "description": "b"}]\n```'), [{"frame": 1, "description": "b"}])
+        self.assertTrue(parser.complete)
+
+    def test_invalid_and_truncated_elements_keep_the_others(self):
+        items, complete = parse_json_array('{"result": [{"frame": 0, "description": "a"}, {"frame": 1 "x"}, '
+                                           '{"frame": 2, "description": "c"}, {"frame": 3, "desc')
+        self.assertEqual([item['frame'] for item in items], [0, 2])
+        self.assertFalse(complete)
+        # Parentesi nel testo prima del JSON e array vuoto valido
+        self.assertEqual(parse_json_array('Frame [00:12] analizzato:\n[]'), ([], True))
+        self.assertEqual(_gemini_schema(FRAME_DESCRIPTION_SCHEMA)['items']['properties']['frame'], {"type": "INTEGER"})
+
+    def make_extractor(self):
+        with patch('src.services.FrameExtractor.get_model_for_action', return_value="claude-sonnet-4-5-20250929"):
+            return FrameExtractor("video.mp4", 4, batch_size=4)
+
+    def test_only_failed_frames_are_retried(self):
+        frames = [{'data': "aW1n", 'timestamp': float(t)} for t in (0, 10, 20, 30)]
+        client = FakeVisionClient([
+            # Risposta interrotta: frame 0 e 2 validi, frame 1 non valido, frame 3 troncato
+            '[{"frame": 0, "description": "primo"}, {"frame": 1, "description": }, '
+            '{"frame": 2, "description": "terzo"}, {"frame": 3, "descr',
+            # Nuova richiesta con i soli frame 1 e 3 (indici locali 0 e 1)
+            json.dumps([{"frame": 0, "description": "secondo"}, {"frame": 1, "description": "quarto"}]),
+        ])
+        extractor = self.make_extractor()
+        with patch('src.services.FrameExtractor.get_llm_client', return_value=client):
+            results = extractor.analyze_frames_batch(frames, "italiano")
+
+        self.assertEqual([call['images'] for call in client.calls], [4, 2])
+        self.assertEqual(client.calls[0]['schema'], FRAME_DESCRIPTION_SCHEMA)
+        self.assertEqual([(r['frame_number'], r['description'], r['timestamp']) for r in results], [
+            (0, "primo", "00:00"), (1, "secondo", "00:10"), (2, "terzo", "00:20"), (3, "quarto", "00:30")])
+
+    def test_items_received_before_an_error_are_kept(self):
+        frames = [{'data': "aW1n", 'timestamp': float(t)} for t in (0, 10)]
+
+        class DroppedClient(FakeVisionClient):
+            def generate(self, model, prompt, on_text=None, **kwargs):
+                self.calls.append(None)
+                if len(self.calls) == 1:
+                    on_text('[{"frame": 0, "description": "ok"}, {"fr')
+                raise ConnectionError("connessione interrotta")
+
+        client = DroppedClient([])
+        extractor = self.make_extractor()
+        with patch('src.services.FrameExtractor.get_llm_client', return_value=client):
+            results = extractor.analyze_frames_batch(frames, "italiano")
+        self.assertEqual(len(client.calls), 2)
+        self.assertEqual([r['description'] for r in results], ["ok"])
+
+
+if __name__ == '__main__':
+    unittest.main()
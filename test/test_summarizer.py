@@ -0,0 +1,82 @@
+import unittest
+import os
+import sys
+import time
+from unittest.mock import patch
+
+# Add the project root to the Python path to allow 'src.' imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.Summarizer import SummarizerThread, SummarizerModelCache
+
+
+class FakeTokenizer:
+    """Un token per parola."""
+
+    def encode(self, text, add_special_tokens=False):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+class FakePipeline:
+    def __init__(self):
+        self.tokenizer = FakeTokenizer()
+        self.calls = []
+
+    def __call__(self, inputs, max_length, min_length, **kwargs):
+        batch = inputs if isinstance(inputs, list) else [inputs]
+        self.calls.append(len(batch))
+        return [{'summary_text': text.split()[0]} for text in batch]
+
+
+class TestSummarizer(unittest.TestCase):
+
+    def setUp(self):
+        self.loads = []
+
+        def load(model_name, quantize):
+            self.loads.append((model_name, quantize))
+            self.pipeline = FakePipeline()
+            return self.pipeline
+
+        self.patcher = patch('src.services.Summarizer._load_pipeline', side_effect=load)
+        self.patcher.start()
+
+    def tearDown(self):
+        SummarizerModelCache.unload()
+        self.patcher.stop()
+
+    def run_thread(self, text, **kwargs):
+        thread = SummarizerThread(text, 50, **kwargs)
+        results = []
+        thread.summarization_complete.connect(results.append)
+        thread.error_occurred.connect(self.fail)
+        thread.run()
+        return results
+
+    def test_model_is_loaded_once_and_chunks_are_batched(self):
+        # 10 blocchi da 1024 parole più uno corto: 3 batch per i blocchi pieni, 1 per l'ultimo, 1 finale
+        text = " ".join(f"parola{i}" for i in range(1024 * 10 + 30))
+        self.assertEqual(len(self.run_thread(text)), 1)
+        self.assertEqual(self.pipeline.calls, [4, 4, 2, 1, 1])
+
+        self.run_thread("testo breve da riassumere")
+        self.assertEqual(len(self.loads), 1)
+
+        self.run_thread("testo breve da riassumere", quantize=True)
+        self.assertEqual(self.loads[-1], ("facebook/bart-large-cnn", True))
+
+    def test_idle_model_is_unloaded(self):
+        self.run_thread("testo breve da riassumere")
+        self.assertTrue(SummarizerModelCache.is_loaded())
+
+        SummarizerModelCache.acquire()
+        SummarizerModelCache.release(idle_seconds=0.05)
+        time.sleep(0.3)
+        self.assertFalse(SummarizerModelCache.is_loaded())
+
+
+if __name__ == '__main__':
+    unittest.main()
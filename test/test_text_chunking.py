@@ -0,0 +1,120 @@
+import unittest
+import os
+import sys
+import tempfile
+import threading
+from unittest.mock import patch
+
+# Add the project root to the Python path to allow 'src.' imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.TextChunking import (
+    split_sections, chunk_text, estimate_tokens, summarize_chunks, condense_text, needs_chunking,
+    SINGLE_PASS_TOKENS, CHUNK_TOKENS
+)
+from src.services.ResponseCache import ResponseCache
+from src.services.LLMClient import LLMResponse, PROVIDER_OLLAMA
+from src.services.ProcessTextAI import ProcessTextAI
+
+
+def clip(name, sentences):
+    body = "\n".join(f"[00:{i // 60:02d}:{i % 60:02d}] Frase numero {i} della clip {name}." for i in range(sentences))
+    return f"--- Trascrizione per: {name}.mp4 ---\n{body}"
+
+
+class FakeClient:
+    """Riassume ogni blocco con la sua prima riga e conta le richieste."""
+
+    def __init__(self):
+        self.prompts = []
+        self.lock = threading.Lock()
+
+    def generate(self, model, prompt, system=None, **kwargs):
+        with self.lock:
+            self.prompts.append(prompt)
+        first_line = prompt.splitlines()[1]
+        return LLMResponse(f"sintesi di {first_line}", model, PROVIDER_OLLAMA, 10, 2)
+
+
+class TestTextChunking(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(cache_dir=self.work_dir.name)
+        self.client = FakeClient()
+        self.patches = [
+            patch('src.services.TextChunking.get_response_cache', return_value=self.cache),
+            patch('src.services.TextChunking.get_llm_client', return_value=self.client),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.work_dir.cleanup()
+
+    def test_sections_follow_clip_separators(self):
+        """Le trascrizioni batch ('---') e le intestazioni con il nome del file separano le clip."""
+        self.assertEqual(split_sections("prima clip\n\n---\n\nseconda clip"), ["prima clip", "seconda clip"])
+        sections = split_sections(f"{clip('a', 2)}\n{clip('b', 2)}")
+        self.assertEqual(len(sections), 2)
+        self.assertTrue(sections[1].startswith("--- Trascrizione per: b.mp4 ---"))
+
+    def test_chunks_respect_budget_and_repeat_header(self):
+        chunks = chunk_text(clip('lunga', 200), 500)
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(estimate_tokens(chunk), 500)
+            self.assertTrue(chunk.startswith("--- Trascrizione per: lunga.mp4 ---"))
+
+        # Una trascrizione senza a capo viene spezzata alla fine delle frasi
+        chunks = chunk_text(" ".join(f"Frase {i}." for i in range(2000)), 300)
+        self.assertTrue(all(estimate_tokens(c) <= 300 and c.endswith(".") for c in chunks))
+
+    def test_editing_one_clip_recomputes_only_its_chunk(self):
+        """Gli altri blocchi hanno lo stesso testo e il loro riassunto parziale arriva dalla cache."""
+        clips = [clip(name, 40) for name in "abcd"]
+        chunks = chunk_text("\n".join(clips), 1000)
+        self.assertEqual(len(chunks), 4)
+        summarize_chunks("ollama:llama3", chunks, "italiano")
+        self.assertEqual(len(self.client.prompts), 4)
+
+        clips[2] = clips[2].replace("Frase numero 5", "Frase corretta 5")
+        edited = chunk_text("\n".join(clips), 1000)
+        results = summarize_chunks("ollama:llama3", edited, "italiano")
+        self.assertEqual(len(self.client.prompts), 5)
+        self.assertEqual([f"{name}.mp4" in result for name, result in zip("abcd", results)], [True] * 4)
+
+    def test_condense_reduces_until_the_text_fits(self):
+        text = "\n".join(clip(name, 60) for name in "abcdefgh")
+        with patch.dict(SINGLE_PASS_TOKENS, {PROVIDER_OLLAMA: 600}), patch.dict(CHUNK_TOKENS, {PROVIDER_OLLAMA: 1000}):
+            self.assertTrue(needs_chunking(text, "ollama:llama3"))
+            condensed = condense_text("ollama:llama3", text, "italiano")
+            self.assertFalse(needs_chunking(condensed, "ollama:llama3"))
+        self.assertIn("sintesi di --- Trascrizione per: a.mp4 ---", condensed)
+
+    def test_long_summary_uses_map_and_reduce(self):
+        """ProcessTextAI riassume i blocchi e poi chiede il riassunto finale sui riassunti parziali."""
+        text = "\n".join(clip(name, 60) for name in "abc")
+        calls = []
+
+        def reduce_call(model, prompt, system=None, **kwargs):
+            calls.append(prompt)
+            return LLMResponse("riassunto finale", model, PROVIDER_OLLAMA, 10, 2)
+
+        with patch.dict(SINGLE_PASS_TOKENS, {PROVIDER_OLLAMA: 1000}), \
+                patch('src.services.ProcessTextAI.get_response_cache', return_value=self.cache), \
+                patch('src.services.ProcessTextAI.get_llm_client') as get_client:
+            get_client.return_value.generate.side_effect = reduce_call
+            thread = ProcessTextAI("summary", "italiano", {'text': text}, use_cache=True)
+            thread.selected_model = "ollama:llama3"
+            self.assertEqual(thread._process_text_with_selected_model()[0], "riassunto finale")
+        self.assertEqual(len(self.client.prompts), 3)
+        self.assertEqual(len(calls), 1)
+        self.assertIn("sintesi di --- Trascrizione per: c.mp4 ---", calls[0])
+        self.assertNotIn("Frase numero 1 ", calls[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
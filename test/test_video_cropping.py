@@ -0,0 +1,37 @@
+import unittest
+import os
+import sys
+
+# Add the project root to the Python path to allow 'src.' imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PyQt6.QtCore import QRect
+from src.services.VideoCropping import normalize_crop_rect, audio_codec_args, build_crop_command
+
+
+class TestVideoCropping(unittest.TestCase):
+
+    def test_rect_is_clamped_and_even(self):
+        """The crop area stays inside the frame and has even sides."""
+        self.assertEqual(normalize_crop_rect(QRect(-10, 5, 1000, 301), 640, 360), (640, 300, 0, 5))
+        self.assertIsNone(normalize_crop_rect(QRect(700, 0, 100, 100), 640, 360))
+
+    def test_audio_is_copied_when_the_container_allows_it(self):
+        """AAC into MP4 is copied, PCM into MP4 is re-encoded, MKV accepts anything."""
+        self.assertEqual(audio_codec_args('aac', 'out.mp4'), ['-c:a', 'copy'])
+        self.assertEqual(audio_codec_args('pcm_s16le', 'out.mp4')[:2], ['-c:a', 'aac'])
+        self.assertEqual(audio_codec_args('opus', 'out.mkv'), ['-c:a', 'copy'])
+        self.assertEqual(audio_codec_args('aac', 'out.avi')[:2], ['-c:a', 'aac'])
+
+    def test_range_is_an_input_seek(self):
+        """Start and duration are placed before -i so ffmpeg seeks instead of decoding."""
+        command = build_crop_command('in.mp4', 'out.mp4', (320, 240, 10, 20), start_time=5.0, end_time=7.5,
+                                     audio_codec='aac', ffmpeg_path='ffmpeg')
+        input_index = command.index('-i')
+        self.assertLess(command.index('-ss'), input_index)
+        self.assertEqual(command[command.index('-t') + 1], '2.500000')
+        self.assertIn('crop=320:240:10:20', command)
+
+
+if __name__ == '__main__':
+    unittest.main()
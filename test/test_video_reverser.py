@@ -0,0 +1,50 @@
+import unittest
+import os
+import sys
+import wave
+import shutil
+import tempfile
+import numpy as np
+
+# Add the project root to the Python path to allow 'src.' imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.VideoReverser import reverse_pcm_to_wav
+
+
+class TestReversePcm(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.pcm_path = os.path.join(self.temp_dir, "audio.pcm")
+        self.wav_path = os.path.join(self.temp_dir, "audio.wav")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _read_wav(self):
+        with wave.open(self.wav_path, 'rb') as wav:
+            channels = wav.getnchannels()
+            data = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+        return data.reshape(-1, channels)
+
+    def test_samples_are_reversed_across_blocks(self):
+        """Stereo frames come out in reverse order, even when split over several blocks."""
+        samples = np.arange(2000, dtype=np.int16).reshape(-1, 2)
+        samples.tofile(self.pcm_path)
+
+        reverse_pcm_to_wav(self.pcm_path, self.wav_path, channels=2, sample_rate=44100, block_samples=64)
+
+        np.testing.assert_array_equal(self._read_wav(), samples[::-1])
+
+    def test_empty_input(self):
+        """An empty PCM file produces a valid, empty WAV."""
+        open(self.pcm_path, 'wb').close()
+
+        reverse_pcm_to_wav(self.pcm_path, self.wav_path, channels=1, sample_rate=16000)
+
+        self.assertEqual(len(self._read_wav()), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import cv2
+import numpy as np
+from unittest.mock import patch
+
+# Add the project root to the Python path to allow 'src.' imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import FFMPEG_PATH
+from src.services.FFmpegRunner import FFmpegError
+from src.services.VideoSaver import VideoProcessingThread
+
+SOURCE_FRAMES = 5
+SOURCE_FPS = 10
+SIZE = (32, 24)
+
+# Legge i frame da stdin come farebbe ffmpeg e fallisce se non arrivano tutti i byte attesi
+COUNTING_SCRIPT = (
+    "import sys; data = sys.stdin.buffer.read(); expected = int(sys.argv[1]);"
+    "sys.stderr.write(f'ricevuti {len(data)} byte'); sys.exit(0 if len(data) == expected else 1)"
+)
+
+
+class TestVideoSaverInterpolation(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.source_path = os.path.join(self.temp_dir, "source.avi")
+        writer = cv2.VideoWriter(self.source_path, cv2.VideoWriter_fourcc(*'MJPG'), SOURCE_FPS, SIZE)
+        for i in range(SOURCE_FRAMES):
+            writer.write(np.full((SIZE[1], SIZE[0], 3), i * 40, dtype=np.uint8))
+        writer.release()
+        self.target_path = os.path.join(self.temp_dir, "output.mp4")
+        self.piped = []
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def fake_pipe_frames(self, command, frames):
+        self.piped.append((command, [frame.copy() for frame in frames]))
+
+    def make_thread(self, **options):
+        options = {'use_interpolation': True, 'interpolation_factor': 2, **options}
+        thread = VideoProcessingThread(self.source_path, self.target_path, options)
+        thread.error.connect(self.fail)
+        return thread
+
+    def test_streaming_stage_pipes_frames_into_the_final_encoder(self):
+        """Without parallel encoding the interpolated frames go straight to the final ffmpeg."""
+        thread = self.make_thread()
+        completed = []
+        thread.completed.connect(completed.append)
+        with patch.object(VideoProcessingThread, '_pipe_frames', self.fake_pipe_frames):
+            thread.run()
+
+        command, frames = self.piped[0]
+        self.assertEqual(command[0], FFMPEG_PATH)
+        self.assertEqual(command[command.index('-r') + 1], f"{SOURCE_FPS * 2:.6f}")
+        self.assertEqual(command[command.index('-s') + 1], "32x24")
+        # Audio dalla sorgente originale, video dalla pipe
+        self.assertEqual(command[command.index('pipe:0') + 2], self.source_path)
+        self.assertIn('1:a:0?', command)
+        self.assertEqual(command[-1], thread.target_path)
+        # Ogni coppia di frame consecutivi riceve factor - 1 frame intermedi
+        self.assertEqual(len(frames), (SOURCE_FRAMES - 1) * 2 + 1)
+        self.assertEqual(frames[0].shape, (SIZE[1], SIZE[0], 3))
+        self.assertEqual(completed, [thread.target_path])
+
+    def test_interpolation_stage_writes_a_lossless_intermediate(self):
+        """With parallel encoding the frames go to a lossless intermediate, which is then rendered."""
+        thread = self.make_thread(use_parallel_encoding=True, interpolation_factor=3)
+        rendered = []
+        with patch.object(VideoProcessingThread, '_pipe_frames', self.fake_pipe_frames), \
+                patch.object(VideoProcessingThread, '_run_ffmpeg_stage', lambda _, path: rendered.append(path)):
+            thread.run()
+
+        command, frames = self.piped[0]
+        self.assertEqual(command[0], FFMPEG_PATH)
+        self.assertEqual(command[command.index('-qp') + 1], '0')
+        self.assertEqual(command[command.index('-r') + 1], f"{SOURCE_FPS * 3:.6f}")
+        self.assertEqual(len(frames), (SOURCE_FRAMES - 1) * 3 + 1)
+        self.assertEqual(rendered, [command[-1]])
+        self.assertTrue(command[-1].endswith(".mkv"))
+
+
+class TestPipeFrames(unittest.TestCase):
+
+    def frames(self, count):
+        return (np.full((SIZE[1], SIZE[0], 3), i, dtype=np.uint8) for i in range(count))
+
+    def run_pipe(self, frame_count, expected_bytes):
+        thread = VideoProcessingThread("source.avi", "output.mp4", {})
+        command = [sys.executable, '-c', COUNTING_SCRIPT, str(expected_bytes), '-progress']
+        with patch('src.services.FFmpegRunner.FFMPEG_TIMINGS_FILE', None):
+            thread._pipe_frames(command, self.frames(frame_count))
+        return thread
+
+    def test_all_frames_reach_the_encoder(self):
+        frame_size = SIZE[0] * SIZE[1] * 3
+        thread = self.run_pipe(4, 4 * frame_size)
+        self.assertEqual(thread.ffmpeg_job.returncode, 0)
+
+    def test_encoder_failure_is_reported(self):
+        with self.assertRaises(FFmpegError) as context:
+            self.run_pipe(2, 1)
+        self.assertIn("ricevuti", context.exception.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()